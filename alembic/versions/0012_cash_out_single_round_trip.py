@@ -0,0 +1,238 @@
+"""single round trip cash-out function
+
+Revision ID: 0012_cash_out_single_round_trip
+Revises: 0011_seed_cashout_limits
+Create Date: 2026-10-17 00:10:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "0012_cash_out_single_round_trip"
+down_revision = "0011_seed_cashout_limits"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Server-side version of POST /v1/cash-out/mobile-money (routes/payments.py):
+    # idempotency lookup, velocity limits, ledger posting, fee, FX quote,
+    # payout row and idempotency store in one statement.
+    # Returns {"outcome": ...}: REPLAY | IDEMPOTENCY_CONFLICT | VELOCITY_LIMIT_EXCEEDED | OK.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION app.cash_out_mobile_money(
+            p_wallet_id uuid,
+            p_user_id uuid,
+            p_amount_cents bigint,
+            p_country ledger.country_code,
+            p_idempotency_key text,
+            p_route_key text,
+            p_request_hash text,
+            p_provider_ref text,
+            p_provider text,
+            p_phone_e164 text,
+            p_system_owner_id uuid,
+            p_since timestamptz,
+            p_max_count integer,
+            p_max_amount_cents bigint,
+            p_max_receivers integer,
+            p_payout_currency text,
+            p_static_fx_rate text,
+            p_static_receive_minor bigint
+        ) RETURNS jsonb
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+          v_cached record;
+          v_count bigint;
+          v_txn_id uuid;
+          v_fee_cents bigint;
+          v_fx_rate text;
+          v_receive_minor bigint;
+          v_quote_id text;
+          v_quote_from text;
+          v_quote_receive text;
+          v_external_ref text;
+          v_quote jsonb;
+          v_resp jsonb;
+        BEGIN
+          SELECT request_hash, response_json, status_code
+          INTO v_cached
+          FROM app.idempotency_keys
+          WHERE user_id = p_user_id
+            AND idempotency_key = p_idempotency_key
+            AND route_key = p_route_key
+          LIMIT 1;
+
+          IF FOUND THEN
+            RETURN jsonb_build_object(
+              'outcome', 'REPLAY',
+              'request_hash', v_cached.request_hash,
+              'response_json', v_cached.response_json,
+              'status_code', v_cached.status_code
+            );
+          END IF;
+
+          IF EXISTS (
+            SELECT 1
+            FROM app.idempotency_keys
+            WHERE user_id = p_user_id
+              AND idempotency_key = p_idempotency_key
+              AND route_key <> p_route_key
+          ) THEN
+            RETURN jsonb_build_object('outcome', 'IDEMPOTENCY_CONFLICT');
+          END IF;
+
+          -- services/velocity.check_cash_out_velocity
+          IF COALESCE(p_max_count, 0) > 0 THEN
+            SELECT COUNT(*) INTO v_count
+            FROM ledger.ledger_transactions
+            WHERE created_by = p_user_id
+              AND type = 'CASHOUT'
+              AND created_at >= p_since;
+            IF v_count >= p_max_count THEN
+              RETURN jsonb_build_object('outcome', 'VELOCITY_LIMIT_EXCEEDED');
+            END IF;
+          END IF;
+
+          IF COALESCE(p_max_amount_cents, 0) > 0 THEN
+            SELECT COALESCE(SUM(amount_cents), 0) INTO v_count
+            FROM ledger.ledger_transactions
+            WHERE created_by = p_user_id
+              AND type = 'CASHOUT'
+              AND created_at >= p_since;
+            IF v_count + p_amount_cents > p_max_amount_cents THEN
+              RETURN jsonb_build_object('outcome', 'VELOCITY_LIMIT_EXCEEDED');
+            END IF;
+          END IF;
+
+          IF COALESCE(p_max_receivers, 0) > 0 AND COALESCE(p_phone_e164, '') <> '' THEN
+            IF NOT EXISTS (
+              SELECT 1
+              FROM app.mobile_money_payouts p
+              JOIN ledger.ledger_transactions t ON t.id = p.transaction_id
+              WHERE t.created_by = p_user_id
+                AND t.type = 'CASHOUT'
+                AND p.created_at >= p_since
+                AND p.phone_e164 = p_phone_e164
+            ) THEN
+              SELECT COUNT(DISTINCT p.phone_e164) INTO v_count
+              FROM app.mobile_money_payouts p
+              JOIN ledger.ledger_transactions t ON t.id = p.transaction_id
+              WHERE t.created_by = p_user_id
+                AND t.type = 'CASHOUT'
+                AND p.created_at >= p_since
+                AND p.phone_e164 IS NOT NULL
+                AND p.phone_e164 <> '';
+              IF v_count >= p_max_receivers THEN
+                RETURN jsonb_build_object('outcome', 'VELOCITY_LIMIT_EXCEEDED');
+              END IF;
+            END IF;
+          END IF;
+
+          PERFORM set_config('app.user_id', p_user_id::text, true);
+
+          v_txn_id := ledger.post_cash_out_mobile_money(
+            p_wallet_id,
+            p_user_id,
+            p_amount_cents,
+            p_country,
+            p_idempotency_key,
+            p_provider_ref,
+            p_provider,
+            p_phone_e164,
+            p_system_owner_id
+          );
+
+          SELECT COALESCE(SUM(e.amount_cents), 0) INTO v_fee_cents
+          FROM ledger.ledger_entries e
+          WHERE e.transaction_id = v_txn_id
+            AND e.memo = 'Cashout fee';
+
+          IF p_payout_currency IS NOT NULL THEN
+            BEGIN
+              -- by position, like _cashout_fx_quote (row[1] rate, row[3] receive);
+              -- trailing columns are ignored
+              SELECT * INTO v_quote_id, v_fx_rate, v_quote_from, v_quote_receive
+              FROM fx.issue_fx_quote_secure('USD'::text, p_payout_currency, p_amount_cents)
+              LIMIT 1;
+              v_receive_minor := trunc(v_quote_receive::numeric)::bigint;
+            EXCEPTION
+              WHEN undefined_function THEN
+                v_fx_rate := p_static_fx_rate;
+                v_receive_minor := p_static_receive_minor;
+            END;
+          END IF;
+
+          IF v_fx_rate IS NULL OR v_receive_minor IS NULL THEN
+            v_fx_rate := '1';
+            v_receive_minor := p_amount_cents;
+          END IF;
+
+          v_quote := jsonb_build_object(
+            'send_amount_cents', p_amount_cents,
+            'fee_cents', v_fee_cents,
+            'fx_rate', v_fx_rate,
+            'receive_amount_minor', v_receive_minor,
+            'corridor', 'US->' || upper(p_country::text),
+            'provider', CASE WHEN upper(p_provider) = 'THUNES' THEN 'THUNES' ELSE 'DIRECT' END
+          );
+
+          SELECT NULLIF(external_ref, '') INTO v_external_ref
+          FROM ledger.ledger_transactions
+          WHERE id = v_txn_id;
+          v_external_ref := COALESCE(v_external_ref, 'ext-' || v_txn_id::text);
+
+          INSERT INTO app.mobile_money_payouts (
+            transaction_id, provider, phone_e164, provider_ref,
+            status, amount_cents, currency,
+            last_error, attempt_count, last_attempt_at, next_retry_at, retryable, provider_response,
+            quote,
+            created_at, updated_at
+          )
+          VALUES (
+            v_txn_id, p_provider, p_phone_e164, p_provider_ref,
+            'PENDING', p_amount_cents, 'XOF',
+            NULL, 0, NULL, NULL, TRUE, NULL,
+            v_quote,
+            now(), now()
+          )
+          ON CONFLICT (transaction_id) DO UPDATE
+          SET quote = COALESCE(app.mobile_money_payouts.quote, EXCLUDED.quote);
+
+          v_resp := jsonb_build_object(
+            'transaction_id', v_txn_id::text,
+            'external_ref', v_external_ref,
+            'fee_cents', v_quote -> 'fee_cents',
+            'fx_rate', v_quote -> 'fx_rate',
+            'receive_amount_minor', v_quote -> 'receive_amount_minor',
+            'corridor', v_quote -> 'corridor'
+          );
+
+          INSERT INTO app.idempotency_keys (
+            user_id, idempotency_key, route_key,
+            request_hash, response_json, status_code
+          )
+          VALUES (p_user_id, p_idempotency_key, p_route_key, p_request_hash, v_resp, 200)
+          ON CONFLICT (user_id, idempotency_key, route_key) DO NOTHING;
+
+          RETURN jsonb_build_object('outcome', 'OK', 'response_json', v_resp);
+        END;
+        $$;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        DROP FUNCTION IF EXISTS app.cash_out_mobile_money(
+            uuid, uuid, bigint, ledger.country_code, text, text, text, text, text, text, uuid,
+            timestamptz, integer, bigint, integer, text, text, bigint
+        );
+        """
+    )
@@ -0,0 +1,97 @@
+"""shared rate limit buckets
+
+Revision ID: 0013_rate_limit_buckets
+Revises: 0012_cash_out_single_round_trip
+Create Date: 2026-10-17 00:20:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "0013_rate_limit_buckets"
+down_revision = "0012_cash_out_single_round_trip"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Backing store for rate_limit.PostgresRateLimiter (RATE_LIMIT_BACKEND=postgres).
+    # UNLOGGED: no WAL, truncated after a crash, which for rate limit state is fine.
+    op.execute(
+        """
+        CREATE UNLOGGED TABLE IF NOT EXISTS app.rate_limit_buckets (
+          key text PRIMARY KEY,
+          tokens double precision NOT NULL,
+          updated_at timestamptz NOT NULL,
+          expires_at timestamptz NOT NULL
+        );
+
+        CREATE INDEX IF NOT EXISTS ix_rate_limit_buckets_expires_at
+          ON app.rate_limit_buckets (expires_at);
+
+        CREATE OR REPLACE FUNCTION app.rate_limit_take(
+            p_key text,
+            p_capacity double precision,
+            p_refill_per_sec double precision,
+            OUT allowed boolean,
+            OUT tokens double precision
+        )
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+          v_now timestamptz := clock_timestamp();
+          v_tokens double precision;
+          v_updated_at timestamptz;
+        BEGIN
+          INSERT INTO app.rate_limit_buckets (key, tokens, updated_at, expires_at)
+          VALUES (p_key, p_capacity, v_now, v_now)
+          ON CONFLICT (key) DO NOTHING;
+
+          SELECT b.tokens, b.updated_at
+          INTO v_tokens, v_updated_at
+          FROM app.rate_limit_buckets b
+          WHERE b.key = p_key
+          FOR UPDATE;
+
+          -- the lock wait may have been long; measure elapsed time after it
+          v_now := clock_timestamp();
+          IF v_updated_at IS NULL THEN
+            -- row removed by the expiry sweep in between: start full
+            v_tokens := p_capacity;
+            v_updated_at := v_now;
+          END IF;
+
+          tokens := LEAST(
+            p_capacity,
+            v_tokens + GREATEST(0, EXTRACT(EPOCH FROM (v_now - v_updated_at))) * p_refill_per_sec
+          );
+          allowed := tokens >= 1;
+          IF allowed THEN
+            tokens := tokens - 1;
+          END IF;
+
+          INSERT INTO app.rate_limit_buckets (key, tokens, updated_at, expires_at)
+          VALUES (
+            p_key, tokens, v_now,
+            v_now + make_interval(secs => (p_capacity - tokens) / p_refill_per_sec)
+          )
+          ON CONFLICT (key) DO UPDATE
+          SET tokens = EXCLUDED.tokens,
+              updated_at = EXCLUDED.updated_at,
+              expires_at = EXCLUDED.expires_at;
+        END;
+        $$;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        DROP FUNCTION IF EXISTS app.rate_limit_take(text, double precision, double precision);
+        DROP TABLE IF EXISTS app.rate_limit_buckets;
+        """
+    )
@@ -0,0 +1,48 @@
+"""payout worker leases
+
+Revision ID: 0014_payout_leases
+Revises: 0013_rate_limit_buckets
+Create Date: 2026-10-17 00:40:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "0014_payout_leases"
+down_revision = "0013_rate_limit_buckets"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The payout worker claims rows by stamping a lease and committing, instead
+    # of holding FOR UPDATE locks across provider calls. A row whose lease has
+    # expired (worker crashed or stalled) is claimable again.
+    op.execute(
+        """
+        ALTER TABLE app.mobile_money_payouts
+          ADD COLUMN IF NOT EXISTS lease_owner text,
+          ADD COLUMN IF NOT EXISTS leased_until timestamptz;
+        """
+    )
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_mobile_money_payouts_leased_until
+        ON app.mobile_money_payouts (leased_until)
+        WHERE leased_until IS NOT NULL;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_mobile_money_payouts_leased_until;")
+    op.execute(
+        """
+        ALTER TABLE app.mobile_money_payouts
+          DROP COLUMN IF EXISTS leased_until,
+          DROP COLUMN IF EXISTS lease_owner;
+        """
+    )
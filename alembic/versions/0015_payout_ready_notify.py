@@ -0,0 +1,61 @@
+"""notify the payout worker when a payout becomes ready
+
+Revision ID: 0015_payout_ready_notify
+Revises: 0014_payout_leases
+Create Date: 2026-10-17 01:00:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "0015_payout_ready_notify"
+down_revision = "0014_payout_leases"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Wakes payout workers blocked on LISTEN payout_ready (payout_worker.run_forever).
+    # Fires for every cash-out insert (both the per-statement route and
+    # app.cash_out_mobile_money) and for admin retries (FAILED -> PENDING).
+    # NOTIFY is delivered on commit and identical payloads in one transaction
+    # collapse into one, so this costs no extra round trips.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION app.notify_payout_ready() RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+          PERFORM pg_notify('payout_ready', COALESCE(upper(NEW.provider), ''));
+          RETURN NULL;
+        END;
+        $$;
+
+        DROP TRIGGER IF EXISTS trg_mobile_money_payouts_ready_insert ON app.mobile_money_payouts;
+        CREATE TRIGGER trg_mobile_money_payouts_ready_insert
+          AFTER INSERT ON app.mobile_money_payouts
+          FOR EACH ROW
+          WHEN (NEW.status = 'PENDING')
+          EXECUTE FUNCTION app.notify_payout_ready();
+
+        DROP TRIGGER IF EXISTS trg_mobile_money_payouts_ready_update ON app.mobile_money_payouts;
+        CREATE TRIGGER trg_mobile_money_payouts_ready_update
+          AFTER UPDATE OF status ON app.mobile_money_payouts
+          FOR EACH ROW
+          WHEN (NEW.status = 'PENDING' AND OLD.status IS DISTINCT FROM 'PENDING')
+          EXECUTE FUNCTION app.notify_payout_ready();
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        DROP TRIGGER IF EXISTS trg_mobile_money_payouts_ready_update ON app.mobile_money_payouts;
+        DROP TRIGGER IF EXISTS trg_mobile_money_payouts_ready_insert ON app.mobile_money_payouts;
+        DROP FUNCTION IF EXISTS app.notify_payout_ready();
+        """
+    )
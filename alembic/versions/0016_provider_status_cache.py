@@ -0,0 +1,41 @@
+"""shared provider status cache
+
+Revision ID: 0016_provider_status_cache
+Revises: 0015_payout_ready_notify
+Create Date: 2026-10-17 01:20:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "0016_provider_status_cache"
+down_revision = "0015_payout_ready_notify"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Short-lived provider status results shared by the payout worker and the
+    # reconciler (app/payouts/status_poller.py). UNLOGGED like
+    # app.rate_limit_buckets: losing it after a crash only costs refetches.
+    op.execute(
+        """
+        CREATE UNLOGGED TABLE IF NOT EXISTS app.provider_status_cache (
+          provider text NOT NULL,
+          provider_ref text NOT NULL,
+          result jsonb NOT NULL,
+          expires_at timestamptz NOT NULL,
+          PRIMARY KEY (provider, provider_ref)
+        );
+
+        CREATE INDEX IF NOT EXISTS ix_provider_status_cache_expires_at
+          ON app.provider_status_cache (expires_at);
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS app.provider_status_cache;")
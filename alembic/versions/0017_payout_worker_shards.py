@@ -0,0 +1,49 @@
+"""payout worker registry and shard assignments
+
+Revision ID: 0017_payout_worker_shards
+Revises: 0016_provider_status_cache
+Create Date: 2026-10-17 01:40:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "0017_payout_worker_shards"
+down_revision = "0016_provider_status_cache"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Payout worker processes heartbeat into app.payout_workers and split the
+    # payouts between them by hash shard (app/workers/worker_registry.py).
+    # Each shard row names at most one live owner; a worker whose heartbeat
+    # expires is deleted and its shards go back to NULL until the next
+    # heartbeat of a live worker reassigns them.
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS app.payout_workers (
+          worker_id text PRIMARY KEY,
+          hostname text NOT NULL,
+          pid integer NOT NULL,
+          started_at timestamptz NOT NULL DEFAULT now(),
+          heartbeat_at timestamptz NOT NULL DEFAULT now(),
+          processed_total bigint NOT NULL DEFAULT 0,
+          last_batch_size integer NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS app.payout_worker_shards (
+          shard integer PRIMARY KEY,
+          worker_id text REFERENCES app.payout_workers (worker_id) ON DELETE SET NULL,
+          assigned_at timestamptz NOT NULL DEFAULT now()
+        );
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS app.payout_worker_shards;")
+    op.execute("DROP TABLE IF EXISTS app.payout_workers;")
@@ -0,0 +1,43 @@
+"""shared provider access tokens
+
+Revision ID: 0019_provider_tokens
+Revises: 0018_payout_claim_indexes
+Create Date: 2026-10-17 03:00:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "0019_provider_tokens"
+down_revision = "0018_payout_claim_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Provider access tokens (MoMo disbursement) shared by the API, payout
+    # workers and the reconciler (app/providers/mobile_money/token_store.py).
+    # lease_owner/leased_until single-flight the refresh across processes.
+    # UNLOGGED: losing it after a crash only costs one token fetch per key.
+    op.execute(
+        """
+        CREATE UNLOGGED TABLE IF NOT EXISTS app.provider_tokens (
+          provider text NOT NULL,
+          environment text NOT NULL,
+          country text NOT NULL DEFAULT '',
+          token text,
+          expires_at timestamptz,
+          lease_owner text,
+          leased_until timestamptz,
+          updated_at timestamptz NOT NULL DEFAULT now(),
+          PRIMARY KEY (provider, environment, country)
+        );
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS app.provider_tokens;")
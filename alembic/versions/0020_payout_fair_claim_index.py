@@ -0,0 +1,37 @@
+"""per-provider index for the fair-share pending claim
+
+Revision ID: 0020_payout_fair_claim_index
+Revises: 0019_provider_tokens
+Create Date: 2026-10-17 04:00:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "0020_payout_fair_claim_index"
+down_revision = "0019_provider_tokens"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # claim_pending_payouts_fair (app/payouts/repository.py) finds the providers
+    # with PENDING rows by a loose index scan, then reads only each provider's
+    # oldest rows; both walk this index instead of ranking the whole backlog.
+    # Same CONCURRENTLY caveat as 0018: drop an INVALID leftover and rerun.
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_mobile_money_payouts_pending_provider_claim
+            ON app.mobile_money_payouts ((upper(btrim(provider))), created_at)
+            WHERE status = 'PENDING';
+            """
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS app.idx_mobile_money_payouts_pending_provider_claim;")
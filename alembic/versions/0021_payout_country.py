@@ -0,0 +1,79 @@
+"""payout corridor column and index for the per-country fair claim
+
+Revision ID: 0021_payout_country
+Revises: 0020_payout_fair_claim_index
+Create Date: 2026-10-17 05:00:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "0021_payout_country"
+down_revision = "0020_payout_fair_claim_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # claim_pending_payouts_fair with by_country (app/payouts/repository.py)
+    # walks (provider, country) groups the way 0020 walks providers, which
+    # needs the corridor on the payout row itself. It is copied from the
+    # ledger transaction on insert, so every insert path (the cash-out route,
+    # app.cash_out_mobile_money, scripts) fills it without knowing about it.
+    op.execute(
+        """
+        ALTER TABLE app.mobile_money_payouts
+          ADD COLUMN IF NOT EXISTS country text NOT NULL DEFAULT '';
+
+        CREATE OR REPLACE FUNCTION app.set_payout_country() RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+          IF NEW.country = '' THEN
+            SELECT COALESCE(upper(btrim(tx.country::text)), '') INTO NEW.country
+            FROM ledger.ledger_transactions tx
+            WHERE tx.id = NEW.transaction_id;
+            NEW.country := COALESCE(NEW.country, '');
+          END IF;
+          RETURN NEW;
+        END;
+        $$;
+
+        DROP TRIGGER IF EXISTS trg_mobile_money_payouts_country ON app.mobile_money_payouts;
+        CREATE TRIGGER trg_mobile_money_payouts_country
+          BEFORE INSERT ON app.mobile_money_payouts
+          FOR EACH ROW
+          EXECUTE FUNCTION app.set_payout_country();
+
+        UPDATE app.mobile_money_payouts p
+        SET country = upper(btrim(tx.country::text))
+        FROM ledger.ledger_transactions tx
+        WHERE tx.id = p.transaction_id
+          AND p.country = ''
+          AND tx.country IS NOT NULL;
+        """
+    )
+    # Same CONCURRENTLY caveat as 0018: drop an INVALID leftover and rerun.
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_mobile_money_payouts_pending_corridor_claim
+            ON app.mobile_money_payouts ((upper(btrim(provider))), country, created_at)
+            WHERE status = 'PENDING';
+            """
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS app.idx_mobile_money_payouts_pending_corridor_claim;")
+    op.execute(
+        """
+        DROP TRIGGER IF EXISTS trg_mobile_money_payouts_country ON app.mobile_money_payouts;
+        DROP FUNCTION IF EXISTS app.set_payout_country();
+        ALTER TABLE app.mobile_money_payouts DROP COLUMN IF EXISTS country;
+        """
+    )
@@ -0,0 +1,53 @@
+"""restrict access to shared provider tokens
+
+Revision ID: 0022_provider_tokens_grants
+Revises: 0021_payout_country
+Create Date: 2026-10-17 06:00:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "0022_provider_tokens_grants"
+down_revision = "0021_payout_country"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # app.provider_tokens (0019) holds live MoMo disbursement access tokens in
+    # plaintext. Only the table owner (the role migrations and the app run as)
+    # keeps access: drop PUBLIC and every other role's grants, including ones
+    # handed out by ALTER DEFAULT PRIVILEGES on the app schema. Deployments
+    # whose API/workers connect as a separate role grant it back explicitly
+    # (docs/PRODUCTION_RUNBOOK.md, "Rotate secrets").
+    op.execute(
+        """
+        DO $$
+        DECLARE
+          r record;
+        BEGIN
+          REVOKE ALL ON app.provider_tokens FROM PUBLIC;
+          FOR r IN
+            SELECT DISTINCT a.grantee::regrole::text AS grantee
+            FROM pg_class c
+            CROSS JOIN LATERAL aclexplode(c.relacl) a
+            WHERE c.oid = 'app.provider_tokens'::regclass
+              AND a.grantee <> 0
+              AND a.grantee <> c.relowner
+          LOOP
+            EXECUTE format('REVOKE ALL ON app.provider_tokens FROM %s', r.grantee);
+          END LOOP;
+        END;
+        $$;
+        """
+    )
+
+
+def downgrade() -> None:
+    # The revoked grants are not recorded, so there is nothing to restore;
+    # re-grant by hand if a role needs the table back.
+    pass
@@ -20,3 +20,22 @@ class Payout:
     last_attempt_at: Optional[datetime]
     next_retry_at: Optional[datetime]
     provider_response: Optional[dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class StatusUpdate:
+    """
+    One payout outcome for repository.update_status_many; fields mirror the
+    keyword arguments of update_status.
+    """
+    payout_id: UUID
+    new_status: str
+    from_status: Optional[str] = None
+    provider_ref: Optional[str] = None
+    provider_response: Optional[dict[str, Any]] = None
+    last_error: Optional[str] = None
+    retryable: Optional[bool] = None
+    attempt_count: Optional[int] = None
+    next_retry_at: Optional[datetime] = None
+    touch_last_attempt_at: bool = True
+    lease_owner: Optional[str] = None
@@ -6,10 +6,15 @@ from __future__ import annotations
 
 import json
 from datetime import datetime, timedelta, timezone
-from typing import Any, Optional
+from typing import Any, Mapping, Optional, Sequence
 from uuid import UUID
 
-from psycopg2.extras import RealDictCursor
+from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
+from psycopg2.extras import RealDictCursor, execute_values
+
+from app.payouts.model import StatusUpdate
+from db_prepared import PreparedStatement
 
 DEFAULT_BACKOFF_SECONDS = 60  # used when caller doesn't provide next_retry_at
 TERMINAL_STATUSES = ("CONFIRMED", "FAILED")
@@ -31,91 +36,442 @@ def _utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
+def _effective_next_retry_at(new_status: str, retryable: Optional[bool], next_retry_at: Optional[datetime]):
+    if next_retry_at is None and new_status in {"SENT", "RETRY"} and retryable is True:
+        return _utcnow() + timedelta(seconds=DEFAULT_BACKOFF_SECONDS)
+    return next_retry_at
+
+
 # ==========================================================
 # Claiming payouts for worker
 # ==========================================================
 
-def claim_pending_payouts(conn, *, batch_size: int) -> list[dict[str, Any]]:
+# Claims stamp a lease (lease_owner/leased_until, alembic 0014) and are meant to
+# be committed straight away: no row lock is held while the worker calls the
+# provider. Rows whose lease has expired are claimable again.
+_CLAIM_SELECT = """
+    ,
+    leased AS (
+      UPDATE app.mobile_money_payouts p
+      SET lease_owner = %s,
+          leased_until = now() + make_interval(secs => %s::float8)
+      FROM picked
+      WHERE p.id = picked.id
+      RETURNING p.*
+    )
+    SELECT
+      p.id,
+      p.transaction_id,
+      COALESCE(NULLIF(btrim(upper(p.provider)), ''), btrim(upper(tx.provider))) AS provider,
+      COALESCE(p.phone_e164, tx.phone_e164) AS phone_e164,
+      p.provider_ref,
+      p.attempt_count,
+      p.last_attempt_at,
+      p.next_retry_at,
+      p.lease_owner,
+      p.created_at,
+      tx.amount_cents,
+      tx.currency,
+      tx.external_ref,
+      tx.country
+    FROM leased p
+    LEFT JOIN ledger.ledger_transactions tx ON tx.id = p.transaction_id
+"""
+
+# Payouts are split into shard_count hash shards by id; a sharded worker
+# (app/workers/worker_registry.py) only claims the shards it owns. shard_count=1,
+# shards=[0] matches every row. hashtext is shifted to be non-negative.
+_SHARD_FILTER = "mod(hashtext(p.id::text)::bigint + 2147483648, %s::int) = ANY(%s::int[])"
+
+_CLAIM_PENDING = PreparedStatement(
+    "claim_pending_payouts",
+    """
+    WITH picked AS (
+      SELECT p.id
+      FROM app.mobile_money_payouts p
+      WHERE p.status = 'PENDING'
+        AND (p.next_retry_at IS NULL OR p.next_retry_at <= now())
+        AND (p.leased_until IS NULL OR p.leased_until <= now())
+        AND """
+    + _SHARD_FILTER
+    + """
+      ORDER BY p.created_at
+      LIMIT %s
+      FOR UPDATE SKIP LOCKED
+    )
+    """
+    + _CLAIM_SELECT,
+)
+
+# %s::text: PREPARE needs a concrete type to resolve the || operator
+_CLAIM_STALE_SENT = PreparedStatement(
+    "claim_stale_sent_payouts",
+    """
+    WITH picked AS (
+      SELECT p.id
+      FROM app.mobile_money_payouts p
+      WHERE p.status = 'SENT'
+        AND (p.next_retry_at IS NULL OR p.next_retry_at <= now())
+        AND (p.leased_until IS NULL OR p.leased_until <= now())
+        AND (
+          (p.last_attempt_at IS NOT NULL AND p.last_attempt_at <= (now() - (%s::text || ' seconds')::interval))
+          OR
+          (p.last_attempt_at IS NULL AND p.updated_at <= (now() - (%s::text || ' seconds')::interval))
+        )
+        AND """
+    + _SHARD_FILTER
+    + """
+      ORDER BY p.next_retry_at NULLS FIRST, p.updated_at
+      LIMIT %s
+      FOR UPDATE SKIP LOCKED
+    )
+    """
+    + _CLAIM_SELECT,
+)
+
+
+def claim_pending_payouts(
+    conn,
+    *,
+    batch_size: int,
+    lease_owner: str,
+    lease_seconds: float,
+    shard_count: int = 1,
+    shards: Sequence[int] = (0,),
+) -> list[dict[str, Any]]:
     cur = conn.cursor()
-    cur.execute(
-        """
-        WITH picked AS (
-          SELECT p.id
+    _CLAIM_PENDING.execute(cur, (shard_count, list(shards), batch_size, lease_owner, lease_seconds))
+    cols = [d[0] for d in cur.description]
+    return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+# Fair-share variant of _CLAIM_PENDING: claimable rows are ranked within their
+# group (provider, or provider:country) and interleaved by weighted turn
+# ((rank - 1) / weight), so a backlog in one group can't push newer payouts of
+# another group out of the batch. A group quota caps its rows per batch
+# (0 = no cap). Weights/quotas are looked up by group key, then by provider.
+#
+# Only the oldest `window` claimable rows of each group are ranked, so the
+# cost follows groups x window rather than the backlog: the groups with
+# PENDING rows come from a loose index scan and each one's window from a
+# LATERAL read, on idx_mobile_money_payouts_pending_provider_claim (alembic
+# 0020) per provider, idx_mobile_money_payouts_pending_corridor_claim (0021)
+# per provider and country.
+_FAIR_PICKED = """
+    WITH RECURSIVE groups AS (
+      (
+        SELECT {group_cols}
+        FROM app.mobile_money_payouts p
+        WHERE p.status = 'PENDING'
+        ORDER BY {group_order}
+        LIMIT 1
+      )
+      UNION ALL
+      SELECT n.*
+      FROM groups g
+      CROSS JOIN LATERAL (
+        SELECT {group_cols}
+        FROM app.mobile_money_payouts p
+        WHERE p.status = 'PENDING'
+          AND {group_after}
+        ORDER BY {group_order}
+        LIMIT 1
+      ) n
+    ),
+    w AS (
+      SELECT * FROM unnest(%s::text[], %s::float8[], %s::int[]) AS w(grp, weight, quota)
+    ),
+    ranked AS (
+      SELECT
+        c.id,
+        c.created_at,
+        c.rn,
+        (c.rn - 1) / COALESCE(wg.weight, wp.weight, 1.0) AS turn,
+        COALESCE(wg.quota, wp.quota, %s::int) AS quota
+      FROM (
+        SELECT
+          c.id,
+          c.created_at,
+          g.provider,
+          {group_key} AS grp,
+          row_number() OVER (PARTITION BY {group_key} ORDER BY c.created_at) AS rn
+        FROM groups g
+        CROSS JOIN LATERAL (
+          SELECT p.id, p.created_at
           FROM app.mobile_money_payouts p
-          WHERE p.status = 'PENDING'
+          WHERE {group_match}
+            AND p.status = 'PENDING'
             AND (p.next_retry_at IS NULL OR p.next_retry_at <= now())
+            AND (p.leased_until IS NULL OR p.leased_until <= now())
+            AND {shard_filter}
           ORDER BY p.created_at
           LIMIT %s
-          FOR UPDATE SKIP LOCKED
-        )
-        SELECT
-          p.id,
-          p.transaction_id,
-          COALESCE(NULLIF(btrim(upper(p.provider)), ''), btrim(upper(tx.provider))) AS provider,
-          COALESCE(p.phone_e164, tx.phone_e164) AS phone_e164,
-          p.provider_ref,
-          p.attempt_count,
-          p.last_attempt_at,
-          p.next_retry_at,
-          tx.amount_cents,
-          tx.currency,
-          tx.external_ref,
-          tx.country
-        FROM app.mobile_money_payouts p
-        JOIN picked ON picked.id = p.id
-        LEFT JOIN ledger.ledger_transactions tx ON tx.id = p.transaction_id
-        """,
-        (batch_size,),
+        ) c
+      ) c
+      LEFT JOIN w wg ON wg.grp = c.grp
+      LEFT JOIN w wp ON wp.grp = c.provider
+    ),
+    picked AS (
+      SELECT p.id
+      FROM app.mobile_money_payouts p
+      JOIN ranked r ON r.id = p.id
+      WHERE (r.quota <= 0 OR r.rn <= r.quota)
+        AND p.status = 'PENDING'
+        AND (p.leased_until IS NULL OR p.leased_until <= now())
+      ORDER BY r.turn, r.created_at
+      LIMIT %s
+      FOR UPDATE OF p SKIP LOCKED
+    )
+    """
+
+_CLAIM_PENDING_FAIR = PreparedStatement(
+    "claim_pending_payouts_fair",
+    _FAIR_PICKED.format(
+        group_cols="upper(btrim(p.provider)) AS provider",
+        group_order="1",
+        group_after="upper(btrim(p.provider)) > g.provider",
+        group_key="g.provider",
+        group_match="upper(btrim(p.provider)) = g.provider",
+        shard_filter=_SHARD_FILTER,
+    )
+    + _CLAIM_SELECT,
+)
+
+# country: copied from the ledger transaction on insert (alembic 0021)
+_CLAIM_PENDING_FAIR_COUNTRY = PreparedStatement(
+    "claim_pending_payouts_fair_country",
+    _FAIR_PICKED.format(
+        group_cols="upper(btrim(p.provider)) AS provider, p.country",
+        group_order="1, 2",
+        group_after="(upper(btrim(p.provider)), p.country) > (g.provider, g.country)",
+        group_key="g.provider || ':' || g.country",
+        group_match="upper(btrim(p.provider)) = g.provider AND p.country = g.country",
+        shard_filter=_SHARD_FILTER,
+    )
+    + _CLAIM_SELECT,
+)
+
+
+def claim_pending_payouts_fair(
+    conn,
+    *,
+    batch_size: int,
+    lease_owner: str,
+    lease_seconds: float,
+    weights: Mapping[str, float] | None = None,
+    quotas: Mapping[str, int] | None = None,
+    default_quota: int = 0,
+    by_country: bool = False,
+    window: int = 0,
+    shard_count: int = 1,
+    shards: Sequence[int] = (0,),
+) -> list[dict[str, Any]]:
+    """
+    Like claim_pending_payouts, but shares the batch across providers (or
+    provider:country corridors with by_country) by weighted round-robin.
+    weights/quotas are keyed by upper-case provider or "PROVIDER:CC".
+    window is how many of each group's oldest claimable rows are ranked
+    (0 = twice batch_size, never less than batch_size).
+    """
+    window = max(batch_size, window or 2 * batch_size)
+    weights = weights or {}
+    quotas = quotas or {}
+    keys = sorted(set(weights) | set(quotas))
+    stmt = _CLAIM_PENDING_FAIR_COUNTRY if by_country else _CLAIM_PENDING_FAIR
+    cur = conn.cursor()
+    stmt.execute(
+        cur,
+        (
+            keys,
+            [weights.get(k) for k in keys],
+            [quotas.get(k) for k in keys],
+            default_quota,
+            shard_count,
+            list(shards),
+            window,
+            batch_size,
+            lease_owner,
+            lease_seconds,
+        ),
     )
     cols = [d[0] for d in cur.description]
     return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
-def claim_stale_sent_payouts(conn, *, batch_size: int, stale_after_seconds: int) -> list[dict[str, Any]]:
+def claim_stale_sent_payouts(
+    conn,
+    *,
+    batch_size: int,
+    stale_after_seconds: int,
+    lease_owner: str,
+    lease_seconds: float,
+    shard_count: int = 1,
+    shards: Sequence[int] = (0,),
+) -> list[dict[str, Any]]:
     cur = conn.cursor()
-    cur.execute(
-        """
-        WITH picked AS (
-          SELECT p.id
-          FROM app.mobile_money_payouts p
-          WHERE p.status = 'SENT'
-            AND (p.next_retry_at IS NULL OR p.next_retry_at <= now())
-            AND (
-              (p.last_attempt_at IS NOT NULL AND p.last_attempt_at <= (now() - (%s || ' seconds')::interval))
-              OR
-              (p.last_attempt_at IS NULL AND p.updated_at <= (now() - (%s || ' seconds')::interval))
-            )
-          ORDER BY p.next_retry_at NULLS FIRST, p.updated_at
-          LIMIT %s
-          FOR UPDATE SKIP LOCKED
-        )
-        SELECT
-          p.id,
-          p.transaction_id,
-          COALESCE(NULLIF(btrim(upper(p.provider)), ''), btrim(upper(tx.provider))) AS provider,
-          COALESCE(p.phone_e164, tx.phone_e164) AS phone_e164,
-          p.provider_ref,
-          p.attempt_count,
-          p.last_attempt_at,
-          p.next_retry_at,
-          tx.amount_cents,
-          tx.currency,
-          tx.external_ref,
-          tx.country
-        FROM app.mobile_money_payouts p
-        JOIN picked ON picked.id = p.id
-        LEFT JOIN ledger.ledger_transactions tx ON tx.id = p.transaction_id
-        """,
-        (stale_after_seconds, stale_after_seconds, batch_size),
+    _CLAIM_STALE_SENT.execute(
+        cur,
+        (stale_after_seconds, stale_after_seconds, shard_count, list(shards), batch_size, lease_owner, lease_seconds),
     )
     cols = [d[0] for d in cur.description]
     return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
+# Extends the lease on the rows a running batch still holds. Rows it has
+# already written (lease released) or that were re-claimed after an expiry
+# (lease_owner changed) are not returned.
+_RENEW_LEASES = PreparedStatement(
+    "payout_renew_leases",
+    """
+    UPDATE app.mobile_money_payouts p
+    SET leased_until = now() + make_interval(secs => %s::float8)
+    WHERE p.id = ANY(%s::uuid[])
+      AND p.lease_owner = %s
+    RETURNING p.id
+    """,
+)
+
+
+def renew_leases(conn, ids: Sequence[Any], *, lease_owner: str, lease_seconds: float) -> set[str]:
+    """Returns the ids (as str) whose lease lease_owner still holds, now extended."""
+    if not ids:
+        return set()
+    cur = conn.cursor()
+    _RENEW_LEASES.execute(cur, (lease_seconds, [str(i) for i in ids], lease_owner))
+    return {str(row[0]) for row in cur.fetchall()}
+
+
+# NOTIFY channel raised by app.notify_payout_ready (alembic 0015) when a payout
+# becomes PENDING: cash-out insert or admin retry.
+PAYOUT_READY_CHANNEL = "payout_ready"
+
+# Earliest moment a row skipped by the claims above becomes claimable:
+# next_retry_at, lease expiry and (for SENT) the stale threshold. GREATEST
+# ignores NULLs.
+_NEXT_DUE = PreparedStatement(
+    "payout_next_due",
+    """
+    SELECT EXTRACT(EPOCH FROM (min(due) - now()))::float8
+    FROM (
+      SELECT COALESCE(GREATEST(p.next_retry_at, p.leased_until), now()) AS due
+      FROM app.mobile_money_payouts p
+      WHERE p.status = 'PENDING' AND """
+    + _SHARD_FILTER
+    + """
+      UNION ALL
+      SELECT GREATEST(
+               p.next_retry_at,
+               p.leased_until,
+               COALESCE(p.last_attempt_at, p.updated_at) + make_interval(secs => %s::float8)
+             )
+      FROM app.mobile_money_payouts p
+      WHERE p.status = 'SENT' AND """
+    + _SHARD_FILTER
+    + """
+    ) d
+    """,
+)
+
+
+def seconds_until_next_payout_due(
+    conn,
+    *,
+    stale_after_seconds: int,
+    shard_count: int = 1,
+    shards: Sequence[int] = (0,),
+) -> Optional[float]:
+    """
+    Seconds until the next PENDING/SENT payout in the given shards can be
+    claimed (<= 0 if one already can), or None when there is nothing in flight.
+    """
+    cur = conn.cursor()
+    shards = list(shards)
+    _NEXT_DUE.execute(cur, (shard_count, shards, stale_after_seconds, shard_count, shards))
+    row = cur.fetchone()
+    return None if row is None or row[0] is None else float(row[0])
+
+
+# Per-provider backlog for the worker's queue gauges. due_at is when a row
+# became claimable: next_retry_at (or creation) for PENDING, the stale
+# threshold for SENT; leases are ignored so in-flight rows still count.
+_QUEUE_STATS = PreparedStatement(
+    "payout_queue_stats",
+    """
+    WITH q AS (
+      SELECT
+        upper(p.provider) AS provider,
+        p.status,
+        CASE
+          WHEN p.status = 'PENDING' THEN COALESCE(p.next_retry_at, p.created_at)
+          ELSE GREATEST(
+                 p.next_retry_at,
+                 COALESCE(p.last_attempt_at, p.updated_at) + make_interval(secs => %s::float8)
+               )
+        END AS due_at
+      FROM app.mobile_money_payouts p
+      WHERE p.status IN ('PENDING', 'SENT')
+    )
+    SELECT
+      provider,
+      count(*) FILTER (WHERE status = 'PENDING'),
+      count(*) FILTER (WHERE status = 'SENT' AND due_at <= now()),
+      COALESCE(EXTRACT(EPOCH FROM (now() - min(due_at) FILTER (WHERE due_at <= now()))), 0)::float8
+    FROM q
+    GROUP BY provider
+    """,
+)
+
+
+def payout_queue_stats(conn, *, stale_after_seconds: int) -> dict[str, tuple[int, int, float]]:
+    """
+    provider -> (PENDING count, due SENT count, age in seconds of the oldest
+    due payout) for providers with anything in flight.
+    """
+    cur = conn.cursor()
+    _QUEUE_STATS.execute(cur, (stale_after_seconds,))
+    return {row[0]: (int(row[1]), int(row[2]), float(row[3])) for row in cur.fetchall()}
+
+
 # ==========================================================
 # Updates
 # ==========================================================
 
+_UPDATE_STATUS_SET_SQL = """
+    UPDATE app.mobile_money_payouts
+    SET
+      status = %s,
+      provider_ref = COALESCE(%s, provider_ref),
+      provider_response = COALESCE(%s::jsonb, provider_response),
+      last_error = %s,
+      retryable = COALESCE(%s, retryable),
+      attempt_count = COALESCE(%s, attempt_count),
+      last_attempt_at = CASE WHEN %s THEN now() ELSE last_attempt_at END,
+      next_retry_at = %s,
+      updated_at = now(){lease_set}
+    WHERE id = %s
+"""
+
+# Leased variants: only the lease holder may write the outcome, and writing it
+# releases the lease.
+_LEASE_SET = ",\n      lease_owner = NULL,\n      leased_until = NULL"
+_LEASE_WHERE = "      AND lease_owner = %s\n"
+_FROM_WHERE = "      AND status = %s\n"
+
+_UPDATE_STATUS = PreparedStatement("payout_update_status", _UPDATE_STATUS_SET_SQL.format(lease_set=""))
+_UPDATE_STATUS_FROM = PreparedStatement(
+    "payout_update_status_from",
+    _UPDATE_STATUS_SET_SQL.format(lease_set="") + _FROM_WHERE,
+)
+_UPDATE_STATUS_LEASED = PreparedStatement(
+    "payout_update_status_leased",
+    _UPDATE_STATUS_SET_SQL.format(lease_set=_LEASE_SET) + _LEASE_WHERE,
+)
+_UPDATE_STATUS_FROM_LEASED = PreparedStatement(
+    "payout_update_status_from_leased",
+    _UPDATE_STATUS_SET_SQL.format(lease_set=_LEASE_SET) + _FROM_WHERE + _LEASE_WHERE,
+)
+
+
 def update_status(
     conn,
     *,
@@ -129,77 +485,148 @@ def update_status(
     attempt_count: Optional[int] = None,
     next_retry_at: Optional[datetime] = None,
     touch_last_attempt_at: bool = True,
+    lease_owner: Optional[str] = None,
 ) -> bool:
+    """
+    lease_owner: set by the payout worker; the update only applies while that
+    lease is still held, and releases it.
+    """
     cur = conn.cursor()
 
-    effective_next_retry_at = next_retry_at
-    if effective_next_retry_at is None and new_status in {"SENT", "RETRY"} and retryable is True:
-        effective_next_retry_at = _utcnow() + timedelta(seconds=DEFAULT_BACKOFF_SECONDS)
-
+    effective_next_retry_at = _effective_next_retry_at(new_status, retryable, next_retry_at)
     resp = _adapt_json(provider_response) if provider_response is not None else None
 
-    if from_status is None:
-        cur.execute(
-            """
-            UPDATE app.mobile_money_payouts
-            SET
-              status = %s,
-              provider_ref = COALESCE(%s, provider_ref),
-              provider_response = COALESCE(%s::jsonb, provider_response),
-              last_error = %s,
-              retryable = COALESCE(%s, retryable),
-              attempt_count = COALESCE(%s, attempt_count),
-              last_attempt_at = CASE WHEN %s THEN now() ELSE last_attempt_at END,
-              next_retry_at = %s,
-              updated_at = now()
-            WHERE id = %s
-            """,
-            (
-                new_status,
-                provider_ref,
-                resp,
-                last_error,
-                retryable,
-                attempt_count,
-                touch_last_attempt_at,
-                effective_next_retry_at,
-                payout_id,
-            ),
-        )
+    params: list[Any] = [
+        new_status,
+        provider_ref,
+        resp,
+        last_error,
+        retryable,
+        attempt_count,
+        touch_last_attempt_at,
+        effective_next_retry_at,
+        payout_id,
+    ]
+    if from_status is not None:
+        params.append(from_status)
+    if lease_owner is not None:
+        params.append(lease_owner)
+
+    if lease_owner is None:
+        stmt = _UPDATE_STATUS if from_status is None else _UPDATE_STATUS_FROM
     else:
-        cur.execute(
-            """
-            UPDATE app.mobile_money_payouts
-            SET
-              status = %s,
-              provider_ref = COALESCE(%s, provider_ref),
-              provider_response = COALESCE(%s::jsonb, provider_response),
-              last_error = %s,
-              retryable = COALESCE(%s, retryable),
-              attempt_count = COALESCE(%s, attempt_count),
-              last_attempt_at = CASE WHEN %s THEN now() ELSE last_attempt_at END,
-              next_retry_at = %s,
-              updated_at = now()
-            WHERE id = %s
-              AND status = %s
-            """,
-            (
-                new_status,
-                provider_ref,
-                resp,
-                last_error,
-                retryable,
-                attempt_count,
-                touch_last_attempt_at,
-                effective_next_retry_at,
-                payout_id,
-                from_status,
-            ),
-        )
+        stmt = _UPDATE_STATUS_LEASED if from_status is None else _UPDATE_STATUS_FROM_LEASED
+    stmt.execute(cur, tuple(params))
 
     return cur.rowcount == 1
 
 
+# Same SET as _UPDATE_STATUS_SET_SQL, one row of VALUES per outcome. Leased rows
+# (lease_owner given) are guarded and released exactly like update_status.
+_UPDATE_STATUS_MANY_SQL = """
+    UPDATE app.mobile_money_payouts p
+    SET
+      status = v.new_status,
+      provider_ref = COALESCE(v.provider_ref, p.provider_ref),
+      provider_response = COALESCE(v.provider_response, p.provider_response),
+      last_error = v.last_error,
+      retryable = COALESCE(v.retryable, p.retryable),
+      attempt_count = COALESCE(v.attempt_count, p.attempt_count),
+      last_attempt_at = CASE WHEN v.touch_last_attempt_at THEN now() ELSE p.last_attempt_at END,
+      next_retry_at = v.next_retry_at,
+      updated_at = now(),
+      lease_owner = CASE WHEN v.lease_owner IS NULL THEN p.lease_owner END,
+      leased_until = CASE WHEN v.lease_owner IS NULL THEN p.leased_until END
+    FROM (VALUES %s) AS v(
+      id, new_status, provider_ref, provider_response, last_error, retryable,
+      attempt_count, touch_last_attempt_at, next_retry_at, from_status, lease_owner
+    )
+    WHERE p.id = v.id
+      AND (v.from_status IS NULL OR p.status = v.from_status)
+      AND (v.lease_owner IS NULL OR p.lease_owner = v.lease_owner)
+    RETURNING p.id
+"""
+_UPDATE_STATUS_MANY_TEMPLATE = (
+    "(%s::uuid, %s::text, %s::text, %s::jsonb, %s::text, %s::boolean,"
+    " %s::int, %s::boolean, %s::timestamptz, %s::text, %s::text)"
+)
+
+
+def update_status_many(conn, updates: list[StatusUpdate]) -> list[bool]:
+    """
+    Applies a batch of outcomes in one UPDATE ... FROM (VALUES ...) and
+    returns, per update, whether its row was written (False: from_status or
+    lease guard did not match). One update per payout_id per call.
+    """
+    if not updates:
+        return []
+
+    rows = [
+        (
+            str(u.payout_id),
+            u.new_status,
+            u.provider_ref,
+            _adapt_json(u.provider_response) if u.provider_response is not None else None,
+            u.last_error,
+            u.retryable,
+            u.attempt_count,
+            u.touch_last_attempt_at,
+            _effective_next_retry_at(u.new_status, u.retryable, u.next_retry_at),
+            u.from_status,
+            u.lease_owner,
+        )
+        for u in updates
+    ]
+    cur = conn.cursor()
+    applied = execute_values(
+        cur,
+        _UPDATE_STATUS_MANY_SQL,
+        rows,
+        template=_UPDATE_STATUS_MANY_TEMPLATE,
+        page_size=len(rows),
+        fetch=True,
+    )
+    applied_ids = {str(r[0]) for r in applied}
+    return [str(u.payout_id) in applied_ids for u in updates]
+
+
+# Merge updates keyed by provider_ref / payout id, shared by the sync
+# functions below and their *_async twins.
+_UPDATE_BY_PROVIDER_REF_SQL = """
+UPDATE app.mobile_money_payouts
+SET
+  status = %s,
+  provider_response =
+    COALESCE(provider_response, '{{}}'::jsonb) || COALESCE(%s::jsonb, '{{}}'::jsonb),
+  last_error = %s,
+  retryable = COALESCE(%s, retryable),
+  next_retry_at = %s,
+  updated_at = now()
+WHERE provider_ref = %s
+{terminal_guard_sql}
+"""
+
+_UPDATE_BY_PAYOUT_ID_SQL = """
+UPDATE app.mobile_money_payouts
+SET
+  status = %s,
+  provider_response =
+    COALESCE(provider_response, '{{}}'::jsonb) || COALESCE(%s::jsonb, '{{}}'::jsonb),
+  last_error = %s,
+  retryable = COALESCE(%s, retryable),
+  next_retry_at = %s,
+  updated_at = now()
+WHERE id = %s
+{terminal_guard_sql}
+"""
+
+
+def _terminal_guard_sql(allow_terminal_override: bool) -> str:
+    if allow_terminal_override:
+        return ""
+    return "AND status NOT IN ('CONFIRMED','FAILED')"
+
+
 def update_status_by_provider_ref(
     conn,
     *,
@@ -219,24 +646,10 @@ def update_status_by_provider_ref(
     cur = conn.cursor()
     resp_json = _adapt_json(provider_response) if provider_response is not None else None
 
-    terminal_guard_sql = ""
-    if not allow_terminal_override:
-        terminal_guard_sql = "AND status NOT IN ('CONFIRMED','FAILED')"
+    sql = _UPDATE_BY_PROVIDER_REF_SQL.format(terminal_guard_sql=_terminal_guard_sql(allow_terminal_override))
 
     cur.execute(
-        f"""
-        UPDATE app.mobile_money_payouts
-        SET
-          status = %s,
-          provider_response =
-            COALESCE(provider_response, '{{}}'::jsonb) || COALESCE(%s::jsonb, '{{}}'::jsonb),
-          last_error = %s,
-          retryable = COALESCE(%s, retryable),
-          next_retry_at = %s,
-          updated_at = now()
-        WHERE provider_ref = %s
-        {terminal_guard_sql}
-        """,
+        sql,
         (
             new_status,
             resp_json,
@@ -266,24 +679,10 @@ def update_status_by_payout_id_merge(
     cur = conn.cursor()
     resp_json = _adapt_json(provider_response) if provider_response is not None else None
 
-    terminal_guard_sql = ""
-    if not allow_terminal_override:
-        terminal_guard_sql = "AND status NOT IN ('CONFIRMED','FAILED')"
+    sql = _UPDATE_BY_PAYOUT_ID_SQL.format(terminal_guard_sql=_terminal_guard_sql(allow_terminal_override))
 
     cur.execute(
-        f"""
-        UPDATE app.mobile_money_payouts
-        SET
-          status = %s,
-          provider_response =
-            COALESCE(provider_response, '{{}}'::jsonb) || COALESCE(%s::jsonb, '{{}}'::jsonb),
-          last_error = %s,
-          retryable = COALESCE(%s, retryable),
-          next_retry_at = %s,
-          updated_at = now()
-        WHERE id = %s
-        {terminal_guard_sql}
-        """,
+        sql,
         (
             new_status,
             resp_json,
@@ -381,30 +780,49 @@ def get_payout_by_transaction_id(conn, transaction_id: UUID) -> dict | None:
         return dict(row) if row else None
 
 
-def get_payout_by_provider_ref(conn, provider_ref: str, *, provider: str | None = None) -> dict | None:
-    provider_filter = ""
-    params = [provider_ref]
+# Single-payout lookups shared with the *_async twins further down.
+_GET_BY_PROVIDER_REF_SQL = """
+select
+  p.id,
+  p.transaction_id,
+  p.provider_ref,
+  p.status,
+  p.created_at,
+  p.updated_at
+from app.mobile_money_payouts p
+where p.provider_ref = %s
+{provider_filter}
+order by p.updated_at desc
+limit 1
+"""
+
+_GET_BY_EXTERNAL_REF_SQL = """
+select
+  p.id,
+  p.transaction_id,
+  p.provider_ref,
+  p.status,
+  p.created_at,
+  p.updated_at,
+  tx.external_ref
+from app.mobile_money_payouts p
+join ledger.ledger_transactions tx on tx.id = p.transaction_id
+where tx.external_ref = %s
+order by p.updated_at desc
+limit 1
+"""
+
+
+def _provider_ref_lookup(provider_ref: str, provider: str | None) -> tuple[str, tuple]:
     if provider:
-        provider_filter = "AND upper(p.provider) = upper(%s)"
-        params.append(provider)
+        return _GET_BY_PROVIDER_REF_SQL.format(provider_filter="AND upper(p.provider) = upper(%s)"), (provider_ref, provider)
+    return _GET_BY_PROVIDER_REF_SQL.format(provider_filter=""), (provider_ref,)
 
+
+def get_payout_by_provider_ref(conn, provider_ref: str, *, provider: str | None = None) -> dict | None:
+    sql, params = _provider_ref_lookup(provider_ref, provider)
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            f"""
-            select
-              p.id,
-              p.transaction_id,
-              p.provider_ref,
-              p.status,
-              p.updated_at
-            from app.mobile_money_payouts p
-            where p.provider_ref = %s
-            {provider_filter}
-            order by p.updated_at desc
-            limit 1
-            """,
-            tuple(params),
-        )
+        cur.execute(sql, params)
         row = cur.fetchone()
         return dict(row) if row else None
 
@@ -416,22 +834,7 @@ def get_payout_by_external_ref(conn, external_ref: str, provider: str | None = N
     (tests expect cross-provider webhook handling).
     """
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            """
-            select
-              p.id,
-              p.transaction_id,
-              p.provider_ref,
-              p.status,
-              tx.external_ref
-            from app.mobile_money_payouts p
-            join ledger.ledger_transactions tx on tx.id = p.transaction_id
-            where tx.external_ref = %s
-            order by p.updated_at desc
-            limit 1
-            """,
-            (external_ref,),
-        )
+        cur.execute(_GET_BY_EXTERNAL_REF_SQL, (external_ref,))
         row = cur.fetchone()
         return dict(row) if row else None
 
@@ -444,3 +847,129 @@ def get_payout_by_any_ref(conn, *, provider_ref: str | None, external_ref: str |
     if external_ref:
         return get_payout_by_external_ref(conn, external_ref, provider=provider)
     return None
+
+
+# ==========================================================
+# Async variants (psycopg 3 connections from db_async)
+# ==========================================================
+
+async def update_status_by_provider_ref_async(
+    conn,
+    *,
+    provider_ref: str,
+    new_status: str,
+    provider_response: Optional[dict[str, Any]] = None,
+    last_error: Optional[str] = None,
+    retryable: Optional[bool] = None,
+    next_retry_at: Optional[datetime] = None,
+    allow_terminal_override: bool = False,
+    provider: str | None = None,  # accepted for compatibility, IGNORED
+) -> bool:
+    resp_json = Jsonb(provider_response) if provider_response is not None else None
+    sql = _UPDATE_BY_PROVIDER_REF_SQL.format(terminal_guard_sql=_terminal_guard_sql(allow_terminal_override))
+
+    async with conn.cursor() as cur:
+        await cur.execute(
+            sql,
+            (new_status, resp_json, last_error, retryable, next_retry_at, provider_ref),
+        )
+        return cur.rowcount == 1
+
+
+async def update_status_by_payout_id_merge_async(
+    conn,
+    *,
+    payout_id,  # UUID
+    new_status: str,
+    provider_response: Optional[dict[str, Any]] = None,
+    last_error: Optional[str] = None,
+    retryable: Optional[bool] = None,
+    next_retry_at: Optional[datetime] = None,
+    allow_terminal_override: bool = False,
+) -> bool:
+    resp_json = Jsonb(provider_response) if provider_response is not None else None
+    sql = _UPDATE_BY_PAYOUT_ID_SQL.format(terminal_guard_sql=_terminal_guard_sql(allow_terminal_override))
+
+    async with conn.cursor() as cur:
+        await cur.execute(
+            sql,
+            (new_status, resp_json, last_error, retryable, next_retry_at, payout_id),
+        )
+        return cur.rowcount == 1
+
+
+async def update_status_by_any_ref_async(
+    conn,
+    *,
+    provider_ref: str | None,
+    external_ref: str | None,
+    new_status: str,
+    provider_response: Optional[dict[str, Any]] = None,
+    last_error: Optional[str] = None,
+    retryable: Optional[bool] = None,
+    next_retry_at: Optional[datetime] = None,
+    allow_terminal_override: bool = False,
+    provider: str | None = None,  # accepted for compatibility, IGNORED
+) -> bool:
+    """
+    Async twin of update_status_by_any_ref (provider_ref first, external_ref fallback).
+    """
+    if provider_ref:
+        ok = await update_status_by_provider_ref_async(
+            conn,
+            provider_ref=provider_ref,
+            new_status=new_status,
+            provider_response=provider_response,
+            retryable=retryable,
+            last_error=last_error,
+            next_retry_at=next_retry_at,
+            allow_terminal_override=allow_terminal_override,
+            provider=provider,
+        )
+        if ok:
+            return True
+
+    if external_ref:
+        payout = await get_payout_by_external_ref_async(conn, external_ref)
+        if not payout:
+            return False
+
+        return await update_status_by_payout_id_merge_async(
+            conn,
+            payout_id=payout["id"],
+            new_status=new_status,
+            provider_response=provider_response,
+            retryable=retryable,
+            last_error=last_error,
+            next_retry_at=next_retry_at,
+            allow_terminal_override=allow_terminal_override,
+        )
+
+    return False
+
+
+async def get_payout_by_provider_ref_async(conn, provider_ref: str, *, provider: str | None = None) -> dict | None:
+    sql, params = _provider_ref_lookup(provider_ref, provider)
+    async with conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute(sql, params)
+        row = await cur.fetchone()
+        return dict(row) if row else None
+
+
+async def get_payout_by_external_ref_async(conn, external_ref: str, provider: str | None = None) -> dict | None:
+    async with conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute(_GET_BY_EXTERNAL_REF_SQL, (external_ref,))
+        row = await cur.fetchone()
+        return dict(row) if row else None
+
+
+async def get_payout_by_any_ref_async(
+    conn, *, provider_ref: str | None, external_ref: str | None, provider: str | None = None
+) -> dict | None:
+    if provider_ref:
+        row = await get_payout_by_provider_ref_async(conn, provider_ref, provider=provider)
+        if row:
+            return row
+    if external_ref:
+        return await get_payout_by_external_ref_async(conn, external_ref, provider=provider)
+    return None
@@ -0,0 +1,297 @@
+# app/payouts/status_poller.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Optional
+
+from psycopg2.extras import Json, execute_values
+
+from app.providers.base import ProviderResult
+from app.providers.mobile_money.http import run_sync
+from db import get_conn
+from settings import settings
+
+logger = logging.getLogger("nexapay.status_poller")
+
+# (provider_name, adapter, payout): upper-cased provider name, the adapter
+# from get_provider, and the payout row
+StatusRequest = tuple[str, Any, dict]
+
+_SHARED_GET_SQL = """
+    SELECT c.provider, c.provider_ref, c.result
+    FROM app.provider_status_cache c
+    JOIN unnest(%s::text[], %s::text[]) AS k(provider, provider_ref)
+      ON k.provider = c.provider AND k.provider_ref = c.provider_ref
+    WHERE c.expires_at > now()
+"""
+
+_SHARED_PUT_SQL = """
+    INSERT INTO app.provider_status_cache (provider, provider_ref, result, expires_at)
+    VALUES %s
+    ON CONFLICT (provider, provider_ref) DO UPDATE
+      SET result = EXCLUDED.result, expires_at = EXCLUDED.expires_at
+"""
+_SHARED_PUT_TEMPLATE = "(%s, %s, %s::jsonb, now() + make_interval(secs => %s::float8))"
+
+_SHARED_CLEANUP_SQL = "DELETE FROM app.provider_status_cache WHERE expires_at < now()"
+
+
+def _key(provider_name: str, payout: dict) -> Optional[tuple[str, str]]:
+    ref = (payout.get("provider_ref") or "").strip()
+    return (provider_name, ref) if ref else None
+
+
+def _result_to_json(res: ProviderResult) -> dict[str, Any]:
+    return {
+        "status": res.status,
+        "provider_ref": res.provider_ref,
+        "response": res.response,
+        "error": res.error,
+        "retryable": res.retryable,
+    }
+
+
+def _result_from_json(data: dict[str, Any]) -> ProviderResult:
+    return ProviderResult(
+        status=data["status"],
+        provider_ref=data.get("provider_ref"),
+        response=data.get("response"),
+        error=data.get("error"),
+        retryable=data.get("retryable"),
+    )
+
+
+class StatusPoller:
+    """
+    Provider status lookups for SENT payouts, shared by the payout worker and
+    the reconciler so each (provider, provider_ref) is fetched at most once
+    per ttl_s:
+      - results are cached in memory and, with shared=True, in the UNLOGGED
+        table app.provider_status_cache (alembic 0016) so separate worker and
+        reconciler processes see each other's fetches;
+      - concurrent lookups of the same payout wait for the one in flight;
+      - misses are grouped per provider: adapters exposing
+        get_cashout_statuses(payouts) -> {provider_ref: result} are called once
+        per group, the rest fan out: as up to max_in_flight_async coroutines on
+        the provider event loop when every adapter has an async side (.aio, see
+        SyncProvider), else over at most max_in_flight threads.
+    Failed lookups are never cached. Payouts without a provider_ref bypass the
+    cache.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl_s: float,
+        max_in_flight: int = 8,
+        max_in_flight_async: int = 200,
+        shared: bool = False,
+        cleanup_every: int = 200,
+    ):
+        self.ttl_s = max(0.0, float(ttl_s))
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_in_flight_async = max(1, int(max_in_flight_async))
+        self.shared = shared
+        self.cleanup_every = max(1, int(cleanup_every))
+        self._lock = threading.Lock()
+        self._memory: dict[tuple[str, str], tuple[float, Any]] = {}
+        self._inflight: dict[tuple[str, str], Future] = {}
+        self._puts = 0
+
+    def get(self, provider_name: str, provider: Any, payout: dict) -> Any:
+        """
+        Single lookup; raises whatever the provider raised.
+        """
+        res = self.get_many([(provider_name, provider, payout)])[0]
+        if isinstance(res, Exception):
+            raise res
+        return res
+
+    def get_many(self, requests: list[StatusRequest]) -> list[Any]:
+        """
+        Results in request order; a failed lookup is returned as its exception.
+        """
+        results: list[Any] = [None] * len(requests)
+        if self.ttl_s <= 0:
+            self._fetch(requests, list(range(len(requests))), results)
+            return results
+
+        owned: dict[tuple[str, str], list[int]] = {}
+        waiting: list[tuple[int, Future]] = []
+        uncached: list[int] = []
+        now = time.monotonic()
+        with self._lock:
+            for i, (name, _, payout) in enumerate(requests):
+                key = _key(name, payout)
+                if key is None:
+                    uncached.append(i)
+                    continue
+                hit = self._memory.get(key)
+                if hit is not None and hit[0] > now:
+                    results[i] = hit[1]
+                elif key in owned:
+                    owned[key].append(i)
+                elif key in self._inflight:
+                    waiting.append((i, self._inflight[key]))
+                else:
+                    owned[key] = [i]
+                    self._inflight[key] = Future()
+
+        try:
+            if owned and self.shared:
+                self._load_shared(requests, owned, results)
+            misses = [idx[0] for key, idx in owned.items() if results[idx[0]] is None]
+            self._fetch(requests, misses + uncached, results)
+        finally:
+            self._publish(requests, owned, results)
+
+        for i, fut in waiting:
+            try:
+                results[i] = fut.result()
+            except Exception as exc:
+                results[i] = exc
+        return results
+
+    def reset(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    # --- internals ---
+
+    def _fetch(self, requests: list[StatusRequest], indexes: list[int], results: list[Any]) -> None:
+        groups: dict[str, list[int]] = {}
+        for i in indexes:
+            groups.setdefault(requests[i][0], []).append(i)
+
+        singles: list[int] = []
+        for name, idx in groups.items():
+            provider = requests[idx[0]][1]
+            bulk = getattr(provider, "get_cashout_statuses", None)
+            with_ref = [i for i in idx if _key(name, requests[i][2]) is not None]
+            if bulk is None or len(with_ref) < 2:
+                singles.extend(idx)
+                continue
+            singles.extend(set(idx) - set(with_ref))
+            try:
+                by_ref = bulk([requests[i][2] for i in with_ref]) or {}
+            except Exception:
+                logger.warning("status_poll_bulk_failed provider=%s count=%s", name, len(with_ref), exc_info=True)
+                by_ref = {}
+            for i in with_ref:
+                res = by_ref.get(_key(name, requests[i][2])[1])
+                if res is None:
+                    singles.append(i)  # not in the listing: ask for it directly
+                else:
+                    results[i] = res
+
+        def one(i: int) -> Any:
+            _, provider, payout = requests[i]
+            try:
+                return provider.get_cashout_status(payout)
+            except Exception as exc:
+                return exc
+
+        adapters = [getattr(requests[i][1], "aio", None) for i in singles]
+        if len(singles) > 1 and all(a is not None for a in adapters):
+            # async adapters: the whole fan-out on the provider event loop, no threads
+            for i, res in zip(singles, run_sync(self._fetch_async(adapters, [requests[i][2] for i in singles]))):
+                results[i] = res
+            return
+
+        if len(singles) <= 1 or self.max_in_flight <= 1:
+            for i in singles:
+                results[i] = one(i)
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(singles)), thread_name_prefix="status-poll") as pool:
+            for i, res in zip(singles, pool.map(one, singles)):
+                results[i] = res
+
+    async def _fetch_async(self, adapters: list[Any], payouts: list[dict]) -> list[Any]:
+        sem = asyncio.Semaphore(self.max_in_flight_async)
+
+        async def one(adapter: Any, payout: dict) -> Any:
+            async with sem:
+                try:
+                    return await adapter.get_cashout_status(payout)
+                except Exception as exc:
+                    return exc
+
+        return await asyncio.gather(*(one(a, p) for a, p in zip(adapters, payouts)))
+
+    def _load_shared(self, requests: list[StatusRequest], owned: dict, results: list[Any]) -> None:
+        keys = list(owned)
+        try:
+            with get_conn() as conn:
+                cur = conn.cursor()
+                cur.execute(_SHARED_GET_SQL, ([k[0] for k in keys], [k[1] for k in keys]))
+                rows = cur.fetchall()
+        except Exception:
+            logger.warning("status_poll_shared_cache_unavailable", exc_info=True)
+            return
+        for name, ref, data in rows:
+            res = _result_from_json(data)
+            for i in owned.get((name, ref), ()):
+                results[i] = res
+
+    def _publish(self, requests: list[StatusRequest], owned: dict, results: list[Any]) -> None:
+        expires = time.monotonic() + self.ttl_s
+        fresh: list[tuple[tuple[str, str], ProviderResult]] = []
+        with self._lock:
+            for key, idx in owned.items():
+                res = results[idx[0]]
+                for i in idx[1:]:
+                    results[i] = res
+                fut = self._inflight.pop(key)
+                if res is None or isinstance(res, Exception):
+                    fut.set_exception(res or RuntimeError("status lookup did not complete"))
+                    continue
+                fut.set_result(res)
+                self._memory[key] = (expires, res)
+                if isinstance(res, ProviderResult):
+                    fresh.append((key, res))
+            now = time.monotonic()
+            for key in [k for k, (exp, _) in self._memory.items() if exp <= now]:
+                del self._memory[key]
+
+        if fresh and self.shared:
+            self._store_shared(fresh)
+
+    def _store_shared(self, fresh: list[tuple[tuple[str, str], ProviderResult]]) -> None:
+        self._puts += 1
+        rows = [(k[0], k[1], Json(_result_to_json(res)), self.ttl_s) for k, res in fresh]
+        try:
+            with get_conn() as conn:
+                cur = conn.cursor()
+                execute_values(cur, _SHARED_PUT_SQL, rows, template=_SHARED_PUT_TEMPLATE, page_size=len(rows))
+                if self._puts % self.cleanup_every == 0:
+                    cur.execute(_SHARED_CLEANUP_SQL)
+        except Exception:
+            logger.warning("status_poll_shared_cache_unavailable", exc_info=True)
+
+
+_poller: StatusPoller | None = None
+_poller_lock = threading.Lock()
+
+
+def get_status_poller() -> StatusPoller:
+    global _poller
+    if _poller is None:
+        with _poller_lock:
+            if _poller is None:
+                _poller = StatusPoller(
+                    ttl_s=settings.STATUS_POLL_TTL_S,
+                    max_in_flight=settings.STATUS_POLL_MAX_IN_FLIGHT,
+                    max_in_flight_async=settings.STATUS_POLL_MAX_IN_FLIGHT_ASYNC,
+                    shared=settings.STATUS_POLL_SHARED_CACHE,
+                )
+    return _poller
+
+
+def reset_status_poller() -> None:
+    global _poller
+    with _poller_lock:
+        _poller = None
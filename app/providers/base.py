@@ -31,3 +31,8 @@ class ProviderResult:
 class MobileMoneyProvider(Protocol):
     def send_cashout(self, payout: dict[str, Any]) -> ProviderResult: ...
     def get_cashout_status(self, payout: dict[str, Any]) -> ProviderResult: ...
+
+
+class AsyncMobileMoneyProvider(Protocol):
+    async def send_cashout(self, payout: dict[str, Any]) -> ProviderResult: ...
+    async def get_cashout_status(self, payout: dict[str, Any]) -> ProviderResult: ...
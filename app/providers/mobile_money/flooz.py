@@ -4,29 +4,34 @@
 # app/providers/mobile_money/flooz.py
 from __future__ import annotations
 
+import logging
 from typing import Optional
 
 import httpx
 
-from app.providers.base import ProviderResult, MobileMoneyProvider
+from app.providers.base import ProviderResult, AsyncMobileMoneyProvider
 from app.providers.mobile_money.config import flooz_config
 from app.providers.mobile_money.http import HttpClient, is_retryable_http
-from settings import settings
+from app.providers.mobile_money.shim import SyncProvider
 
+logger = logging.getLogger("nexapay.providers")
 
-class FloozProvider(MobileMoneyProvider):
+
+class AsyncFloozProvider(AsyncMobileMoneyProvider):
     def __init__(self, http: Optional[HttpClient] = None):
-        timeout = float(getattr(settings, "MM_HTTP_TIMEOUT_S", 20.0))
-        self.http = http or HttpClient(timeout_s=timeout)
+        self.http = http or HttpClient("FLOOZ")
 
-    def send_cashout(self, payout: dict) -> ProviderResult:
+    async def send_cashout(self, payout: dict) -> ProviderResult:
         cfg = flooz_config()
         url = cfg.cashout_url
 
-        print("[FLOOZ] mode     =", repr(cfg.mode))
-        print("[FLOOZ] cashout  =", repr(url))
-        print("[FLOOZ] auth_mode=", repr(cfg.auth_mode))
-        print("[FLOOZ] api_key? =", bool(cfg.api_key))
+        logger.debug(
+            "flooz_cashout_config mode=%s url=%s auth_mode=%s api_key_set=%s",
+            cfg.mode,
+            url,
+            cfg.auth_mode,
+            bool(cfg.api_key),
+        )
 
         if not url:
             return ProviderResult(status="FAILED", error="FLOOZ_CASHOUT_URL not configured", retryable=False)
@@ -60,7 +65,7 @@ class FloozProvider(MobileMoneyProvider):
         }
 
         try:
-            resp = self.http.post(url, headers=headers, json_body=body, debug=True)
+            resp = await self.http.post(url, headers=headers, json_body=body, debug=True)
         except httpx.TimeoutException:
             return ProviderResult(status="FAILED", error="Gateway timeout", retryable=True)
         except Exception as e:
@@ -90,7 +95,7 @@ class FloozProvider(MobileMoneyProvider):
             retryable=is_retryable_http(resp.status_code),
         )
 
-    def get_cashout_status(self, payout: dict) -> ProviderResult:
+    async def get_cashout_status(self, payout: dict) -> ProviderResult:
         cfg = flooz_config()
         tpl = cfg.status_url_template
         provider_ref = payout.get("provider_ref")
@@ -107,7 +112,7 @@ class FloozProvider(MobileMoneyProvider):
         headers = _auth_headers(auth_mode, api_key)
 
         try:
-            resp = self.http.get(url, headers=headers, debug=True)
+            resp = await self.http.get(url, headers=headers, debug=True)
         except httpx.TimeoutException:
             return ProviderResult(status="SENT", provider_ref=provider_ref, error="Gateway timeout", retryable=True)
         except Exception as e:
@@ -130,6 +135,11 @@ class FloozProvider(MobileMoneyProvider):
         )
 
 
+class FloozProvider(SyncProvider):
+    def __init__(self, http: Optional[HttpClient] = None):
+        super().__init__(AsyncFloozProvider(http))
+
+
 def _auth_headers(mode: str, api_key: str) -> dict[str, str]:
     mode = (mode or "bearer").lower()
     api_key = (api_key or "").strip()
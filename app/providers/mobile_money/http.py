@@ -3,11 +3,229 @@
 # app/providers/mobile_money/http.py
 from __future__ import annotations
 
+import asyncio
+import logging
+import threading
+import time
+import weakref
 from dataclasses import dataclass
-from typing import Any, Optional
+from typing import Any, Coroutine, Optional, TypeVar
 
 import httpx
 
+from services.metrics import (
+    increment_provider_http_handshake,
+    increment_provider_http_request,
+    observe_provider_http_connect,
+)
+from services.redaction import redact_value
+from settings import settings
+
+logger = logging.getLogger("nexapay.providers")
+
+T = TypeVar("T")
+
+# One keep-alive pool per provider origin (scheme://host:port), shared by every
+# adapter and every payout: httpx.Limits caps a client's pool as a whole, so a
+# client per origin is what gives each provider host its own connection cap.
+# httpx.AsyncClient pools belong to the event loop they were opened on, hence
+# one set per loop.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+_clients_lock = threading.Lock()
+
+# Event loop the sync shims (run_sync) run adapter coroutines on
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def _http2_available() -> bool:
+    # HTTP/2 needs the optional h2 package (pip install h2); without it we speak HTTP/1.1
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _parse_timeouts(raw: str) -> dict[str, tuple[float, float]]:
+    # "THUNES=3:30,MOMO=2:15" -> {"THUNES": (3.0, 30.0), ...}; bad entries are skipped
+    out: dict[str, tuple[float, float]] = {}
+    for item in (raw or "").split(","):
+        name, sep, value = item.partition("=")
+        connect, sep2, read = value.partition(":")
+        if not (sep and sep2):
+            continue
+        try:
+            pair = (float(connect), float(read))
+        except ValueError:
+            continue
+        if pair[0] > 0 and pair[1] > 0:
+            out[name.strip().upper()] = pair
+    return out
+
+
+def provider_timeout(provider: str) -> httpx.Timeout:
+    """
+    Connect and read timeouts for one provider: MM_HTTP_PROVIDER_TIMEOUTS if it
+    names the provider, else MM_HTTP_CONNECT_TIMEOUT_S and <PROVIDER>_HTTP_TIMEOUT_S
+    (falling back to MM_HTTP_TIMEOUT_S) for reads.
+    """
+    key = (provider or "").strip().upper()
+    override = _parse_timeouts(settings.MM_HTTP_PROVIDER_TIMEOUTS).get(key)
+    if override:
+        connect, read = override
+    else:
+        connect = float(settings.MM_HTTP_CONNECT_TIMEOUT_S)
+        read = float(getattr(settings, f"{key}_HTTP_TIMEOUT_S", None) or settings.MM_HTTP_TIMEOUT_S)
+    # write and pool (waiting for a free connection to the host) share the read budget
+    return httpx.Timeout(read, connect=connect)
+
+
+def _client_for(url: str) -> httpx.AsyncClient:
+    # called on the loop the request runs on
+    loop = asyncio.get_running_loop()
+    u = httpx.URL(url)
+    origin = f"{u.scheme}://{u.netloc.decode('ascii')}"
+    with _clients_lock:
+        clients = _clients.setdefault(loop, {})
+        client = clients.get(origin)
+        if client is None:
+            client = httpx.AsyncClient(
+                http2=bool(settings.MM_HTTP2) and _http2_available(),
+                limits=httpx.Limits(
+                    max_connections=settings.MM_HTTP_MAX_CONNECTIONS_PER_HOST,
+                    max_keepalive_connections=settings.MM_HTTP_MAX_KEEPALIVE_PER_HOST,
+                    keepalive_expiry=settings.MM_HTTP_KEEPALIVE_EXPIRY_S,
+                ),
+                # follow_redirects=True helps if a provider returns redirects (or you hit a / trailing slash)
+                follow_redirects=True,
+            )
+            clients[origin] = client
+    return client
+
+
+def _provider_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="provider-io", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Run an adapter coroutine on the shared provider event loop and block until
+    it is done. All sync callers (worker lanes, reconciler, scripts) share that
+    loop and its connection pools, whichever thread they call from.
+    """
+    loop = _provider_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync called on the provider loop; await the async adapter instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+async def aclose_transport() -> None:
+    """
+    Close the pools opened on the running loop.
+    """
+    with _clients_lock:
+        clients = list(_clients.pop(asyncio.get_running_loop(), {}).values())
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception:
+            logger.warning("provider_http_close_failed", exc_info=True)
+
+
+def close_transport() -> None:
+    # pools the sync shims opened; async callers close theirs with aclose_transport()
+    if _loop is not None:
+        run_sync(aclose_transport())
+
+
+class ProviderTransport:
+    """
+    requests-style async post/get for one provider over the shared keep-alive
+    pools. Returns the httpx.Response (status_code, json(), text) and raises
+    httpx.HTTPError on network failures and timeouts.
+    """
+
+    def __init__(self, provider: str):
+        self.provider = (provider or "").strip().upper()
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        headers: dict[str, str] | None = None,
+        json: Any = None,
+        auth: tuple[str, str] | None = None,
+    ) -> httpx.Response:
+        connect_started: list[float] = []
+        handshakes: list[str] = []
+
+        async def trace(event: str, info: dict[str, Any]) -> None:
+            # httpcore events: connection.connect_tcp.started/complete, connection.start_tls.complete
+            if event == "connection.connect_tcp.started":
+                connect_started.append(time.perf_counter())
+            elif event == "connection.connect_tcp.complete":
+                handshakes.append("tcp")
+            elif event == "connection.start_tls.complete":
+                handshakes.append("tls")
+
+        try:
+            resp = await _client_for(url).request(
+                method,
+                url,
+                headers=headers,
+                json=json,
+                auth=auth,
+                timeout=provider_timeout(self.provider),
+                extensions={"trace": trace},
+            )
+        finally:
+            for kind in handshakes:
+                increment_provider_http_handshake(self.provider, kind)
+            if connect_started and handshakes:
+                observe_provider_http_connect(self.provider, time.perf_counter() - connect_started[0])
+
+        increment_provider_http_request(
+            self.provider,
+            "new" if handshakes else "reused",
+            resp.http_version,
+        )
+        return resp
+
+    async def post(
+        self,
+        url: str,
+        *,
+        headers: dict[str, str] | None = None,
+        json: Any = None,
+        auth: tuple[str, str] | None = None,
+    ) -> httpx.Response:
+        return await self.request("POST", url, headers=headers, json=json, auth=auth)
+
+    async def get(
+        self,
+        url: str,
+        *,
+        headers: dict[str, str] | None = None,
+        auth: tuple[str, str] | None = None,
+    ) -> httpx.Response:
+        return await self.request("GET", url, headers=headers, auth=auth)
+
 
 @dataclass
 class HttpResponse:
@@ -17,11 +235,10 @@ class HttpResponse:
 
 
 class HttpClient:
-    def __init__(self, timeout_s: float = 20.0, follow_redirects: bool = True):
-        # follow_redirects=True helps if a provider returns redirects (or you hit a / trailing slash)
-        self._client = httpx.Client(timeout=timeout_s, follow_redirects=follow_redirects)
+    def __init__(self, provider: str):
+        self._client = ProviderTransport(provider)
 
-    def post(
+    async def post(
         self,
         url: str,
         *,
@@ -29,20 +246,20 @@ class HttpClient:
         json_body: dict[str, Any] | None = None,
         debug: bool = False,
     ) -> HttpResponse:
-        r = self._client.post(url, headers=headers, json=json_body)
-        if debug:
+        r = await self._client.post(url, headers=headers, json=json_body)
+        if debug and logger.isEnabledFor(logging.DEBUG):
             self._debug_dump("POST", url, headers, json_body, r)
         return self._wrap(r)
 
-    def get(
+    async def get(
         self,
         url: str,
         *,
         headers: dict[str, str],
         debug: bool = False,
     ) -> HttpResponse:
-        r = self._client.get(url, headers=headers)
-        if debug:
+        r = await self._client.get(url, headers=headers)
+        if debug and logger.isEnabledFor(logging.DEBUG):
             self._debug_dump("GET", url, headers, None, r)
         return self._wrap(r)
 
@@ -56,26 +273,29 @@ class HttpClient:
 
     @staticmethod
     def _debug_dump(method: str, url: str, headers: dict[str, str], json_body: Any, r: httpx.Response) -> None:
-        # Don’t print secrets
+        # Don’t log secrets
         safe_headers = dict(headers or {})
         if "Authorization" in safe_headers:
             safe_headers["Authorization"] = "REDACTED"
         if "X-Api-Key" in safe_headers:
             safe_headers["X-Api-Key"] = "REDACTED"
 
-        print(f"[HTTP DEBUG] {method} {url}")
-        print(f"[HTTP DEBUG] headers={safe_headers}")
-        if json_body is not None:
-            print(f"[HTTP DEBUG] json={json_body}")
-        print(f"[HTTP DEBUG] -> status={r.status_code}")
-        # helpful for 405 cases:
         try:
-            print(f"[HTTP DEBUG] request_method={r.request.method} request_url={r.request.url}")
+            request_line = f"{r.request.method} {r.request.url}"  # helpful for 405 cases
         except Exception:
-            pass
-        print(f"[HTTP DEBUG] text={r.text[:300]}")
-        if r.headers.get("allow"):
-            print(f"[HTTP DEBUG] allow={r.headers.get('allow')}")
+            request_line = None
+
+        logger.debug(
+            "provider_http method=%s url=%s status=%s request=%s allow=%s headers=%s json=%s text=%s",
+            method,
+            url,
+            r.status_code,
+            request_line,
+            r.headers.get("allow"),
+            safe_headers,
+            redact_value(json_body),
+            redact_value(r.text[:300]),
+        )
 
 
 def is_retryable_http(code: int) -> bool:
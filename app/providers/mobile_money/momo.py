@@ -2,13 +2,13 @@ from __future__ import annotations
 
 import logging
 import os
-import time
 import uuid
-from typing import Any, Optional
-
-import requests
+from typing import Any
 
 from app.providers.base import ProviderResult
+from app.providers.mobile_money.http import ProviderTransport
+from app.providers.mobile_money.shim import SyncProvider
+from app.providers.mobile_money.token_store import TokenKey, get_token_store
 
 
 BASE_URL = "https://sandbox.momodeveloper.mtn.com"
@@ -17,21 +17,22 @@ logger = logging.getLogger("nexapay")
 DESTINATION_CURRENCY = {
     "GH": "GHS",
 }
+transport = ProviderTransport("MOMO")
 
 
-class MomoProvider:
+class AsyncMomoProvider:
     def __init__(self) -> None:
         momo_env = (os.getenv("MOMO_ENV") or "sandbox").strip().lower()
-        self.base_url = BASE_URL
+        # MOMO_BASE_URL points the adapter elsewhere, e.g. at the provider simulator (app/simulator)
+        self.base_url = (os.getenv("MOMO_BASE_URL") or BASE_URL).strip().rstrip("/")
+        self.environment = momo_env
         self.target_env = "sandbox" if momo_env == "sandbox" else "sandbox"
         self.api_user_id = (os.getenv("MOMO_API_USER_ID") or "").strip()
         self.api_key = (os.getenv("MOMO_API_KEY") or "").strip()
         self.subscription_key = (os.getenv("MOMO_DISBURSE_SUB_KEY") or "").strip()
         self.callback_host = (os.getenv("MOMO_CALLBACK_HOST") or "").strip()
-        self._token: Optional[str] = None
-        self._token_exp: float = 0.0
 
-    def initiate_payout(self, payout: dict) -> ProviderResult:
+    async def initiate_payout(self, payout: dict) -> ProviderResult:
         missing = _missing_env(self.api_user_id, self.api_key, self.subscription_key)
         if missing:
             return ProviderResult(status="FAILED", error="MOMO_CONFIG_MISSING", response={"missing": missing})
@@ -52,7 +53,7 @@ class MomoProvider:
         external_ref = str(payout.get("external_ref") or payout.get("transaction_id") or provider_ref)
 
         amount = f"{int(amount_cents) / 100:.2f}"
-        return self.create_transfer(
+        return await self.create_transfer(
             amount=amount,
             currency=request_currency,
             external_id=external_ref,
@@ -61,7 +62,7 @@ class MomoProvider:
             note=payout.get("payee_note") or "NepXy cash-out",
         )
 
-    def get_status(self, payout: dict) -> ProviderResult:
+    async def get_status(self, payout: dict) -> ProviderResult:
         provider_ref = (payout.get("provider_ref") or "").strip()
         if not provider_ref:
             return ProviderResult(status="SENT", error="MISSING_PROVIDER_REF", retryable=True)
@@ -70,11 +71,11 @@ class MomoProvider:
         if missing:
             return ProviderResult(status="SENT", error="MOMO_CONFIG_MISSING", response={"missing": missing})
 
-        token = self.get_access_token_disbursement()
+        token = await self.get_access_token_disbursement()
         if not token:
             return ProviderResult(status="SENT", provider_ref=provider_ref, error="MOMO_TOKEN_ERROR", retryable=True)
 
-        resp = self.get_transfer_status(provider_ref)
+        resp = await self.get_transfer_status(provider_ref)
         if isinstance(resp, ProviderResult):
             return resp
 
@@ -113,15 +114,20 @@ class MomoProvider:
             retryable=retryable,
         )
 
-    def get_access_token_disbursement(self) -> str | None:
-        now = time.time()
-        if self._token and now < (self._token_exp - TOKEN_SAFETY_BUFFER_S):
-            return self._token
+    async def get_access_token_disbursement(self) -> str | None:
+        # Shared with every other process using these credentials, and refreshed
+        # ahead of expiry, so a payout rarely waits on the token endpoint.
+        return await get_token_store().get(
+            TokenKey("MOMO", self.environment),
+            self._fetch_token_disbursement,
+            safety_buffer_s=TOKEN_SAFETY_BUFFER_S,
+        )
 
+    async def _fetch_token_disbursement(self) -> tuple[str, float] | None:
         url = f"{self.base_url}/disbursement/token/"
         headers = {"Ocp-Apim-Subscription-Key": self.subscription_key}
         try:
-            resp = requests.post(url, headers=headers, auth=(self.api_user_id, self.api_key))
+            resp = await transport.post(url, headers=headers, auth=(self.api_user_id, self.api_key))
         except Exception:
             return None
 
@@ -130,12 +136,10 @@ class MomoProvider:
             token = payload.get("access_token") if isinstance(payload, dict) else None
             if token:
                 expires_in = int(payload.get("expires_in") or 3600)
-                self._token = token
-                self._token_exp = now + max(0, expires_in)
-                return self._token
+                return token, max(0, expires_in)
         return None
 
-    def create_transfer(
+    async def create_transfer(
         self,
         *,
         amount: str,
@@ -145,7 +149,7 @@ class MomoProvider:
         reference_id: str,
         note: str,
     ):
-        token = self.get_access_token_disbursement()
+        token = await self.get_access_token_disbursement()
         if not token:
             return ProviderResult(status="FAILED", error="MOMO_TOKEN_ERROR", retryable=True)
 
@@ -168,7 +172,7 @@ class MomoProvider:
         }
 
         try:
-            resp = requests.post(url, headers=headers, json=body)
+            resp = await transport.post(url, headers=headers, json=body)
             logger.info(
                 "momo transfer create status=%s reference_id=%s",
                 resp.status_code,
@@ -237,8 +241,8 @@ class MomoProvider:
                 retryable=True,
             )
 
-    def get_transfer_status(self, reference_id: str):
-        token = self.get_access_token_disbursement()
+    async def get_transfer_status(self, reference_id: str):
+        token = await self.get_access_token_disbursement()
         if not token:
             return ProviderResult(status="SENT", provider_ref=reference_id, error="MOMO_TOKEN_ERROR", retryable=True)
 
@@ -250,7 +254,7 @@ class MomoProvider:
         }
 
         try:
-            resp = requests.get(url, headers=headers)
+            resp = await transport.get(url, headers=headers)
             logger.info(
                 "momo transfer status status=%s reference_id=%s",
                 resp.status_code,
@@ -261,17 +265,22 @@ class MomoProvider:
             logger.warning("momo transfer status error reference_id=%s err=%s", reference_id, exc)
             return ProviderResult(status="SENT", provider_ref=reference_id, error=str(exc), retryable=True)
 
-    def get_token(self) -> str | None:
-        return self.get_access_token_disbursement()
+    async def get_token(self) -> str | None:
+        return await self.get_access_token_disbursement()
+
+    async def get_payout_status(self, payout: dict) -> ProviderResult:
+        return await self.get_status(payout)
 
-    def get_payout_status(self, payout: dict) -> ProviderResult:
-        return self.get_status(payout)
+    async def send_cashout(self, payout: dict) -> ProviderResult:
+        return await self.initiate_payout(payout)
 
-    def send_cashout(self, payout: dict) -> ProviderResult:
-        return self.initiate_payout(payout)
+    async def get_cashout_status(self, payout: dict) -> ProviderResult:
+        return await self.get_status(payout)
 
-    def get_cashout_status(self, payout: dict) -> ProviderResult:
-        return self.get_status(payout)
+
+class MomoProvider(SyncProvider):
+    def __init__(self) -> None:
+        super().__init__(AsyncMomoProvider())
 
 
 def _safe_json(resp) -> Any:
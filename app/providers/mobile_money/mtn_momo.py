@@ -7,8 +7,9 @@ import os
 from dataclasses import dataclass
 from typing import Optional, Any
 
-from app.providers.base import ProviderResult, MobileMoneyProvider
+from app.providers.base import ProviderResult, AsyncMobileMoneyProvider
 from app.providers.mobile_money.config import mm_mode, momo_config
+from app.providers.mobile_money.shim import SyncProvider
 from settings import settings
 
 
@@ -107,11 +108,11 @@ def _momo_country_config(country: str) -> MomoCountryConfig:
     )
 
 
-class MtnMomoProvider(MobileMoneyProvider):
+class AsyncMtnMomoProvider(AsyncMobileMoneyProvider):
     def __init__(self, *_: Any, **__: Any):
         pass
 
-    def send_cashout(self, payout: dict) -> ProviderResult:
+    async def send_cashout(self, payout: dict) -> ProviderResult:
         country = _normalize(payout.get("country"))
         cfg = _momo_country_config(country)
         missing = cfg.missing
@@ -150,7 +151,7 @@ class MtnMomoProvider(MobileMoneyProvider):
         }
         return ProviderResult(status="SENT", provider_ref=provider_ref, response=response, retryable=True)
 
-    def get_cashout_status(self, payout: dict) -> ProviderResult:
+    async def get_cashout_status(self, payout: dict) -> ProviderResult:
         country = _normalize(payout.get("country"))
         cfg = _momo_country_config(country)
         provider_ref = str(payout.get("provider_ref") or payout.get("id") or payout.get("transaction_id"))
@@ -188,3 +189,8 @@ class MtnMomoProvider(MobileMoneyProvider):
             return False
         # TODO(MTN_MOMO): implement HMAC verification once MTN signature spec is confirmed.
         return False
+
+
+class MtnMomoProvider(SyncProvider):
+    def __init__(self, *_: Any, **__: Any):
+        super().__init__(AsyncMtnMomoProvider())
@@ -0,0 +1,40 @@
+# app/providers/mobile_money/shim.py
+from __future__ import annotations
+
+import functools
+import inspect
+from typing import Any
+
+from app.providers.base import AsyncMobileMoneyProvider, MobileMoneyProvider, ProviderResult
+from app.providers.mobile_money.http import run_sync
+
+
+class SyncProvider(MobileMoneyProvider):
+    """
+    Blocking MobileMoneyProvider over an async adapter, for thread-based callers.
+    Coroutine methods run on the shared provider event loop (run_sync); other
+    attributes pass through. The async adapter itself is .aio, for callers that
+    can await it (StatusPoller fans out on it).
+    """
+
+    def __init__(self, aio: AsyncMobileMoneyProvider):
+        self.aio = aio
+
+    def send_cashout(self, payout: dict[str, Any]) -> ProviderResult:
+        return run_sync(self.aio.send_cashout(payout))
+
+    def get_cashout_status(self, payout: dict[str, Any]) -> ProviderResult:
+        return run_sync(self.aio.get_cashout_status(payout))
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "aio":  # not set yet (copy/pickle)
+            raise AttributeError(name)
+        attr = getattr(self.aio, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args: Any, **kwargs: Any) -> Any:
+            return run_sync(attr(*args, **kwargs))
+
+        return call
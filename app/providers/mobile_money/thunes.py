@@ -3,18 +3,92 @@
 # app/providers/mobile_money/thunes.py
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
-import requests
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+import httpx
 
 from settings import settings
 from app.providers.base import ProviderResult
+from app.providers.mobile_money.http import ProviderTransport
+from app.providers.mobile_money.shim import SyncProvider
+from services.metrics import increment_provider_quote
+
+transport = ProviderTransport("THUNES")
+
+T = TypeVar("T")
+
+# (payer_id, mode, transaction_type, source currency, source country, destination currency, amount_cents)
+QuoteKey = tuple[int, str, str, str, str, str, int]
+
+
+class QuoteCache:
+    """
+    Still-valid Thunes quotations, reused for identical payouts (same payer,
+    corridor, amount and transaction type) so a payroll-style burst quotes once
+    instead of once per payout. Per process; one quotation request per key is
+    in flight per event loop and concurrent payouts join it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._quotes: dict[QuoteKey, tuple[Any, float]] = {}
+        self._inflight: dict[tuple[asyncio.AbstractEventLoop, QuoteKey], asyncio.Task] = {}
+
+    def get(self, key: QuoteKey) -> Any:
+        with self._lock:
+            cached = self._quotes.get(key)
+            if cached is not None and time.time() >= cached[1]:
+                del self._quotes[key]
+                cached = None
+        return cached[0] if cached is not None else None
+
+    def put(self, key: QuoteKey, quotation_id: Any, valid_until: float) -> None:
+        now = time.time()
+        with self._lock:
+            if valid_until > now:
+                self._quotes[key] = (quotation_id, valid_until)
+            # keys that are never asked for again would otherwise stay forever
+            for stale in [k for k, (_, until) in self._quotes.items() if until <= now]:
+                del self._quotes[stale]
+
+    def discard(self, key: QuoteKey, quotation_id: Any) -> None:
+        with self._lock:
+            cached = self._quotes.get(key)
+            if cached is not None and cached[0] == quotation_id:
+                del self._quotes[key]
+
+    async def single_flight(self, key: QuoteKey, create: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        # -> (result, joined): joined = another payout's request was shared
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._inflight.get((loop, key))
+            joined = task is not None
+            if task is None:
+                task = loop.create_task(create())
+                self._inflight[(loop, key)] = task
+                task.add_done_callback(lambda _: self._inflight.pop((loop, key), None))
+        return await asyncio.shield(task), joined
+
+    def reset(self) -> None:
+        with self._lock:
+            self._quotes.clear()
+
+
+quote_cache = QuoteCache()
+
+
+def reset_quote_cache() -> None:
+    quote_cache.reset()
 
 
 # --- Thunes "Money Transfer API v2" base path is: {API_ENDPOINT}/v2/money-transfer
 # Docs: Base URL `/v2/money-transfer` and Basic Auth.  :contentReference[oaicite:10]{index=10}
 
 
-class ThunesProvider:
+class AsyncThunesProvider:
     """
     Thunes adapter for your worker contract:
       - send_cashout(payout_dict) -> ProviderResult(status=CONFIRMED|SENT|FAILED, provider_ref=..., response=..., error=..., retryable=...)
@@ -46,7 +120,6 @@ class ThunesProvider:
         self.api_secret = (api_secret or "").strip()
 
         self.use_simulation = bool(getattr(settings, "THUNES_USE_SIMULATION", True)) and self.mode == "sandbox"
-        self.timeout_s = float(getattr(settings, "MM_HTTP_TIMEOUT_S", 20.0))
 
     def _auth(self):
         # Thunes uses Basic Authentication: -u API_KEY:API_SECRET  :contentReference[oaicite:11]{index=11}
@@ -95,10 +168,12 @@ class ThunesProvider:
         except Exception:
             return None
 
-    def send_cashout(self, payout: dict) -> ProviderResult:
+    async def send_cashout(self, payout: dict) -> ProviderResult:
         """
         Called by worker when payout is PENDING.
         Implements: quotation -> transaction -> confirm. :contentReference[oaicite:13]{index=13}
+        Identical payouts share a still-valid quotation (QuoteCache), so a burst
+        mostly pays for transaction -> confirm.
         """
         if not self.base_url:
             return ProviderResult(
@@ -141,6 +216,10 @@ class ThunesProvider:
         source_currency = (settings.THUNES_SOURCE_CURRENCY or "USD").strip().upper()
         source_country_iso3 = (settings.THUNES_SOURCE_COUNTRY_ISO3 or "USA").strip().upper()
 
+        phone = (payout.get("phone_e164") or "").strip()
+        if not phone:
+            return ProviderResult(status="FAILED", error="MISSING_PHONE_E164", retryable=False)
+
         # 1) Create quotation  POST /quotations  :contentReference[oaicite:14]{index=14}
         q_payload = {
             "external_id": external_id,
@@ -164,39 +243,25 @@ class ThunesProvider:
             # SOURCE_AMOUNT
             q_payload["source"]["amount"] = destination_amount
 
-        try:
-            q_url = f"{self.base_url}/quotations"
-            q_resp = requests.post(
-                q_url,
-                json=q_payload,
-                headers=self._headers(),
-                auth=self._auth(),
-                timeout=self.timeout_s,
-            )
-            q_data = _safe_json(q_resp)
-            if q_resp.status_code not in (200, 201):
-                return _map_thunes_http_failure(
-                    "THUNES_QUOTATION_FAILED",
-                    q_url,
-                    q_resp.status_code,
-                    q_data,
-                )
+        quote_key: QuoteKey = (
+            payer_id,
+            quote_mode,
+            tx_type,
+            source_currency,
+            source_country_iso3,
+            destination_currency,
+            amount_cents,
+        )
 
-            quotation_id = q_data.get("id")
-            if not quotation_id:
-                return ProviderResult(
-                    status="FAILED",
-                    error="THUNES_QUOTATION_MISSING_ID",
-                    response={"http_status": q_resp.status_code, "data": q_data, "request_url": q_url},
-                    retryable=False,
-                )
+        try:
+            quotation_id, shared, failure = await self._quotation(quote_key, q_payload)
+            if failure is not None:
+                return failure
 
             # 2) Create transaction  POST /quotations/{id}/transactions :contentReference[oaicite:15]{index=15}
-            phone = (payout.get("phone_e164") or "").strip()
-            if not phone:
-                return ProviderResult(status="FAILED", error="MISSING_PHONE_E164", retryable=False)
-
+            # external_id is per payout: a reused quotation carries another payout's
             t_payload = {
+                "external_id": external_id,
                 "credit_party_identifier": {
                     "msisdn": phone
                 },
@@ -214,14 +279,15 @@ class ThunesProvider:
                 },
             }
 
-            t_url = f"{self.base_url}/quotations/{quotation_id}/transactions"
-            t_resp = requests.post(
-                t_url,
-                json=t_payload,
-                headers=self._headers(),
-                auth=self._auth(),
-                timeout=self.timeout_s,
-            )
+            t_url, t_resp = await self._create_transaction(quotation_id, t_payload)
+            if shared and _quote_refused(t_resp.status_code):
+                # expired or used up early: this payout gets a quotation of its own
+                increment_provider_quote("THUNES", "refused")
+                quote_cache.discard(quote_key, quotation_id)
+                quotation_id, _, failure = await self._quotation(quote_key, q_payload, reuse=False)
+                if failure is not None:
+                    return failure
+                t_url, t_resp = await self._create_transaction(quotation_id, t_payload)
             t_data = _safe_json(t_resp)
             if t_resp.status_code not in (200, 201):
                 return _map_thunes_http_failure(
@@ -242,11 +308,10 @@ class ThunesProvider:
 
             # 3) Confirm transaction  POST /transactions/{id}/confirm :contentReference[oaicite:16]{index=16}
             c_url = f"{self.base_url}/transactions/{transaction_id}/confirm"
-            c_resp = requests.post(
+            c_resp = await transport.post(
                 c_url,
                 headers=self._headers(),
                 auth=self._auth(),
-                timeout=self.timeout_s,
             )
             c_data = _safe_json(c_resp)
 
@@ -274,7 +339,7 @@ class ThunesProvider:
                 retryable=True,
             )
 
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             return ProviderResult(
                 status="FAILED",
                 error=f"THUNES_NETWORK_ERROR: {e}",
@@ -282,7 +347,76 @@ class ThunesProvider:
                 retryable=True,
             )
 
-    def get_cashout_status(self, payout: dict) -> ProviderResult:
+    async def _quotation(
+        self, key: QuoteKey, payload: dict, *, reuse: bool = True
+    ) -> tuple[Any, bool, Optional[ProviderResult]]:
+        """
+        -> (quotation_id, shared, failure). shared = the quotation came from the
+        cache or another payout's in-flight request; failure is set instead of
+        the id when Thunes refused to quote.
+        """
+        caching = float(settings.THUNES_QUOTE_CACHE_TTL_S) > 0
+        if not (reuse and caching):
+            # a fresh quotation of our own, still cached for the payouts after us
+            quotation_id, failure = await self._create_quotation(payload, key=key if caching else None)
+            return quotation_id, False, failure
+
+        cached = quote_cache.get(key)
+        if cached is not None:
+            increment_provider_quote("THUNES", "hit")
+            return cached, True, None
+
+        (quotation_id, failure), joined = await quote_cache.single_flight(
+            key, lambda: self._create_quotation(payload, key=key)
+        )
+        if joined:
+            increment_provider_quote("THUNES", "shared")
+        return quotation_id, joined, failure
+
+    async def _create_quotation(
+        self, payload: dict, *, key: Optional[QuoteKey] = None
+    ) -> tuple[Any, Optional[ProviderResult]]:
+        q_url = f"{self.base_url}/quotations"
+        q_resp = await transport.post(
+            q_url,
+            json=payload,
+            headers=self._headers(),
+            auth=self._auth(),
+        )
+        increment_provider_quote("THUNES", "miss")
+        q_data = _safe_json(q_resp)
+        if q_resp.status_code not in (200, 201):
+            return None, _map_thunes_http_failure(
+                "THUNES_QUOTATION_FAILED",
+                q_url,
+                q_resp.status_code,
+                q_data,
+            )
+
+        quotation_id = q_data.get("id")
+        if not quotation_id:
+            return None, ProviderResult(
+                status="FAILED",
+                error="THUNES_QUOTATION_MISSING_ID",
+                response={"http_status": q_resp.status_code, "data": q_data, "request_url": q_url},
+                retryable=False,
+            )
+
+        if key is not None:
+            quote_cache.put(key, quotation_id, _reuse_until(q_data))
+        return quotation_id, None
+
+    async def _create_transaction(self, quotation_id: Any, payload: dict) -> tuple[str, httpx.Response]:
+        t_url = f"{self.base_url}/quotations/{quotation_id}/transactions"
+        t_resp = await transport.post(
+            t_url,
+            json=payload,
+            headers=self._headers(),
+            auth=self._auth(),
+        )
+        return t_url, t_resp
+
+    async def get_cashout_status(self, payout: dict) -> ProviderResult:
         """
         Called by worker when payout is stale SENT.
         Uses GET /transactions/{transaction_id}. :contentReference[oaicite:17]{index=17}
@@ -299,11 +433,10 @@ class ThunesProvider:
         url = f"{self.base_url}/transactions/{provider_ref}"
 
         try:
-            resp = requests.get(
+            resp = await transport.get(
                 url,
                 headers=self._headers(),
                 auth=self._auth(),
-                timeout=self.timeout_s,
             )
             data = _safe_json(resp)
 
@@ -346,7 +479,7 @@ class ThunesProvider:
                 retryable=retryable,
             )
 
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             return ProviderResult(
                 status="FAILED",
                 provider_ref=provider_ref,
@@ -356,6 +489,13 @@ class ThunesProvider:
             )
 
 
+class ThunesProvider(SyncProvider):
+    map_thunes_status = staticmethod(AsyncThunesProvider.map_thunes_status)
+
+    def __init__(self):
+        super().__init__(AsyncThunesProvider())
+
+
 def _map_thunes_http_failure(
     code: str,
     request_url: str,
@@ -394,6 +534,26 @@ def _map_thunes_http_failure(
     )
 
 
+def _quote_refused(http_status: int) -> bool:
+    # a 4xx on a reused quotation (expired, already used); transient codes and 404 are not about the quote
+    return 400 <= http_status < 500 and http_status not in (404, 408, 425, 429)
+
+
+def _reuse_until(q_data: dict) -> float:
+    # THUNES_QUOTE_CACHE_TTL_S from now, capped at expiration_date minus the margin
+    until = time.time() + float(settings.THUNES_QUOTE_CACHE_TTL_S)
+    raw = q_data.get("expiration_date")
+    if raw:
+        try:
+            expires = datetime.fromisoformat(str(raw).replace("Z", "+00:00"))
+        except ValueError:
+            return until
+        if expires.tzinfo is None:
+            expires = expires.replace(tzinfo=timezone.utc)
+        until = min(until, expires.timestamp() - float(settings.THUNES_QUOTE_EXPIRY_MARGIN_S))
+    return until
+
+
 def _safe_json(resp) -> Dict[str, Any]:
     try:
         j = resp.json()
@@ -0,0 +1,276 @@
+# app/providers/mobile_money/token_store.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from db import get_conn
+from settings import settings
+
+logger = logging.getLogger("nexapay.providers")
+
+# fetch() -> (access_token, expires_in seconds), or None when the provider refused
+TokenFetch = Callable[[], Awaitable[Optional[tuple[str, float]]]]
+
+# How long one process may hold the refresh of a key before another takes over
+TOKEN_LEASE_S = 30.0
+# Waiting for another process's refresh: poll the row this often
+LEASE_POLL_S = 0.25
+
+# Take the refresh lease only when nobody holds it and the stored token is
+# missing or inside the refresh window; RETURNING a row means we won it.
+_CLAIM_SQL = """
+    INSERT INTO app.provider_tokens (provider, environment, country, lease_owner, leased_until)
+    VALUES (%s, %s, %s, %s, now() + make_interval(secs => %s::float8))
+    ON CONFLICT (provider, environment, country) DO UPDATE
+      SET lease_owner = EXCLUDED.lease_owner, leased_until = EXCLUDED.leased_until
+      WHERE (app.provider_tokens.leased_until IS NULL OR app.provider_tokens.leased_until < now())
+        AND (app.provider_tokens.expires_at IS NULL
+             OR app.provider_tokens.expires_at < now() + make_interval(secs => %s::float8))
+    RETURNING token, extract(epoch FROM expires_at)
+"""
+
+_GET_SQL = """
+    SELECT token, extract(epoch FROM expires_at)
+    FROM app.provider_tokens
+    WHERE provider = %s AND environment = %s AND country = %s
+"""
+
+_STORE_SQL = """
+    UPDATE app.provider_tokens
+    SET token = %s, expires_at = to_timestamp(%s), lease_owner = NULL, leased_until = NULL, updated_at = now()
+    WHERE provider = %s AND environment = %s AND country = %s
+"""
+
+_RELEASE_SQL = """
+    UPDATE app.provider_tokens
+    SET lease_owner = NULL, leased_until = NULL
+    WHERE provider = %s AND environment = %s AND country = %s AND lease_owner = %s
+"""
+
+
+@dataclass(frozen=True)
+class TokenKey:
+    provider: str
+    environment: str
+    country: str = ""  # "" = the provider's default credential set
+
+    def params(self) -> tuple[str, str, str]:
+        return (self.provider, self.environment, self.country)
+
+
+@dataclass
+class _Entry:
+    token: str
+    expires_at: float  # epoch seconds
+    used_at: float
+
+
+class TokenStore:
+    """
+    Provider access tokens shared by every process:
+      - each process keeps the token in memory and, with shared=True, in
+        app.provider_tokens (alembic 0019), so API workers, payout workers and
+        the reconciler reuse one token per (provider, environment, country);
+      - a token is dropped safety_buffer_s before it expires, and refreshed in
+        the background refresh_ahead_s before that, so payouts don't wait on
+        the token endpoint;
+      - single-flight: one refresh per key per event loop, and across processes
+        one holder of a short row lease; the rest wait for its result.
+    Without the table (or the DB) it degrades to a per-process cache.
+    """
+
+    def __init__(self, *, refresh_ahead_s: float, shared: bool = True, lease_s: float = TOKEN_LEASE_S):
+        self.refresh_ahead_s = max(0.0, float(refresh_ahead_s))
+        self.shared = shared
+        self.lease_s = max(1.0, float(lease_s))
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._memory: dict[TokenKey, _Entry] = {}
+        self._inflight: dict[tuple[asyncio.AbstractEventLoop, TokenKey], asyncio.Task] = {}
+        self._timers: dict[TokenKey, asyncio.TimerHandle] = {}
+
+    async def get(self, key: TokenKey, fetch: TokenFetch, *, safety_buffer_s: float) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                entry.used_at = now
+        if entry is not None and now < entry.expires_at - safety_buffer_s:
+            if now >= entry.expires_at - safety_buffer_s - self.refresh_ahead_s:
+                self._refresh_in_background(key, fetch, safety_buffer_s)
+            return entry.token
+        return await asyncio.shield(self._refresh_task(key, fetch, safety_buffer_s))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+
+    # --- internals ---
+
+    def _refresh_task(self, key: TokenKey, fetch: TokenFetch, safety_buffer_s: float) -> asyncio.Task:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._inflight.get((loop, key))
+            if task is None:
+                task = loop.create_task(self._refresh(key, fetch, safety_buffer_s))
+                self._inflight[(loop, key)] = task
+                task.add_done_callback(lambda _: self._inflight.pop((loop, key), None))
+        return task
+
+    def _refresh_in_background(self, key: TokenKey, fetch: TokenFetch, safety_buffer_s: float) -> None:
+        task = self._refresh_task(key, fetch, safety_buffer_s)
+        # nobody awaits a background refresh: keep its failure out of "exception never retrieved"
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def _refresh(self, key: TokenKey, fetch: TokenFetch, safety_buffer_s: float) -> Optional[str]:
+        window_s = safety_buffer_s + self.refresh_ahead_s
+        if self.shared:
+            stored = await asyncio.to_thread(self._claim, key, window_s)
+            if stored is not None:
+                token, expires_at, won = stored
+                if not won:
+                    token, expires_at = await self._wait_for_holder(key, token, expires_at, safety_buffer_s)
+                if token and expires_at and time.time() < expires_at - window_s:
+                    return self._remember(key, token, expires_at, fetch, safety_buffer_s)
+                if not won and token and expires_at and time.time() < expires_at - safety_buffer_s:
+                    # still usable and the holder is refreshing it; don't stampede
+                    return self._remember(key, token, expires_at, fetch, safety_buffer_s)
+
+        try:
+            fetched = await fetch()
+        except Exception:
+            logger.warning("provider_token_fetch_failed provider=%s", key.provider, exc_info=True)
+            fetched = None
+        if not fetched:
+            if self.shared:
+                await asyncio.to_thread(self._release, key)
+            return self._usable(key, safety_buffer_s)
+
+        token, expires_in = fetched
+        expires_at = time.time() + max(0.0, float(expires_in))
+        if self.shared:
+            await asyncio.to_thread(self._store, key, token, expires_at)
+        return self._remember(key, token, expires_at, fetch, safety_buffer_s)
+
+    async def _wait_for_holder(
+        self, key: TokenKey, token: Optional[str], expires_at: Optional[float], safety_buffer_s: float
+    ) -> tuple[Optional[str], Optional[float]]:
+        # Another process holds the lease. A usable token is good enough; with
+        # none, wait for theirs (up to the lease) before fetching ourselves.
+        deadline = time.monotonic() + self.lease_s
+        while not (token and expires_at and time.time() < expires_at - safety_buffer_s):
+            if time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(LEASE_POLL_S)
+            row = await asyncio.to_thread(self._load, key)
+            if row is not None:
+                token, expires_at = row
+        return token, expires_at
+
+    def _usable(self, key: TokenKey, safety_buffer_s: float) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is not None and time.time() < entry.expires_at - safety_buffer_s:
+            return entry.token
+        return None
+
+    def _remember(self, key: TokenKey, token: str, expires_at: float, fetch: TokenFetch, safety_buffer_s: float) -> str:
+        now = time.time()
+        with self._lock:
+            prev = self._memory.get(key)
+            self._memory[key] = _Entry(token=token, expires_at=expires_at, used_at=prev.used_at if prev else now)
+            timer = self._timers.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+            delay = max(0.0, expires_at - safety_buffer_s - self.refresh_ahead_s - now)
+            self._timers[key] = asyncio.get_running_loop().call_later(
+                delay, self._on_timer, key, fetch, safety_buffer_s, now
+            )
+        return token
+
+    def _on_timer(self, key: TokenKey, fetch: TokenFetch, safety_buffer_s: float, stored_at: float) -> None:
+        # Refresh ahead of expiry only for tokens used since they were stored;
+        # an idle process lets its copy lapse and fetches again on demand.
+        with self._lock:
+            self._timers.pop(key, None)
+            entry = self._memory.get(key)
+        if entry is not None and entry.used_at > stored_at:
+            self._refresh_in_background(key, fetch, safety_buffer_s)
+
+    def _claim(self, key: TokenKey, window_s: float) -> Optional[tuple[Optional[str], Optional[float], bool]]:
+        try:
+            with get_conn() as conn:
+                cur = conn.cursor()
+                cur.execute(_CLAIM_SQL, (*key.params(), self.owner, self.lease_s, window_s))
+                row = cur.fetchone()
+                if row is not None:
+                    return row[0], _epoch(row[1]), True
+                cur.execute(_GET_SQL, key.params())
+                row = cur.fetchone()
+                return (row[0], _epoch(row[1]), False) if row else (None, None, False)
+        except Exception:
+            logger.warning("provider_token_store_unavailable", exc_info=True)
+            return None
+
+    def _load(self, key: TokenKey) -> Optional[tuple[Optional[str], Optional[float]]]:
+        try:
+            with get_conn() as conn:
+                cur = conn.cursor()
+                cur.execute(_GET_SQL, key.params())
+                row = cur.fetchone()
+        except Exception:
+            logger.warning("provider_token_store_unavailable", exc_info=True)
+            return None
+        return (row[0], _epoch(row[1])) if row else None
+
+    def _store(self, key: TokenKey, token: str, expires_at: float) -> None:
+        try:
+            with get_conn() as conn:
+                conn.cursor().execute(_STORE_SQL, (token, expires_at, *key.params()))
+        except Exception:
+            logger.warning("provider_token_store_unavailable", exc_info=True)
+
+    def _release(self, key: TokenKey) -> None:
+        try:
+            with get_conn() as conn:
+                conn.cursor().execute(_RELEASE_SQL, (*key.params(), self.owner))
+        except Exception:
+            logger.warning("provider_token_store_unavailable", exc_info=True)
+
+
+def _epoch(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+_store: TokenStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_token_store() -> TokenStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TokenStore(
+                    refresh_ahead_s=settings.PROVIDER_TOKEN_REFRESH_AHEAD_S,
+                    shared=settings.PROVIDER_TOKEN_SHARED,
+                )
+    return _store
+
+
+def reset_token_store() -> None:
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.reset()
+        _store = None
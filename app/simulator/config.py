@@ -0,0 +1,115 @@
+# app/simulator/config.py
+from __future__ import annotations
+
+import math
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+# Same .env as the API (settings.py) so webhook secrets match; the simulator
+# itself needs no database, hence its own settings class.
+ENV_PATH = Path(__file__).resolve().parents[2] / ".env"
+
+PROVIDERS = ("TMONEY", "FLOOZ", "MOMO", "THUNES")
+
+# z-score of the 99th percentile of a standard normal
+_Z99 = 2.3263
+
+
+class SimulatorSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=str(ENV_PATH), extra="ignore")
+
+    # Response latency per request: lognormal with this median and p99 (ms).
+    # SIM_LATENCY_BY_PROVIDER overrides median:p99 per provider, e.g. "THUNES=250:2000,MOMO=120:600"
+    SIM_LATENCY_MEDIAN_MS: float = Field(default=80.0, ge=0)
+    SIM_LATENCY_P99_MS: float = Field(default=400.0, ge=0)
+    SIM_LATENCY_BY_PROVIDER: str = ""
+    # Share of requests answered 500 / 429 before doing anything; per provider as "FLOOZ=0.1"
+    SIM_ERROR_RATE: float = Field(default=0.0, ge=0, le=1)
+    SIM_ERROR_RATE_BY_PROVIDER: str = ""
+    SIM_THROTTLE_RATE: float = Field(default=0.0, ge=0, le=1)
+    # Outage bursts: every SIM_BURST_EVERY_S (0 = never, providers staggered) each provider
+    # answers only SIM_BURST_STATUS for SIM_BURST_DURATION_S. POST /sim/burst/{provider} starts one now
+    SIM_BURST_EVERY_S: float = Field(default=0.0, ge=0)
+    SIM_BURST_DURATION_S: float = Field(default=5.0, ge=0)
+    SIM_BURST_STATUS: int = Field(default=503, ge=400, le=599)
+    # Accepted cash-outs settle after this long (lognormal, ms); this share of them ends FAILED
+    SIM_SETTLE_MEDIAN_MS: float = Field(default=2000.0, ge=0)
+    SIM_SETTLE_P99_MS: float = Field(default=15000.0, ge=0)
+    SIM_FAILURE_RATE: float = Field(default=0.05, ge=0, le=1)
+    # Callbacks: a settled cash-out is POSTed to {SIM_WEBHOOK_BASE_URL}/v1/webhooks/<provider>,
+    # signed with the API's <PROVIDER>_WEBHOOK_SECRET (empty base URL = status polling only).
+    # SIM_WEBHOOK_RATE of them get one, SIM_WEBHOOK_DUPLICATE_RATE of those twice; failed
+    # deliveries are retried SIM_WEBHOOK_RETRIES times with doubling delays
+    SIM_WEBHOOK_BASE_URL: str = ""
+    SIM_WEBHOOK_RATE: float = Field(default=1.0, ge=0, le=1)
+    SIM_WEBHOOK_DUPLICATE_RATE: float = Field(default=0.0, ge=0, le=1)
+    SIM_WEBHOOK_RETRIES: int = Field(default=3, ge=0)
+    SIM_WEBHOOK_TIMEOUT_S: float = Field(default=10.0, gt=0)
+    # Thunes quotations expire after this long; single-use ones refuse a second transaction
+    SIM_THUNES_QUOTE_TTL_S: float = Field(default=300.0, gt=0)
+    SIM_THUNES_QUOTE_SINGLE_USE: bool = False
+    # Cash-outs kept for status lookups; the oldest are dropped beyond this
+    SIM_MAX_TRANSFERS: int = Field(default=1_000_000, ge=1)
+    # Seed for reproducible runs (latencies, faults, outcomes)
+    SIM_SEED: Optional[int] = None
+
+    TMONEY_WEBHOOK_SECRET: str = ""
+    FLOOZ_WEBHOOK_SECRET: str = ""
+    MOMO_WEBHOOK_SECRET: str = ""
+    THUNES_WEBHOOK_SECRET: str = ""
+
+
+@dataclass(frozen=True)
+class Lognormal:
+    """A latency distribution given by its median and 99th percentile (seconds)."""
+
+    median_s: float
+    p99_s: float
+
+    @classmethod
+    def from_ms(cls, median_ms: float, p99_ms: float) -> "Lognormal":
+        return cls(max(0.0, median_ms) / 1000.0, max(0.0, p99_ms) / 1000.0)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median_s <= 0:
+            return 0.0
+        sigma = math.log(max(self.p99_s, self.median_s) / self.median_s) / _Z99
+        return rng.lognormvariate(math.log(self.median_s), sigma)
+
+
+def parse_latencies(raw: str) -> dict[str, Lognormal]:
+    # "THUNES=250:2000,MOMO=120" -> median:p99 in ms (p99 defaults to the median); bad entries skipped
+    out: dict[str, Lognormal] = {}
+    for item in (raw or "").split(","):
+        name, sep, value = item.partition("=")
+        median, _, p99 = value.partition(":")
+        if not sep:
+            continue
+        try:
+            pair = (float(median), float(p99 or median))
+        except ValueError:
+            continue
+        if pair[0] >= 0 and pair[1] >= 0:
+            out[name.strip().upper()] = Lognormal.from_ms(*pair)
+    return out
+
+
+def parse_rates(raw: str) -> dict[str, float]:
+    # "FLOOZ=0.1,THUNES=0.02" -> {"FLOOZ": 0.1, ...}; values outside 0..1 skipped
+    out: dict[str, float] = {}
+    for item in (raw or "").split(","):
+        name, sep, value = item.partition("=")
+        if not sep:
+            continue
+        try:
+            rate = float(value)
+        except ValueError:
+            continue
+        if 0.0 <= rate <= 1.0:
+            out[name.strip().upper()] = rate
+    return out
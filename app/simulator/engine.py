@@ -0,0 +1,204 @@
+# app/simulator/engine.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import random
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+import httpx
+
+from app.simulator.config import PROVIDERS, Lognormal, SimulatorSettings, parse_latencies, parse_rates
+
+logger = logging.getLogger("nexapay.simulator")
+
+# Provider-neutral cash-out states; the routes translate them to each API's words
+CREATED = "CREATED"  # Thunes: transaction created, not confirmed yet
+PENDING = "PENDING"
+SUCCESS = "SUCCESS"
+FAILED = "FAILED"
+
+
+@dataclass
+class Transfer:
+    provider: str
+    ref: str
+    external_id: str
+    amount: Any
+    currency: str
+    msisdn: str
+    outcome: str  # SUCCESS or FAILED, decided up front
+    created_at: float = field(default_factory=time.time)
+    settle_at: Optional[float] = None  # None until submitted (Thunes confirm)
+    extra: dict[str, Any] = field(default_factory=dict)
+
+    def state(self, now: Optional[float] = None) -> str:
+        if self.settle_at is None:
+            return CREATED
+        if (now if now is not None else time.time()) < self.settle_at:
+            return PENDING
+        return self.outcome
+
+
+class Simulator:
+    """
+    State and fault injection behind the simulated provider APIs: per-request
+    latency, error/throttle rates and outage bursts; cash-outs that settle
+    after a sampled delay; and signed webhook callbacks when they do. All
+    in memory, for one event loop.
+    """
+
+    def __init__(
+        self,
+        cfg: SimulatorSettings,
+        *,
+        webhook_bodies: Optional[dict[str, Callable[[Transfer], dict]]] = None,
+    ):
+        self.cfg = cfg
+        self.rng = random.Random(cfg.SIM_SEED)
+        self.webhook_bodies = webhook_bodies or {}
+        self.stats: Counter[tuple[str, str]] = Counter()
+        self._latency = Lognormal.from_ms(cfg.SIM_LATENCY_MEDIAN_MS, cfg.SIM_LATENCY_P99_MS)
+        self._latency_by_provider = parse_latencies(cfg.SIM_LATENCY_BY_PROVIDER)
+        self._error_rates = parse_rates(cfg.SIM_ERROR_RATE_BY_PROVIDER)
+        self._settle = Lognormal.from_ms(cfg.SIM_SETTLE_MEDIAN_MS, cfg.SIM_SETTLE_P99_MS)
+        self._bursts: dict[str, tuple[float, int]] = {}  # provider -> (until, status)
+        self._started = time.monotonic()
+        self._transfers: OrderedDict[tuple[str, str], Transfer] = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    # --- faults ---
+
+    async def delay(self, provider: str) -> None:
+        seconds = self._latency_by_provider.get(provider, self._latency).sample(self.rng)
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    def fault(self, provider: str) -> Optional[int]:
+        """
+        HTTP status to fail this request with, or None to serve it.
+        """
+        self.stats[(provider, "requests")] += 1
+        status = self._burst_status(provider)
+        if status is None:
+            roll = self.rng.random()
+            if roll < self.cfg.SIM_THROTTLE_RATE:
+                status = 429
+            elif roll < self.cfg.SIM_THROTTLE_RATE + self._error_rates.get(provider, self.cfg.SIM_ERROR_RATE):
+                status = 500
+        if status is not None:
+            self.stats[(provider, f"http_{status}")] += 1
+        return status
+
+    def start_burst(self, provider: str, *, seconds: float, status: int) -> None:
+        self._bursts[provider] = (time.monotonic() + max(0.0, seconds), status)
+
+    def _burst_status(self, provider: str) -> Optional[int]:
+        now = time.monotonic()
+        until, status = self._bursts.get(provider, (0.0, 0))
+        if now < until:
+            return status
+        every = self.cfg.SIM_BURST_EVERY_S
+        if every > 0:
+            # providers take turns: each one's burst is offset by a share of the period
+            offset = every * (PROVIDERS.index(provider) if provider in PROVIDERS else 0) / len(PROVIDERS)
+            if (now - self._started - offset) % every < self.cfg.SIM_BURST_DURATION_S:
+                return self.cfg.SIM_BURST_STATUS
+        return None
+
+    # --- cash-outs ---
+
+    def create(self, provider: str, ref: str, *, external_id: str, amount: Any, currency: str, msisdn: str) -> Transfer:
+        key = (provider, ref)
+        existing = self._transfers.get(key)
+        if existing is not None:
+            return existing
+        outcome = FAILED if self.rng.random() < self.cfg.SIM_FAILURE_RATE else SUCCESS
+        t = Transfer(provider, ref, external_id, amount, currency, msisdn, outcome)
+        self._transfers[key] = t
+        while len(self._transfers) > self.cfg.SIM_MAX_TRANSFERS:
+            self._transfers.popitem(last=False)
+        self.stats[(provider, "created")] += 1
+        return t
+
+    def get(self, provider: str, ref: str) -> Optional[Transfer]:
+        return self._transfers.get((provider, ref))
+
+    def submit(self, t: Transfer) -> None:
+        """
+        Starts the settlement clock (and schedules the webhook); no-op if already running.
+        """
+        if t.settle_at is not None:
+            return
+        t.settle_at = time.time() + self._settle.sample(self.rng)
+        if self.cfg.SIM_WEBHOOK_BASE_URL and self.rng.random() < self.cfg.SIM_WEBHOOK_RATE:
+            copies = 2 if self.rng.random() < self.cfg.SIM_WEBHOOK_DUPLICATE_RATE else 1
+            task = asyncio.get_running_loop().create_task(self._callback(t, copies))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def reset(self) -> None:
+        self._transfers.clear()
+        self._bursts.clear()
+        self.stats.clear()
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        out: dict[str, dict[str, int]] = {}
+        for (provider, name), n in sorted(self.stats.items()):
+            out.setdefault(provider, {})[name] = n
+        for t in self._transfers.values():
+            counts = out.setdefault(t.provider, {})
+            key = f"state_{t.state().lower()}"
+            counts[key] = counts.get(key, 0) + 1
+        return out
+
+    async def aclose(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # --- webhooks ---
+
+    async def _callback(self, t: Transfer, copies: int) -> None:
+        await asyncio.sleep(max(0.0, (t.settle_at or 0.0) - time.time()))
+        body_fn = self.webhook_bodies.get(t.provider)
+        if body_fn is None:
+            return
+        raw = json.dumps(body_fn(t), separators=(",", ":")).encode("utf-8")
+        for _ in range(copies):
+            await self._deliver(t.provider, raw)
+
+    async def _deliver(self, provider: str, raw: bytes) -> None:
+        url = f"{self.cfg.SIM_WEBHOOK_BASE_URL.rstrip('/')}/v1/webhooks/{provider.lower()}"
+        headers = {"Content-Type": "application/json"}
+        secret = getattr(self.cfg, f"{provider}_WEBHOOK_SECRET", "")
+        if secret:
+            headers["X-Signature"] = "sha256=" + hmac.new(secret.encode("utf-8"), raw, hashlib.sha256).hexdigest()
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.cfg.SIM_WEBHOOK_TIMEOUT_S)
+        backoff = 1.0
+        for attempt in range(self.cfg.SIM_WEBHOOK_RETRIES + 1):
+            try:
+                resp = await self._client.post(url, content=raw, headers=headers)
+                if resp.status_code < 300:
+                    self.stats[(provider, "webhooks_delivered")] += 1
+                    return
+                error = f"HTTP {resp.status_code}"
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+            if attempt < self.cfg.SIM_WEBHOOK_RETRIES:
+                await asyncio.sleep(backoff)
+                backoff *= 2
+        self.stats[(provider, "webhooks_failed")] += 1
+        logger.warning("simulator_webhook_failed provider=%s url=%s error=%s", provider, url, error)
@@ -0,0 +1,355 @@
+# app/simulator/main.py
+"""
+Local provider simulator: TMoney, Flooz, MoMo (disbursement) and Thunes (Money
+Transfer API v2) cash-out and status APIs in one ASGI app, with configurable
+latency, errors, 429/5xx bursts and webhook callbacks (app/simulator/config.py).
+The worker, webhook ingestion and reconcile run against it unchanged:
+
+  python -m uvicorn app.simulator.main:app --port 8090
+
+  TMONEY_CASHOUT_URL=http://127.0.0.1:8090/tmoney/cashout
+  TMONEY_STATUS_URL_TEMPLATE=http://127.0.0.1:8090/tmoney/status/{provider_ref}
+  FLOOZ_CASHOUT_URL / FLOOZ_STATUS_URL_TEMPLATE   (same, under /flooz)
+  MOMO_BASE_URL=http://127.0.0.1:8090/momo
+  THUNES_SANDBOX_API_ENDPOINT=http://127.0.0.1:8090/thunes
+  SIM_WEBHOOK_BASE_URL=http://127.0.0.1:8001
+
+Credentials are not checked. GET /sim/stats reports per-provider counters,
+POST /sim/burst/{provider} starts an outage burst and POST /sim/reset forgets
+everything.
+"""
+from __future__ import annotations
+
+import itertools
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from app.simulator.config import PROVIDERS, SimulatorSettings
+from app.simulator.engine import CREATED, FAILED, PENDING, SUCCESS, Simulator, Transfer
+
+# Each API's words for the neutral states
+_WORDS = {
+    "TMONEY": {CREATED: "PENDING", PENDING: "PENDING", SUCCESS: "SUCCESS", FAILED: "FAILED"},
+    "FLOOZ": {CREATED: "PENDING", PENDING: "PENDING", SUCCESS: "SUCCESS", FAILED: "FAILED"},
+    "MOMO": {CREATED: "PENDING", PENDING: "PENDING", SUCCESS: "SUCCESSFUL", FAILED: "FAILED"},
+    "THUNES": {CREATED: "CREATED", PENDING: "SUBMITTED", SUCCESS: "COMPLETED", FAILED: "DECLINED"},
+}
+
+
+def _word(t: Transfer) -> str:
+    return _WORDS[t.provider][t.state()]
+
+
+async def _json(req: Request) -> dict[str, Any]:
+    try:
+        payload = await req.json()
+    except Exception:
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+# --- wallet-style APIs (TMoney, Flooz): the shapes routes/mock_tmoney.py answers with ---
+
+
+def _wallet_router(sim: Simulator, provider: str) -> APIRouter:
+    router = APIRouter(prefix=f"/{provider.lower()}", tags=[f"sim-{provider.lower()}"])
+
+    @router.post("/cashout")
+    async def cashout(req: Request):
+        if (failed := await _gate(sim, provider)) is not None:
+            return failed
+        body = await _json(req)
+        ref = str(body.get("external_id") or "").strip()
+        try:
+            amount_cents = int(body.get("amount_cents") or 0)
+        except (TypeError, ValueError):
+            amount_cents = 0
+        if not ref or not body.get("msisdn") or not body.get("currency") or amount_cents <= 0:
+            return JSONResponse(
+                status_code=400,
+                content={"error": "INVALID_REQUEST", "message": "external_id, msisdn, currency and amount_cents are required"},
+            )
+        t = sim.create(
+            provider,
+            ref,
+            external_id=ref,
+            amount=amount_cents,
+            currency=str(body["currency"]),
+            msisdn=str(body["msisdn"]),
+        )
+        sim.submit(t)
+        return JSONResponse(status_code=202, content={"status": "ACCEPTED", "provider_ref": t.ref, "provider_tx_id": t.ref})
+
+    @router.get("/status/{provider_ref}")
+    async def status(provider_ref: str):
+        if (failed := await _gate(sim, provider)) is not None:
+            return failed
+        t = sim.get(provider, provider_ref)
+        if t is None:
+            return JSONResponse(status_code=404, content={"error": "NOT_FOUND", "provider_ref": provider_ref})
+        return {"status": _word(t), "provider_ref": t.ref, "amount_cents": t.amount, "currency": t.currency}
+
+    return router
+
+
+def _wallet_webhook(t: Transfer) -> dict:
+    return {
+        "event_type": "cashout.status",
+        "provider_ref": t.ref,
+        "status": _word(t),
+        "amount_cents": t.amount,
+        "currency": t.currency,
+    }
+
+
+# --- MTN MoMo disbursement ---
+
+
+def _momo_router(sim: Simulator) -> APIRouter:
+    router = APIRouter(prefix="/momo/disbursement", tags=["sim-momo"])
+
+    @router.post("/token/")
+    async def token():
+        if (failed := await _gate(sim, "MOMO")) is not None:
+            return failed
+        sim.stats[("MOMO", "tokens")] += 1
+        return {"access_token": f"sim-{uuid.uuid4().hex}", "token_type": "access_token", "expires_in": 3600}
+
+    @router.post("/v1_0/transfer")
+    async def transfer(req: Request):
+        if (failed := await _gate(sim, "MOMO")) is not None:
+            return failed
+        ref = (req.headers.get("X-Reference-Id") or "").strip()
+        body = await _json(req)
+        payee = body.get("payee") if isinstance(body.get("payee"), dict) else {}
+        if not ref or not payee.get("partyId") or not body.get("amount") or not body.get("currency"):
+            return JSONResponse(
+                status_code=400,
+                content={"code": "INVALID_REQUEST", "message": "X-Reference-Id, amount, currency and payee are required"},
+            )
+        if sim.get("MOMO", ref) is not None:
+            return JSONResponse(status_code=409, content={"code": "RESOURCE_ALREADY_EXIST", "message": "Duplicated reference id"})
+        t = sim.create(
+            "MOMO",
+            ref,
+            external_id=str(body.get("externalId") or ""),
+            amount=str(body["amount"]),
+            currency=str(body["currency"]),
+            msisdn=str(payee["partyId"]),
+        )
+        t.extra["financialTransactionId"] = str(next(_momo_ids))
+        sim.submit(t)
+        return Response(status_code=202)
+
+    @router.get("/v1_0/transfer/{reference_id}")
+    async def transfer_status(reference_id: str):
+        if (failed := await _gate(sim, "MOMO")) is not None:
+            return failed
+        t = sim.get("MOMO", reference_id)
+        if t is None:
+            return JSONResponse(status_code=404, content={"code": "RESOURCE_NOT_FOUND", "message": "Requested resource was not found."})
+        return _momo_body(t)
+
+    return router
+
+
+_momo_ids = itertools.count(10_000_000)
+
+
+def _momo_body(t: Transfer) -> dict:
+    body = {
+        "amount": t.amount,
+        "currency": t.currency,
+        "financialTransactionId": t.extra.get("financialTransactionId"),
+        "externalId": t.external_id,
+        "payee": {"partyIdType": "MSISDN", "partyId": t.msisdn},
+        "status": _word(t),
+    }
+    if t.state() == FAILED:
+        body["reason"] = "PAYEE_NOT_FOUND"
+    return body
+
+
+def _momo_webhook(t: Transfer) -> dict:
+    # MTN's callback carries externalId but not the X-Reference-Id; provider_ref is
+    # added so webhook ingestion can match it like the other providers
+    return {**_momo_body(t), "provider_ref": t.ref}
+
+
+# --- Thunes Money Transfer API v2 ---
+
+
+def _thunes_router(sim: Simulator) -> APIRouter:
+    router = APIRouter(prefix="/thunes/v2/money-transfer", tags=["sim-thunes"])
+    ids = itertools.count(1)
+    quotations: dict[str, dict[str, Any]] = {}
+
+    def error(status: int, code: str, message: str) -> JSONResponse:
+        return JSONResponse(status_code=status, content={"errors": [{"code": code, "message": message}]})
+
+    @router.post("/quotations")
+    async def create_quotation(req: Request):
+        if (failed := await _gate(sim, "THUNES")) is not None:
+            return failed
+        body = await _json(req)
+        source = body.get("source") if isinstance(body.get("source"), dict) else {}
+        destination = body.get("destination") if isinstance(body.get("destination"), dict) else {}
+        if not body.get("payer_id") or not (source.get("amount") or destination.get("amount")):
+            return error(400, "INVALID_REQUEST", "payer_id and a source or destination amount are required")
+        now = time.time()
+        quotation = {
+            "id": next(ids),
+            "external_id": body.get("external_id"),
+            "payer": {"id": int(body["payer_id"])},
+            "mode": body.get("mode"),
+            "transaction_type": body.get("transaction_type"),
+            "source": source,
+            "destination": destination,
+            "creation_date": _iso(now),
+            "expiration_date": _iso(now + sim.cfg.SIM_THUNES_QUOTE_TTL_S),
+        }
+        while len(quotations) >= sim.cfg.SIM_MAX_TRANSFERS:
+            quotations.pop(next(iter(quotations)))
+        quotations[str(quotation["id"])] = {"quotation": quotation, "expires_at": now + sim.cfg.SIM_THUNES_QUOTE_TTL_S, "used": 0}
+        sim.stats[("THUNES", "quotations")] += 1
+        return JSONResponse(status_code=201, content=quotation)
+
+    @router.post("/quotations/{quotation_id}/transactions")
+    async def create_transaction(quotation_id: str, req: Request):
+        if (failed := await _gate(sim, "THUNES")) is not None:
+            return failed
+        q = quotations.get(quotation_id)
+        if q is None:
+            return error(404, "QUOTATION_NOT_FOUND", "Quotation not found")
+        if time.time() >= q["expires_at"]:
+            return error(400, "QUOTATION_EXPIRED", "Quotation has expired")
+        if q["used"] and sim.cfg.SIM_THUNES_QUOTE_SINGLE_USE:
+            return error(400, "QUOTATION_ALREADY_USED", "Quotation already used")
+        body = await _json(req)
+        party = body.get("credit_party_identifier") if isinstance(body.get("credit_party_identifier"), dict) else {}
+        if not party.get("msisdn"):
+            return error(400, "INVALID_REQUEST", "credit_party_identifier.msisdn is required")
+        q["used"] += 1
+        destination = q["quotation"]["destination"]
+        tx_id = next(ids)
+        t = sim.create(
+            "THUNES",
+            str(tx_id),
+            external_id=str(body.get("external_id") or q["quotation"].get("external_id") or ""),
+            amount=destination.get("amount"),
+            currency=str(destination.get("currency") or ""),
+            msisdn=str(party["msisdn"]),
+        )
+        t.extra["quotation_id"] = q["quotation"]["id"]
+        return JSONResponse(status_code=201, content=_thunes_body(t))
+
+    @router.post("/transactions/{transaction_id}/confirm")
+    async def confirm(transaction_id: str):
+        if (failed := await _gate(sim, "THUNES")) is not None:
+            return failed
+        t = sim.get("THUNES", transaction_id)
+        if t is None:
+            return error(404, "TRANSACTION_NOT_FOUND", "Transaction not found")
+        sim.submit(t)
+        return _thunes_body(t)
+
+    @router.get("/transactions/{transaction_id}")
+    async def transaction(transaction_id: str):
+        if (failed := await _gate(sim, "THUNES")) is not None:
+            return failed
+        t = sim.get("THUNES", transaction_id)
+        if t is None:
+            return error(404, "TRANSACTION_NOT_FOUND", "Transaction not found")
+        return _thunes_body(t)
+
+    return router
+
+
+def _thunes_body(t: Transfer) -> dict:
+    word = _word(t)
+    return {
+        "id": int(t.ref),
+        "external_id": t.external_id,
+        "status": word,
+        "status_message": word,
+        "quotation_id": t.extra.get("quotation_id"),
+        "credit_party_identifier": {"msisdn": t.msisdn},
+        "destination": {"amount": t.amount, "currency": t.currency},
+        "creation_date": _iso(t.created_at),
+    }
+
+
+# --- app ---
+
+
+async def _gate(sim: Simulator, provider: str) -> Optional[JSONResponse]:
+    # every simulated call: sampled latency, then maybe an injected failure
+    await sim.delay(provider)
+    status = sim.fault(provider)
+    if status is None:
+        return None
+    headers = {"Retry-After": "1"} if status == 429 else None
+    return JSONResponse(status_code=status, content={"error": "SIMULATED_FAILURE", "http_status": status}, headers=headers)
+
+
+def create_app(cfg: Optional[SimulatorSettings] = None) -> FastAPI:
+    sim = Simulator(
+        cfg or SimulatorSettings(),
+        webhook_bodies={
+            "TMONEY": _wallet_webhook,
+            "FLOOZ": _wallet_webhook,
+            "MOMO": _momo_webhook,
+            "THUNES": _thunes_body,
+        },
+    )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        await sim.aclose()
+
+    app = FastAPI(title="NepXy provider simulator", version="1.0.0", lifespan=lifespan)
+    app.state.simulator = sim
+
+    app.include_router(_wallet_router(sim, "TMONEY"))
+    app.include_router(_wallet_router(sim, "FLOOZ"))
+    app.include_router(_momo_router(sim))
+    app.include_router(_thunes_router(sim))
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"ok": True}
+
+    @app.get("/sim/stats")
+    async def stats():
+        return sim.snapshot()
+
+    @app.post("/sim/burst/{provider}")
+    async def burst(provider: str, seconds: Optional[float] = None, status: Optional[int] = None):
+        name = provider.strip().upper()
+        if name not in PROVIDERS:
+            return JSONResponse(status_code=404, content={"error": "UNKNOWN_PROVIDER", "providers": list(PROVIDERS)})
+        seconds = sim.cfg.SIM_BURST_DURATION_S if seconds is None else seconds
+        status = sim.cfg.SIM_BURST_STATUS if status is None else status
+        sim.start_burst(name, seconds=seconds, status=status)
+        return {"provider": name, "seconds": seconds, "status": status}
+
+    @app.post("/sim/reset")
+    async def reset():
+        sim.reset()
+        return {"ok": True}
+
+    return app
+
+
+app = create_app()
@@ -5,10 +5,45 @@
 from __future__ import annotations
 
 from typing import Any
+from psycopg.types.json import Jsonb
 from psycopg2.extensions import connection as PGConn
 from psycopg2.extras import Json
 
 
+_INSERT_WEBHOOK_EVENT_SQL = """
+INSERT INTO webhook_events (
+  provider, path,
+  signature, signature_valid, signature_error,
+  headers, body, body_raw,
+  provider_ref, external_ref, status_raw,
+  payout_transaction_id,
+  payout_status_before, payout_status_after,
+  update_applied,
+  ignored, ignore_reason
+)
+VALUES (
+  %(provider)s, %(path)s,
+  %(signature)s, %(signature_valid)s, %(signature_error)s,
+  %(headers)s, %(body)s, %(body_raw)s,
+  %(provider_ref)s, %(external_ref)s, %(status_raw)s,
+  %(payout_transaction_id)s,
+  %(payout_status_before)s, %(payout_status_after)s,
+  %(update_applied)s,
+  %(ignored)s, %(ignore_reason)s
+)
+RETURNING id
+"""
+
+
+def _webhook_event_params(json_adapter, *, headers: dict[str, Any] | None, body: dict[str, Any] | None, **fields: Any) -> dict[str, Any]:
+    # json_adapter is psycopg2's Json or psycopg 3's Jsonb, per driver.
+    return {
+        **fields,
+        "headers": json_adapter(headers or {}),
+        "body": json_adapter(body) if body is not None else None,
+    }
+
+
 def insert_webhook_event(
     conn: PGConn,
     *,
@@ -34,117 +69,83 @@ def insert_webhook_event(
     Insert a webhook event for audit/debugging.
     NOTE: caller commits.
     """
-    h = headers or {}
-
-    sql = """
-    INSERT INTO webhook_events (
-      provider, path,
-      signature, signature_valid, signature_error,
-      headers, body, body_raw,
-      provider_ref, external_ref, status_raw,
-      payout_transaction_id,
-      payout_status_before, payout_status_after,
-      update_applied,
-      ignored, ignore_reason
+    params = _webhook_event_params(
+        Json,
+        headers=headers,
+        body=body,
+        provider=provider,
+        path=path,
+        signature=signature,
+        signature_valid=signature_valid,
+        signature_error=signature_error,
+        body_raw=body_raw,
+        provider_ref=provider_ref,
+        external_ref=external_ref,
+        status_raw=status_raw,
+        payout_transaction_id=payout_transaction_id,
+        payout_status_before=payout_status_before,
+        payout_status_after=payout_status_after,
+        update_applied=update_applied,
+        ignored=ignored,
+        ignore_reason=ignore_reason,
     )
-    VALUES (
-      %(provider)s, %(path)s,
-      %(signature)s, %(signature_valid)s, %(signature_error)s,
-      %(headers)s, %(body)s, %(body_raw)s,
-      %(provider_ref)s, %(external_ref)s, %(status_raw)s,
-      %(payout_transaction_id)s,
-      %(payout_status_before)s, %(payout_status_after)s,
-      %(update_applied)s,
-      %(ignored)s, %(ignore_reason)s
-    )
-    RETURNING id
-    """
-
-    params = {
-        "provider": provider,
-        "path": path,
-        "signature": signature,
-        "signature_valid": signature_valid,
-        "signature_error": signature_error,
-        "headers": Json(h),
-        "body": Json(body) if body is not None else None,
-        "body_raw": body_raw,
-        "provider_ref": provider_ref,
-        "external_ref": external_ref,
-        "status_raw": status_raw,
-        "payout_transaction_id": payout_transaction_id,
-        "payout_status_before": payout_status_before,
-        "payout_status_after": payout_status_after,
-        "update_applied": update_applied,
-        "ignored": ignored,
-        "ignore_reason": ignore_reason,
-    }
 
     with conn.cursor() as cur:
-        cur.execute(sql, params)
+        cur.execute(_INSERT_WEBHOOK_EVENT_SQL, params)
         row = cur.fetchone()
         assert row and row[0], "insert_webhook_event: missing id"
         return str(row[0])
 
 
-
-def insert_webhook_event(conn: PGConn, *, provider: str, path: str, headers: dict[str, Any] | None = None,
-                         body: dict[str, Any] | None = None, body_raw: str | None = None,
-                         signature: str | None = None, signature_valid: bool | None = None,
-                         signature_error: str | None = None, provider_ref: str | None = None,
-                         external_ref: str | None = None, status_raw: str | None = None,
-                         payout_transaction_id: str | None = None, payout_status_before: str | None = None,
-                         payout_status_after: str | None = None, update_applied: bool | None = None,
-                         ignored: bool | None = None, ignore_reason: str | None = None) -> str:
-    h = headers or {}
-
-    sql = """
-    INSERT INTO webhook_events (
-      provider, path,
-      signature, signature_valid, signature_error,
-      headers, body, body_raw,
-      provider_ref, external_ref, status_raw,
-      payout_transaction_id,
-      payout_status_before, payout_status_after,
-      update_applied,
-      ignored, ignore_reason
-    )
-    VALUES (
-      %(provider)s, %(path)s,
-      %(signature)s, %(signature_valid)s, %(signature_error)s,
-      %(headers)s, %(body)s, %(body_raw)s,
-      %(provider_ref)s, %(external_ref)s, %(status_raw)s,
-      %(payout_transaction_id)s,
-      %(payout_status_before)s, %(payout_status_after)s,
-      %(update_applied)s,
-      %(ignored)s, %(ignore_reason)s
-    )
-    RETURNING id
+async def insert_webhook_event_async(
+    conn,
+    *,
+    provider: str,
+    path: str,
+    headers: dict[str, Any] | None = None,
+    body: dict[str, Any] | None = None,
+    body_raw: str | None = None,
+    signature: str | None = None,
+    signature_valid: bool | None = None,
+    signature_error: str | None = None,
+    provider_ref: str | None = None,
+    external_ref: str | None = None,
+    status_raw: str | None = None,
+    payout_transaction_id: str | None = None,
+    payout_status_before: str | None = None,
+    payout_status_after: str | None = None,
+    update_applied: bool | None = None,
+    ignored: bool | None = None,
+    ignore_reason: str | None = None,
+) -> str:
     """
+    Async variant of insert_webhook_event for db_async connections.
+    NOTE: caller commits.
+    """
+    params = _webhook_event_params(
+        Jsonb,
+        headers=headers,
+        body=body,
+        provider=provider,
+        path=path,
+        signature=signature,
+        signature_valid=signature_valid,
+        signature_error=signature_error,
+        body_raw=body_raw,
+        provider_ref=provider_ref,
+        external_ref=external_ref,
+        status_raw=status_raw,
+        payout_transaction_id=payout_transaction_id,
+        payout_status_before=payout_status_before,
+        payout_status_after=payout_status_after,
+        update_applied=update_applied,
+        ignored=ignored,
+        ignore_reason=ignore_reason,
+    )
 
-    params = {
-        "provider": provider,
-        "path": path,
-        "signature": signature,
-        "signature_valid": signature_valid,
-        "signature_error": signature_error,
-        "headers": Json(h),
-        "body": Json(body) if body is not None else None,
-        "body_raw": body_raw,
-        "provider_ref": provider_ref,
-        "external_ref": external_ref,
-        "status_raw": status_raw,
-        "payout_transaction_id": payout_transaction_id,
-        "payout_status_before": payout_status_before,
-        "payout_status_after": payout_status_after,
-        "update_applied": update_applied,
-        "ignored": ignored,
-        "ignore_reason": ignore_reason,
-    }
-
-    with conn.cursor() as cur:
-        cur.execute(sql, params)
-        row = cur.fetchone()
+    async with conn.cursor() as cur:
+        await cur.execute(_INSERT_WEBHOOK_EVENT_SQL, params)
+        row = await cur.fetchone()
         assert row and row[0], "insert_webhook_event: missing id"
         return str(row[0])
 
@@ -0,0 +1,277 @@
+# app/workers/circuit_breaker.py
+from __future__ import annotations
+
+import functools
+import inspect
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+from services.metrics import increment_circuit_transition, observe_payout_provider_call, set_circuit_state
+from settings import settings
+
+logger = logging.getLogger("nexapay")
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+# /metrics: payout_circuit_state{provider} uses these values
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Per-provider breaker for the payout worker.
+
+      closed    -> open       once the last `window_size` calls (at least
+                              `min_calls` of them) have a failure rate
+                              >= failure_rate or a slow-call rate >= slow_rate
+      open      -> half_open  after the open period; each re-open doubles it,
+                              up to open_max_s
+      half_open -> closed     after `half_open_probes` successful probe calls
+      half_open -> open       on any failed or slow probe
+
+    Callers ask allow() before a provider call and report it with record().
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        window_size: int = 20,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_s: float = 10.0,
+        slow_rate: float = 0.8,
+        open_s: float = 30.0,
+        open_max_s: float = 600.0,
+        half_open_probes: int = 2,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.window_size = max(1, int(window_size))
+        self.min_calls = max(1, int(min_calls))
+        self.failure_rate = float(failure_rate)
+        self.slow_call_s = float(slow_call_s)
+        self.slow_rate = float(slow_rate)
+        self.open_s = max(0.0, float(open_s))
+        self.open_max_s = max(self.open_s, float(open_max_s))
+        self.half_open_probes = max(1, int(half_open_probes))
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._calls: deque[tuple[bool, bool]] = deque(maxlen=self.window_size)  # (failed, slow)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._open_for = self.open_s
+        self._half_open_at = 0.0
+        self._probes_started = 0
+        self._probes_ok = 0
+        set_circuit_state(name, STATE_VALUES[CLOSED])
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open(self._clock())
+            return self._state
+
+    def allow(self) -> bool:
+        now = self._clock()
+        with self._lock:
+            self._maybe_half_open(now)
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                return False
+            # Probes whose result never came back (e.g. answered from a cache)
+            # must not wedge the breaker: start a new probe round.
+            if now - self._half_open_at >= max(self.open_s, 1.0):
+                self._half_open_at = now
+                self._probes_started = self._probes_ok
+            if self._probes_started >= self.half_open_probes:
+                return False
+            self._probes_started += 1
+            return True
+
+    def record(self, *, failed: bool, elapsed_s: float) -> None:
+        slow = elapsed_s >= self.slow_call_s
+        now = self._clock()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if failed or slow:
+                    self._open(now, backoff=True)
+                    return
+                self._probes_ok += 1
+                if self._probes_ok >= self.half_open_probes:
+                    self._calls.clear()
+                    self._open_for = self.open_s
+                    self._transition(CLOSED)
+                return
+
+            if self._state == OPEN:
+                return  # a call that was already in flight when we opened
+
+            self._calls.append((failed, slow))
+            n = len(self._calls)
+            if n < self.min_calls:
+                return
+            failures = sum(1 for f, _ in self._calls if f)
+            slows = sum(1 for _, s in self._calls if s)
+            if failures / n >= self.failure_rate or slows / n >= self.slow_rate:
+                self._open(now, backoff=False)
+
+    def retry_after(self) -> float:
+        """
+        Seconds until the breaker lets probes through (0 when not open).
+        """
+        now = self._clock()
+        with self._lock:
+            self._maybe_half_open(now)
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self._open_for - now)
+
+    # --- internals (lock held) ---
+
+    def _maybe_half_open(self, now: float) -> None:
+        if self._state == OPEN and now >= self._opened_at + self._open_for:
+            self._half_open_at = now
+            self._probes_started = 0
+            self._probes_ok = 0
+            self._transition(HALF_OPEN)
+
+    def _open(self, now: float, *, backoff: bool) -> None:
+        if backoff:
+            self._open_for = min(self.open_max_s, max(self.open_s, self._open_for * 2))
+        self._opened_at = now
+        self._calls.clear()
+        self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+        logger.warning(
+            "circuit_state provider=%s from=%s to=%s open_for_s=%.0f",
+            self.name,
+            self._state,
+            state,
+            self._open_for,
+        )
+        self._state = state
+        set_circuit_state(self.name, STATE_VALUES[state])
+        increment_circuit_transition(self.name, state)
+
+
+def jittered_delay(base_s: float, *, floor_s: float = 1.0) -> float:
+    """
+    Reschedule delay for a payout skipped by an open breaker: somewhere in
+    [base, 2*base) so the backlog doesn't return as a single wave.
+    """
+    base = max(floor_s, float(base_s))
+    return base + random.uniform(0.0, base)
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    breaker = _breakers.get(provider)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(provider)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    provider,
+                    window_size=settings.CIRCUIT_WINDOW_SIZE,
+                    min_calls=settings.CIRCUIT_MIN_CALLS,
+                    failure_rate=settings.CIRCUIT_FAILURE_RATE,
+                    slow_call_s=settings.CIRCUIT_SLOW_CALL_S,
+                    slow_rate=settings.CIRCUIT_SLOW_CALL_RATE,
+                    open_s=settings.CIRCUIT_OPEN_S,
+                    open_max_s=settings.CIRCUIT_OPEN_MAX_S,
+                    half_open_probes=settings.CIRCUIT_HALF_OPEN_PROBES,
+                )
+                _breakers[provider] = breaker
+    return breaker
+
+
+def reset_breakers() -> None:
+    with _breakers_lock:
+        _breakers.clear()
+
+
+# Provider adapter methods GuardedProvider times, by metrics op label
+_PROVIDER_CALLS = {
+    "send_cashout": "send",
+    "create_transfer": "send",
+    "get_cashout_status": "poll",
+    "get_cashout_statuses": "poll_bulk",
+}
+
+
+class GuardedProvider:
+    """
+    Provider adapter proxy for the payout worker: times each provider call
+    (payout_provider_call_duration_seconds) and, with a breaker, reports its
+    outcome and latency to it. Other attributes pass through, and methods the
+    adapter lacks stay missing (StatusPoller probes for get_cashout_statuses).
+    Async adapters are guarded the same way, including the .aio adapter behind
+    a SyncProvider.
+    """
+
+    def __init__(
+        self,
+        provider: Any,
+        *,
+        name: str,
+        breaker: Optional[CircuitBreaker] = None,
+        is_failure: Callable[[Any], bool] = lambda res: False,
+    ):
+        self._provider = provider
+        self._name = name
+        self._breaker = breaker
+        self._is_failure = is_failure
+
+    def _call(self, method: str, op: str, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            res = getattr(self._provider, method)(*args, **kwargs)
+        except Exception:
+            self._record(op, failed=True, elapsed_s=time.perf_counter() - started)
+            raise
+        # a bulk listing has no single verdict; only exceptions count against it
+        failed = op != "poll_bulk" and self._is_failure(res)
+        self._record(op, failed=failed, elapsed_s=time.perf_counter() - started)
+        return res
+
+    async def _acall(self, method: str, op: str, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            res = await getattr(self._provider, method)(*args, **kwargs)
+        except Exception:
+            self._record(op, failed=True, elapsed_s=time.perf_counter() - started)
+            raise
+        failed = op != "poll_bulk" and self._is_failure(res)
+        self._record(op, failed=failed, elapsed_s=time.perf_counter() - started)
+        return res
+
+    def _record(self, op: str, *, failed: bool, elapsed_s: float) -> None:
+        observe_payout_provider_call(self._name, op, elapsed_s)
+        if self._breaker is not None:
+            self._breaker.record(failed=failed, elapsed_s=elapsed_s)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._provider, name)
+        if name == "aio":
+            return GuardedProvider(attr, name=self._name, breaker=self._breaker, is_failure=self._is_failure)
+        op = _PROVIDER_CALLS.get(name)
+        if op is None or not callable(attr):
+            return attr
+        if inspect.iscoroutinefunction(attr):
+            return functools.partial(self._acall, name, op)
+        return functools.partial(self._call, name, op)
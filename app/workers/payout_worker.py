@@ -3,23 +3,55 @@
 # app/workers/payout_worker.py
 from __future__ import annotations
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from types import SimpleNamespace
-from typing import Any, Optional
+from typing import Any, Callable, Optional, Sequence
+import asyncio
+import math
+import os
+import select
+import socket
+import threading
 import time
 import uuid
 
 import logging
 
+import psycopg2
+
 from db import get_conn
+from db_pool import session_connect_kwargs
+from logging_setup import configure_logging
+from app.payouts.model import StatusUpdate
+from app.payouts.status_poller import get_status_poller
+from app.workers.circuit_breaker import OPEN, GuardedProvider, get_breaker, jittered_delay
+from app.workers.worker_registry import WorkerRegistry
 from app.payouts.repository import (
-    update_status,
+    PAYOUT_READY_CHANNEL,
+    update_status_many,
     claim_pending_payouts,
+    claim_pending_payouts_fair,
     claim_stale_sent_payouts,
+    payout_queue_stats,
+    renew_leases,
+    seconds_until_next_payout_due,
 )
 from app.providers.base import ProviderResult
 from app.providers.mobile_money.factory import get_provider
-from services.metrics import increment_payout_attempt
+from app.providers.mobile_money.http import close_transport, run_sync
+from services.metrics import (
+    increment_circuit_short_circuit,
+    increment_payout_attempt,
+    observe_payout_batch,
+    observe_payout_claim,
+    observe_payout_time_to_confirm,
+    render_prometheus,
+    set_payout_queue,
+)
+from settings import settings
 
 SUPPORTED_PROVIDERS = {"TMONEY", "FLOOZ", "MTN", "MTN_MOMO", "MOMO", "THUNES"}
 
@@ -33,6 +65,10 @@ DEFAULT_STALE_SECONDS = 60
 POLL_BACKOFF_SECONDS = 60
 
 MAX_ATTEMPTS_ERROR = "MAX_ATTEMPTS_EXCEEDED"
+CIRCUIT_OPEN_ERROR = "CIRCUIT_OPEN"
+
+# Aliases share the upstream's concurrency cap (WORKER_MAX_IN_FLIGHT_<group>)
+PROVIDER_CAP_GROUPS = {"MTN": "MOMO", "MTN_MOMO": "MOMO"}
 
 
 def _now() -> datetime:
@@ -107,38 +143,490 @@ class MockProvider:
         return SimpleNamespace(ok=False, provider_tx_id=None, response={"http_status": 504}, error="Gateway timeout")
 
 
-def process_once(*, batch_size: int = 50, stale_seconds: int = DEFAULT_STALE_SECONDS) -> int:
-    processed = 0
-    with get_conn() as conn:
-        pending = claim_pending_payouts(conn, batch_size=batch_size)
-        stale_sent = claim_stale_sent_payouts(conn, batch_size=batch_size, stale_after_seconds=stale_seconds)
+def _cap_group(p: dict) -> str:
+    name = (p.get("provider") or "").strip().upper()
+    return PROVIDER_CAP_GROUPS.get(name, name)
 
-        print(f"[worker] found_pending={len(pending)} found_stale_sent={len(stale_sent)}")
 
-        # process each payout independently so one bad row doesn't kill the whole batch
-        for p in pending:
-            try:
-                processed += 1
-                _handle_pending(conn, p)
-            except Exception as e:
-                _mark_internal_error(conn, p, e, from_status="PENDING")
+def _max_in_flight(group: str) -> int:
+    cap = getattr(settings, f"WORKER_MAX_IN_FLIGHT_{group}", None)
+    if cap is None:
+        cap = settings.WORKER_MAX_IN_FLIGHT
+    return max(1, int(cap))
+
+
+def _parse_shares(raw: str, cast: Callable[[str], Any]) -> dict[str, Any]:
+    """
+    "THUNES=1,MTN_MOMO:GH=2" -> {"THUNES": 1, "MTN_MOMO:GH": 2}; keys upper-cased,
+    bad or non-positive entries skipped (WORKER_FAIR_SHARE_WEIGHTS / _QUOTAS).
+    """
+    shares: dict[str, Any] = {}
+    for item in (raw or "").split(","):
+        name, _, value = item.partition("=")
+        name = name.strip().upper()
+        if not name:
+            continue
+        try:
+            share = cast(value.strip())
+        except ValueError:
+            continue
+        if share > 0:
+            shares[name] = share
+    return shares
+
+
+def _lease_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _lease_seconds(batch_size: int) -> float:
+    # at least twice the worst case: the whole batch on the narrowest provider's
+    # lanes, every call running into MM_HTTP_TIMEOUT_S
+    groups = {PROVIDER_CAP_GROUPS.get(n, n) for n in SUPPORTED_PROVIDERS}
+    lanes = max(1, min(int(settings.WORKER_MAX_IN_FLIGHT), *(_max_in_flight(g) for g in groups)))
+    worst = math.ceil(max(1, batch_size) / lanes) * float(settings.MM_HTTP_TIMEOUT_S)
+    return max(float(settings.WORKER_LEASE_SECONDS), 2 * worst)
+
+
+class LeaseKeeper:
+    """
+    Keeps a batch's leases alive while it runs: a background thread renews
+    them every third of the lease, so a slow batch is never claimed (and sent)
+    again by another worker. A row missing from a renewal was lost (its lease
+    ran out and it was re-claimed) and must not be sent by this batch; a
+    failed renewal keeps the previous answer until the next one.
+    """
 
-        for p in stale_sent:
+    def __init__(self, ids: Sequence[Any], *, owner: str, lease_seconds: float):
+        self.owner = owner
+        self.lease_seconds = float(lease_seconds)
+        self._lock = threading.Lock()
+        self._held = {str(i) for i in ids}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> LeaseKeeper:
+        if self._held:
+            self._thread = threading.Thread(target=self._run, name="payout-lease", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def held(self, p: dict) -> bool:
+        with self._lock:
+            return str(p["id"]) in self._held
+
+    def renew(self) -> None:
+        with self._lock:
+            ids = list(self._held)
+        if not ids:
+            return
+        try:
+            with get_conn() as conn:
+                renewed = renew_leases(conn, ids, lease_owner=self.owner, lease_seconds=self.lease_seconds)
+        except Exception:
+            logger.exception("payout_lease_renew_failed count=%s", len(ids))
+            return
+        # rows written meanwhile released their lease and drop out too
+        with self._lock:
+            self._held &= renewed
+
+    def _run(self) -> None:
+        while not self._stop.wait(max(1.0, self.lease_seconds / 3)):
+            self.renew()
+
+
+class OutcomeBatch:
+    """
+    Collects payout outcomes from the dispatch threads and writes them with
+    update_status_many: one statement (and one short transaction) per flush
+    instead of one per payout. Flushes once WORKER_STATUS_FLUSH_SIZE outcomes
+    are queued or the oldest has waited WORKER_STATUS_FLUSH_MS (checked as
+    outcomes arrive), and at the end of the batch.
+
+    Each write only lands while this batch's lease on the row is still held
+    (see claim_pending_payouts); lease_held tells the handlers whether it
+    still is before they call the provider.
+    """
+
+    def __init__(self, *, max_size: int, max_wait_s: float, leases: LeaseKeeper | None = None):
+        self.leases = leases
+        self.max_size = max(1, int(max_size))
+        self.max_wait_s = max(0.0, float(max_wait_s))
+        self._lock = threading.Lock()
+        self._queued: list[StatusUpdate] = []
+        self._first_at = 0.0
+        # payout_id -> (provider, created_at) for queued CONFIRMED outcomes
+        self._confirming: dict[Any, tuple[str, datetime]] = {}
+
+    def update(self, p: dict, **fields: Any) -> None:
+        item = StatusUpdate(payout_id=p["id"], lease_owner=p.get("lease_owner"), **fields)
+        now = time.monotonic()
+        with self._lock:
+            if item.new_status == "CONFIRMED" and p.get("created_at") is not None:
+                self._confirming[item.payout_id] = ((p.get("provider") or "").strip().upper(), p["created_at"])
+            if not self._queued:
+                self._first_at = now
+            self._queued.append(item)
+            due = len(self._queued) >= self.max_size or now - self._first_at >= self.max_wait_s
+            batch = self._take() if due else None
+        if batch:
+            self._write(batch)
+
+    def lease_held(self, p: dict) -> bool:
+        return self.leases is None or self.leases.held(p)
+
+    def flush(self) -> None:
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._write(batch)
+
+    def _take(self) -> list[StatusUpdate]:
+        batch, self._queued = self._queued, []
+        return batch
+
+    def _write(self, batch: list[StatusUpdate]) -> None:
+        # A failed write is not retried here: the leases expire and the rows
+        # are claimed again, as if the worker had crashed.
+        try:
+            with get_conn() as conn:
+                applied = update_status_many(conn, batch)
+        except Exception:
+            logger.exception("payout_outcome_write_failed count=%s", len(batch))
+            return
+        now = _now()
+        for item, ok in zip(batch, applied):
+            with self._lock:
+                confirming = self._confirming.pop(item.payout_id, None)
+            if ok and confirming is not None:
+                observe_payout_time_to_confirm(confirming[0], "worker", (now - confirming[1]).total_seconds())
+            if not ok:
+                logger.warning(
+                    "payout_update_skipped payout_id=%s new_status=%s reason=lease_lost_or_status_changed",
+                    item.payout_id,
+                    item.new_status,
+                )
+
+
+def _run_job(out: OutcomeBatch, handler: Callable[[OutcomeBatch, dict], None], p: dict, from_status: str) -> None:
+    # process each payout independently so one bad row doesn't kill the whole batch
+    try:
+        handler(out, p)
+    except Exception as e:
+        _mark_internal_error(out, p, e, from_status=from_status)
+
+
+def _dispatch(out: OutcomeBatch, jobs: list[tuple[Callable[[OutcomeBatch, dict], None], dict, str]]) -> None:
+    """
+    Runs (handler, payout, from_status) jobs with at most WORKER_MAX_IN_FLIGHT
+    provider calls overall and WORKER_MAX_IN_FLIGHT_<provider> per provider.
+    Each provider gets up to its cap of lanes draining its own queue, so a slow
+    provider never holds threads another provider could use. The handlers are
+    unchanged; only the ordering between different payouts is lost.
+    """
+    overall = max(1, int(settings.WORKER_MAX_IN_FLIGHT))
+
+    queues: dict[str, deque] = {}
+    for job in jobs:
+        queues.setdefault(_cap_group(job[1]), deque()).append(job)
+
+    lanes = [
+        q
+        for group, q in queues.items()
+        for _ in range(min(len(q), _max_in_flight(group)))
+    ]
+    if overall <= 1 or len(lanes) <= 1:
+        for job in jobs:
+            _run_job(out, *job)
+        return
+
+    def drain(q: deque) -> None:
+        while True:
             try:
-                processed += 1
-                _handle_sent(conn, p)
-            except Exception as e:
-                _mark_internal_error(conn, p, e, from_status="SENT")
+                job = q.popleft()
+            except IndexError:
+                return
+            _run_job(out, *job)
+
+    with ThreadPoolExecutor(max_workers=min(overall, len(lanes)), thread_name_prefix="payout") as pool:
+        futures = [pool.submit(drain, q) for q in lanes]
+    for f in futures:
+        f.result()
+
+
+def _prefetch_statuses(stale_sent: list[dict]) -> None:
+    # Providers with a bulk status endpoint are asked once for the whole batch,
+    # and async adapters (.aio) are polled concurrently on the provider event
+    # loop; _handle_sent then reads the cached results. Others are polled per
+    # payout from the dispatch lanes. Failures are not cached and retried there.
+    by_name: dict[str, list[dict]] = {}
+    for p in stale_sent:
+        name = (p.get("provider") or "").strip().upper()
+        if name in SUPPORTED_PROVIDERS and (p.get("provider_ref") or "").strip():
+            by_name.setdefault(name, []).append(p)
+
+    poller = get_status_poller()
+    requests = []
+    for name, rows in by_name.items():
+        breaker = _breaker_for(name)
+        if breaker is not None and breaker.state == OPEN:
+            continue
+        provider = get_provider(name)
+        if provider is None:
+            continue
+        # without a cache window a concurrent poll here would be repeated by the lanes
+        if hasattr(provider, "get_cashout_statuses") or (poller.ttl_s > 0 and hasattr(provider, "aio")):
+            requests += [(name, _guard(name, provider), p) for p in rows]
+    if requests:
+        poller.get_many(requests)
+
+
+def _pipelined(p: dict) -> bool:
+    # MOMO submits through create_transfer; only async adapters (.aio) can be batched
+    name = (p.get("provider") or "").strip().upper()
+    names = {n.strip().upper() for n in (settings.WORKER_PIPELINE_PROVIDERS or "").split(",") if n.strip()}
+    return name in names and name != "MOMO" and hasattr(get_provider(name), "aio")
+
+
+def _submit_pipelined(out: OutcomeBatch, pending: list[dict]) -> None:
+    """
+    Submits PENDING payouts of WORKER_PIPELINE_PROVIDERS as one batch: after
+    the same checks as _handle_pending, every send_cashout runs concurrently on
+    the provider event loop (at most WORKER_PIPELINE_MAX_IN_FLIGHT), so a
+    payroll-style burst takes about one payout's quotation/transaction/confirm
+    time instead of one per lane. The breaker is consulted before the batch
+    goes out, not between its calls.
+    """
+    ready: list[tuple[dict, Any]] = []
+    for p in pending:
+        try:
+            provider = _sendable(out, p)
+            if provider is None:
+                continue
+            name = (p.get("provider") or "").strip().upper()
+            if _circuit_open(out, p, name, from_status="PENDING"):
+                continue
+            ready.append((p, provider.aio))
+        except Exception as e:
+            _mark_internal_error(out, p, e, from_status="PENDING")
+    if not ready:
+        return
+
+    async def send_all() -> list[Any]:
+        sem = asyncio.Semaphore(max(1, int(settings.WORKER_PIPELINE_MAX_IN_FLIGHT)))
+
+        async def one(adapter: Any, payout: dict) -> Any:
+            async with sem:
+                try:
+                    return await adapter.send_cashout(payout)
+                except Exception as exc:
+                    return exc
+
+        return await asyncio.gather(*(one(a, p) for p, a in ready))
+
+    for (p, _), res in zip(ready, run_sync(send_all())):
+        try:
+            if isinstance(res, Exception):
+                raise res
+            _record_send(out, p, _normalize_result(res))
+        except Exception as e:
+            _mark_internal_error(out, p, e, from_status="PENDING")
+
+
+def process_once(
+    *,
+    batch_size: int = 50,
+    stale_seconds: int = DEFAULT_STALE_SECONDS,
+    shard_count: int = 1,
+    shards: Sequence[int] = (0,),
+) -> int:
+    """
+    Claims a batch under a lease (committed immediately, so no row locks are
+    held during provider calls), then commits outcomes in small batches as
+    they arrive (OutcomeBatch).
+    Leases are renewed while the batch runs (LeaseKeeper); left behind by a
+    crashed worker, they expire after _lease_seconds and the rows are
+    claimed again.
+    Only payouts in `shards` (of shard_count) are claimed; the defaults
+    cover all of them. Pending payouts of WORKER_PIPELINE_PROVIDERS are
+    submitted as one concurrent batch (_submit_pipelined), the rest through
+    the dispatch lanes.
+    """
+    started = time.perf_counter()
+    owner = _lease_owner()
+    lease_seconds = _lease_seconds(batch_size)
+    with get_conn() as conn:
+        if settings.WORKER_CLAIM_MODE == "fair":
+            pending = claim_pending_payouts_fair(
+                conn,
+                batch_size=batch_size,
+                lease_owner=owner,
+                lease_seconds=lease_seconds,
+                weights=_parse_shares(settings.WORKER_FAIR_SHARE_WEIGHTS, float),
+                quotas=_parse_shares(settings.WORKER_FAIR_SHARE_QUOTAS, int),
+                default_quota=settings.WORKER_FAIR_SHARE_QUOTA,
+                by_country=settings.WORKER_FAIR_SHARE_BY_COUNTRY,
+                window=settings.WORKER_FAIR_SHARE_WINDOW,
+                shard_count=shard_count,
+                shards=shards,
+            )
+        else:
+            pending = claim_pending_payouts(
+                conn,
+                batch_size=batch_size,
+                lease_owner=owner,
+                lease_seconds=lease_seconds,
+                shard_count=shard_count,
+                shards=shards,
+            )
+        claimed_pending_at = time.perf_counter()
+        stale_sent = claim_stale_sent_payouts(
+            conn,
+            batch_size=batch_size,
+            stale_after_seconds=stale_seconds,
+            lease_owner=owner,
+            lease_seconds=lease_seconds,
+            shard_count=shard_count,
+            shards=shards,
+        )
+        claimed_at = time.perf_counter()
+    observe_payout_claim("pending", claimed_pending_at - started)
+    observe_payout_claim("stale_sent", claimed_at - claimed_pending_at)
 
-        conn.commit()
+    logger.info("worker_poll found_pending=%s found_stale_sent=%s", len(pending), len(stale_sent))
 
+    with LeaseKeeper([p["id"] for p in pending + stale_sent], owner=owner, lease_seconds=lease_seconds) as leases:
+        _prefetch_statuses(stale_sent)
+
+        pipelined: list[dict] = []
+        jobs: list[tuple[Callable[[OutcomeBatch, dict], None], dict, str]] = []
+        for p in pending:
+            if _pipelined(p):
+                pipelined.append(p)
+            else:
+                jobs.append((_handle_pending, p, "PENDING"))
+        jobs += [(_handle_sent, p, "SENT") for p in stale_sent]
+        out = OutcomeBatch(
+            max_size=settings.WORKER_STATUS_FLUSH_SIZE,
+            max_wait_s=settings.WORKER_STATUS_FLUSH_MS / 1000.0,
+            leases=leases,
+        )
+        try:
+            if pipelined:
+                # the pipelined batch runs alongside the other providers' lanes
+                with ThreadPoolExecutor(max_workers=1, thread_name_prefix="payout-pipeline") as pool:
+                    batch = pool.submit(_submit_pipelined, out, pipelined)
+                    _dispatch(out, jobs)
+                batch.result()
+            else:
+                _dispatch(out, jobs)
+        finally:
+            out.flush()
+
+    processed = len(pending) + len(stale_sent)
+    if processed:
+        observe_payout_batch(time.perf_counter() - started)
     return processed
 
 
-def _mark_terminal_max_attempts(conn, *, payout_id: int, from_status: str, provider_ref: str | None, attempt_count: int, provider_response=None) -> None:
-    update_status(
-        conn,
-        payout_id=payout_id,
+def _report_queue(stale_seconds: int) -> None:
+    """
+    Refreshes the payout_queue_depth / payout_oldest_due_age_seconds gauges.
+    Providers whose queue drained are reported as 0, not left at their last value.
+    """
+    try:
+        with get_conn(readonly=True) as conn:
+            stats = payout_queue_stats(conn, stale_after_seconds=stale_seconds)
+    except Exception:
+        logger.warning("worker_queue_stats_failed", exc_info=True)
+        return
+    for name in SUPPORTED_PROVIDERS | set(stats):
+        pending, sent_due, oldest_age_s = stats.get(name, (0, 0, 0.0))
+        set_payout_queue(name, pending, sent_due, oldest_age_s)
+
+
+def _serve_metrics(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Prometheus endpoint for the worker process (GET /metrics on host:port).
+    Unauthenticated, so loopback unless WORKER_METRICS_HOST says otherwise.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # scrapes are not worth a log line
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="worker-metrics", daemon=True).start()
+    logger.info("worker_metrics_listening host=%s port=%s", host, server.server_address[1])
+    return server
+
+
+def _breaker_for(provider_name: str):
+    if not settings.CIRCUIT_BREAKER_ENABLED:
+        return None
+    return get_breaker(PROVIDER_CAP_GROUPS.get(provider_name, provider_name))
+
+
+def _is_provider_failure(r: Any) -> bool:
+    # Timeouts, 5xx and other retryable errors; a definitive answer (even a
+    # rejection) means the provider is up.
+    res = _normalize_result(r)
+    return bool(res.retryable) and (res.status == "FAILED" or bool(res.error))
+
+
+def _guard(provider_name: str, provider):
+    return GuardedProvider(
+        provider,
+        name=provider_name,
+        breaker=_breaker_for(provider_name),
+        is_failure=_is_provider_failure,
+    )
+
+
+def _circuit_open(out: OutcomeBatch, p: dict, provider_name: str, *, from_status: str) -> bool:
+    """
+    True (and the payout rescheduled, attempt_count untouched) when the
+    provider's breaker refuses the call.
+    """
+    breaker = _breaker_for(provider_name)
+    if breaker is None or breaker.allow():
+        return False
+    increment_circuit_short_circuit(breaker.name)
+    delay = jittered_delay(breaker.retry_after() or settings.CIRCUIT_OPEN_S)
+    out.update(
+        p,
+        from_status=from_status,
+        new_status=from_status,
+        provider_ref=None,  # COALESCE keeps existing
+        provider_response=None,
+        last_error=f"{CIRCUIT_OPEN_ERROR}: {provider_name}",
+        retryable=True,
+        attempt_count=int(p.get("attempt_count") or 0),  # nothing was submitted
+        next_retry_at=_now() + timedelta(seconds=delay),
+        touch_last_attempt_at=False,
+    )
+    return True
+
+
+def _mark_terminal_max_attempts(out: OutcomeBatch, p: dict, *, from_status: str, provider_ref: str | None, attempt_count: int, provider_response=None) -> None:
+    out.update(
+        p,
         from_status=from_status,
         new_status="FAILED",
         provider_ref=provider_ref,
@@ -151,15 +639,15 @@ def _mark_terminal_max_attempts(conn, *, payout_id: int, from_status: str, provi
     )
 
 
-def _mark_internal_error(conn, p: dict, e: Exception, *, from_status: str) -> None:
+def _mark_internal_error(out: OutcomeBatch, p: dict, e: Exception, *, from_status: str) -> None:
     payout_id = p["id"]
     attempt_count = int(p.get("attempt_count") or 0)
 
     # Worker error (not provider response). Retry unless we've exhausted submission attempts.
     if attempt_count >= MAX_ATTEMPTS:
         _mark_terminal_max_attempts(
-            conn,
-            payout_id=payout_id,
+            out,
+            p,
             from_status=from_status,
             provider_ref=p.get("provider_ref"),
             attempt_count=attempt_count,
@@ -167,9 +655,8 @@ def _mark_internal_error(conn, p: dict, e: Exception, *, from_status: str) -> No
         )
         return
 
-    update_status(
-        conn,
-        payout_id=payout_id,
+    out.update(
+        p,
         from_status=from_status,
         new_status="SENT",
         provider_ref=None,  # COALESCE keeps existing
@@ -181,30 +668,44 @@ def _mark_internal_error(conn, p: dict, e: Exception, *, from_status: str) -> No
     )
 
 
-def _handle_pending(conn, p: dict) -> None:
-    payout_id = p["id"]
+def _lease_still_held(out: OutcomeBatch, p: dict) -> bool:
+    # the worker that re-claimed the row sends it; sending here too would pay out twice
+    if out.lease_held(p):
+        return True
+    logger.warning("payout_send_skipped payout_id=%s reason=lease_lost", p["id"])
+    return False
+
+
+def _sendable(out: OutcomeBatch, p: dict):
+    """
+    Checks a PENDING payout before submission. Returns its guarded adapter, or
+    None once the payout's outcome is recorded (max attempts, missing phone,
+    unsupported or unconfigured provider) or its lease was lost.
+    """
     current_status = (p.get("status") or "PENDING").strip().upper()
     provider_name = (p.get("provider") or "").strip().upper()
     attempt_count = int(p.get("attempt_count") or 0)
 
+    if not _lease_still_held(out, p):
+        return None
+
     # If we've already hit max submissions, stop retrying (terminal).
     if attempt_count >= MAX_ATTEMPTS:
         _mark_terminal_max_attempts(
-            conn,
-            payout_id=payout_id,
+            out,
+            p,
             from_status=current_status,
             provider_ref=p.get("provider_ref"),
             attempt_count=attempt_count,
             provider_response=p.get("provider_response"),
         )
-        return
+        return None
 
     phone = (p.get("phone_e164") or "").strip()
     if not phone:
         attempt = attempt_count + 1  # <-- increment because worker processed it
-        update_status(
-            conn,
-            payout_id=payout_id,
+        out.update(
+            p,
             from_status=current_status,
             new_status="FAILED",
             provider_ref=p.get("provider_ref"),
@@ -215,12 +716,11 @@ def _handle_pending(conn, p: dict) -> None:
             next_retry_at=None,
             touch_last_attempt_at=False,
         )
-        return
+        return None
 
     if provider_name not in SUPPORTED_PROVIDERS:
-        update_status(
-            conn,
-            payout_id=payout_id,
+        out.update(
+            p,
             from_status=current_status,
             new_status="FAILED",
             provider_ref=p.get("provider_ref"),
@@ -231,13 +731,12 @@ def _handle_pending(conn, p: dict) -> None:
             next_retry_at=None,
             touch_last_attempt_at=False,
         )
-        return
+        return None
 
     provider = get_provider(provider_name)
     if provider is None:
-        update_status(
-            conn,
-            payout_id=payout_id,
+        out.update(
+            p,
             from_status=current_status,
             new_status="FAILED",
             provider_ref=p.get("provider_ref"),
@@ -248,6 +747,19 @@ def _handle_pending(conn, p: dict) -> None:
             next_retry_at=None,
             touch_last_attempt_at=False,
         )
+        return None
+    return _guard(provider_name, provider)
+
+
+def _handle_pending(out: OutcomeBatch, p: dict) -> None:
+    payout_id = p["id"]
+    current_status = (p.get("status") or "PENDING").strip().upper()
+    provider_name = (p.get("provider") or "").strip().upper()
+    attempt_count = int(p.get("attempt_count") or 0)
+    phone = (p.get("phone_e164") or "").strip()
+
+    provider = _sendable(out, p)
+    if provider is None:
         return
 
     if provider_name == "MOMO":
@@ -255,9 +767,8 @@ def _handle_pending(conn, p: dict) -> None:
         currency = (p.get("currency") or "").strip().upper()
         if amount_cents is None or int(amount_cents) <= 0:
             attempt = attempt_count + 1
-            update_status(
-                conn,
-                payout_id=payout_id,
+            out.update(
+                p,
                 from_status=current_status,
                 new_status="FAILED",
                 provider_ref=p.get("provider_ref"),
@@ -271,9 +782,8 @@ def _handle_pending(conn, p: dict) -> None:
             return
         if not currency:
             attempt = attempt_count + 1
-            update_status(
-                conn,
-                payout_id=payout_id,
+            out.update(
+                p,
                 from_status=current_status,
                 new_status="FAILED",
                 provider_ref=p.get("provider_ref"),
@@ -286,6 +796,9 @@ def _handle_pending(conn, p: dict) -> None:
             )
             return
 
+        if _circuit_open(out, p, provider_name, from_status=current_status):
+            return
+
         provider_ref = (p.get("provider_ref") or str(uuid.uuid4())).strip()
         external_ref = str(p.get("external_ref") or p.get("transaction_id") or provider_ref)
         amount = f"{int(amount_cents) / 100:.2f}"
@@ -315,9 +828,8 @@ def _handle_pending(conn, p: dict) -> None:
         returned_ref = res.provider_ref or provider_ref
 
         if res.status == "SENT":
-            update_status(
-                conn,
-                payout_id=payout_id,
+            out.update(
+                p,
                 from_status=current_status,
                 new_status="SENT",
                 provider_ref=returned_ref,
@@ -329,9 +841,8 @@ def _handle_pending(conn, p: dict) -> None:
             )
             return
 
-        update_status(
-            conn,
-            payout_id=payout_id,
+        out.update(
+            p,
             from_status=current_status,
             new_status="FAILED",
             provider_ref=returned_ref,
@@ -343,9 +854,20 @@ def _handle_pending(conn, p: dict) -> None:
         )
         return
 
+    if _circuit_open(out, p, provider_name, from_status=current_status):
+        return
+
+    _record_send(out, p, _normalize_result(provider.send_cashout(p)))
+
+
+def _record_send(out: OutcomeBatch, p: dict, res: ProviderResult) -> None:
+    payout_id = p["id"]
+    current_status = (p.get("status") or "PENDING").strip().upper()
+    provider_name = (p.get("provider") or "").strip().upper()
+    attempt_count = int(p.get("attempt_count") or 0)
+
     # SEND (this is the only place attempt_count increments)
     attempt = attempt_count + 1
-    res = _normalize_result(provider.send_cashout(p))
     increment_payout_attempt(provider_name, res.status)
     if provider_name == "MOMO":
         logger.info(
@@ -361,9 +883,8 @@ def _handle_pending(conn, p: dict) -> None:
     returned_ref = res.provider_ref  # may be None
 
     if res.status == "CONFIRMED":
-        update_status(
-            conn,
-            payout_id=payout_id,
+        out.update(
+            p,
             from_status=current_status,
             new_status="CONFIRMED",
             provider_ref=returned_ref,
@@ -379,9 +900,8 @@ def _handle_pending(conn, p: dict) -> None:
     if res.status == "SENT":
         # If this submission hit the max, don't schedule another retry.
         if attempt >= MAX_ATTEMPTS:
-            update_status(
-                conn,
-                payout_id=payout_id,
+            out.update(
+                p,
                 from_status=current_status,
                 new_status="FAILED",
                 provider_ref=returned_ref,
@@ -393,9 +913,8 @@ def _handle_pending(conn, p: dict) -> None:
             )
             return
 
-        update_status(
-            conn,
-            payout_id=payout_id,
+        out.update(
+            p,
             from_status=current_status,
             new_status="SENT",
             provider_ref=returned_ref,
@@ -409,9 +928,8 @@ def _handle_pending(conn, p: dict) -> None:
 
     # FAILED
     if res.retryable and attempt < MAX_ATTEMPTS:
-        update_status(
-            conn,
-            payout_id=payout_id,
+        out.update(
+            p,
             from_status=current_status,
             new_status="SENT",
             provider_ref=None,  # preserve existing
@@ -425,9 +943,8 @@ def _handle_pending(conn, p: dict) -> None:
 
     # If we got here, it's either non-retryable OR we hit max attempts on a retryable failure.
     terminal_error = MAX_ATTEMPTS_ERROR if attempt >= MAX_ATTEMPTS else (err or "Non-retryable failure")
-    update_status(
-        conn,
-        payout_id=payout_id,
+    out.update(
+        p,
         from_status=current_status,
         new_status="FAILED",
         provider_ref=None,
@@ -439,7 +956,7 @@ def _handle_pending(conn, p: dict) -> None:
     )
 
 
-def _handle_sent(conn, p: dict) -> None:
+def _handle_sent(out: OutcomeBatch, p: dict) -> None:
     """
     Polling does NOT increment attempt_count.
     attempt_count is strictly number of send_cashout submissions.
@@ -453,9 +970,8 @@ def _handle_sent(conn, p: dict) -> None:
     attempt_count = int(p.get("attempt_count") or 0)
 
     if provider_name not in SUPPORTED_PROVIDERS:
-        update_status(
-            conn,
-            payout_id=payout_id,
+        out.update(
+            p,
             from_status=current_status,
             new_status="FAILED",
             provider_ref=p.get("provider_ref"),
@@ -470,9 +986,8 @@ def _handle_sent(conn, p: dict) -> None:
 
     provider = get_provider(provider_name)
     if provider is None:
-        update_status(
-            conn,
-            payout_id=payout_id,
+        out.update(
+            p,
             from_status=current_status,
             new_status="FAILED",
             provider_ref=p.get("provider_ref"),
@@ -484,13 +999,17 @@ def _handle_sent(conn, p: dict) -> None:
             touch_last_attempt_at=False,
         )
         return
+    provider = _guard(provider_name, provider)
 
     # Invariant: SENT must have provider_ref. If missing, resend instead of polling.
     if not (p.get("provider_ref") or "").strip():
-        _resend_sent_missing_ref(conn, p, provider)
+        _resend_sent_missing_ref(out, p, provider)
+        return
+
+    if _circuit_open(out, p, provider_name, from_status=current_status):
         return
 
-    res = _normalize_result(provider.get_cashout_status(p))
+    res = _normalize_result(get_status_poller().get(provider_name, provider, p))
     if provider_name == "MOMO":
         logger.info(
             "momo payout reconcile payout_id=%s provider_ref=%s status=%s error=%s",
@@ -505,9 +1024,8 @@ def _handle_sent(conn, p: dict) -> None:
     err = res.error
 
     if res.status == "CONFIRMED":
-        update_status(
-            conn,
-            payout_id=payout_id,
+        out.update(
+            p,
             from_status=current_status,
             new_status="CONFIRMED",
             provider_ref=provider_ref,
@@ -521,9 +1039,8 @@ def _handle_sent(conn, p: dict) -> None:
         return
 
     if res.status == "FAILED":
-        update_status(
-            conn,
-            payout_id=payout_id,
+        out.update(
+            p,
             from_status=current_status,
             new_status="FAILED",
             provider_ref=provider_ref,
@@ -537,9 +1054,8 @@ def _handle_sent(conn, p: dict) -> None:
         return
 
     # Unknown/in-flight -> keep SENT + schedule next poll (avoid tight loop)
-    update_status(
-        conn,
-        payout_id=payout_id,
+    out.update(
+        p,
         from_status=current_status,
         new_status="SENT",
         provider_ref=provider_ref,
@@ -552,15 +1068,15 @@ def _handle_sent(conn, p: dict) -> None:
     )
 
 
-def _resend_sent_missing_ref(conn, p: dict, provider) -> None:
+def _resend_sent_missing_ref(out: OutcomeBatch, p: dict, provider) -> None:
     payout_id = p["id"]
     attempt_count = int(p.get("attempt_count") or 0)
 
     # If we've already hit max submissions, stop retrying.
     if attempt_count >= MAX_ATTEMPTS:
         _mark_terminal_max_attempts(
-            conn,
-            payout_id=payout_id,
+            out,
+            p,
             from_status="SENT",
             provider_ref=None,
             attempt_count=attempt_count,
@@ -568,6 +1084,12 @@ def _resend_sent_missing_ref(conn, p: dict, provider) -> None:
         )
         return
 
+    if _circuit_open(out, p, (p.get("provider") or "").strip().upper(), from_status="SENT"):
+        return
+
+    if not _lease_still_held(out, p):
+        return
+
     attempt = attempt_count + 1
     res = _normalize_result(provider.send_cashout(p))
     increment_payout_attempt((p.get("provider") or "").strip().upper(), res.status)
@@ -577,9 +1099,8 @@ def _resend_sent_missing_ref(conn, p: dict, provider) -> None:
     returned_ref = res.provider_ref  # may be None
 
     if res.status == "CONFIRMED":
-        update_status(
-            conn,
-            payout_id=payout_id,
+        out.update(
+            p,
             from_status="SENT",
             new_status="CONFIRMED",
             provider_ref=returned_ref,
@@ -593,9 +1114,8 @@ def _resend_sent_missing_ref(conn, p: dict, provider) -> None:
 
     if res.status == "SENT":
         if attempt >= MAX_ATTEMPTS:
-            update_status(
-                conn,
-                payout_id=payout_id,
+            out.update(
+                p,
                 from_status="SENT",
                 new_status="FAILED",
                 provider_ref=returned_ref,
@@ -607,9 +1127,8 @@ def _resend_sent_missing_ref(conn, p: dict, provider) -> None:
             )
             return
 
-        update_status(
-            conn,
-            payout_id=payout_id,
+        out.update(
+            p,
             from_status="SENT",
             new_status="SENT",
             provider_ref=returned_ref,
@@ -623,9 +1142,8 @@ def _resend_sent_missing_ref(conn, p: dict, provider) -> None:
 
     # FAILED
     if res.retryable and attempt < MAX_ATTEMPTS:
-        update_status(
-            conn,
-            payout_id=payout_id,
+        out.update(
+            p,
             from_status="SENT",
             new_status="SENT",
             provider_ref=None,  # keep missing ref (COALESCE preserves if any)
@@ -638,9 +1156,8 @@ def _resend_sent_missing_ref(conn, p: dict, provider) -> None:
         return
 
     terminal_error = MAX_ATTEMPTS_ERROR if attempt >= MAX_ATTEMPTS else (err or "Non-retryable resend failure")
-    update_status(
-        conn,
-        payout_id=payout_id,
+    out.update(
+        p,
         from_status="SENT",
         new_status="FAILED",
         provider_ref=None,
@@ -652,12 +1169,202 @@ def _resend_sent_missing_ref(conn, p: dict, provider) -> None:
     )
 
 
+# Floor on the idle wait so a row that is due but not claimable can't spin the loop
+MIN_IDLE_WAIT_SECONDS = 0.5
+
+
+class PayoutWakeup:
+    """
+    Idle wait for run_forever: blocks on LISTEN payout_ready (alembic 0015)
+    until a cash-out or admin retry commits, the next scheduled
+    next_retry_at / stale / lease deadline comes due, or timeout_s passes.
+
+    Holds one dedicated connection outside the pool. If it breaks, the worker
+    sleeps poll_seconds as before and reconnects on the next wait.
+    With a registry, only the deadlines of this worker's shards count.
+    """
+
+    def __init__(self, *, stale_seconds: int, poll_seconds: float, registry: WorkerRegistry | None = None):
+        self.stale_seconds = stale_seconds
+        self.poll_seconds = poll_seconds
+        self.registry = registry
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None or self._conn.closed:
+            conn = psycopg2.connect(settings.DATABASE_URL, **session_connect_kwargs())
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {PAYOUT_READY_CHANNEL}")
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None and not conn.closed:
+            conn.close()
+
+    def drain(self) -> None:
+        """
+        Drop notifications already received; the next claim sees those rows.
+        """
+        try:
+            conn = self._connection()
+            conn.poll()
+            conn.notifies.clear()
+        except Exception:
+            self.close()
+
+    def wait(self, timeout_s: float) -> bool:
+        """
+        Returns True when woken by a notification.
+        """
+        try:
+            conn = self._connection()
+            if self.registry is None:
+                due = seconds_until_next_payout_due(conn, stale_after_seconds=self.stale_seconds)
+            elif self.registry.shards:
+                due = seconds_until_next_payout_due(
+                    conn,
+                    stale_after_seconds=self.stale_seconds,
+                    shard_count=self.registry.shard_count,
+                    shards=self.registry.shards,
+                )
+            else:
+                due = None
+            if due is not None:
+                timeout_s = min(timeout_s, max(MIN_IDLE_WAIT_SECONDS, due))
+
+            # psycopg2 reads any NOTIFY that arrived before or during the due
+            # query into conn.notifies, after which the socket is no longer readable
+            if conn.notifies:
+                conn.notifies.clear()
+                return True
+            if not select.select([conn], [], [], timeout_s)[0]:
+                return False
+            conn.poll()
+            woke = bool(conn.notifies)
+            conn.notifies.clear()
+            return woke
+        except Exception:
+            logger.warning("worker_listen_failed fallback_sleep_s=%s", self.poll_seconds, exc_info=True)
+            self.close()
+            time.sleep(self.poll_seconds)
+            return False
+
+
+def _heartbeat(registry: WorkerRegistry) -> None:
+    try:
+        registry.heartbeat()
+    except Exception:
+        logger.warning("worker_heartbeat_failed worker_id=%s", registry.worker_id, exc_info=True)
+        registry.expire_if_silent()
+
+
+class Heartbeat:
+    """
+    Heartbeats the registry every interval_s on its own thread, independent
+    of process_once: a batch that runs longer than WORKER_HEARTBEAT_TTL_S must
+    not get this worker expired, and its shards handed to others, while it is
+    still draining them. The first heartbeat runs in start(), so the worker
+    knows its shards before it claims anything.
+    """
+
+    def __init__(self, registry: WorkerRegistry, *, interval_s: float):
+        self.registry = registry
+        self.interval_s = max(0.01, float(interval_s))
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        _heartbeat(self.registry)
+        self._thread = threading.Thread(target=self._run, name="worker-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            _heartbeat(self.registry)
+
+
 def run_forever(*, poll_seconds: int = 5, batch_size: int = 50, stale_seconds: int = DEFAULT_STALE_SECONDS) -> None:
-    print("[worker] payout worker started")
-    while True:
-        n = process_once(batch_size=batch_size, stale_seconds=stale_seconds)
-        if n == 0:
-            time.sleep(poll_seconds)
+    """
+    poll_seconds is the idle sleep when WORKER_LISTEN is off or the LISTEN
+    connection is down; otherwise the worker idles on PayoutWakeup.
+
+    With WORKER_SHARDING, any number of these processes can run side by side:
+    each heartbeats every WORKER_HEARTBEAT_S (on its own thread, see
+    Heartbeat) and drains only the shards the registry assigns it
+    (app/workers/worker_registry.py).
+    """
+    configure_logging()
+    registry = None
+    if settings.WORKER_SHARDING:
+        registry = WorkerRegistry(shard_count=settings.WORKER_SHARD_COUNT, ttl_s=settings.WORKER_HEARTBEAT_TTL_S)
+    logger.info(
+        "worker_started poll_seconds=%s batch_size=%s listen=%s worker_id=%s",
+        poll_seconds,
+        batch_size,
+        settings.WORKER_LISTEN,
+        registry.worker_id if registry is not None else "-",
+    )
+    wakeup = (
+        PayoutWakeup(stale_seconds=stale_seconds, poll_seconds=poll_seconds, registry=registry)
+        if settings.WORKER_LISTEN
+        else None
+    )
+    # idle waits end in time for the next queue report, and to pick up shards
+    # the latest heartbeat assigned
+    idle_s = min(settings.WORKER_LISTEN_TIMEOUT_S, settings.WORKER_QUEUE_STATS_S)
+    if registry is not None:
+        idle_s = min(idle_s, settings.WORKER_HEARTBEAT_S)
+    if settings.WORKER_METRICS_PORT:
+        _serve_metrics(settings.WORKER_METRICS_PORT, settings.WORKER_METRICS_HOST)
+    heartbeat = Heartbeat(registry, interval_s=settings.WORKER_HEARTBEAT_S) if registry is not None else None
+    next_queue_report = 0.0
+    try:
+        if heartbeat is not None:
+            heartbeat.start()
+        while True:
+            if time.monotonic() >= next_queue_report:
+                _report_queue(stale_seconds)
+                next_queue_report = time.monotonic() + settings.WORKER_QUEUE_STATS_S
+            if wakeup is not None:
+                wakeup.drain()
+
+            if registry is None:
+                n = process_once(batch_size=batch_size, stale_seconds=stale_seconds)
+            elif registry.shards:
+                n = process_once(
+                    batch_size=batch_size,
+                    stale_seconds=stale_seconds,
+                    shard_count=registry.shard_count,
+                    shards=registry.shards,
+                )
+                registry.record_batch(n)
+            else:
+                n = 0  # standby: more workers than shards, or not registered yet
+
+            if n == 0:
+                if wakeup is None:
+                    time.sleep(min(poll_seconds, idle_s))
+                else:
+                    wakeup.wait(idle_s)
+    finally:
+        if heartbeat is not None:
+            heartbeat.stop()
+        if wakeup is not None:
+            wakeup.close()
+        close_transport()
+        if registry is not None:
+            try:
+                registry.deregister()
+            except Exception:
+                logger.warning("worker_deregister_failed worker_id=%s", registry.worker_id, exc_info=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,161 @@
+# app/workers/worker_registry.py
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Optional
+
+from psycopg2.extras import execute_values
+
+from db import get_conn
+
+logger = logging.getLogger("nexapay")
+
+# Serializes heartbeats across worker processes while shards are rebalanced
+_REGISTRY_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext('app.payout_worker_shards'))"
+
+_HEARTBEAT_SQL = """
+    INSERT INTO app.payout_workers (worker_id, hostname, pid, processed_total, last_batch_size)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (worker_id) DO UPDATE
+      SET heartbeat_at = now(),
+          processed_total = EXCLUDED.processed_total,
+          last_batch_size = EXCLUDED.last_batch_size
+"""
+
+_EXPIRE_SQL = """
+    DELETE FROM app.payout_workers
+    WHERE heartbeat_at < now() - make_interval(secs => %s::float8)
+    RETURNING worker_id
+"""
+
+_SAVE_SHARDS_SQL = """
+    INSERT INTO app.payout_worker_shards (shard, worker_id)
+    VALUES %s
+    ON CONFLICT (shard) DO UPDATE
+      SET worker_id = EXCLUDED.worker_id, assigned_at = now()
+"""
+
+
+def balance_shards(owners: dict[int, Optional[str]], live: list[str], shard_count: int) -> dict[int, Optional[str]]:
+    """
+    shard -> worker_id for shards 0..shard_count-1, spread as evenly as
+    possible over `live` (in order; the first ones take the remainder).
+    Shards stay with their current live owner unless it is over its share,
+    so a join or a leave only moves the shards it has to.
+    """
+    if not live:
+        return {s: None for s in range(shard_count)}
+
+    base, extra = divmod(shard_count, len(live))
+    quota = {w: base + (1 if i < extra else 0) for i, w in enumerate(live)}
+    load = dict.fromkeys(live, 0)
+
+    result: dict[int, Optional[str]] = {}
+    orphans: list[int] = []
+    for s in range(shard_count):
+        owner = owners.get(s)
+        if owner in quota and load[owner] < quota[owner]:
+            result[s] = owner
+            load[owner] += 1
+        else:
+            orphans.append(s)
+    for s in orphans:
+        owner = next(w for w in live if load[w] < quota[w])
+        result[s] = owner
+        load[owner] += 1
+    return result
+
+
+class WorkerRegistry:
+    """
+    Membership for horizontally scaled payout workers (alembic 0017).
+
+    Every heartbeat upserts this worker into app.payout_workers, drops
+    workers silent for longer than ttl_s (their shards are released) and
+    rebalances app.payout_worker_shards over the live workers, all under one
+    advisory lock, so each shard has exactly one live owner at a time. The
+    worker then claims only payouts in its shards (claim_pending_payouts).
+
+    A shard moving between workers mid-batch is safe: rows already claimed
+    stay leased to the old owner until their outcome is written.
+    """
+
+    def __init__(self, *, shard_count: int, ttl_s: float, worker_id: str | None = None):
+        self.shard_count = max(1, int(shard_count))
+        self.ttl_s = float(ttl_s)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.shards: list[int] = []
+        self.processed_total = 0
+        self.last_batch_size = 0
+        self._last_ok = 0.0
+
+    def record_batch(self, processed: int) -> None:
+        self.processed_total += processed
+        self.last_batch_size = processed
+
+    def heartbeat(self) -> list[int]:
+        """
+        Returns (and remembers) the shards this worker owns now.
+        """
+        with get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(_REGISTRY_LOCK_SQL)
+            cur.execute(
+                _HEARTBEAT_SQL,
+                (self.worker_id, socket.gethostname(), os.getpid(), self.processed_total, self.last_batch_size),
+            )
+            cur.execute(_EXPIRE_SQL, (self.ttl_s,))
+            expired = [r[0] for r in cur.fetchall()]
+            if expired:
+                logger.warning("worker_heartbeat_expired worker_ids=%s", ",".join(expired))
+            shards = self._rebalance(cur)
+
+        if shards != self.shards:
+            logger.info(
+                "worker_shards_assigned worker_id=%s shards=%s shard_count=%s",
+                self.worker_id,
+                ",".join(map(str, shards)) or "-",
+                self.shard_count,
+            )
+        self.shards = shards
+        self._last_ok = time.monotonic()
+        return shards
+
+    def expire_if_silent(self) -> None:
+        """
+        After a failed heartbeat: once ttl_s has passed since the last good one
+        the others may already own our shards, so stop claiming.
+        """
+        if self.shards and time.monotonic() - self._last_ok > self.ttl_s:
+            logger.warning("worker_shards_dropped worker_id=%s reason=heartbeat_expired", self.worker_id)
+            self.shards = []
+
+    def deregister(self) -> None:
+        """
+        Leave the group on shutdown; the others take the shards over at once.
+        """
+        with get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(_REGISTRY_LOCK_SQL)
+            cur.execute("DELETE FROM app.payout_workers WHERE worker_id = %s", (self.worker_id,))
+            self._rebalance(cur)
+        self.shards = []
+
+    def _rebalance(self, cur) -> list[int]:
+        cur.execute("SELECT worker_id FROM app.payout_workers ORDER BY started_at, worker_id")
+        live = [r[0] for r in cur.fetchall()]
+        cur.execute("SELECT shard, worker_id FROM app.payout_worker_shards")
+        owners = {shard: worker_id for shard, worker_id in cur.fetchall()}
+
+        assigned = balance_shards(owners, live, self.shard_count)
+        changed = [(s, w) for s, w in assigned.items() if s not in owners or owners[s] != w]
+        if changed:
+            execute_values(cur, _SAVE_SHARDS_SQL, changed, page_size=len(changed))
+        if any(s >= self.shard_count for s in owners):
+            # WORKER_SHARD_COUNT was lowered: drop the shards beyond it
+            cur.execute("DELETE FROM app.payout_worker_shards WHERE shard >= %s", (self.shard_count,))
+        return sorted(s for s, w in assigned.items() if w == self.worker_id)
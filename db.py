@@ -2,14 +2,31 @@
 
 # db.py
 import psycopg2
-from psycopg2.pool import ThreadedConnectionPool
 from contextlib import contextmanager
 from settings import settings
 import psycopg2.extras
 import threading
 
-_pool: ThreadedConnectionPool | None = None
+from db_pool import InstrumentedPool, session_connect_kwargs
+from db_replica import REPLICA_LAG_SQL, ReplicaLagGuard, replica_configured
+
+_pool: InstrumentedPool | None = None
+_replica_pool: InstrumentedPool | None = None
 _pool_lock = threading.Lock()
+_replica_guard = ReplicaLagGuard("sync")
+
+
+def _new_pool(dsn: str, name: str) -> InstrumentedPool:
+    return InstrumentedPool(
+        dsn,
+        name=name,
+        min_size=settings.DB_POOL_MIN_SIZE,
+        max_size=settings.DB_POOL_MAX_SIZE,
+        max_lifetime_s=settings.DB_POOL_MAX_LIFETIME_S,
+        checkout_timeout_s=settings.DB_POOL_CHECKOUT_TIMEOUT_S,
+        health_check=settings.DB_POOL_HEALTH_CHECK,
+        connect_kwargs=session_connect_kwargs(),
+    )
 
 
 def init_pool():
@@ -22,42 +39,89 @@ def init_pool():
     if _pool is None:
         with _pool_lock:
             if _pool is None:
-                _pool = ThreadedConnectionPool(
-                    minconn=1,
-                    maxconn=10,
-                    dsn=settings.DATABASE_URL,
-                    connect_timeout=5,
-                )
+                _pool = _new_pool(settings.DATABASE_URL, "primary")
+
+
+def _get_replica_pool() -> InstrumentedPool:
+    global _replica_pool
+    if _replica_pool is None:
+        with _pool_lock:
+            if _replica_pool is None:
+                _replica_pool = _new_pool(settings.DATABASE_REPLICA_URL, "replica")
+    return _replica_pool
+
+
+def _checkout_replica():
+    """
+    Returns a replica connection, or None when reads must go to the primary
+    (replica down or lagging more than DB_REPLICA_MAX_LAG_S).
+    """
+    if _replica_guard.claim_check():
+        lag_s = None
+        try:
+            conn = _get_replica_pool().getconn()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(REPLICA_LAG_SQL)
+                    lag_s = float(cur.fetchone()[0])
+                conn.rollback()
+            finally:
+                _replica_pool.putconn(conn)
+        except Exception:
+            lag_s = None
+        finally:
+            _replica_guard.record(lag_s)
+
+    if not _replica_guard.healthy:
+        return None
+
+    try:
+        return _get_replica_pool().getconn()
+    except Exception:
+        _replica_guard.record(None)
+        return None
 
 
 def close_pool():
     """
     Gracefully close all pooled connections.
     """
-    global _pool
+    global _pool, _replica_pool
     if _pool:
         _pool.closeall()
         _pool = None
+    if _replica_pool:
+        _replica_pool.closeall()
+        _replica_pool = None
+    _replica_guard.reset()
 
 
 @contextmanager
-def get_conn():
+def get_conn(readonly: bool = False):
     """
     Provides a transactional DB connection.
     Auto-commits on success, rolls back on error.
+
+    readonly=True routes to DATABASE_REPLICA_URL when configured and caught up,
+    otherwise to the primary. Only use it for pure reads that tolerate lag.
+
+    Safety limits (statement_timeout, idle_in_transaction_session_timeout,
+    application_name) are applied once when the pool opens the connection.
     """
     if _pool is None:
         init_pool()
 
-    conn = _pool.getconn()
+    pool = _pool
+    conn = None
+    if readonly and replica_configured():
+        conn = _checkout_replica()
+        if conn is not None:
+            pool = _replica_pool
 
-    try:
-        # Safety: never allow long-running queries
-        with conn.cursor() as cur:
-            cur.execute("SET statement_timeout = '5000ms';")
-            cur.execute("SET idle_in_transaction_session_timeout = '5000ms';")
-            cur.execute("SET application_name = 'nexapay_api';")
+    if conn is None:
+        conn = pool.getconn()
 
+    try:
         yield conn
         conn.commit()
 
@@ -66,4 +130,4 @@ def get_conn():
         raise
 
     finally:
-        _pool.putconn(conn)
+        pool.putconn(conn)
@@ -0,0 +1,183 @@
+
+# db_async.py
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from psycopg import AsyncConnection
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+from db_instrument import TimedAsyncCursor
+from db_pool import session_connect_kwargs
+from db_replica import REPLICA_LAG_SQL, ReplicaLagGuard, replica_configured
+from services.metrics import (
+    increment_db_pool_checkout_timeout,
+    observe_db_pool_wait,
+    set_db_pool_connections,
+)
+from settings import settings
+
+_pool: AsyncConnectionPool | None = None
+_replica_pool: AsyncConnectionPool | None = None
+_pool_loop: asyncio.AbstractEventLoop | None = None
+_replica_guard = ReplicaLagGuard("async")
+
+_POOL_NAME = "async"
+_REPLICA_POOL_NAME = "async_replica"
+
+
+def _connect_kwargs() -> dict:
+    kwargs = session_connect_kwargs()
+    # psycopg 3 prepares repeated queries itself; None turns that off.
+    kwargs["prepare_threshold"] = 5 if settings.DB_PREPARED_STATEMENTS else None
+    kwargs["cursor_factory"] = TimedAsyncCursor
+    return kwargs
+
+
+def _report(pool: AsyncConnectionPool, name: str) -> None:
+    stats = pool.get_stats()
+    size = int(stats.get("pool_size", 0))
+    idle = int(stats.get("pool_available", 0))
+    set_db_pool_connections(name, in_use=size - idle, idle=idle, max_size=pool.max_size)
+
+
+def _new_pool(dsn: str, name: str) -> AsyncConnectionPool:
+    max_lifetime = float(settings.DB_POOL_MAX_LIFETIME_S or 0) or 365 * 24 * 3600.0
+    return AsyncConnectionPool(
+        conninfo=dsn,
+        name=name,
+        min_size=min(settings.DB_POOL_MIN_SIZE, settings.DB_POOL_MAX_SIZE),
+        max_size=settings.DB_POOL_MAX_SIZE,
+        max_lifetime=max_lifetime,
+        timeout=settings.DB_POOL_CHECKOUT_TIMEOUT_S,
+        check=AsyncConnectionPool.check_connection if settings.DB_POOL_HEALTH_CHECK else None,
+        kwargs=_connect_kwargs(),
+        open=False,
+    )
+
+
+async def init_async_pool() -> None:
+    """
+    Open the async PostgreSQL pool(s) on the running event loop.
+    Called once from the app lifespan.
+
+    NOTE (Windows): psycopg async needs a selector event loop, not the
+    default Proactor loop (asyncio.WindowsSelectorEventLoopPolicy).
+    """
+    global _pool, _replica_pool, _pool_loop
+    if _pool is None:
+        pool = _new_pool(settings.DATABASE_URL, _POOL_NAME)
+        await pool.open()
+
+        replica_pool = None
+        if replica_configured():
+            replica_pool = _new_pool(settings.DATABASE_REPLICA_URL, _REPLICA_POOL_NAME)
+            await replica_pool.open()
+
+        _pool, _replica_pool, _pool_loop = pool, replica_pool, asyncio.get_running_loop()
+
+
+async def close_async_pool() -> None:
+    """
+    Gracefully close all pooled async connections.
+    """
+    global _pool, _replica_pool, _pool_loop
+    pools = [p for p in (_pool, _replica_pool) if p is not None]
+    _pool, _replica_pool, _pool_loop = None, None, None
+    _replica_guard.reset()
+    for pool in pools:
+        await pool.close()
+
+
+async def _open(pool: AsyncConnectionPool | None, dsn: str, name: str) -> AsyncConnection:
+    if pool is None:
+        return await AsyncConnection.connect(dsn, **_connect_kwargs())
+
+    started = time.monotonic()
+    try:
+        conn = await pool.getconn()
+    except PoolTimeout:
+        increment_db_pool_checkout_timeout(name)
+        raise
+    observe_db_pool_wait(name, time.monotonic() - started)
+    _report(pool, name)
+    return conn
+
+
+async def _release(pool: AsyncConnectionPool | None, conn: AsyncConnection, name: str) -> None:
+    if pool is None:
+        await conn.close()
+    else:
+        await pool.putconn(conn)
+        _report(pool, name)
+
+
+async def _open_replica(pool: AsyncConnectionPool | None) -> AsyncConnection | None:
+    """
+    Replica connection, or None when reads must go to the primary.
+    """
+    dsn = settings.DATABASE_REPLICA_URL
+    if _replica_guard.claim_check():
+        lag_s = None
+        try:
+            conn = await _open(pool, dsn, _REPLICA_POOL_NAME)
+            try:
+                async with conn.cursor() as cur:
+                    await cur.execute(REPLICA_LAG_SQL)
+                    lag_s = float((await cur.fetchone())[0])
+                await conn.rollback()
+            finally:
+                await _release(pool, conn, _REPLICA_POOL_NAME)
+        except Exception:
+            lag_s = None
+        finally:
+            _replica_guard.record(lag_s)
+
+    if not _replica_guard.healthy:
+        return None
+
+    try:
+        return await _open(pool, dsn, _REPLICA_POOL_NAME)
+    except Exception:
+        _replica_guard.record(None)
+        return None
+
+
+@asynccontextmanager
+async def get_async_conn(readonly: bool = False) -> AsyncIterator[AsyncConnection]:
+    """
+    Async counterpart of db.get_conn for `async def` handlers.
+    Auto-commits on success, rolls back on error.
+
+    readonly=True routes to DATABASE_REPLICA_URL when configured and caught up
+    (same guard as db.get_conn), otherwise to the primary.
+
+    asyncio pools are bound to the loop that opened them. Callers on another
+    loop (TestClient without lifespan, one-off scripts) get a short-lived
+    connection instead.
+    """
+    on_loop = _pool_loop is asyncio.get_running_loop()
+    pool = _pool if on_loop else None
+    name = _POOL_NAME
+
+    conn = None
+    if readonly and replica_configured():
+        replica_pool = _replica_pool if on_loop else None
+        conn = await _open_replica(replica_pool)
+        if conn is not None:
+            pool, name = replica_pool, _REPLICA_POOL_NAME
+
+    if conn is None:
+        conn = await _open(pool, settings.DATABASE_URL, name)
+
+    try:
+        yield conn
+        await conn.commit()
+    except Exception:
+        await conn.rollback()
+        raise
+    finally:
+        await _release(pool, conn, name)
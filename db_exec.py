@@ -5,6 +5,7 @@ from __future__ import annotations
 
 from typing import Any, Optional, Sequence
 
+from psycopg import AsyncConnection
 from psycopg2.extensions import connection as Connection
 
 from db import get_conn
@@ -43,6 +44,38 @@ def db_execute(conn: Connection, sql: str, params: Optional[Sequence[Any]] = Non
         raise
 
 
+async def db_fetchone_async(conn: AsyncConnection, sql: str, params: Optional[Sequence[Any]] = None) -> Optional[tuple]:
+    """
+    Async variant for connections from db_async.get_async_conn (same actor rules apply).
+    """
+    try:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params or ())
+            return await cur.fetchone()
+    except Exception as e:
+        raise_http_from_db_error(e)
+        raise
+
+
+async def db_fetchall_async(conn: AsyncConnection, sql: str, params: Optional[Sequence[Any]] = None) -> list[tuple]:
+    try:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params or ())
+            return await cur.fetchall()
+    except Exception as e:
+        raise_http_from_db_error(e)
+        raise
+
+
+async def db_execute_async(conn: AsyncConnection, sql: str, params: Optional[Sequence[Any]] = None) -> None:
+    try:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params or ())
+    except Exception as e:
+        raise_http_from_db_error(e)
+        raise
+
+
 # optional convenience versions that open their own connection (DON'T use for secure actor-based calls)
 def db_fetchone_newconn(sql: str, params: Optional[Sequence[Any]] = None) -> Optional[tuple]:
     with get_conn() as conn:
@@ -0,0 +1,247 @@
+
+# db_instrument.py
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import time
+from contextvars import ContextVar
+from typing import Any
+
+from psycopg import AsyncCursor
+from psycopg2.extensions import connection as _PGConnection, cursor as _PGCursor
+
+from services.metrics import increment_db_slow_query, observe_db_statement
+from services.redaction import redact_dict, redact_value
+from settings import settings
+
+logger = logging.getLogger("nexapay.db")
+
+# Set by RequestContextMiddleware to the ASGI scope; the route template is read
+# lazily because routing happens after the middleware runs.
+request_scope: ContextVar[dict | None] = ContextVar("db_request_scope", default=None)
+# Non-HTTP callers (worker, scripts) can label their statements.
+db_caller: ContextVar[str] = ContextVar("db_caller", default="background")
+
+_EXPLAINABLE = ("select", "with", "insert", "update", "delete", "execute")
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WS_RE = re.compile(r"\s+")
+
+_fingerprints: dict[str, tuple[str, str]] = {}
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Fingerprint text: literals and placeholders become '?', whitespace collapses.
+    """
+    text = _COMMENT_RE.sub(" ", sql)
+    text = _STRING_RE.sub("?", text)
+    text = _PARAM_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("(?)", text)
+    return _WS_RE.sub(" ", text).strip().lower()
+
+
+def _sql_text(sql: Any) -> str:
+    if isinstance(sql, str):
+        return sql
+    if isinstance(sql, bytes):
+        return sql.decode("utf-8", errors="replace")
+    return str(sql)  # sql.Composed and friends
+
+
+def fingerprint(sql: Any) -> tuple[str, str]:
+    """
+    Returns (fingerprint_id, short normalized statement). Cached per SQL text.
+    """
+    sql = _sql_text(sql)
+    cached = _fingerprints.get(sql)
+    if cached is not None:
+        return cached
+    normalized = normalize_sql(sql)
+    fp = hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+    result = (fp, normalized[:80])
+    if len(_fingerprints) < 5000:
+        _fingerprints[sql] = result
+    return result
+
+
+def current_route() -> str:
+    scope = request_scope.get()
+    if scope is None:
+        return db_caller.get()
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope.get("path") or "-"
+
+
+def _redact_param(value: Any) -> Any:
+    # unwrap psycopg2 Json / psycopg Jsonb adapters
+    for attr in ("adapted", "obj"):
+        if hasattr(value, attr) and type(value).__module__.startswith("psycopg"):
+            value = getattr(value, attr)
+            break
+    if isinstance(value, dict):
+        return redact_dict(value)
+    if isinstance(value, (list, tuple)):
+        return [_redact_param(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return redact_value(value)
+    if isinstance(value, (bytes, memoryview)):
+        return "[BYTES]"
+    return str(value)
+
+
+def redact_params(params: Any) -> Any:
+    """
+    Slow-log view of statement parameters (services.redaction rules).
+    """
+    if isinstance(params, dict):
+        return redact_dict({k: _redact_param(v) for k, v in params.items()})
+    if isinstance(params, (list, tuple)):
+        return [_redact_param(v) for v in params]
+    return _redact_param(params)
+
+
+def _explainable(sql: str) -> bool:
+    head = sql.lstrip().split(None, 1)
+    return bool(head) and head[0].lower() in _EXPLAINABLE
+
+
+def _record(sql: Any, params: Any, elapsed_s: float) -> bool:
+    """
+    Record one statement; returns True if it crossed the slow-query threshold.
+    """
+    fp, statement = fingerprint(sql)
+    route = current_route()
+    observe_db_statement(route, fp, statement, elapsed_s)
+
+    threshold_ms = int(settings.DB_SLOW_QUERY_MS or 0)
+    if threshold_ms <= 0 or elapsed_s * 1000.0 < threshold_ms:
+        return False
+
+    increment_db_slow_query(route, fp)
+    logger.warning(
+        "slow_query route=%s fingerprint=%s duration_ms=%.1f sql=%s params=%s",
+        route,
+        fp,
+        elapsed_s * 1000.0,
+        normalize_sql(_sql_text(sql)),
+        redact_params(params),
+    )
+    return True
+
+
+def _log_plan(fp: str, rows: list) -> None:
+    plan = "\n".join(str(r[0]) for r in rows)
+    logger.warning("slow_query_plan fingerprint=%s\n%s", fp, plan)
+
+
+class _TimedCursorMixin:
+    """
+    Mixed into any psycopg2 cursor class (plain, RealDictCursor, ...).
+    """
+
+    def execute(self, query, vars=None):
+        if not settings.DB_INSTRUMENTATION:
+            return super().execute(query, vars)
+        started = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        finally:
+            # failed and cancelled statements (statement_timeout) are timed too
+            slow = _record(query, vars, time.perf_counter() - started)
+        if slow:
+            self._explain(query, vars)
+        return result
+
+    def executemany(self, query, vars_list):
+        if not settings.DB_INSTRUMENTATION:
+            return super().executemany(query, vars_list)
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _record(query, None, time.perf_counter() - started)
+
+    def _explain(self, query, vars) -> None:
+        if not settings.DB_EXPLAIN_SLOW_QUERIES or not isinstance(query, str) or not _explainable(query):
+            return
+        # in a savepoint like _cashout_fx_quote: a failed EXPLAIN must not leave the
+        # caller's transaction aborted (autocommit has no transaction to protect)
+        savepoint = not self.connection.autocommit
+        try:
+            # plain (uninstrumented) cursor, same transaction; EXPLAIN without ANALYZE never runs the statement
+            with _PGConnection.cursor(self.connection, cursor_factory=_PGCursor) as cur:
+                if savepoint:
+                    cur.execute("SAVEPOINT slow_query_explain;")
+                try:
+                    cur.execute("EXPLAIN " + query, vars)
+                    rows = cur.fetchall()
+                except Exception:
+                    if savepoint:
+                        cur.execute("ROLLBACK TO SAVEPOINT slow_query_explain;")
+                    raise
+                finally:
+                    if savepoint:
+                        cur.execute("RELEASE SAVEPOINT slow_query_explain;")
+            _log_plan(fingerprint(query)[0], rows)
+        except Exception:
+            logger.debug("slow_query explain failed", exc_info=True)
+
+
+_timed_cursor_classes: dict[type, type] = {}
+
+
+def timed_cursor_class(base: type | None) -> type:
+    base = base or _PGCursor
+    cls = _timed_cursor_classes.get(base)
+    if cls is None:
+        cls = type(f"Timed{base.__name__}", (_TimedCursorMixin, base), {})
+        _timed_cursor_classes[base] = cls
+    return cls
+
+
+class TimedAsyncCursor(AsyncCursor):
+    """
+    psycopg 3 cursor_factory for db_async connections.
+    """
+
+    async def execute(self, query, params=None, **kwargs):
+        if not settings.DB_INSTRUMENTATION:
+            return await super().execute(query, params, **kwargs)
+        started = time.perf_counter()
+        try:
+            result = await super().execute(query, params, **kwargs)
+        finally:
+            slow = _record(query, params, time.perf_counter() - started)
+        if slow:
+            await self._explain(query, params)
+        return result
+
+    async def _explain(self, query, params) -> None:
+        if not settings.DB_EXPLAIN_SLOW_QUERIES or not isinstance(query, str) or not _explainable(query):
+            return
+        savepoint = not self.connection.autocommit
+        try:
+            async with AsyncCursor(self.connection) as cur:
+                if savepoint:
+                    await cur.execute("SAVEPOINT slow_query_explain;")
+                try:
+                    await cur.execute("EXPLAIN " + query, params)
+                    rows = await cur.fetchall()
+                except Exception:
+                    if savepoint:
+                        await cur.execute("ROLLBACK TO SAVEPOINT slow_query_explain;")
+                    raise
+                finally:
+                    if savepoint:
+                        await cur.execute("RELEASE SAVEPOINT slow_query_explain;")
+            _log_plan(fingerprint(query)[0], rows)
+        except Exception:
+            logger.debug("slow_query explain failed", exc_info=True)
@@ -0,0 +1,202 @@
+
+# db_pool.py
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+from psycopg2.pool import PoolError
+
+from db_prepared import PooledConnection
+from services.metrics import (
+    increment_db_pool_checkout_timeout,
+    observe_db_pool_wait,
+    set_db_pool_connections,
+)
+from settings import settings
+
+
+class PoolTimeout(PoolError):
+    """
+    Raised when no connection frees up within the checkout timeout.
+    Subclasses psycopg2's PoolError so existing handlers keep working.
+    """
+
+
+def session_connect_kwargs() -> dict[str, Any]:
+    """
+    libpq connect parameters shared by the sync and async pools.
+    Session settings ride in the startup packet: zero extra round trips per checkout.
+    """
+    return {
+        "connect_timeout": 5,
+        "application_name": settings.DB_APPLICATION_NAME,
+        "options": (
+            f"-c statement_timeout={int(settings.DB_STATEMENT_TIMEOUT_MS)}ms "
+            f"-c idle_in_transaction_session_timeout={int(settings.DB_IDLE_IN_TX_TIMEOUT_MS)}ms"
+        ),
+    }
+
+
+class InstrumentedPool:
+    """
+    Thread-safe psycopg2 pool that blocks (up to a timeout) when exhausted,
+    recycles old connections and reports wait time / usage to /metrics.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        *,
+        name: str = "primary",
+        min_size: int = 1,
+        max_size: int = 10,
+        max_lifetime_s: float = 0.0,
+        checkout_timeout_s: float = 5.0,
+        health_check: bool = False,
+        connect_kwargs: dict[str, Any] | None = None,
+    ):
+        self.dsn = dsn
+        self.name = name
+        self.min_size = max(0, min(int(min_size), int(max_size)))
+        self.max_size = max(1, int(max_size))
+        self.max_lifetime_s = float(max_lifetime_s or 0.0)
+        self.checkout_timeout_s = float(checkout_timeout_s)
+        self.health_check = bool(health_check)
+        self.connect_kwargs = dict(connect_kwargs or {})
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle: deque[Any] = deque()
+        self._created_at: dict[int, float] = {}
+        self._size = 0  # idle + in use + being opened
+        self._closed = False
+
+        for _ in range(self.min_size):
+            conn = self._connect()
+            with self._cond:
+                self._size += 1
+                self._idle.append(conn)
+        self._report()
+
+    # ------------------------------------------------------
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, connection_factory=PooledConnection, **self.connect_kwargs)
+        self._created_at[id(conn)] = time.monotonic()
+        return conn
+
+    def _discard(self, conn) -> None:
+        self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _expired(self, conn) -> bool:
+        if self.max_lifetime_s <= 0:
+            return False
+        created = self._created_at.get(id(conn))
+        return created is not None and (time.monotonic() - created) > self.max_lifetime_s
+
+    def _healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        if not self.health_check:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _report(self) -> None:
+        with self._cond:
+            idle = len(self._idle)
+            in_use = self._size - idle
+        set_db_pool_connections(self.name, in_use=in_use, idle=idle, max_size=self.max_size)
+
+    # ------------------------------------------------------
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout_s
+
+        while True:
+            conn = None
+            open_new = False
+
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError("connection pool is closed")
+                    if self._idle:
+                        conn = self._idle.popleft()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        open_new = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        increment_db_pool_checkout_timeout(self.name)
+                        raise PoolTimeout(
+                            f"{self.name} pool exhausted: no connection within {self.checkout_timeout_s}s"
+                        )
+                    self._cond.wait(remaining)
+
+            if open_new:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif self._expired(conn) or not self._healthy(conn):
+                # Drop it and loop: either reuse another idle conn or open a fresh one.
+                self._discard(conn)
+                with self._cond:
+                    self._size -= 1
+                continue
+
+            observe_db_pool_wait(self.name, time.monotonic() - started)
+            self._report()
+            return conn
+
+    def putconn(self, conn, close: bool = False) -> None:
+        status = TRANSACTION_STATUS_UNKNOWN if conn.closed else conn.info.transaction_status
+        if not close and status not in (TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN):
+            try:
+                conn.rollback()
+                status = conn.info.transaction_status
+            except Exception:
+                status = TRANSACTION_STATUS_UNKNOWN
+
+        drop = close or self._closed or status == TRANSACTION_STATUS_UNKNOWN or self._expired(conn)
+        if drop:
+            self._discard(conn)
+
+        with self._cond:
+            if drop:
+                self._size -= 1
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+        self._report()
+
+    def closeall(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+        self._report()
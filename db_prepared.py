@@ -0,0 +1,82 @@
+
+# db_prepared.py
+from __future__ import annotations
+
+import re
+from typing import Any, Optional, Sequence
+
+from psycopg2 import errors as pg_errors
+from psycopg2.extensions import connection as _PGConnection
+
+from db_instrument import timed_cursor_class
+from settings import settings
+
+_PLACEHOLDER_RE = re.compile(r"%%|%s")
+
+
+class PooledConnection(_PGConnection):
+    """
+    psycopg2 connection used by db_pool: remembers which named statements
+    have been PREPAREd in this session, and hands out timed cursors
+    (see db_instrument).
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: set[str] = set()
+
+    def cursor(self, *args: Any, **kwargs: Any):
+        kwargs["cursor_factory"] = timed_cursor_class(kwargs.get("cursor_factory") or self.cursor_factory)
+        return super().cursor(*args, **kwargs)
+
+
+def _to_positional(sql: str) -> tuple[str, int]:
+    """
+    Rewrite psycopg2 '%s' placeholders to PREPARE-style $1..$n.
+    """
+    count = 0
+
+    def _sub(m: re.Match) -> str:
+        nonlocal count
+        if m.group(0) == "%%":
+            return "%"
+        count += 1
+        return f"${count}"
+
+    return _PLACEHOLDER_RE.sub(_sub, sql), count
+
+
+class PreparedStatement:
+    """
+    Hot SQL that is PREPAREd once per pooled connection and run with EXECUTE.
+
+    Falls back to a plain cur.execute() when DB_PREPARED_STATEMENTS is off or
+    the connection is not a PooledConnection (scripts, ad-hoc connections).
+    Only positional '%s' placeholders are supported.
+    """
+
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sql = sql
+        body, self.param_count = _to_positional(sql.strip().rstrip(";"))
+        self._prepare_sql = f"PREPARE {name} AS {body}"
+        placeholders = ", ".join(["%s"] * self.param_count)
+        self._execute_sql = f"EXECUTE {name} ({placeholders})" if self.param_count else f"EXECUTE {name}"
+
+    def execute(self, cur, params: Optional[Sequence[Any]] = None) -> None:
+        params = tuple(params or ())
+        prepared = getattr(cur.connection, "prepared_statements", None)
+        if not settings.DB_PREPARED_STATEMENTS or prepared is None:
+            cur.execute(self.sql, params)
+            return
+
+        if self.name not in prepared:
+            cur.execute(self._prepare_sql)
+            prepared.add(self.name)
+
+        try:
+            cur.execute(self._execute_sql, params)
+        except pg_errors.InvalidSqlStatementName:
+            # Session lost its statements (e.g. DISCARD ALL); re-prepare next time.
+            prepared.discard(self.name)
+            raise
@@ -0,0 +1,73 @@
+
+# db_replica.py
+from __future__ import annotations
+
+import threading
+import time
+
+from services.metrics import increment_db_replica_fallback, set_db_replica_lag
+from settings import settings
+
+# Lag is 0 when the standby has replayed everything it received; otherwise
+# the age of the last replayed commit. A primary (not in recovery) reports 0.
+REPLICA_LAG_SQL = """
+SELECT CASE
+  WHEN NOT pg_is_in_recovery() THEN 0
+  WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+  ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END::float8;
+"""
+
+
+def replica_configured() -> bool:
+    return bool((settings.DATABASE_REPLICA_URL or "").strip())
+
+
+class ReplicaLagGuard:
+    """
+    Caches the replica lag for DB_REPLICA_LAG_CHECK_INTERVAL_S so only one
+    caller per interval pays for the lag query. Unknown / too-high lag routes
+    reads back to the primary.
+    """
+
+    def __init__(self, engine: str):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._checking = False
+        self._healthy = False
+
+    @property
+    def healthy(self) -> bool:
+        return self._healthy
+
+    def claim_check(self) -> bool:
+        """
+        True if the caller should run REPLICA_LAG_SQL now and report via record().
+        """
+        interval = float(settings.DB_REPLICA_LAG_CHECK_INTERVAL_S)
+        with self._lock:
+            if self._checking or (time.monotonic() - self._checked_at) < interval:
+                return False
+            self._checking = True
+            return True
+
+    def record(self, lag_s: float | None) -> None:
+        """
+        lag_s=None means the replica could not be reached.
+        """
+        healthy = lag_s is not None and lag_s <= float(settings.DB_REPLICA_MAX_LAG_S)
+        with self._lock:
+            self._checked_at = time.monotonic()
+            self._checking = False
+            self._healthy = healthy
+        if lag_s is not None:
+            set_db_replica_lag(self.engine, lag_s)
+        if not healthy:
+            increment_db_replica_fallback(self.engine, "unreachable" if lag_s is None else "lag")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._checked_at = 0.0
+            self._checking = False
+            self._healthy = False
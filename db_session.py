@@ -1,6 +1,7 @@
 
 #db_session.py
 from uuid import UUID
+from psycopg import AsyncCursor
 from psycopg2.extensions import cursor as Cursor
 
 
@@ -10,3 +11,10 @@ def set_db_actor(cur: Cursor, user_id: UUID) -> None:
     Must be called inside the same connection/transaction before ledger.post_*.
     """
     cur.execute("SELECT set_config('app.user_id', %s, true);", (str(user_id),))
+
+
+async def set_db_actor_async(cur: AsyncCursor, user_id: UUID) -> None:
+    """
+    Async variant of set_db_actor for db_async connections.
+    """
+    await cur.execute("SELECT set_config('app.user_id', %s, true);", (str(user_id),))
@@ -13,7 +13,7 @@ class CurrentUser:
     def __init__(self, user_id: UUID):
         self.user_id = user_id
 
-def get_current_user(
+async def get_current_user(
     creds: HTTPAuthorizationCredentials = Depends(bearer),
 ) -> CurrentUser:
     if not creds:
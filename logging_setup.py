@@ -0,0 +1,153 @@
+
+# logging_setup.py
+from __future__ import annotations
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import re
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from settings import settings
+
+# "http_request request_id=... status=200" -> event + fields
+_EVENT_RE = re.compile(r"^([a-z][a-z0-9_]*)(?:\s|$)")
+_FIELD_RE = re.compile(r"(\w+)=(\S*)")
+
+_RESERVED = frozenset(("ts", "level", "logger", "event", "msg", "exc"))
+# LogRecord attributes that are not user extras
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: QueueListener | None = None
+
+
+def _parse_rates(raw: str) -> dict[str, float]:
+    rates: dict[str, float] = {}
+    for item in (raw or "").split(","):
+        name, _, value = item.partition("=")
+        name = name.strip()
+        if not name:
+            continue
+        try:
+            rates[name] = min(1.0, max(0.0, float(value)))
+        except ValueError:
+            continue
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of INFO/DEBUG records per event name (first word of the
+    message, e.g. http_request) or logger name. WARNING and above always pass.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = None
+        if isinstance(record.msg, str):
+            m = _EVENT_RE.match(record.msg)
+            if m:
+                rate = self.rates.get(m.group(1))
+        if rate is None:
+            rate = self.rates.get(record.name)
+        if rate is None or rate >= 1.0:
+            return True
+        return random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: ts, level, logger, event, msg, key=value fields
+    from the message, any `extra=` attributes, and exc for tracebacks.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        out: dict = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        m = _EVENT_RE.match(message)
+        if m:
+            out["event"] = m.group(1)
+            for key, value in _FIELD_RE.findall(message[m.end():]):
+                if key not in _RESERVED:
+                    out[key] = value
+        out["msg"] = message
+
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in out:
+                out[key] = value
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, default=str)
+
+
+class _QueueHandler(QueueHandler):
+    # Resolve args and tracebacks in the caller thread (they may not survive
+    # the hand-off) but leave formatting to the writer thread.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def configure_logging(*, force: bool = False) -> None:
+    """
+    Root logging for the API and worker: records go through an in-memory queue
+    to a background writer thread, so log I/O never blocks a request or the
+    worker loop. Leaves existing root handlers alone (pytest, uvicorn --log-config)
+    unless force=True.
+    """
+    global _listener
+    root = logging.getLogger()
+    if _listener is not None or (root.handlers and not force):
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    if (settings.LOG_FORMAT or "json").lower() == "text":
+        stream.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+    else:
+        stream.setFormatter(JsonFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(_parse_rates(settings.LOG_SAMPLE_RATES)))
+
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(handler)
+    root.setLevel((settings.LOG_LEVEL or "INFO").upper())
+
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """
+    Flush queued records and stop the writer thread.
+    """
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
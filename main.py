@@ -35,7 +35,11 @@ from routes.catalog import router as catalog_router
 
 from app.providers.mobile_money.validate import validate_mobile_money_startup
 from app.providers.mobile_money.config import mm_mode, enabled_providers, is_strict_startup_validation
+from app.providers.mobile_money.http import close_transport
 from settings import validate_env_settings, settings
+from db_async import init_async_pool, close_async_pool
+from rate_limit import close_rate_limiter
+from logging_setup import configure_logging
 from middleware import (
     RequestContextMiddleware,
     RateLimitMiddleware,
@@ -47,10 +51,7 @@ logger = logging.getLogger("nexapay")
 
 
 def _configure_logging_once() -> None:
-    root = logging.getLogger()
-    if root.handlers:
-        return
-    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    configure_logging()
 
 
 def _parse_csv_env(name: str, default: str = "") -> List[str]:
@@ -116,7 +117,12 @@ async def lifespan(app: FastAPI):
     # Provider startup validation (sandbox-friendly unless strict enabled)
     validate_mobile_money_startup()
 
+    await init_async_pool()
+
     yield
+    await close_async_pool()
+    close_transport()
+    close_rate_limiter()
     logger.info("SHUTDOWN NepXy API")
 
 
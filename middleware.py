@@ -1,26 +1,41 @@
 
 import logging
+import math
 import os
 import time
 import uuid
-from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from rate_limit import allow_token_bucket
-from services.metrics import increment_http_requests
+from db_instrument import request_scope
+from rate_limit import RateDecision, get_rate_limiter
+from security import decode_token
+from services.metrics import increment_http_requests, increment_rate_limited
 from settings import settings
 
 logger = logging.getLogger("nexapay.http")
 
+# Pure ASGI middleware: no per-request task/stream hand-off as with
+# BaseHTTPMiddleware, and StreamingResponse bodies pass straight through.
 
-class StagingGateMiddleware(BaseHTTPMiddleware):
+
+def _client_host(scope: Scope) -> str | None:
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+class StagingGateMiddleware:
     ALLOWED_PATHS = {"/healthz", "/readyz", "/openapi.json"}
 
-    def __init__(self, app):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next):
         key = (os.getenv("STAGING_GATE_KEY") or "").strip()
         env = (
             (os.getenv("ENVIRONMENT") or os.getenv("ENV") or (settings.ENV or "dev"))
@@ -28,12 +43,14 @@ class StagingGateMiddleware(BaseHTTPMiddleware):
             .lower()
         )
         gate_enabled = env == "staging" and bool(key)
-        path = request.url.path or ""
+        path = scope.get("path") or ""
         if gate_enabled and not self._is_allowed_path(path):
-            header = request.headers.get("X-Staging-Key")
+            header = Headers(scope=scope).get("X-Staging-Key")
             if header != key:
-                raise HTTPException(status_code=403, detail="STAGING_GATE_KEY_REQUIRED")
-        return await call_next(request)
+                response = JSONResponse(status_code=403, content={"detail": "STAGING_GATE_KEY_REQUIRED"})
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
 
     def _is_allowed_path(self, path: str) -> bool:
         if path in self.ALLOWED_PATHS:
@@ -43,108 +60,201 @@ class StagingGateMiddleware(BaseHTTPMiddleware):
         return False
 
 
-class RequestContextMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        req_id = request.headers.get("X-Request-Id") or str(uuid.uuid4())
+class RequestContextMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        req_id = Headers(scope=scope).get("X-Request-Id") or str(uuid.uuid4())
         start = time.time()
+        method = scope.get("method")
+        path = scope.get("path") or ""
+
+        # attach to request state (request.state.request_id)
+        scope.setdefault("state", {})["request_id"] = req_id
+        # lets db_instrument label statements with the matched route
+        scope_token = request_scope.set(scope)
+
+        status = 500
+        response_started = False
 
-        # attach to request state
-        request.state.request_id = req_id
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status, response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                status = message["status"]
+                MutableHeaders(scope=message)["X-Request-Id"] = req_id
+            await send(message)
 
-        response = None
         try:
-            response = await call_next(request)
-            return response
+            await self.app(scope, receive, send_with_request_id)
         except Exception:
             logger.exception(
                 "http_request error request_id=%s method=%s path=%s",
                 req_id,
-                request.method,
-                request.url.path,
+                method,
+                path,
             )
             raise
         finally:
+            request_scope.reset(scope_token)
             duration_ms = int((time.time() - start) * 1000)
-            status = getattr(response, "status_code", 500)
 
-            if response is not None:
-                response.headers["X-Request-Id"] = req_id
-                route_obj = request.scope.get("route")
-                route = getattr(route_obj, "path", request.url.path)
+            if response_started:
+                route_obj = scope.get("route")
+                route = getattr(route_obj, "path", path)
                 increment_http_requests(route, status)
 
             logger.info(
                 "http_request request_id=%s method=%s path=%s status=%s duration_ms=%s client=%s",
                 req_id,
-                request.method,
-                request.url.path,
+                method,
+                path,
                 status,
                 duration_ms,
-                request.client.host if request.client else None,
+                _client_host(scope),
             )
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+# Money-movement routes: (method, path) -> settings field with the per-user limit per minute
+USER_ROUTE_LIMITS = {
+    ("POST", "/v1/cash-out/mobile-money"): "RATE_LIMIT_CASHOUT_PER_MIN",
+    ("POST", "/v1/p2p/transfer"): "RATE_LIMIT_P2P_TRANSFER_PER_MIN",
+    ("POST", "/v1/fx/convert"): "RATE_LIMIT_FX_CONVERT_PER_MIN",
+    ("POST", "/v1/merchant/pay"): "RATE_LIMIT_MERCHANT_PAY_PER_MIN",
+}
+
+
+def _jwt_subject(scope: Scope) -> str | None:
+    auth = Headers(scope=scope).get("Authorization") or ""
+    scheme, _, token = auth.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    sub = decode_token(token.strip()).get("sub")
+    return str(sub) if sub else None
+
+
+class RateLimitMiddleware:
+    """
+    Token buckets taken before routing (so before any DB connection):
+      - per client IP for /v1/auth/ and /v1/webhooks/;
+      - per JWT subject and route for USER_ROUTE_LIMITS, plus an optional
+        per-user budget across all of them (RATE_LIMIT_MONEY_PER_USER_PER_MIN).
+    Rejections are 429 {"detail": "RATE_LIMITED"} with Retry-After.
+    """
+
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         *,
         auth_limit: int = 120,
         auth_window_seconds: int = 60,
         webhook_limit: int = 300,
         webhook_window_seconds: int = 60,
     ):
-        super().__init__(app)
+        self.app = app
         self.auth_limit = int(auth_limit)
         self.auth_window_seconds = int(auth_window_seconds)
         self.webhook_limit = int(webhook_limit)
         self.webhook_window_seconds = int(webhook_window_seconds)
 
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path or ""
-        group = None
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope.get("path") or ""
         if path.startswith("/v1/auth/"):
-            group = "auth"
-            limit = self.auth_limit
-            window = self.auth_window_seconds
+            decision = await self._take_ip(scope, "auth", self.auth_limit, self.auth_window_seconds)
         elif path.startswith("/v1/webhooks/"):
-            group = "webhooks"
-            limit = self.webhook_limit
-            window = self.webhook_window_seconds
+            decision = await self._take_ip(scope, "webhooks", self.webhook_limit, self.webhook_window_seconds)
+        elif (scope.get("method"), path) in USER_ROUTE_LIMITS:
+            decision = await self._take_user(scope, path)
+        else:
+            decision = None
 
-        if not group:
-            return await call_next(request)
+        if decision is None or decision.allowed:
+            await self.app(scope, receive, send)
+            return
+        await self._reject(scope, receive, send, decision)
 
-        client = request.client.host if request.client else "unknown"
-        key = f"{group}:{client}"
+    async def _take(self, key: str, limit: int, window: int) -> RateDecision:
         refill_per_sec = float(limit) / max(1.0, float(window))
-        ok = allow_token_bucket(key, capacity=limit, refill_per_sec=refill_per_sec)
-        if ok:
-            return await call_next(request)
+        return await get_rate_limiter().take(key, capacity=limit, refill_per_sec=refill_per_sec)
+
+    async def _take_ip(self, scope: Scope, group: str, limit: int, window: int) -> RateDecision:
+        client = _client_host(scope) or "unknown"
+        decision = await self._take(f"{group}:{client}", limit, window)
+        if not decision.allowed:
+            increment_rate_limited(group)
+        return decision
 
-        req_id = getattr(request.state, "request_id", None) or request.headers.get("X-Request-Id") or str(uuid.uuid4())
-        headers = {"X-Request-Id": req_id}
-        return JSONResponse(status_code=429, content={"detail": "RATE_LIMITED"}, headers=headers)
+    async def _take_user(self, scope: Scope, path: str) -> RateDecision | None:
+        # Unauthenticated requests are rejected by get_current_user without touching the DB.
+        user_id = _jwt_subject(scope)
+        if not user_id:
+            return None
 
+        route_limit = int(getattr(settings, USER_ROUTE_LIMITS[(scope["method"], path)], 0) or 0)
+        if route_limit > 0:
+            decision = await self._take(f"user:{user_id}:{path}", route_limit, 60)
+            if not decision.allowed:
+                increment_rate_limited(path)
+                return decision
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
+        user_limit = int(settings.RATE_LIMIT_MONEY_PER_USER_PER_MIN or 0)
+        if user_limit > 0:
+            decision = await self._take(f"user:{user_id}:money", user_limit, 60)
+            if not decision.allowed:
+                increment_rate_limited("money")
+                return decision
+        return None
 
-        response.headers.setdefault("X-Content-Type-Options", "nosniff")
-        response.headers.setdefault("X-Frame-Options", "DENY")
-        response.headers.setdefault("Referrer-Policy", "no-referrer")
-        response.headers.setdefault(
-            "Content-Security-Policy",
-            "default-src 'none'; frame-ancestors 'none'; base-uri 'none'; form-action 'none'",
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, decision: RateDecision) -> None:
+        req_id = (
+            scope.get("state", {}).get("request_id")
+            or Headers(scope=scope).get("X-Request-Id")
+            or str(uuid.uuid4())
         )
+        headers = {
+            "X-Request-Id": req_id,
+            "Retry-After": str(max(1, math.ceil(decision.retry_after_s))),
+        }
+        response = JSONResponse(status_code=429, content={"detail": "RATE_LIMITED"}, headers=headers)
+        await response(scope, receive, send)
 
-        if (settings.ENV or "dev").lower() == "prod":
-            scheme = request.headers.get("x-forwarded-proto", request.url.scheme)
-            if scheme == "https":
-                response.headers.setdefault(
-                    "Strict-Transport-Security",
-                    "max-age=31536000; includeSubDomains",
+
+class SecurityHeadersMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.setdefault("X-Content-Type-Options", "nosniff")
+                headers.setdefault("X-Frame-Options", "DENY")
+                headers.setdefault("Referrer-Policy", "no-referrer")
+                headers.setdefault(
+                    "Content-Security-Policy",
+                    "default-src 'none'; frame-ancestors 'none'; base-uri 'none'; form-action 'none'",
                 )
 
-        return response
+                if (settings.ENV or "dev").lower() == "prod":
+                    scheme = Headers(scope=scope).get("x-forwarded-proto", scope.get("scheme", "http"))
+                    if scheme == "https":
+                        headers.setdefault(
+                            "Strict-Transport-Security",
+                            "max-age=31536000; includeSubDomains",
+                        )
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -1,37 +1,235 @@
 
+import logging
+import threading
 import time
-from collections import defaultdict, deque
+from collections import OrderedDict, deque
+from typing import NamedTuple, Protocol
 
-# key -> deque[timestamps]
-_hits = defaultdict(lambda: deque())
+from anyio import to_thread
 
-# key -> (tokens, last_refill)
-_buckets: dict[str, tuple[float, float]] = {}
+from db_pool import InstrumentedPool, session_connect_kwargs
+from services.metrics import increment_rate_limit_backend_error
+from settings import settings
 
-# TODO: replace in-memory buckets with Redis for multi-worker production.
+logger = logging.getLogger("nexapay.rate_limit")
 
 
-def allow(key: str, limit: int, window_seconds: int) -> bool:
-    now = time.time()
-    q = _hits[key]
-    while q and (now - q[0]) > window_seconds:
-        q.popleft()
-    if len(q) >= limit:
-        return False
-    q.append(now)
-    return True
+class RateDecision(NamedTuple):
+    allowed: bool
+    retry_after_s: float = 0.0  # seconds until the next token, when denied
 
 
-def allow_token_bucket(key: str, capacity: int, refill_per_sec: float) -> bool:
-    now = time.time()
-    tokens, last = _buckets.get(key, (float(capacity), now))
+def _retry_after(tokens: float, refill_per_sec: float) -> float:
+    if refill_per_sec <= 0:
+        return 60.0
+    return max(0.0, (1.0 - tokens) / refill_per_sec)
+
+
+class RateLimiterBackend(Protocol):
+    name: str
+
+    async def take(self, key: str, capacity: int, refill_per_sec: float) -> RateDecision:
+        """Take one token from the bucket `key` (created full)."""
+        ...
+
+
+class MemoryRateLimiter:
+    """
+    Process-local token buckets, bounded two ways:
+      - TTL: a bucket idle long enough to have refilled is dropped (it is
+        indistinguishable from a new one);
+      - LRU: at most `max_keys` buckets, least recently used evicted first.
+    Each uvicorn worker enforces its own limit; use PostgresRateLimiter
+    (RATE_LIMIT_BACKEND=postgres) for one limit across workers.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max(1, int(max_keys))
+        self._lock = threading.Lock()
+        # key -> (tokens, last_refill, full_at)
+        self._buckets: "OrderedDict[str, tuple[float, float, float]]" = OrderedDict()
+        # key -> deque[timestamps] (sliding window, see allow())
+        self._hits: "OrderedDict[str, deque]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets) + len(self._hits)
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        while buckets:
+            _, _, full_at = next(iter(buckets.values()))
+            if full_at > now and len(buckets) <= self.max_keys:
+                break
+            buckets.popitem(last=False)
+
+    def take_sync(self, key: str, capacity: int, refill_per_sec: float) -> RateDecision:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._buckets.pop(key, None)
+            tokens, last = (float(capacity), now) if entry is None else entry[:2]
+
+            elapsed = max(0.0, now - last)
+            tokens = min(float(capacity), tokens + elapsed * refill_per_sec)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+
+            full_at = now + ((float(capacity) - tokens) / refill_per_sec if refill_per_sec > 0 else 3600.0)
+            self._buckets[key] = (tokens, now, full_at)
+            self._evict(now)
+
+        if allowed:
+            return RateDecision(True)
+        return RateDecision(False, _retry_after(tokens, refill_per_sec))
+
+    async def take(self, key: str, capacity: int, refill_per_sec: float) -> RateDecision:
+        return self.take_sync(key, capacity, refill_per_sec)
+
+    def allow_window(self, key: str, limit: int, window_seconds: int) -> bool:
+        now = time.time()
+        with self._lock:
+            q = self._hits.pop(key, None) or deque()
+            while q and (now - q[0]) > window_seconds:
+                q.popleft()
+            allowed = len(q) < limit
+            if allowed:
+                q.append(now)
+            if q:
+                self._hits[key] = q
+            while len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+        return allowed
+
+
+# app.rate_limit_take (alembic 0013) locks the bucket row, so concurrent
+# workers never hand out the same token.
+_TAKE_SQL = "SELECT allowed, tokens FROM app.rate_limit_take(%s, %s, %s)"
+
+_CLEANUP_SQL = "DELETE FROM app.rate_limit_buckets WHERE expires_at < now()"
+
 
-    elapsed = max(0.0, now - last)
-    tokens = min(float(capacity), tokens + elapsed * refill_per_sec)
+class PostgresRateLimiter:
+    """
+    Token buckets in the UNLOGGED table app.rate_limit_buckets (alembic 0013),
+    shared by every worker on the database. Fails open: if the database is
+    unavailable the request is allowed and rate_limit_backend_errors_total
+    is incremented.
 
-    if tokens < 1.0:
-        _buckets[key] = (tokens, now)
-        return False
+    Uses its own pool (RATE_LIMIT_DB_POOL_MAX_SIZE, metrics pool
+    "rate_limit"), not the request pool: the bucket is taken before the
+    route runs, and must not wait behind (or starve) the handlers. Size it
+    like the request pool: every limited request takes a connection here
+    first, and a checkout timeout fails open, so alert on
+    rate_limit_backend_errors_total (docs/PRODUCTION_RUNBOOK.md).
+    """
 
-    _buckets[key] = (tokens - 1.0, now)
-    return True
+    name = "postgres"
+
+    def __init__(self, cleanup_every: int = 1000):
+        self.cleanup_every = max(1, int(cleanup_every))
+        self._calls = 0
+        self._calls_lock = threading.Lock()
+        self._pool: InstrumentedPool | None = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> InstrumentedPool:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = InstrumentedPool(
+                        settings.DATABASE_URL,
+                        name="rate_limit",
+                        min_size=0,
+                        max_size=settings.RATE_LIMIT_DB_POOL_MAX_SIZE,
+                        max_lifetime_s=settings.DB_POOL_MAX_LIFETIME_S,
+                        checkout_timeout_s=settings.RATE_LIMIT_DB_CHECKOUT_TIMEOUT_S,
+                        connect_kwargs=session_connect_kwargs(),
+                    )
+        return self._pool
+
+    def close(self) -> None:
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.closeall()
+
+    def take_sync(self, key: str, capacity: int, refill_per_sec: float) -> RateDecision:
+        refill = max(float(refill_per_sec), 1e-6)
+        # take_sync runs on the anyio threadpool
+        with self._calls_lock:
+            self._calls += 1
+            cleanup = self._calls % self.cleanup_every == 0
+        try:
+            pool = self._get_pool()
+            conn = pool.getconn()
+            try:
+                # single statement: skip the BEGIN/COMMIT round trips (this pool
+                # is only used here, so its connections simply stay autocommit)
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(_TAKE_SQL, (key, float(capacity), refill))
+                    allowed, tokens = cur.fetchone()
+                    if cleanup:
+                        cur.execute(_CLEANUP_SQL)
+            finally:
+                pool.putconn(conn)
+        except Exception:
+            increment_rate_limit_backend_error(self.name)
+            logger.warning("rate limit backend unavailable; allowing key=%s", key, exc_info=True)
+            return RateDecision(True)
+
+        if allowed:
+            return RateDecision(True)
+        return RateDecision(False, _retry_after(float(tokens), refill))
+
+    async def take(self, key: str, capacity: int, refill_per_sec: float) -> RateDecision:
+        return await to_thread.run_sync(self.take_sync, key, capacity, refill_per_sec)
+
+
+_local = MemoryRateLimiter()
+_limiter: RateLimiterBackend | None = None
+
+
+def get_rate_limiter() -> RateLimiterBackend:
+    """
+    Backend selected by RATE_LIMIT_BACKEND (memory | postgres).
+    """
+    global _limiter, _local
+    if _limiter is None:
+        if settings.RATE_LIMIT_BACKEND == "postgres":
+            _limiter = PostgresRateLimiter()
+        else:
+            _local = MemoryRateLimiter(max_keys=settings.RATE_LIMIT_MEMORY_MAX_KEYS)
+            _limiter = _local
+    return _limiter
+
+
+def close_rate_limiter() -> None:
+    """
+    Closes the postgres backend's pool, if one was opened (app shutdown).
+    """
+    if isinstance(_limiter, PostgresRateLimiter):
+        _limiter.close()
+
+
+def reset_rate_limiter() -> None:
+    global _limiter, _local
+    close_rate_limiter()
+    _limiter = None
+    _local = MemoryRateLimiter()
+
+
+def allow(key: str, limit: int, window_seconds: int) -> bool:
+    """
+    Process-local sliding window (bounded, see MemoryRateLimiter).
+    """
+    return _local.allow_window(key, limit, window_seconds)
+
+
+def allow_token_bucket(key: str, capacity: int, refill_per_sec: float) -> bool:
+    """
+    Process-local token bucket (bounded, see MemoryRateLimiter).
+    """
+    return _local.take_sync(key, capacity, refill_per_sec).allowed
@@ -78,7 +78,7 @@ def export_payouts_csv(
     """
 
     def _rows():
-        with get_conn() as conn:
+        with get_conn(readonly=True) as conn:
             with conn.cursor() as cur:
                 set_db_actor(cur, admin.user_id)
                 cur.execute(sql, (from_date, to_date))
@@ -125,7 +125,7 @@ def export_ledger_csv(
     """
 
     def _rows():
-        with get_conn() as conn:
+        with get_conn(readonly=True) as conn:
             with conn.cursor() as cur:
                 set_db_actor(cur, admin.user_id)
                 cur.execute(sql, (from_date, to_date))
@@ -179,6 +179,51 @@ def admin_process_payouts_once(
     return {"processed": processed}
 
 
+@router.get("/payout-workers")
+def admin_list_payout_workers(_admin=Depends(require_admin)):
+    """
+    Registered payout worker processes (alembic 0017) with their shards.
+    Workers whose heartbeat has lapsed stay listed until a live one expires them.
+    """
+    with get_conn(readonly=True) as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(
+                """
+                SELECT
+                  w.worker_id,
+                  w.hostname,
+                  w.pid,
+                  w.started_at,
+                  w.heartbeat_at,
+                  w.processed_total,
+                  w.last_batch_size,
+                  COALESCE(array_agg(s.shard ORDER BY s.shard) FILTER (WHERE s.shard IS NOT NULL), '{}') AS shards
+                FROM app.payout_workers w
+                LEFT JOIN app.payout_worker_shards s ON s.worker_id = w.worker_id
+                GROUP BY w.worker_id
+                ORDER BY w.started_at, w.worker_id
+                """
+            )
+            rows = cur.fetchall() or []
+            cur.execute("SELECT count(*) AS n FROM app.payout_worker_shards WHERE worker_id IS NULL")
+            unassigned = int(cur.fetchone()["n"])
+
+    workers = [
+        {
+            "worker_id": r["worker_id"],
+            "hostname": r["hostname"],
+            "pid": r["pid"],
+            "started_at": r["started_at"].isoformat(),
+            "heartbeat_at": r["heartbeat_at"].isoformat(),
+            "processed_total": int(r["processed_total"]),
+            "last_batch_size": int(r["last_batch_size"]),
+            "shards": list(r["shards"]),
+        }
+        for r in rows
+    ]
+    return {"workers": workers, "count": len(workers), "unassigned_shards": unassigned}
+
+
 @router.get("/payouts")
 def admin_list_payouts(
     status: str | None = Query(None),
@@ -228,7 +273,7 @@ def admin_list_payouts(
     """
     params.extend([limit, offset])
 
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute(sql, params)
             rows = cur.fetchall() or []
@@ -269,7 +314,7 @@ def admin_list_payout_webhook_events(
         LIMIT %s
     """
 
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute(payout_sql, (str(transaction_id),))
             payout = cur.fetchone()
@@ -2,6 +2,7 @@
 
 
 # routes/mock_tmoney.py
+# Dev-only TMoney mock mounted in the API; app/simulator covers all providers with faults and callbacks.
 from __future__ import annotations
 
 from fastapi import APIRouter, Request
@@ -9,10 +9,12 @@ import logging
 
 from fastapi import APIRouter, Header, HTTPException, Depends, Request
 from fastapi.responses import JSONResponse
+from psycopg2 import errors as pg_errors
 from psycopg2.extras import Json as Psycopg2Json
 
 from deps.auth import get_current_user, CurrentUser
 from db import get_conn
+from db_prepared import PreparedStatement
 from db_session import set_db_actor
 from settings import settings, FX_STATIC_RATES
 from schemas import (
@@ -40,7 +42,12 @@ from services.corridors import validate_cash_out_corridor, CURRENCY_RULES
 from services.db_errors import raise_http_from_db_error
 from services.idempotency import get_idempotency, store_idempotency, request_hash, idempotency_conflict
 from services.metrics import increment_idempotency_replay
-from services.velocity import check_cash_in_velocity, check_cash_out_velocity
+from services.velocity import (
+    cash_out_limits,
+    cash_out_window_start,
+    check_cash_in_velocity,
+    check_cash_out_velocity,
+)
 
 router = APIRouter(prefix="/v1", tags=["payments"])
 
@@ -298,6 +305,84 @@ def _cashout_fee_cents(cur, txn_id: str) -> int:
     return int(row[0] or 0) if row else 0
 
 
+_CASH_OUT_SINGLE_ROUND_TRIP = PreparedStatement(
+    "cash_out_mobile_money",
+    """
+    SELECT app.cash_out_mobile_money(
+      %s::uuid, %s::uuid,
+      %s::bigint, %s::ledger.country_code,
+      %s::text, %s::text, %s::text,
+      %s::text, %s::text, %s::text, %s::uuid,
+      %s::timestamptz, %s::integer, %s::bigint, %s::integer,
+      %s::text, %s::text, %s::bigint
+    )
+    """,
+)
+
+
+def _post_cash_out_single_round_trip(
+    conn,
+    *,
+    body: CashOutRequest,
+    user_id: str,
+    country: str,
+    provider_code: str,
+    provider_ref: str,
+    idem: str,
+    route_key: str,
+    req_hash: str,
+) -> dict | None:
+    """
+    Runs the whole cash-out (idempotency, velocity, posting, fee, FX quote,
+    payout row, idempotency store) as one autocommit statement, so there is
+    no separate BEGIN/COMMIT either. Returns the function's jsonb result, or
+    None when migration 0012 is not applied yet.
+    """
+    payout_currency = CURRENCY_RULES.get(country.upper(), {}).get("payout")
+    static_rate = FX_STATIC_RATES.get(("USD", payout_currency)) if payout_currency else None
+    static_receive_minor = (
+        int(round(int(body.amount_cents) * float(static_rate))) if static_rate is not None else None
+    )
+    max_count, max_amount, max_receivers = cash_out_limits()
+
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            _CASH_OUT_SINGLE_ROUND_TRIP.execute(
+                cur,
+                (
+                    str(body.wallet_id),
+                    user_id,
+                    int(body.amount_cents),
+                    country,
+                    idem,
+                    route_key,
+                    req_hash,
+                    provider_ref,
+                    provider_code,
+                    body.phone_e164,
+                    str(settings.SYSTEM_OWNER_ID),
+                    cash_out_window_start(),
+                    max_count,
+                    max_amount,
+                    max_receivers,
+                    payout_currency,
+                    str(static_rate) if static_rate is not None else None,
+                    static_receive_minor,
+                ),
+            )
+            return cur.fetchone()[0]
+    except pg_errors.UndefinedFunction as e:
+        # only the function itself missing; a lookup failing inside its body is a real error
+        if not (e.diag.message_primary or "").startswith("function app.cash_out_mobile_money("):
+            raise
+        # tried again on the next cash-out, so applying the migration takes effect without a restart
+        logger.warning("app.cash_out_mobile_money missing (run alembic upgrade); using multi-statement cash-out")
+        return None
+    finally:
+        conn.autocommit = False
+
+
 def _cashout_fx_quote(
     cur,
     amount_cents: int,
@@ -399,6 +484,32 @@ def cash_out_mobile_money(
 
     try:
         with get_conn() as conn:
+            result = None
+            if settings.CASHOUT_SINGLE_ROUND_TRIP:
+                result = _post_cash_out_single_round_trip(
+                    conn,
+                    body=body,
+                    user_id=str(user.user_id),
+                    country=country,
+                    provider_code=provider_code,
+                    provider_ref=provider_ref,
+                    idem=idem,
+                    route_key=route_key,
+                    req_hash=req_hash,
+                )
+            if result is not None:
+                outcome = result.get("outcome")
+                if outcome == "REPLAY":
+                    if result.get("request_hash") and result["request_hash"] != req_hash:
+                        raise HTTPException(status_code=409, detail="IDEMPOTENCY_CONFLICT")
+                    increment_idempotency_replay(route_key)
+                    return JSONResponse(status_code=result["status_code"], content=result["response_json"])
+                if outcome == "IDEMPOTENCY_CONFLICT":
+                    raise HTTPException(status_code=409, detail="IDEMPOTENCY_CONFLICT")
+                if outcome == "VELOCITY_LIMIT_EXCEEDED":
+                    raise HTTPException(status_code=429, detail="VELOCITY_LIMIT_EXCEEDED")
+                return CashOutResponse(**result["response_json"])
+
             cached = get_idempotency(
                 conn,
                 user_id=str(user.user_id),
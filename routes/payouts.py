@@ -13,7 +13,7 @@ from pydantic import BaseModel
 
 from schemas import CashOutQuote
 
-from db import get_conn
+from db_async import get_async_conn
 from deps.auth import get_current_user, CurrentUser
 
 logger = logging.getLogger("nexapay")
@@ -61,9 +61,9 @@ class PayoutDetailResponse(BaseModel):
     quote: Optional[CashOutQuote] = None
 
 
-def _rollback_quiet(conn) -> None:
+async def _rollback_quiet(conn) -> None:
     try:
-        conn.rollback()
+        await conn.rollback()
     except Exception:
         pass
 
@@ -72,7 +72,7 @@ def _qident(name: str) -> str:
     return '"' + name.replace('"', '""') + '"'
 
 
-def _discover_wallet_table(cur) -> Tuple[str, str, str]:
+async def _discover_wallet_table(cur) -> Tuple[str, str, str]:
     """
     Find a table/view that contains:
       - owner_id
@@ -80,7 +80,7 @@ def _discover_wallet_table(cur) -> Tuple[str, str, str]:
     Prefer schema=ledger, then app; prefer tables with 'wallet' in name.
     Returns: (schema, table, wallet_id_column)
     """
-    cur.execute(
+    await cur.execute(
         """
         WITH cols AS (
           SELECT
@@ -111,22 +111,22 @@ def _discover_wallet_table(cur) -> Tuple[str, str, str]:
         LIMIT 1;
         """
     )
-    row = cur.fetchone()
+    row = await cur.fetchone()
     if not row:
         raise HTTPException(status_code=500, detail="WALLETS_TABLE_NOT_FOUND")
     return str(row[0]), str(row[1]), str(row[2])
 
 
-def _assert_wallet_owned_by_user(cur, conn, wallet_id: UUID, user_id: UUID) -> None:
+async def _assert_wallet_owned_by_user(cur, conn, wallet_id: UUID, user_id: UUID) -> None:
     """
     Ownership check without relying on DB session actor.
     """
     try:
-        schema, table, wallet_col = _discover_wallet_table(cur)
+        schema, table, wallet_col = await _discover_wallet_table(cur)
         ref = f"{_qident(schema)}.{_qident(table)}"
         col = _qident(wallet_col)
 
-        cur.execute(
+        await cur.execute(
             f"""
             SELECT 1
             FROM {ref}
@@ -136,23 +136,23 @@ def _assert_wallet_owned_by_user(cur, conn, wallet_id: UUID, user_id: UUID) -> N
             """,
             (str(wallet_id), str(user_id)),
         )
-        ok = cur.fetchone()
+        ok = await cur.fetchone()
         if not ok:
             raise HTTPException(status_code=404, detail="WALLET_NOT_FOUND")
 
     except HTTPException:
         raise
     except Exception as e:
-        _rollback_quiet(conn)
+        await _rollback_quiet(conn)
         raise HTTPException(status_code=500, detail=f"WALLET_OWNERSHIP_CHECK_FAILED: {type(e).__name__}: {e}")
 
 
-def _discover_entries_table(cur) -> Tuple[str, str]:
+async def _discover_entries_table(cur) -> Tuple[str, str]:
     """
     Find one table/view that has BOTH transaction_id and wallet_id.
     Prefer schema ledger/app; prefer names containing entry/entr.
     """
-    cur.execute(
+    await cur.execute(
         """
         WITH cols AS (
           SELECT
@@ -181,41 +181,41 @@ def _discover_entries_table(cur) -> Tuple[str, str]:
         LIMIT 1;
         """
     )
-    row = cur.fetchone()
+    row = await cur.fetchone()
     if not row:
         raise HTTPException(status_code=500, detail="LEDGER_ENTRIES_TABLE_NOT_FOUND")
     return str(row[0]), str(row[1])
 
 
-def _wallet_id_for_tx(cur, entry_ref: str, tx_id: UUID) -> UUID:
-    cur.execute(
+async def _wallet_id_for_tx(cur, entry_ref: str, tx_id: UUID) -> UUID:
+    await cur.execute(
         f"SELECT wallet_id FROM {entry_ref} WHERE transaction_id=%s::uuid LIMIT 1;",
         (str(tx_id),),
     )
-    row = cur.fetchone()
+    row = await cur.fetchone()
     if not row or not row[0]:
         raise HTTPException(status_code=404, detail="Payout not found")
     return UUID(str(row[0]))
 
 
 @router.get("/payouts/{transaction_id}", response_model=PayoutDetailResponse)
-def get_payout_by_transaction_id(
+async def get_payout_by_transaction_id(
     transaction_id: UUID,
     response: Response,
     user: CurrentUser = Depends(get_current_user),
 ):
     response.headers["X-Nepxy-Payouts-Version"] = PAYOUTS_ROUTE_VERSION
 
-    with get_conn() as conn:
-        _rollback_quiet(conn)
-        with conn.cursor() as cur:
-            entry_schema, entry_table = _discover_entries_table(cur)
+    async with get_async_conn(readonly=True) as conn:
+        await _rollback_quiet(conn)
+        async with conn.cursor() as cur:
+            entry_schema, entry_table = await _discover_entries_table(cur)
             entry_ref = f"{_qident(entry_schema)}.{_qident(entry_table)}"
 
-            wallet_id = _wallet_id_for_tx(cur, entry_ref, transaction_id)
-            _assert_wallet_owned_by_user(cur, conn, wallet_id, user.user_id)
+            wallet_id = await _wallet_id_for_tx(cur, entry_ref, transaction_id)
+            await _assert_wallet_owned_by_user(cur, conn, wallet_id, user.user_id)
 
-            cur.execute(
+            await cur.execute(
                 """
                 SELECT
                   p.transaction_id,
@@ -240,7 +240,7 @@ def get_payout_by_transaction_id(
                 """,
                 (str(transaction_id),),
             )
-            row = cur.fetchone()
+            row = await cur.fetchone()
             if not row:
                 raise HTTPException(status_code=404, detail="Payout not found")
 
@@ -274,7 +274,7 @@ def get_payout_by_transaction_id(
 
 
 @router.get("/wallets/{wallet_id}/payouts", response_model=PayoutListResponse)
-def list_wallet_payouts(
+async def list_wallet_payouts(
     wallet_id: UUID,
     response: Response,
     limit: int = Query(30, ge=1, le=200),
@@ -282,19 +282,19 @@ def list_wallet_payouts(
 ):
     response.headers["X-Nepxy-Payouts-Version"] = PAYOUTS_ROUTE_VERSION
 
-    with get_conn() as conn:
+    async with get_async_conn(readonly=True) as conn:
         # Always reset transaction state in case the connection was previously aborted
-        _rollback_quiet(conn)
+        await _rollback_quiet(conn)
 
-        with conn.cursor() as cur:
+        async with conn.cursor() as cur:
             # ✅ ownership check without db_session actor
-            _assert_wallet_owned_by_user(cur, conn, wallet_id, user.user_id)
+            await _assert_wallet_owned_by_user(cur, conn, wallet_id, user.user_id)
 
-            entry_schema, entry_table = _discover_entries_table(cur)
+            entry_schema, entry_table = await _discover_entries_table(cur)
             entry_ref = f"{_qident(entry_schema)}.{_qident(entry_table)}"
 
             try:
-                cur.execute(
+                await cur.execute(
                     f"""
                     SELECT
                       p.transaction_id,
@@ -322,9 +322,9 @@ def list_wallet_payouts(
                     """,
                     (str(wallet_id), limit),
                 )
-                rows = cur.fetchall() or []
+                rows = await cur.fetchall() or []
             except Exception as e:
-                _rollback_quiet(conn)
+                await _rollback_quiet(conn)
                 logger.exception("payouts query failed wallet=%s entries=%s", wallet_id, entry_ref)
                 raise HTTPException(
                     status_code=500,
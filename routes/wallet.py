@@ -7,9 +7,9 @@ from uuid import UUID
 from typing import Optional
 
 from deps.auth import get_current_user, CurrentUser
-from db import get_conn
-from db_session import set_db_actor
-from db_exec import db_fetchall, db_fetchone
+from db_async import get_async_conn
+from db_session import set_db_actor_async
+from db_exec import db_fetchall_async, db_fetchone_async
 from schemas import (
     WalletListResponse, WalletItem,
     WalletBalanceResponse,
@@ -21,13 +21,13 @@ router = APIRouter(prefix="/v1", tags=["wallets"])
 
 
 @router.get("/wallets", response_model=WalletListResponse)
-def list_my_wallets(user: CurrentUser = Depends(get_current_user)):
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            set_db_actor(cur, user.user_id)
+async def list_my_wallets(user: CurrentUser = Depends(get_current_user)):
+    async with get_async_conn(readonly=True) as conn:
+        async with conn.cursor() as cur:
+            await set_db_actor_async(cur, user.user_id)
 
         # This MUST run on same conn
-        rows = db_fetchall(conn, "SELECT * FROM ledger.get_my_wallets_secure();", ())
+        rows = await db_fetchall_async(conn, "SELECT * FROM ledger.get_my_wallets_secure();", ())
 
     return WalletListResponse(
         wallets=[
@@ -45,29 +45,29 @@ def list_my_wallets(user: CurrentUser = Depends(get_current_user)):
 
 
 @router.get("/wallets/{wallet_id}/balance", response_model=WalletBalanceResponse)
-def wallet_balance(wallet_id: UUID, user: CurrentUser = Depends(get_current_user)):
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            set_db_actor(cur, user.user_id)
+async def wallet_balance(wallet_id: UUID, user: CurrentUser = Depends(get_current_user)):
+    async with get_async_conn(readonly=True) as conn:
+        async with conn.cursor() as cur:
+            await set_db_actor_async(cur, user.user_id)
 
-        row = db_fetchone(conn, "SELECT ledger.get_available_balance_secure(%s::uuid);", (str(wallet_id),))
+        row = await db_fetchone_async(conn, "SELECT ledger.get_available_balance_secure(%s::uuid);", (str(wallet_id),))
         bal = row[0] if row else 0
 
     return WalletBalanceResponse(wallet_id=wallet_id, balance_cents=int(bal))
 
 
 @router.get("/wallets/{wallet_id}/transactions", response_model=WalletTxnPage)
-def wallet_transactions(
+async def wallet_transactions(
     wallet_id: UUID,
     limit: int = 50,
     cursor: Optional[str] = None,
     user: CurrentUser = Depends(get_current_user),
 ):
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            set_db_actor(cur, user.user_id)
+    async with get_async_conn(readonly=True) as conn:
+        async with conn.cursor() as cur:
+            await set_db_actor_async(cur, user.user_id)
 
-        rows = db_fetchall(
+        rows = await db_fetchall_async(
             conn,
             "SELECT * FROM ledger.get_wallet_transactions_secure(%s::uuid, %s::int, %s::text);",
             (str(wallet_id), int(limit), cursor),
@@ -94,17 +94,17 @@ def wallet_transactions(
 
 
 @router.get("/wallets/{wallet_id}/activity", response_model=WalletActivityPage)
-def wallet_activity(
+async def wallet_activity(
     wallet_id: UUID,
     limit: int = 50,
     cursor: Optional[str] = None,
     user: CurrentUser = Depends(get_current_user),
 ):
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            set_db_actor(cur, user.user_id)
+    async with get_async_conn(readonly=True) as conn:
+        async with conn.cursor() as cur:
+            await set_db_actor_async(cur, user.user_id)
 
-        rows = db_fetchall(
+        rows = await db_fetchall_async(
             conn,
             "SELECT * FROM ledger.get_wallet_activity_secure(%s::uuid, %s::int, %s::text);",
             (str(wallet_id), int(limit), cursor),
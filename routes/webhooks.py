@@ -13,13 +13,13 @@ from datetime import datetime, timezone
 from typing import Any
 
 from fastapi import APIRouter, Request, HTTPException
-from psycopg2.extras import Json
+from psycopg.types.json import Jsonb
 
-from db import get_conn
+from db_async import get_async_conn
 
 from app.payouts.repository import (
-    update_status_by_any_ref,
-    get_payout_by_any_ref,
+    update_status_by_any_ref_async,
+    get_payout_by_any_ref_async,
 )
 from app.providers.mobile_money.thunes import ThunesProvider
 from settings import settings
@@ -27,8 +27,8 @@ from settings import settings
 # IMPORTANT:
 # This existing function in your repo logs a "detailed" webhook audit record
 # (likely in a different table than app.webhook_events).
-from app.webhooks.repository import insert_webhook_event as insert_webhook_audit_event
-from services.metrics import increment_webhook_event
+from app.webhooks.repository import insert_webhook_event_async as insert_webhook_audit_event
+from services.metrics import increment_webhook_event, observe_payout_time_to_confirm
 from services.redaction import redact_text
 
 
@@ -147,7 +147,7 @@ def _verify_signature(*, raw: bytes, signature_header: str | None, secret: str |
     return True, None
 
 
-def _insert_admin_webhook_event(
+async def _insert_admin_webhook_event(
     conn,
     *,
     provider: str,
@@ -166,8 +166,8 @@ def _insert_admin_webhook_event(
     event_id = str(uuid.uuid4())
     received_at = datetime.now(timezone.utc)
 
-    with conn.cursor() as cur:
-        cur.execute(
+    async with conn.cursor() as cur:
+        await cur.execute(
             """
             INSERT INTO app.webhook_events
                 (id, provider, external_ref, provider_ref, status_raw, payload, payload_json, headers, received_at, signature_valid, payload_summary)
@@ -180,19 +180,19 @@ def _insert_admin_webhook_event(
                 external_ref,
                 provider_ref,
                 status_raw,
-                Json(payload) if payload is not None else Json({}),
-                Json(payload) if payload is not None else Json({}),
-                Json(headers or {}),
+                Jsonb(payload) if payload is not None else Jsonb({}),
+                Jsonb(payload) if payload is not None else Jsonb({}),
+                Jsonb(headers or {}),
                 received_at,
                 bool(signature_valid),
-                Json(payload_summary or {}),
+                Jsonb(payload_summary or {}),
             ),
         )
 
     return event_id
 
 
-def _log_both_tables(
+async def _log_both_tables(
     conn,
     *,
     provider: str,
@@ -215,7 +215,7 @@ def _log_both_tables(
     ignore_reason: str | None = None,
 ):
     # 1) Minimal admin table insert (this is what fixes your failing tests)
-    _insert_admin_webhook_event(
+    await _insert_admin_webhook_event(
         conn,
         provider=provider,
         headers=headers,
@@ -228,7 +228,7 @@ def _log_both_tables(
     )
 
     # 2) Your existing detailed audit insert (kept as-is)
-    insert_webhook_audit_event(
+    await insert_webhook_audit_event(
         conn,
         provider=provider,
         path=str(req.url.path),
@@ -315,8 +315,8 @@ async def _handle_mobile_money_webhook(req: Request, *, provider: str):
     # If secret missing, log and 500 (deployment misconfig)
     if sig_err == "WEBHOOK_SECRET_NOT_CONFIGURED":
         _log_summary(False, sig_err)
-        with get_conn() as conn:
-            _log_both_tables(
+        async with get_async_conn() as conn:
+            await _log_both_tables(
                 conn,
                 provider=provider,
                 req=req,
@@ -333,14 +333,14 @@ async def _handle_mobile_money_webhook(req: Request, *, provider: str):
                 ignored=True,
                 ignore_reason=sig_err,
             )
-            conn.commit()
+            await conn.commit()
         raise HTTPException(status_code=500, detail={"error": sig_err, "provider": provider})
 
     # Missing/invalid signature -> log and 401
     if not sig_ok:
         _log_summary(False, sig_err)
-        with get_conn() as conn:
-            _log_both_tables(
+        async with get_async_conn() as conn:
+            await _log_both_tables(
                 conn,
                 provider=provider,
                 req=req,
@@ -357,14 +357,14 @@ async def _handle_mobile_money_webhook(req: Request, *, provider: str):
                 ignored=True,
                 ignore_reason=sig_err,
             )
-            conn.commit()
+            await conn.commit()
         raise HTTPException(status_code=401, detail={"error": sig_err})
 
     # From here: signature valid, now enforce valid JSON object
     if payload_obj is None:
         _log_summary(True, "INVALID_JSON")
-        with get_conn() as conn:
-            _log_both_tables(
+        async with get_async_conn() as conn:
+            await _log_both_tables(
                 conn,
                 provider=provider,
                 req=req,
@@ -381,13 +381,13 @@ async def _handle_mobile_money_webhook(req: Request, *, provider: str):
                 ignored=True,
                 ignore_reason="INVALID_JSON",
             )
-            conn.commit()
+            await conn.commit()
         raise HTTPException(status_code=400, detail={"error": "INVALID_JSON", "body": body_raw_str})
 
     if not isinstance(payload_obj, dict):
         _log_summary(True, "INVALID_JSON_OBJECT")
-        with get_conn() as conn:
-            _log_both_tables(
+        async with get_async_conn() as conn:
+            await _log_both_tables(
                 conn,
                 provider=provider,
                 req=req,
@@ -404,15 +404,15 @@ async def _handle_mobile_money_webhook(req: Request, *, provider: str):
                 ignored=True,
                 ignore_reason="INVALID_JSON_OBJECT",
             )
-            conn.commit()
+            await conn.commit()
         raise HTTPException(status_code=400, detail={"error": "INVALID_JSON_OBJECT"})
 
     provider_ref, external_ref, status_raw = _extract_refs(payload_obj)
 
     if not status_raw:
         _log_summary(True, "MISSING_STATUS")
-        with get_conn() as conn:
-            _log_both_tables(
+        async with get_async_conn() as conn:
+            await _log_both_tables(
                 conn,
                 provider=provider,
                 req=req,
@@ -429,13 +429,13 @@ async def _handle_mobile_money_webhook(req: Request, *, provider: str):
                 ignored=True,
                 ignore_reason="MISSING_STATUS",
             )
-            conn.commit()
+            await conn.commit()
         raise HTTPException(status_code=400, detail={"error": "MISSING_STATUS"})
 
     if not provider_ref and not external_ref:
         _log_summary(True, "MISSING_PROVIDER_REF_OR_EXTERNAL_REF")
-        with get_conn() as conn:
-            _log_both_tables(
+        async with get_async_conn() as conn:
+            await _log_both_tables(
                 conn,
                 provider=provider,
                 req=req,
@@ -452,13 +452,13 @@ async def _handle_mobile_money_webhook(req: Request, *, provider: str):
                 ignored=True,
                 ignore_reason="MISSING_PROVIDER_REF_OR_EXTERNAL_REF",
             )
-            conn.commit()
+            await conn.commit()
         raise HTTPException(status_code=400, detail={"error": "MISSING_PROVIDER_REF_OR_EXTERNAL_REF"})
 
     new_status, retryable, last_error, next_retry_at = _map_provider_status(status_raw, provider=provider)
 
-    with get_conn() as conn:
-        existing = get_payout_by_any_ref(conn, provider_ref=provider_ref, external_ref=external_ref)
+    async with get_async_conn() as conn:
+        existing = await get_payout_by_any_ref_async(conn, provider_ref=provider_ref, external_ref=external_ref)
         status_before = existing.get("status") if existing else None
         tx_id = existing.get("transaction_id") if existing else None
 
@@ -473,7 +473,7 @@ async def _handle_mobile_money_webhook(req: Request, *, provider: str):
             ignore_reason = "PAYOUT_NOT_FOUND"
 
             _log_summary(True, ignore_reason)
-            _log_both_tables(
+            await _log_both_tables(
                 conn,
                 provider=provider,
                 req=req,
@@ -494,7 +494,7 @@ async def _handle_mobile_money_webhook(req: Request, *, provider: str):
                 ignored=True,
                 ignore_reason=ignore_reason,
             )
-            conn.commit()
+            await conn.commit()
 
             return {
                 "ok": True,
@@ -507,7 +507,7 @@ async def _handle_mobile_money_webhook(req: Request, *, provider: str):
             }
 
         # Try update (no terminal override)
-        ok = update_status_by_any_ref(
+        ok = await update_status_by_any_ref_async(
             conn,
             provider_ref=provider_ref,
             external_ref=external_ref,
@@ -528,10 +528,13 @@ async def _handle_mobile_money_webhook(req: Request, *, provider: str):
                 ignore_reason = "NOT_UPDATED"
         else:
             update_applied = True
-            refreshed = get_payout_by_any_ref(conn, provider_ref=provider_ref, external_ref=external_ref)
+            refreshed = await get_payout_by_any_ref_async(conn, provider_ref=provider_ref, external_ref=external_ref)
             status_after = refreshed.get("status") if refreshed else None
+            if status_after == "CONFIRMED" and status_before != "CONFIRMED" and refreshed.get("created_at"):
+                age_s = (datetime.now(timezone.utc) - refreshed["created_at"]).total_seconds()
+                observe_payout_time_to_confirm(provider, "webhook", age_s)
 
-        _log_both_tables(
+        await _log_both_tables(
             conn,
             provider=provider,
             req=req,
@@ -553,7 +556,7 @@ async def _handle_mobile_money_webhook(req: Request, *, provider: str):
             ignore_reason=ignore_reason,
         )
 
-        conn.commit()
+        await conn.commit()
 
     _log_summary(True, unsigned_reason)
     resp = {
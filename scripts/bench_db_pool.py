@@ -0,0 +1,115 @@
+"""
+Compare requests/sec of a sync handler on db.get_conn (threadpool + psycopg2
+ThreadedConnectionPool) against an async handler on db_async.get_async_conn.
+
+Runs in-process over httpx.ASGITransport, so no server is needed — only DATABASE_URL.
+
+Usage:
+  python scripts/bench_db_pool.py --concurrency 200 --requests 5000 --query-ms 2
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+import httpx
+from fastapi import FastAPI
+
+from db import get_conn, close_pool
+from db_async import get_async_conn, init_async_pool, close_async_pool
+
+
+def _build_app(query_ms: float) -> FastAPI:
+    app = FastAPI()
+    sleep_s = max(0.0, query_ms) / 1000.0
+
+    @app.get("/sync")
+    def sync_read():
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_sleep(%s), 1;", (sleep_s,))
+                row = cur.fetchone()
+        return {"ok": row[1]}
+
+    @app.get("/async")
+    async def async_read():
+        async with get_async_conn() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT pg_sleep(%s), 1;", (sleep_s,))
+                row = await cur.fetchone()
+        return {"ok": row[1]}
+
+    return app
+
+
+async def _run(client: httpx.AsyncClient, path: str, total: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    remaining = total
+    lock = asyncio.Lock()
+
+    async def worker() -> None:
+        nonlocal remaining, errors
+        while True:
+            async with lock:
+                if remaining <= 0:
+                    return
+                remaining -= 1
+            t0 = time.perf_counter()
+            try:
+                r = await client.get(path)
+                if r.status_code != 200:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "path": path,
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else 0.0,
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark sync vs async DB pool handlers.")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--query-ms", type=float, default=2.0, help="simulated DB time per request (pg_sleep)")
+    parser.add_argument("--warmup", type=int, default=200)
+    args = parser.parse_args()
+
+    app = _build_app(args.query_ms)
+    await init_async_pool()
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0) as client:
+        for path in ("/sync", "/async"):
+            await _run(client, path, args.warmup, min(args.concurrency, args.warmup))
+            result = await _run(client, path, args.requests, args.concurrency)
+            print(
+                f"{result['path']:<7} concurrency={args.concurrency} requests={result['requests']} "
+                f"errors={result['errors']} rps={result['rps']} "
+                f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms ({result['seconds']}s)"
+            )
+
+    await close_async_pool()
+    close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
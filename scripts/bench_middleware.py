@@ -0,0 +1,103 @@
+"""
+Per-request overhead of the middleware stack in main.create_app.
+
+Builds three copies of a trivial app and drives them in-process over
+httpx.ASGITransport (no server or database needed):
+  - bare:     no middleware
+  - basehttp: four pass-through BaseHTTPMiddleware layers (the wrapper cost
+              the old stack paid before doing any work)
+  - asgi:     the current pure-ASGI stack from middleware.py
+Reports mean/p99 microseconds per request for a JSON route and a
+StreamingResponse route.
+
+Usage:
+  python scripts/bench_middleware.py --requests 5000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from middleware import (
+    RateLimitMiddleware,
+    RequestContextMiddleware,
+    SecurityHeadersMiddleware,
+    StagingGateMiddleware,
+)
+
+
+class _PassThrough(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+def _build_app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse(iter([b"a,b\n"] * 50), media_type="text/csv")
+
+    if stack == "basehttp":
+        for _ in range(4):
+            app.add_middleware(_PassThrough)
+    elif stack == "asgi":
+        app.add_middleware(StagingGateMiddleware)
+        app.add_middleware(RateLimitMiddleware)
+        app.add_middleware(RequestContextMiddleware)
+        app.add_middleware(SecurityHeadersMiddleware)
+    return app
+
+
+async def _run(app: FastAPI, path: str, n: int) -> list[float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(200):  # warm up
+            await client.get(path)
+        timings = []
+        for _ in range(n):
+            started = time.perf_counter()
+            r = await client.get(path)
+            timings.append((time.perf_counter() - started) * 1e6)
+            assert r.status_code == 200, r.text
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark middleware overhead per request.")
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    # the access log line is part of RequestContextMiddleware but not what we measure
+    logging.getLogger("nexapay.http").setLevel(logging.WARNING)
+
+    for path in ("/ping", "/stream"):
+        baseline = None
+        for stack in ("bare", "basehttp", "asgi"):
+            timings = asyncio.run(_run(_build_app(stack), path, args.requests))
+            mean = statistics.fmean(timings)
+            p99 = statistics.quantiles(timings, n=100)[98]
+            baseline = mean if baseline is None else baseline
+            print(
+                f"{path:8} {stack:9} mean={mean:8.1f}us p99={p99:8.1f}us "
+                f"overhead={mean - baseline:7.1f}us/request"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Payout claim latency on a large app.mobile_money_payouts, with and without the
+claim-path partial indexes (alembic 0018 and 0020).
+
+Seeds --payouts rows against DATABASE_URL (provider_ref 'bench-claim-%'): mostly
+CONFIRMED/FAILED history, plus --in-flight-pct of PENDING (some backing off)
+and stale SENT rows. It then times claim_pending_payouts (FIFO and
+fair-share) and claim_stale_sent_payouts, first with the claim indexes
+dropped and then with them present. The fair-share claim ranks only a window
+of each provider's oldest rows (--fair-window, 0 = twice the batch size).
+Each phase runs in one transaction that is rolled back (the DDL included), so
+the schema is left as it was. Every claim runs in a
+savepoint that is rolled back, so each one sees the same queue. Seeded rows
+are deleted at the end unless --keep is given.
+
+Note: DROP INDEX holds an exclusive lock on the table for the duration of a
+phase. Run this against a scratch database, not a live one.
+
+Usage:
+  python scripts/bench_payout_claims.py --payouts 1000000 --iterations 50
+  python scripts/bench_payout_claims.py --no-seed --iterations 200   # reuse a --keep run
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+from app.payouts.repository import (
+    _CLAIM_PENDING,
+    _CLAIM_PENDING_FAIR,
+    _CLAIM_STALE_SENT,
+    claim_pending_payouts,
+    claim_pending_payouts_fair,
+    claim_stale_sent_payouts,
+)
+from db import close_pool, get_conn
+from settings import settings
+
+# Same definitions as alembic/versions/0018_payout_claim_indexes.py and 0020_payout_fair_claim_index.py
+CLAIM_INDEXES = {
+    "idx_mobile_money_payouts_pending_claim": (
+        "ON app.mobile_money_payouts (created_at) WHERE status = 'PENDING'"
+    ),
+    "idx_mobile_money_payouts_sent_claim": (
+        "ON app.mobile_money_payouts (next_retry_at NULLS FIRST, updated_at) WHERE status = 'SENT'"
+    ),
+    "idx_mobile_money_payouts_pending_provider_claim": (
+        "ON app.mobile_money_payouts ((upper(btrim(provider))), created_at) WHERE status = 'PENDING'"
+    ),
+}
+
+SEED_CHUNK = 100_000
+STALE_SECONDS = 60
+
+
+def _seed(n: int, in_flight_pct: float) -> None:
+    # in_flight_pct split evenly between PENDING and SENT; a third of the
+    # PENDING rows back off into the future and are not claimable
+    in_flight = max(0.0, min(100.0, in_flight_pct)) / 100.0
+    pending_cut = in_flight / 2
+    started = time.perf_counter()
+    for lo in range(1, n + 1, SEED_CHUNK):
+        hi = min(n, lo + SEED_CHUNK - 1)
+        with get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SET LOCAL statement_timeout = 0")
+            cur.execute(
+                """
+                INSERT INTO app.mobile_money_payouts (
+                  transaction_id, provider, phone_e164, provider_ref, status, amount_cents, currency,
+                  attempt_count, last_attempt_at, next_retry_at, created_at, updated_at
+                )
+                SELECT
+                  gen_random_uuid(),
+                  (ARRAY['TMONEY', 'FLOOZ', 'MTN_MOMO', 'THUNES'])[1 + g %% 4],
+                  '+22890000000',
+                  'bench-claim-' || g,
+                  s.status,
+                  1000,
+                  'XOF',
+                  1,
+                  s.created_at + interval '5 seconds',
+                  CASE WHEN s.status = 'PENDING' AND g %% 3 = 0 THEN now() + interval '1 hour' END,
+                  s.created_at,
+                  s.created_at + interval '5 seconds'
+                FROM (
+                  SELECT
+                    g,
+                    CASE
+                      WHEN r < %s THEN 'PENDING'
+                      WHEN r < %s THEN 'SENT'
+                      WHEN g %% 20 = 0 THEN 'FAILED'
+                      ELSE 'CONFIRMED'
+                    END AS status,
+                    now() - make_interval(secs => 90 * 86400 * random()) - interval '10 minutes' AS created_at
+                  FROM (SELECT g, random() AS r FROM generate_series(%s, %s) g) x
+                ) s
+                """,
+                (pending_cut, in_flight, lo, hi),
+            )
+        print(f"seeded {hi:>9}/{n} rows ({time.perf_counter() - started:6.1f}s)", flush=True)
+
+    with get_conn() as conn:
+        conn.cursor().execute("ANALYZE app.mobile_money_payouts")
+
+
+def _queue_sizes() -> tuple[int, int, int]:
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT count(*),
+                   count(*) FILTER (WHERE status = 'PENDING'),
+                   count(*) FILTER (WHERE status = 'SENT')
+            FROM app.mobile_money_payouts
+            """
+        )
+        return cur.fetchone()
+
+
+def _plan(cur, sql: str, params: tuple) -> str:
+    # the scan feeding the picked CTE: Seq Scan vs Index Scan
+    cur.execute("EXPLAIN " + sql, params)
+    lines = [r[0].strip() for r in cur.fetchall()]
+    scans = [line for line in lines if "Scan" in line and "mobile_money_payouts" in line]
+    return (scans[0] if scans else lines[0]).lstrip("-> ")
+
+
+def _phase(with_indexes: bool, iterations: int, batch_size: int, fair_window: int) -> dict[str, tuple[list[float], str]]:
+    results: dict[str, tuple[list[float], str]] = {}
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SET LOCAL statement_timeout = 0")
+        for name, definition in CLAIM_INDEXES.items():
+            if with_indexes:
+                cur.execute(f"CREATE INDEX IF NOT EXISTS {name} {definition}")
+            else:
+                cur.execute(f"DROP INDEX IF EXISTS app.{name}")
+        cur.execute("ANALYZE app.mobile_money_payouts")
+
+        claims = {
+            "pending": lambda: claim_pending_payouts(
+                conn, batch_size=batch_size, lease_owner="bench-claims", lease_seconds=300
+            ),
+            "pending_fair": lambda: claim_pending_payouts_fair(
+                conn, batch_size=batch_size, lease_owner="bench-claims", lease_seconds=300, window=fair_window
+            ),
+            "stale_sent": lambda: claim_stale_sent_payouts(
+                conn,
+                batch_size=batch_size,
+                stale_after_seconds=STALE_SECONDS,
+                lease_owner="bench-claims",
+                lease_seconds=300,
+            ),
+        }
+        plans = {
+            "pending": _plan(cur, _CLAIM_PENDING.sql, (1, [0], batch_size, "bench-claims", 300)),
+            "pending_fair": _plan(
+                cur,
+                _CLAIM_PENDING_FAIR.sql,
+                ([], [], [], 0, 1, [0], max(batch_size, fair_window or 2 * batch_size), batch_size, "bench-claims", 300),
+            ),
+            "stale_sent": _plan(
+                cur,
+                _CLAIM_STALE_SENT.sql,
+                (STALE_SECONDS, STALE_SECONDS, 1, [0], batch_size, "bench-claims", 300),
+            ),
+        }
+
+        for kind, claim in claims.items():
+            timings = []
+            for _ in range(iterations):
+                cur.execute("SAVEPOINT bench_claim")
+                started = time.perf_counter()
+                rows = claim()
+                timings.append((time.perf_counter() - started) * 1000.0)
+                cur.execute("ROLLBACK TO SAVEPOINT bench_claim")
+                if not rows:
+                    print(f"warning: {kind} claim returned no rows", flush=True)
+            results[kind] = (timings, plans[kind])
+        conn.rollback()  # undo the DDL: the schema is left as it was
+    return results
+
+
+def _report(label: str, results: dict[str, tuple[list[float], str]]) -> None:
+    for kind, (timings, plan) in results.items():
+        ordered = sorted(timings)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        print(
+            f"{label:16} {kind:10} p50={statistics.median(ordered):9.2f}ms "
+            f"p95={p95:9.2f}ms max={ordered[-1]:9.2f}ms  plan: {plan}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark payout claim queries against a large payouts table.")
+    parser.add_argument("--payouts", type=int, default=1_000_000)
+    parser.add_argument("--in-flight-pct", type=float, default=1.0, help="share of seeded rows that are PENDING/SENT")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--fair-window", type=int, default=0, help="WORKER_FAIR_SHARE_WINDOW for the fair claim")
+    parser.add_argument("--no-seed", action="store_true", help="reuse rows from an earlier --keep run")
+    parser.add_argument("--keep", action="store_true", help="leave the seeded rows in place")
+    args = parser.parse_args()
+
+    # plain statements: a prepared plan would outlive the DDL between phases
+    settings.DB_PREPARED_STATEMENTS = False
+    try:
+        if not args.no_seed:
+            _seed(args.payouts, args.in_flight_pct)
+        total, pending, sent = _queue_sizes()
+        print(f"table rows={total} pending={pending} sent={sent}")
+
+        without = _phase(False, args.iterations, args.batch_size, args.fair_window)
+        with_idx = _phase(True, args.iterations, args.batch_size, args.fair_window)
+        _report("without indexes", without)
+        _report("with indexes", with_idx)
+        for kind in without:
+            before = statistics.median(without[kind][0])
+            after = statistics.median(with_idx[kind][0])
+            print(f"{kind:10} p50 speedup x{before / after:.1f}")
+    finally:
+        if not args.keep and not args.no_seed:
+            with get_conn() as conn:
+                cur = conn.cursor()
+                cur.execute("SET LOCAL statement_timeout = 0")
+                cur.execute("DELETE FROM app.mobile_money_payouts WHERE provider_ref LIKE 'bench-claim-%'")
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Payout worker batch throughput against a latency-injecting fake provider.
+
+Drives payout_worker._dispatch in-process (no database or provider needed):
+get_provider returns a provider that sleeps --latency seconds per call, and
+the OutcomeBatch only records outcomes. Runs the same batch sequentially
+(WORKER_MAX_IN_FLIGHT=1) and with the configured per-provider caps, and checks
+both runs reach the same status/attempt_count for every payout.
+
+--status-writes instead times writing N outcomes against DATABASE_URL:
+one update_status per payout vs a single update_status_many.
+
+Usage:
+  python scripts/bench_payout_worker.py --payouts 50 --latency 0.2
+  python scripts/bench_payout_worker.py --status-writes --payouts 500
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, ".")
+
+from app.payouts.model import StatusUpdate
+from app.payouts.repository import update_status, update_status_many
+from app.providers.base import ProviderResult
+from app.workers import payout_worker
+from db import close_pool, get_conn
+from settings import settings
+
+PROVIDERS = ("TMONEY", "FLOOZ", "THUNES", "MTN_MOMO")
+
+
+class _SlowProvider:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def send_cashout(self, payout: dict):
+        time.sleep(self.latency)
+        return ProviderResult(status="SENT", provider_ref=f"bench-{uuid.uuid4()}", response={"http_status": 202})
+
+    def get_cashout_status(self, payout: dict):
+        time.sleep(self.latency)
+        return ProviderResult(status="CONFIRMED", provider_ref=payout.get("provider_ref"), response={"http_status": 200})
+
+
+def _batch(n: int) -> list[dict]:
+    rows = []
+    for i in range(n):
+        provider = PROVIDERS[i % len(PROVIDERS)]
+        rows.append(
+            {
+                "id": i,
+                "status": "PENDING" if i % 3 else "SENT",
+                "provider": provider,
+                "phone_e164": "+22890000000",
+                "provider_ref": f"bench-ref-{i}" if i % 3 == 0 else None,
+                "attempt_count": i % 2,
+            }
+        )
+    return rows
+
+
+class _Recorder(payout_worker.OutcomeBatch):
+    def __init__(self):
+        super().__init__(max_size=50, max_wait_s=0.2)
+        self.outcomes: dict = {}
+        self._rec_lock = threading.Lock()
+
+    def _write(self, batch: list[StatusUpdate]) -> None:
+        with self._rec_lock:
+            for u in batch:
+                self.outcomes[u.payout_id] = (u.new_status, u.attempt_count)
+
+
+def _run(rows: list[dict], overall: int) -> tuple[float, dict]:
+    out = _Recorder()
+    settings.WORKER_MAX_IN_FLIGHT = overall
+
+    jobs = [
+        (payout_worker._handle_pending if p["status"] == "PENDING" else payout_worker._handle_sent, p, p["status"])
+        for p in rows
+    ]
+    started = time.perf_counter()
+    payout_worker._dispatch(out, jobs)
+    out.flush()
+    return time.perf_counter() - started, out.outcomes
+
+
+def _bench_status_writes(n: int) -> None:
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO app.mobile_money_payouts (
+              transaction_id, provider, phone_e164, provider_ref, status, amount_cents, currency
+            )
+            SELECT gen_random_uuid(), 'TMONEY', '+22890000000', 'bench-status-' || g, 'SENT', 1000, 'XOF'
+            FROM generate_series(1, %s) g
+            RETURNING id
+            """,
+            (n,),
+        )
+        ids = [r[0] for r in cur.fetchall()]
+
+    try:
+        started = time.perf_counter()
+        with get_conn() as conn:
+            for payout_id in ids:
+                update_status(conn, payout_id=payout_id, from_status="SENT", new_status="SENT", retryable=True)
+        per_row = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with get_conn() as conn:
+            applied = update_status_many(
+                conn,
+                [StatusUpdate(payout_id=i, from_status="SENT", new_status="SENT", retryable=True) for i in ids],
+            )
+        batched = time.perf_counter() - started
+        assert all(applied)
+    finally:
+        with get_conn() as conn:
+            conn.cursor().execute("DELETE FROM app.mobile_money_payouts WHERE provider_ref LIKE 'bench-status-%'")
+        close_pool()
+
+    print(f"update_status      rows={n} elapsed={per_row * 1000:8.1f}ms")
+    print(f"update_status_many rows={n} elapsed={batched * 1000:8.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark concurrent payout dispatch.")
+    parser.add_argument("--payouts", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per provider call")
+    parser.add_argument("--max-in-flight", type=int, default=settings.WORKER_MAX_IN_FLIGHT)
+    parser.add_argument("--status-writes", action="store_true", help="time DB status writes instead")
+    args = parser.parse_args()
+
+    if args.status_writes:
+        _bench_status_writes(args.payouts)
+        return
+
+    provider = _SlowProvider(args.latency)
+    payout_worker.get_provider = lambda name: provider
+    payout_worker.increment_payout_attempt = lambda *a, **k: None
+    rows = _batch(args.payouts)
+
+    seq_s, seq_out = _run(rows, 1)
+    con_s, con_out = _run(rows, args.max_in_flight)
+    assert seq_out == con_out, "concurrent dispatch changed payout outcomes"
+
+    for label, elapsed in (("sequential", seq_s), (f"in_flight={args.max_in_flight}", con_s)):
+        print(f"{label:14} payouts={args.payouts} elapsed={elapsed:6.2f}s rate={args.payouts / elapsed:7.1f}/s")
+    print(f"speedup x{seq_s / con_s:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Measure the planning time saved per cash-out request by DB_PREPARED_STATEMENTS.
+
+Runs the cash-out hot path lookups (2 idempotency + 4 velocity queries) against
+DATABASE_URL, first as plain SQL then as PREPARE/EXECUTE, and reports:
+  - server planning time per request (EXPLAIN ANALYZE "Planning Time")
+  - client wall time per request
+
+Usage:
+  python scripts/bench_prepared_statements.py --iterations 500 [--user-id <uuid>]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, ".")
+
+from db import get_conn, close_pool
+from services import idempotency, velocity
+from settings import settings
+
+
+def _hot_statements(user_id: str, phone: str):
+    since = datetime.now(timezone.utc) - timedelta(hours=24)
+    return [
+        (idempotency._GET_IDEMPOTENCY, (user_id, "bench-key", "POST:/v1/cash-out/mobile-money")),
+        (idempotency._IDEMPOTENCY_CONFLICT, (user_id, "bench-key", "POST:/v1/cash-out/mobile-money")),
+        (velocity._CASHOUT_COUNT_24H, (user_id, since)),
+        (velocity._CASHOUT_SUM_24H, (user_id, since)),
+        (velocity._RECEIVER_USED_24H, (user_id, since, phone)),
+        (velocity._DISTINCT_RECEIVERS_24H, (user_id, since)),
+    ]
+
+
+def _planning_ms(cur, sql: str, params) -> float:
+    cur.execute(f"EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) {sql}", params)
+    plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return float(plan[0].get("Planning Time", 0.0))
+
+
+def _run(conn, statements, iterations: int, prepared: bool) -> tuple[float, float]:
+    settings.DB_PREPARED_STATEMENTS = prepared
+    with conn.cursor() as cur:
+        # warm up (and PREPARE once when enabled); Postgres switches to a
+        # generic plan after five executions
+        for _ in range(6):
+            for stmt, params in statements:
+                stmt.execute(cur, params)
+                cur.fetchall()
+
+        planning = 0.0
+        for stmt, params in statements:
+            if prepared:
+                planning += _planning_ms(cur, stmt._execute_sql, params)
+            else:
+                planning += _planning_ms(cur, stmt.sql, params)
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for stmt, params in statements:
+                stmt.execute(cur, params)
+                cur.fetchall()
+        wall_ms = (time.perf_counter() - started) * 1000.0 / iterations
+    conn.rollback()
+    return planning, wall_ms
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark prepared statements on the cash-out hot path.")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--user-id", default=str(uuid.uuid4()))
+    parser.add_argument("--phone", default="+22890000000")
+    args = parser.parse_args()
+
+    statements = _hot_statements(args.user_id, args.phone)
+
+    with get_conn() as conn:
+        plain_plan, plain_wall = _run(conn, statements, args.iterations, prepared=False)
+        prep_plan, prep_wall = _run(conn, statements, args.iterations, prepared=True)
+
+    print(f"statements per cash-out request: {len(statements)}")
+    print(f"plain     planning={plain_plan:.3f}ms/request wall={plain_wall:.3f}ms/request")
+    print(f"prepared  planning={prep_plan:.3f}ms/request wall={prep_wall:.3f}ms/request")
+    print(f"saved     planning={plain_plan - prep_plan:.3f}ms/request wall={plain_wall - prep_wall:.3f}ms/request")
+
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Rate limiter decisions per second, per backend.
+
+  memory:   MemoryRateLimiter, one thread, over --keys distinct keys
+  postgres: PostgresRateLimiter (app.rate_limit_take, alembic 0013) from
+            --threads threads against DATABASE_URL
+
+Usage:
+  python scripts/bench_rate_limit.py --decisions 200000 --keys 50000
+  python scripts/bench_rate_limit.py --backend postgres --decisions 20000 --threads 16
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, ".")
+
+from rate_limit import MemoryRateLimiter, PostgresRateLimiter
+from settings import settings
+
+
+def _bench_memory(decisions: int, keys: int) -> float:
+    limiter = MemoryRateLimiter(max_keys=keys)
+    started = time.perf_counter()
+    for i in range(decisions):
+        limiter.take_sync(f"ip:{i % keys}", capacity=120, refill_per_sec=2.0)
+    return decisions / (time.perf_counter() - started)
+
+
+def _bench_postgres(decisions: int, keys: int, threads: int) -> float:
+    settings.RATE_LIMIT_DB_POOL_MAX_SIZE = threads  # one connection per thread
+    limiter = PostgresRateLimiter()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda i: limiter.take_sync(f"bench:{i % keys}", 120, 2.0), range(decisions)))
+    rate = decisions / (time.perf_counter() - started)
+    limiter.close()
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark rate limiter backends.")
+    parser.add_argument("--backend", choices=["memory", "postgres"], default="memory")
+    parser.add_argument("--decisions", type=int, default=200_000)
+    parser.add_argument("--keys", type=int, default=50_000)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    if args.backend == "memory":
+        rate = _bench_memory(args.decisions, args.keys)
+    else:
+        rate = _bench_postgres(args.decisions, args.keys, args.threads)
+    print(f"{args.backend:8} decisions={args.decisions} keys={args.keys} rate={rate:,.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,33 @@ from typing import Any
 
 from psycopg2.extensions import connection as PGConn
 
+from db_prepared import PreparedStatement
+
+
+_GET_IDEMPOTENCY = PreparedStatement(
+    "idempotency_get",
+    """
+    SELECT request_hash, response_json, status_code
+    FROM app.idempotency_keys
+    WHERE user_id = %s::uuid
+      AND idempotency_key = %s
+      AND route_key = %s
+    LIMIT 1
+    """,
+)
+
+_IDEMPOTENCY_CONFLICT = PreparedStatement(
+    "idempotency_conflict",
+    """
+    SELECT 1
+    FROM app.idempotency_keys
+    WHERE user_id = %s::uuid
+      AND idempotency_key = %s
+      AND route_key <> %s
+    LIMIT 1
+    """,
+)
+
 
 def request_hash(payload: dict[str, Any]) -> str:
     raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
@@ -20,17 +47,7 @@ def get_idempotency(
     route_key: str,
 ) -> dict[str, Any] | None:
     with conn.cursor() as cur:
-        cur.execute(
-            """
-            SELECT request_hash, response_json, status_code
-            FROM app.idempotency_keys
-            WHERE user_id = %s::uuid
-              AND idempotency_key = %s
-              AND route_key = %s
-            LIMIT 1
-            """,
-            (user_id, idempotency_key, route_key),
-        )
+        _GET_IDEMPOTENCY.execute(cur, (user_id, idempotency_key, route_key))
         row = cur.fetchone()
         if not row:
             return None
@@ -45,17 +62,7 @@ def idempotency_conflict(
     route_key: str,
 ) -> bool:
     with conn.cursor() as cur:
-        cur.execute(
-            """
-            SELECT 1
-            FROM app.idempotency_keys
-            WHERE user_id = %s::uuid
-              AND idempotency_key = %s
-              AND route_key <> %s
-            LIMIT 1
-            """,
-            (user_id, idempotency_key, route_key),
-        )
+        _IDEMPOTENCY_CONFLICT.execute(cur, (user_id, idempotency_key, route_key))
         return cur.fetchone() is not None
 
 
@@ -6,6 +6,24 @@ from typing import Dict, Tuple
 
 _lock = Lock()
 _counters: dict[str, dict[Tuple[Tuple[str, str], ...], int]] = {}
+_gauges: dict[str, dict[Tuple[Tuple[str, str], ...], float]] = {}
+# name -> labels -> (bucket counts, sum, count); buckets are per metric name
+_histograms: dict[str, dict[Tuple[Tuple[str, str], ...], Tuple[list[int], float, int]]] = {}
+_histogram_buckets: dict[str, Tuple[float, ...]] = {}
+
+LATENCY_BUCKETS_S: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Provider calls and worker batches: tens of ms up to the lease
+WORKER_BUCKETS_S: Tuple[float, ...] = (
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+# Cash-out created -> CONFIRMED: seconds to a day
+CONFIRM_BUCKETS_S: Tuple[float, ...] = (
+    1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0, 7200.0, 21600.0, 86400.0,
+)
 
 
 def _inc(name: str, labels: dict[str, str] | None = None, value: int = 1) -> None:
@@ -15,6 +33,29 @@ def _inc(name: str, labels: dict[str, str] | None = None, value: int = 1) -> Non
         series[key] = int(series.get(key, 0)) + int(value)
 
 
+def _set_gauge(name: str, value: float, labels: dict[str, str] | None = None) -> None:
+    key = tuple(sorted((labels or {}).items()))
+    with _lock:
+        _gauges.setdefault(name, {})[key] = float(value)
+
+
+def _observe(
+    name: str,
+    value: float,
+    labels: dict[str, str] | None = None,
+    buckets: Tuple[float, ...] = LATENCY_BUCKETS_S,
+) -> None:
+    key = tuple(sorted((labels or {}).items()))
+    with _lock:
+        bounds = _histogram_buckets.setdefault(name, buckets)
+        series = _histograms.setdefault(name, {})
+        counts, total, count = series.get(key) or ([0] * len(bounds), 0.0, 0)
+        for i, bound in enumerate(bounds):
+            if value <= bound:
+                counts[i] += 1
+        series[key] = (counts, total + float(value), count + 1)
+
+
 def increment_http_requests(route: str, status: int) -> None:
     _inc("http_requests_total", {"route": route, "status": str(status)})
 
@@ -38,6 +79,121 @@ def increment_idempotency_replay(route: str) -> None:
     _inc("idempotency_replays_total", {"route": route})
 
 
+def observe_db_pool_wait(pool: str, seconds: float) -> None:
+    _observe("db_pool_wait_seconds", seconds, {"pool": pool})
+
+
+def set_db_pool_connections(pool: str, in_use: int, idle: int, max_size: int) -> None:
+    _set_gauge("db_pool_connections_in_use", in_use, {"pool": pool})
+    _set_gauge("db_pool_connections_idle", idle, {"pool": pool})
+    _set_gauge("db_pool_max_size", max_size, {"pool": pool})
+
+
+def increment_db_pool_checkout_timeout(pool: str) -> None:
+    _inc("db_pool_checkout_timeouts_total", {"pool": pool})
+
+
+def set_db_replica_lag(engine: str, seconds: float) -> None:
+    _set_gauge("db_replica_lag_seconds", seconds, {"engine": engine})
+
+
+def increment_db_replica_fallback(engine: str, reason: str) -> None:
+    _inc("db_replica_fallbacks_total", {"engine": engine, "reason": reason})
+
+
+def observe_db_statement(route: str, fingerprint: str, statement: str, seconds: float) -> None:
+    _observe(
+        "db_statement_duration_seconds",
+        seconds,
+        {"route": route, "fingerprint": fingerprint, "statement": statement},
+    )
+
+
+def increment_db_slow_query(route: str, fingerprint: str) -> None:
+    _inc("db_slow_queries_total", {"route": route, "fingerprint": fingerprint})
+
+
+def increment_rate_limited(group: str) -> None:
+    _inc("rate_limited_total", {"group": group})
+
+
+def increment_rate_limit_backend_error(backend: str) -> None:
+    _inc("rate_limit_backend_errors_total", {"backend": backend})
+
+
+def set_circuit_state(provider: str, state: int) -> None:
+    # 0 closed, 1 half_open, 2 open
+    _set_gauge("payout_circuit_state", state, {"provider": provider})
+
+
+def increment_circuit_transition(provider: str, state: str) -> None:
+    _inc("payout_circuit_transitions_total", {"provider": provider, "to": state})
+
+
+def increment_circuit_short_circuit(provider: str) -> None:
+    _inc("payout_circuit_short_circuits_total", {"provider": provider})
+
+
+def set_payout_queue(provider: str, pending: int, sent_due: int, oldest_due_age_s: float) -> None:
+    _set_gauge("payout_queue_depth", pending, {"provider": provider, "status": "PENDING"})
+    _set_gauge("payout_queue_depth", sent_due, {"provider": provider, "status": "SENT_DUE"})
+    _set_gauge("payout_oldest_due_age_seconds", oldest_due_age_s, {"provider": provider})
+
+
+def observe_payout_claim(kind: str, seconds: float) -> None:
+    _observe("payout_claim_duration_seconds", seconds, {"kind": kind})
+
+
+def observe_payout_provider_call(provider: str, op: str, seconds: float) -> None:
+    _observe("payout_provider_call_duration_seconds", seconds, {"provider": provider, "op": op}, WORKER_BUCKETS_S)
+
+
+def observe_payout_batch(seconds: float) -> None:
+    _observe("payout_batch_duration_seconds", seconds, None, WORKER_BUCKETS_S)
+
+
+def observe_payout_time_to_confirm(provider: str, source: str, seconds: float) -> None:
+    _observe("payout_time_to_confirm_seconds", seconds, {"provider": provider, "source": source}, CONFIRM_BUCKETS_S)
+
+
+def increment_provider_http_request(provider: str, connection: str, http_version: str) -> None:
+    # connection: "new" (this request paid for a TCP/TLS handshake) or "reused" (keep-alive)
+    _inc(
+        "provider_http_requests_total",
+        {"provider": provider, "connection": connection, "http_version": http_version},
+    )
+
+
+def increment_provider_http_handshake(provider: str, kind: str) -> None:
+    _inc("provider_http_handshakes_total", {"provider": provider, "kind": kind})
+
+
+def observe_provider_http_connect(provider: str, seconds: float) -> None:
+    _observe("provider_http_connect_seconds", seconds, {"provider": provider}, WORKER_BUCKETS_S)
+
+
+def increment_provider_quote(provider: str, result: str) -> None:
+    # result: "miss" (new quotation), "hit" (cached one reused), "shared" (joined an
+    # in-flight request) or "refused" (a reused quotation the provider turned down)
+    _inc("provider_quotes_total", {"provider": provider, "result": result})
+
+
+def _escape_label(value: str) -> str:
+    # exposition format: backslash, double quote and newline are escaped in label values
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
 def render_prometheus() -> str:
     lines: list[str] = []
     with _lock:
@@ -49,4 +205,20 @@ def render_prometheus() -> str:
                     lines.append(f"{name}{{{label_str}}} {value}")
                 else:
                     lines.append(f"{name} {value}")
+
+        for name, series in sorted(_gauges.items()):
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for name, series in sorted(_histograms.items()):
+            bounds = _histogram_buckets[name]
+            lines.append(f"# TYPE {name} histogram")
+            for labels, (counts, total, count) in sorted(series.items()):
+                for bound, bucket_count in zip(bounds, counts):
+                    le = (("le", _format_value(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(labels, le)} {bucket_count}")
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
     return "\n".join(lines) + ("\n" if lines else "")
@@ -7,6 +7,7 @@ from typing import Any, Iterable
 from psycopg2.extras import RealDictCursor
 
 from db import get_conn
+from app.payouts.status_poller import get_status_poller
 from app.providers.base import ProviderResult
 from app.providers.mobile_money.factory import get_provider
 from app.providers.mobile_money.config import mm_mode
@@ -66,22 +67,37 @@ def _deterministic_provider_status(payout: dict[str, Any]) -> ProviderResult:
     return ProviderResult(status="SENT", provider_ref=payout.get("provider_ref"))
 
 
-def _get_provider_status(payout: dict[str, Any]) -> ProviderResult:
+def _get_provider_statuses(payouts: list[dict[str, Any]]) -> list[ProviderResult]:
+    """
+    Provider status per payout, through the shared StatusPoller: grouped per
+    provider, fetched concurrently, and reusing anything the worker fetched
+    within STATUS_POLL_TTL_S.
+    """
     mode = (mm_mode() or "sandbox").strip().lower()
     if mode == "sandbox":
-        return _deterministic_provider_status(payout)
+        return [_deterministic_provider_status(p) for p in payouts]
 
-    provider_name = (payout.get("provider") or "").strip().upper()
-    provider = get_provider(provider_name) if provider_name else None
-    if provider is None:
-        return _deterministic_provider_status(payout)
+    results: list[ProviderResult] = [None] * len(payouts)  # type: ignore[list-item]
+    requests = []
+    positions = []
+    providers: dict[str, Any] = {}
+    for i, payout in enumerate(payouts):
+        provider_name = (payout.get("provider") or "").strip().upper()
+        if provider_name and provider_name not in providers:
+            providers[provider_name] = get_provider(provider_name)
+        provider = providers.get(provider_name)
+        if provider is None:
+            results[i] = _deterministic_provider_status(payout)
+            continue
+        requests.append((provider_name, provider, payout))
+        positions.append(i)
 
-    try:
-        res = provider.get_cashout_status(payout)
-    except Exception as exc:
-        return ProviderResult(status="SENT", provider_ref=payout.get("provider_ref"), error=str(exc), retryable=True)
-
-    return _normalize_provider_result(res)
+    for i, res in zip(positions, get_status_poller().get_many(requests)):
+        if isinstance(res, Exception):
+            results[i] = ProviderResult(status="SENT", provider_ref=payouts[i].get("provider_ref"), error=str(res), retryable=True)
+        else:
+            results[i] = _normalize_provider_result(res)
+    return results
 
 
 def _fetch_ledger_entry_presence(cur, tx_ids: Iterable[str]) -> dict[str, bool]:
@@ -161,8 +177,7 @@ def run_reconcile(*, stale_minutes: int = 30, lookback_minutes: int = 240) -> di
             stale_rows = cur.fetchall()
             summary["stale_checked"] = len(stale_rows)
 
-            for payout in stale_rows:
-                provider_result = _get_provider_status(payout)
+            for payout, provider_result in zip(stale_rows, _get_provider_statuses(stale_rows)):
                 provider_status = provider_result.status
                 if provider_status != payout["status"]:
                     summary["status_mismatch"] += 1
@@ -5,9 +5,61 @@ from typing import Optional
 
 from fastapi import HTTPException
 
+from db_prepared import PreparedStatement
 from settings import settings
 
 
+_CASHOUT_COUNT_24H = PreparedStatement(
+    "velocity_cashout_count",
+    """
+    SELECT COUNT(*)
+    FROM ledger.ledger_transactions
+    WHERE created_by = %s::uuid
+      AND type = 'CASHOUT'
+      AND created_at >= %s
+    """,
+)
+
+_CASHOUT_SUM_24H = PreparedStatement(
+    "velocity_cashout_sum",
+    """
+    SELECT COALESCE(SUM(amount_cents), 0)
+    FROM ledger.ledger_transactions
+    WHERE created_by = %s::uuid
+      AND type = 'CASHOUT'
+      AND created_at >= %s
+    """,
+)
+
+_RECEIVER_USED_24H = PreparedStatement(
+    "velocity_receiver_used",
+    """
+    SELECT 1
+    FROM app.mobile_money_payouts p
+    JOIN ledger.ledger_transactions t ON t.id = p.transaction_id
+    WHERE t.created_by = %s::uuid
+      AND t.type = 'CASHOUT'
+      AND p.created_at >= %s
+      AND p.phone_e164 = %s
+    LIMIT 1
+    """,
+)
+
+_DISTINCT_RECEIVERS_24H = PreparedStatement(
+    "velocity_distinct_receivers",
+    """
+    SELECT COUNT(DISTINCT p.phone_e164)
+    FROM app.mobile_money_payouts p
+    JOIN ledger.ledger_transactions t ON t.id = p.transaction_id
+    WHERE t.created_by = %s::uuid
+      AND t.type = 'CASHOUT'
+      AND p.created_at >= %s
+      AND p.phone_e164 IS NOT NULL
+      AND p.phone_e164 <> ''
+    """,
+)
+
+
 def _now() -> datetime:
     return datetime.now(timezone.utc)
 
@@ -23,73 +75,44 @@ def _raise_limit() -> None:
     raise HTTPException(status_code=429, detail="VELOCITY_LIMIT_EXCEEDED")
 
 
+def cash_out_limits() -> tuple[int, int, int]:
+    """
+    (max_count, max_amount_cents, max_distinct_receivers) per 24h; 0 = disabled.
+    """
+    return (
+        int(getattr(settings, "MAX_CASHOUT_COUNT_PER_DAY", 0) or 0),
+        int(getattr(settings, "MAX_CASHOUT_PER_DAY_CENTS", 0) or 0),
+        int(getattr(settings, "MAX_DISTINCT_RECEIVERS_PER_DAY", 0) or 0),
+    )
+
+
+def cash_out_window_start() -> datetime:
+    return _now() - timedelta(hours=24)
+
+
 def check_cash_out_velocity(conn, *, user_id: str, amount_cents: int, phone_e164: str | None) -> None:
-    since = _now() - timedelta(hours=24)
-    max_count = int(getattr(settings, "MAX_CASHOUT_COUNT_PER_DAY", 0) or 0)
-    max_amount = int(getattr(settings, "MAX_CASHOUT_PER_DAY_CENTS", 0) or 0)
-    max_receivers = int(getattr(settings, "MAX_DISTINCT_RECEIVERS_PER_DAY", 0) or 0)
+    since = cash_out_window_start()
+    max_count, max_amount, max_receivers = cash_out_limits()
 
     with conn.cursor() as cur:
         if _enabled(max_count):
-            cur.execute(
-                """
-                SELECT COUNT(*)
-                FROM ledger.ledger_transactions
-                WHERE created_by = %s::uuid
-                  AND type = 'CASHOUT'
-                  AND created_at >= %s
-                """,
-                (user_id, since),
-            )
+            _CASHOUT_COUNT_24H.execute(cur, (user_id, since))
             count = int(cur.fetchone()[0] or 0)
             if count >= max_count:
                 _raise_limit()
 
         if _enabled(max_amount):
-            cur.execute(
-                """
-                SELECT COALESCE(SUM(amount_cents), 0)
-                FROM ledger.ledger_transactions
-                WHERE created_by = %s::uuid
-                  AND type = 'CASHOUT'
-                  AND created_at >= %s
-                """,
-                (user_id, since),
-            )
+            _CASHOUT_SUM_24H.execute(cur, (user_id, since))
             total = int(cur.fetchone()[0] or 0)
             if total + int(amount_cents) > max_amount:
                 _raise_limit()
 
         if _enabled(max_receivers) and phone_e164:
-            cur.execute(
-                """
-                SELECT 1
-                FROM app.mobile_money_payouts p
-                JOIN ledger.ledger_transactions t ON t.id = p.transaction_id
-                WHERE t.created_by = %s::uuid
-                  AND t.type = 'CASHOUT'
-                  AND p.created_at >= %s
-                  AND p.phone_e164 = %s
-                LIMIT 1
-                """,
-                (user_id, since, phone_e164),
-            )
+            _RECEIVER_USED_24H.execute(cur, (user_id, since, phone_e164))
             already_used = cur.fetchone() is not None
 
             if not already_used:
-                cur.execute(
-                    """
-                    SELECT COUNT(DISTINCT p.phone_e164)
-                    FROM app.mobile_money_payouts p
-                    JOIN ledger.ledger_transactions t ON t.id = p.transaction_id
-                    WHERE t.created_by = %s::uuid
-                      AND t.type = 'CASHOUT'
-                      AND p.created_at >= %s
-                      AND p.phone_e164 IS NOT NULL
-                      AND p.phone_e164 <> ''
-                    """,
-                    (user_id, since),
-                )
+                _DISTINCT_RECEIVERS_24H.execute(cur, (user_id, since))
                 distinct_count = int(cur.fetchone()[0] or 0)
                 if distinct_count >= max_receivers:
                     _raise_limit()
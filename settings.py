@@ -31,6 +31,41 @@ class Settings(BaseSettings):
     # -----------------------
     DATABASE_URL: str = Field(...)
 
+    # Connection pool (applies to db.get_conn and db_async.get_async_conn, per process)
+    DB_POOL_MIN_SIZE: int = Field(default=1, ge=0)
+    DB_POOL_MAX_SIZE: int = Field(default=10, ge=1)
+    DB_POOL_MAX_LIFETIME_S: float = 1800.0  # recycle connections older than this; 0 disables
+    DB_POOL_CHECKOUT_TIMEOUT_S: float = 5.0
+    DB_POOL_HEALTH_CHECK: bool = False  # SELECT 1 on checkout (one extra round trip)
+
+    # Session settings, applied once per connection at connect time
+    DB_STATEMENT_TIMEOUT_MS: int = 5000
+    DB_IDLE_IN_TX_TIMEOUT_MS: int = 5000
+    DB_APPLICATION_NAME: str = "nexapay_api"
+    # Named server-side prepared statements for hot SQL (disable behind PgBouncer transaction pooling)
+    DB_PREPARED_STATEMENTS: bool = True
+
+    # Optional read replica for read-only routes (empty = everything on the primary)
+    DATABASE_REPLICA_URL: str = ""
+    DB_REPLICA_MAX_LAG_S: float = 5.0  # above this, readonly connections fall back to the primary
+    DB_REPLICA_LAG_CHECK_INTERVAL_S: float = 2.0
+
+    # Per-statement timing (db_instrument): histograms by route + SQL fingerprint
+    DB_INSTRUMENTATION: bool = True
+    DB_SLOW_QUERY_MS: int = 250  # log statements at or above this ("nexapay.db"); 0 disables
+    DB_EXPLAIN_SLOW_QUERIES: bool = False  # also log EXPLAIN (no ANALYZE) for slow statements
+
+    # Cash-out posting via app.cash_out_mobile_money (alembic 0012): one DB round trip per request
+    CASHOUT_SINGLE_ROUND_TRIP: bool = True
+
+    # -----------------------
+    # Logging (logging_setup.configure_logging)
+    # -----------------------
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    # Keep this fraction of INFO lines per event or logger, e.g. "http_request=0.1,webhook_received=0.5"
+    LOG_SAMPLE_RATES: str = ""
+
     # -----------------------
     # System owner
     # -----------------------
@@ -49,6 +84,26 @@ class Settings(BaseSettings):
     # -----------------------
     CORS_ALLOW_ORIGINS: str = ""
 
+    # -----------------------
+    # Rate limiting (RateLimitMiddleware)
+    # -----------------------
+    # memory: per-process buckets (LRU/TTL bounded); postgres: shared across workers (alembic 0013)
+    RATE_LIMIT_BACKEND: Literal["memory", "postgres"] = "memory"
+    RATE_LIMIT_MEMORY_MAX_KEYS: int = Field(default=100_000, ge=1)
+    # postgres backend: its own pool, separate from the request pool and sized like it (every limited
+    # request checks out a connection); a checkout slower than the timeout fails open (request allowed,
+    # rate_limit_backend_errors_total incremented)
+    RATE_LIMIT_DB_POOL_MAX_SIZE: int = Field(default=10, ge=1)
+    RATE_LIMIT_DB_CHECKOUT_TIMEOUT_S: float = Field(default=2.0, gt=0)
+    # Per authenticated user (JWT sub), per route, requests per minute; 0 disables. Cash-out and p2p
+    # are throttled by default, FX convert and merchant pay are opt-in
+    RATE_LIMIT_CASHOUT_PER_MIN: int = 20
+    RATE_LIMIT_P2P_TRANSFER_PER_MIN: int = 30
+    RATE_LIMIT_FX_CONVERT_PER_MIN: int = 0
+    RATE_LIMIT_MERCHANT_PAY_PER_MIN: int = 0
+    # Per user across all of the above; 0 disables
+    RATE_LIMIT_MONEY_PER_USER_PER_MIN: int = 0
+
     # -----------------------
     # Velocity limits (fraud/abuse controls)
     # -----------------------
@@ -57,6 +112,74 @@ class Settings(BaseSettings):
     MAX_DISTINCT_RECEIVERS_PER_DAY: int = 0
     MAX_CASHIN_PER_DAY_CENTS: int = 0
 
+    # -----------------------
+    # Payout worker (app/workers/payout_worker.py)
+    # -----------------------
+    # Provider calls in flight per batch, overall and per provider (MTN/MTN_MOMO count as MOMO); 1 = sequential
+    WORKER_MAX_IN_FLIGHT: int = 16
+    WORKER_MAX_IN_FLIGHT_TMONEY: int = 4
+    WORKER_MAX_IN_FLIGHT_FLOOZ: int = 4
+    WORKER_MAX_IN_FLIGHT_MOMO: int = 8
+    WORKER_MAX_IN_FLIGHT_THUNES: int = 4
+    # Pending payouts of these providers (async adapters only) are submitted together as one batch,
+    # concurrently on the provider event loop, rather than through their thread lanes above
+    WORKER_PIPELINE_PROVIDERS: str = "THUNES"
+    WORKER_PIPELINE_MAX_IN_FLIGHT: int = Field(default=32, ge=1)
+    # Pending claims: fifo = oldest first; fair = weighted round-robin across providers (and
+    # countries with WORKER_FAIR_SHARE_BY_COUNTRY) so one corridor's backlog can't starve the rest
+    WORKER_CLAIM_MODE: Literal["fifo", "fair"] = "fair"
+    # "MTN_MOMO=2,THUNES=1", or per corridor "THUNES:GH=0.5"; unlisted groups weigh 1
+    WORKER_FAIR_SHARE_WEIGHTS: str = ""
+    # Max payouts per group in one claimed batch (0 = no cap), overridable per group as above
+    WORKER_FAIR_SHARE_QUOTA: int = Field(default=0, ge=0)
+    WORKER_FAIR_SHARE_QUOTAS: str = ""
+    WORKER_FAIR_SHARE_BY_COUNTRY: bool = False
+    # Oldest claimable payouts ranked per group (provider, or corridor with _BY_COUNTRY) in each fair
+    # claim (0 = twice the batch size); bounds the claim's cost on a deep backlog
+    WORKER_FAIR_SHARE_WINDOW: int = Field(default=0, ge=0)
+    # Claimed payouts are leased for at least this long (raised to twice a batch's worst-case provider
+    # time, batch size / narrowest provider lanes x MM_HTTP_TIMEOUT_S) and renewed while the batch runs
+    WORKER_LEASE_SECONDS: int = Field(default=300, ge=1)
+    # Outcomes are written in one UPDATE per flush: at this many, or once the oldest has waited this long
+    WORKER_STATUS_FLUSH_SIZE: int = Field(default=50, ge=1)
+    WORKER_STATUS_FLUSH_MS: int = Field(default=200, ge=0)
+    # Idle workers block on LISTEN payout_ready (alembic 0015) instead of polling;
+    # they still wake after this long, or sooner when a next_retry_at comes due
+    WORKER_LISTEN: bool = True
+    WORKER_LISTEN_TIMEOUT_S: float = Field(default=60.0, gt=0)
+    # Provider status polls (worker + reconcile) are shared for this long per payout; 0 disables.
+    # Shared across processes via app.provider_status_cache (alembic 0016) when STATUS_POLL_SHARED_CACHE
+    STATUS_POLL_TTL_S: float = Field(default=30.0, ge=0)
+    # Concurrent polls: threads for sync-only adapters, coroutines on the provider event loop
+    # for async ones (still capped per host by MM_HTTP_MAX_CONNECTIONS_PER_HOST)
+    STATUS_POLL_MAX_IN_FLIGHT: int = Field(default=8, ge=1)
+    STATUS_POLL_MAX_IN_FLIGHT_ASYNC: int = Field(default=200, ge=1)
+    STATUS_POLL_SHARED_CACHE: bool = True
+    # Per-provider circuit breaker: opens when the last CIRCUIT_WINDOW_SIZE calls (at least
+    # CIRCUIT_MIN_CALLS) fail or run slow too often; open payouts are rescheduled without a call
+    CIRCUIT_BREAKER_ENABLED: bool = True
+    CIRCUIT_WINDOW_SIZE: int = Field(default=20, ge=1)
+    CIRCUIT_MIN_CALLS: int = Field(default=10, ge=1)
+    CIRCUIT_FAILURE_RATE: float = Field(default=0.5, gt=0, le=1)
+    CIRCUIT_SLOW_CALL_S: float = Field(default=10.0, gt=0)
+    CIRCUIT_SLOW_CALL_RATE: float = Field(default=0.8, gt=0, le=1)
+    CIRCUIT_OPEN_S: float = Field(default=30.0, ge=0)  # doubles on each failed half-open probe
+    CIRCUIT_OPEN_MAX_S: float = Field(default=600.0, ge=0)
+    CIRCUIT_HALF_OPEN_PROBES: int = Field(default=2, ge=1)
+    # Horizontal scale-out: each worker heartbeats into app.payout_workers (alembic 0017) and drains
+    # only its share of WORKER_SHARD_COUNT hash shards (same value on every worker); a worker silent
+    # for WORKER_HEARTBEAT_TTL_S loses its shards. Off = every worker claims everything (SKIP LOCKED)
+    WORKER_SHARDING: bool = True
+    WORKER_SHARD_COUNT: int = Field(default=16, ge=1)
+    WORKER_HEARTBEAT_S: float = Field(default=10.0, gt=0)
+    WORKER_HEARTBEAT_TTL_S: float = Field(default=60.0, gt=0)
+    # Worker metrics: queue depth gauges are refreshed this often; /metrics is served on
+    # WORKER_METRICS_PORT (0 = not served, e.g. when the worker runs inside the API process).
+    # Unauthenticated: bound to loopback unless WORKER_METRICS_HOST opens it (e.g. 0.0.0.0 in a container)
+    WORKER_QUEUE_STATS_S: float = Field(default=15.0, gt=0)
+    WORKER_METRICS_PORT: int = Field(default=0, ge=0)
+    WORKER_METRICS_HOST: str = "127.0.0.1"
+
     # -----------------------
     # Mobile Money (Mode Switch)
     # -----------------------
@@ -64,9 +187,24 @@ class Settings(BaseSettings):
     MM_STRICT_STARTUP_VALIDATION: bool = False
     MM_ENABLED_PROVIDERS: str = "TMONEY,FLOOZ,MTN_MOMO,THUNES"
 
-    # HTTP timeouts
+    # Provider HTTP transport (app/providers/mobile_money/http.py): keep-alive pools
+    # shared by every adapter, one per provider host. HTTP/2 is negotiated when
+    # MM_HTTP2 is on and the h2 package is installed.
+    # MM_HTTP_TIMEOUT_S is the read timeout (<PROVIDER>_HTTP_TIMEOUT_S overrides it);
+    # MM_HTTP_PROVIDER_TIMEOUTS sets connect:read per provider, e.g. "THUNES=3:30,MOMO=2:15"
     MM_HTTP_TIMEOUT_S: float = 20.0
     MOMO_HTTP_TIMEOUT_S: float = 20.0
+    MM_HTTP_CONNECT_TIMEOUT_S: float = Field(default=5.0, gt=0)
+    MM_HTTP_PROVIDER_TIMEOUTS: str = ""
+    MM_HTTP_MAX_CONNECTIONS_PER_HOST: int = Field(default=20, ge=1)
+    MM_HTTP_MAX_KEEPALIVE_PER_HOST: int = Field(default=10, ge=0)
+    MM_HTTP_KEEPALIVE_EXPIRY_S: float = Field(default=60.0, gt=0)
+    MM_HTTP2: bool = True
+    # Provider access tokens (MoMo): shared by every process through app.provider_tokens
+    # (alembic 0019) when PROVIDER_TOKEN_SHARED, and refreshed in the background this long
+    # before the adapter would drop them (expiry minus its safety buffer)
+    PROVIDER_TOKEN_SHARED: bool = True
+    PROVIDER_TOKEN_REFRESH_AHEAD_S: float = Field(default=300.0, ge=0)
 
     # -----------------------
     # TMONEY (sandbox/real)
@@ -171,6 +309,11 @@ class Settings(BaseSettings):
 
     THUNES_TX_TYPE: str = "C2C"
     THUNES_QUOTE_MODE: str = "DESTINATION_AMOUNT"
+    # Identical payouts (payer, currency, amount, transaction type) reuse a quotation for up to
+    # this long, and never past its expiration_date minus the margin; 0 = a quotation per payout.
+    # Off until the account's quotations are confirmed to accept more than one transaction
+    THUNES_QUOTE_CACHE_TTL_S: float = Field(default=0.0, ge=0)
+    THUNES_QUOTE_EXPIRY_MARGIN_S: float = Field(default=15.0, ge=0)
 
     THUNES_SOURCE_CURRENCY: str = "USD"
     THUNES_SOURCE_COUNTRY_ISO3: str = "USA"
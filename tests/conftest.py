@@ -16,6 +16,12 @@ from fastapi.testclient import TestClient
 
 from main import app
 from db import get_conn
+from settings import settings
+from rate_limit import reset_rate_limiter
+from app.payouts.status_poller import reset_status_poller
+from app.providers.mobile_money.thunes import reset_quote_cache
+from app.providers.mobile_money.token_store import reset_token_store
+from app.workers.circuit_breaker import reset_breakers
 
 # Optional: if you want to run the worker manually via python tests/conftest.py
 from app.workers.payout_worker import run_forever
@@ -291,6 +297,28 @@ def admin(admin_user):
 # Cleanup between tests
 # ---------------------------
 
+@pytest.fixture(autouse=True)
+def _reset_rate_limits():
+    # tests reuse a few users; keep per-user buckets from leaking across tests
+    reset_rate_limiter()
+    yield
+    reset_rate_limiter()
+
+
+@pytest.fixture(autouse=True)
+def _reset_worker_singletons(monkeypatch):
+    # process-wide worker state starts empty in every test and stays in memory:
+    # the shared DB tables are covered by their own test modules
+    monkeypatch.setattr(settings, "STATUS_POLL_SHARED_CACHE", False)
+    monkeypatch.setattr(settings, "PROVIDER_TOKEN_SHARED", False)
+    resets = (reset_status_poller, reset_breakers, reset_token_store, reset_quote_cache)
+    for reset in resets:
+        reset()
+    yield
+    for reset in resets:
+        reset()
+
+
 @pytest.fixture(autouse=True)
 def _clean_payouts_table():
     with get_conn() as conn:
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from app.payouts.status_poller import StatusPoller
+from app.providers.base import ProviderResult
+from app.providers.mobile_money.http import run_sync
+from app.providers.mobile_money.shim import SyncProvider
+from app.providers.mobile_money.thunes import ThunesProvider
+from app.workers import payout_worker
+from services.metrics import render_prometheus
+
+
+class _AsyncProvider:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+        self.label = "pytest"
+
+    async def send_cashout(self, payout: dict) -> ProviderResult:
+        return ProviderResult(status="SENT", provider_ref=payout["id"])
+
+    async def get_cashout_status(self, payout: dict) -> ProviderResult:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return ProviderResult(status="CONFIRMED", provider_ref=payout["provider_ref"])
+
+    async def check(self, value: int) -> int:
+        return value * 2
+
+
+def test_sync_shim_blocks_on_the_async_adapter():
+    provider = SyncProvider(_AsyncProvider())
+
+    assert provider.send_cashout({"id": "p1"}).provider_ref == "p1"
+    assert provider.get_cashout_status({"provider_ref": "r1"}).status == "CONFIRMED"
+    assert provider.check(21) == 42  # other coroutine methods are shimmed too
+    assert provider.label == "pytest"
+    assert getattr(provider, "get_cashout_statuses", None) is None
+
+
+def test_run_sync_refuses_to_deadlock_the_provider_loop():
+    async def nested():
+        run_sync(asyncio.sleep(0))
+
+    with pytest.raises(RuntimeError):
+        run_sync(nested())
+
+
+def test_status_polls_fan_out_on_one_event_loop():
+    aio = _AsyncProvider(delay=0.2)
+    provider = SyncProvider(aio)
+    poller = StatusPoller(ttl_s=60, max_in_flight=1, max_in_flight_async=100)
+
+    started = time.perf_counter()
+    results = poller.get_many([("TMONEY", provider, {"provider_ref": f"r{i}"}) for i in range(100)])
+
+    assert all(r.status == "CONFIRMED" for r in results)
+    assert aio.peak == 100
+    assert time.perf_counter() - started < 2.0  # 100 x 0.2s one at a time would take 20s
+
+
+def test_guard_times_async_calls():
+    guarded = payout_worker._guard("PYTEST_AIO", SyncProvider(_AsyncProvider()))
+
+    run_sync(guarded.aio.get_cashout_status({"provider_ref": "r1"}))
+
+    assert 'payout_provider_call_duration_seconds_count{op="poll",provider="PYTEST_AIO"} 1' in render_prometheus()
+
+
+def test_thunes_status_mapping_is_still_a_class_helper():
+    assert ThunesProvider.map_thunes_status("COMPLETED") == ("CONFIRMED", False, None)
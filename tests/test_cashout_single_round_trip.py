@@ -0,0 +1,109 @@
+import uuid
+
+import pytest
+
+from db import get_conn
+from settings import settings
+from tests.conftest import _auth_headers
+
+
+def _cash_out(client, token: str, wallet_id: str, idem: str, amount_cents: int = 100, provider_ref: str | None = None):
+    payload = {
+        "wallet_id": wallet_id,
+        "amount_cents": amount_cents,
+        "country": "BJ",
+        "provider_ref": provider_ref or f"srt-ref-{uuid.uuid4()}",
+        "provider": "TMONEY",
+        "phone_e164": "+22890000000",
+    }
+    return client.post(
+        "/v1/cash-out/mobile-money",
+        json=payload,
+        headers=_auth_headers(token, idem=idem),
+    )
+
+
+@pytest.fixture
+def live_fx_quote():
+    # a quote function whose column names nobody would guess: both paths must read it by position
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regprocedure('fx.issue_fx_quote_secure(text,text,bigint)')")
+            if cur.fetchone()[0] is not None:
+                pytest.skip("fx.issue_fx_quote_secure is installed in this database")
+            cur.execute("CREATE SCHEMA IF NOT EXISTS fx")
+            cur.execute(
+                """
+                CREATE FUNCTION fx.issue_fx_quote_secure(p_from text, p_to text, p_amount bigint)
+                RETURNS TABLE (qid uuid, r numeric, src bigint, dst bigint, exp timestamptz)
+                LANGUAGE sql
+                AS $$
+                  SELECT '00000000-0000-0000-0000-000000000001'::uuid, 123.25::numeric,
+                         p_amount, p_amount * 123 + 7, now() + interval '5 minutes'
+                $$
+                """
+            )
+        conn.commit()
+    yield
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DROP FUNCTION fx.issue_fx_quote_secure(text, text, bigint)")
+        conn.commit()
+
+
+def test_single_round_trip_matches_multi_statement_response(client, user2, funded_wallet2_xof, monkeypatch):
+    monkeypatch.setattr(settings, "CASHOUT_SINGLE_ROUND_TRIP", False)
+    legacy = _cash_out(client, user2.token, funded_wallet2_xof, f"pytest-srt-{uuid.uuid4()}")
+    assert legacy.status_code == 200, legacy.text
+
+    monkeypatch.setattr(settings, "CASHOUT_SINGLE_ROUND_TRIP", True)
+    fast = _cash_out(client, user2.token, funded_wallet2_xof, f"pytest-srt-{uuid.uuid4()}")
+    assert fast.status_code == 200, fast.text
+
+    a, b = legacy.json(), fast.json()
+    assert set(a) == set(b)
+    for key in ("fee_cents", "fx_rate", "receive_amount_minor", "corridor"):
+        assert a[key] == b[key]
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT status, quote FROM app.mobile_money_payouts WHERE transaction_id = %s::uuid",
+                (b["transaction_id"],),
+            )
+            status, quote = cur.fetchone()
+    assert status == "PENDING"
+    assert quote["fx_rate"] == b["fx_rate"]
+
+
+def test_single_round_trip_replays_and_maps_conflicts(client, user2, funded_wallet2_xof, monkeypatch):
+    monkeypatch.setattr(settings, "CASHOUT_SINGLE_ROUND_TRIP", True)
+    idem = f"pytest-srt-{uuid.uuid4()}"
+    ref = f"srt-ref-{uuid.uuid4()}"
+
+    first = _cash_out(client, user2.token, funded_wallet2_xof, idem, provider_ref=ref)
+    assert first.status_code == 200, first.text
+
+    replay = _cash_out(client, user2.token, funded_wallet2_xof, idem, provider_ref=ref)
+    assert replay.status_code == 200, replay.text
+    assert replay.json()["transaction_id"] == first.json()["transaction_id"]
+
+    conflict = _cash_out(client, user2.token, funded_wallet2_xof, idem, amount_cents=101, provider_ref=ref)
+    assert conflict.status_code == 409, conflict.text
+    assert conflict.json()["detail"] == "IDEMPOTENCY_CONFLICT"
+
+
+def test_single_round_trip_uses_the_live_quote_like_multi_statement(
+    client, user2, funded_wallet2_xof, live_fx_quote, monkeypatch
+):
+    monkeypatch.setattr(settings, "CASHOUT_SINGLE_ROUND_TRIP", False)
+    legacy = _cash_out(client, user2.token, funded_wallet2_xof, f"pytest-srt-{uuid.uuid4()}")
+    assert legacy.status_code == 200, legacy.text
+
+    monkeypatch.setattr(settings, "CASHOUT_SINGLE_ROUND_TRIP", True)
+    fast = _cash_out(client, user2.token, funded_wallet2_xof, f"pytest-srt-{uuid.uuid4()}")
+    assert fast.status_code == 200, fast.text
+
+    for body in (legacy.json(), fast.json()):
+        assert body["fx_rate"] == "123.25"
+        assert body["receive_amount_minor"] == 100 * 123 + 7
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from app.providers.base import ProviderResult
+from app.workers import circuit_breaker, payout_worker
+from app.workers.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from services.metrics import render_prometheus
+from settings import settings
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _breaker(clock, **kwargs) -> CircuitBreaker:
+    opts = dict(window_size=10, min_calls=4, failure_rate=0.5, slow_call_s=5.0, slow_rate=0.5, open_s=30, open_max_s=120, half_open_probes=2)
+    opts.update(kwargs)
+    return CircuitBreaker("PYTEST", clock=clock, **opts)
+
+
+def test_opens_on_failure_rate_only_after_min_calls():
+    clock = _Clock()
+    b = _breaker(clock)
+
+    for _ in range(3):
+        b.record(failed=True, elapsed_s=0.1)
+    assert b.state == CLOSED  # below min_calls
+
+    b.record(failed=False, elapsed_s=0.1)
+    assert b.state == OPEN  # 3/4 failed
+    assert b.allow() is False
+    assert 29 < b.retry_after() <= 30
+
+
+def test_opens_on_slow_calls():
+    b = _breaker(_Clock())
+    for _ in range(4):
+        b.record(failed=False, elapsed_s=6.0)
+    assert b.state == OPEN
+
+
+def test_half_open_probes_close_or_reopen_with_longer_backoff():
+    clock = _Clock()
+    b = _breaker(clock)
+    for _ in range(4):
+        b.record(failed=True, elapsed_s=0.1)
+
+    clock.now += 30
+    assert b.state == HALF_OPEN
+    assert b.allow() and b.allow()
+    assert b.allow() is False  # only half_open_probes calls get through
+
+    b.record(failed=True, elapsed_s=0.1)
+    assert b.state == OPEN
+    assert 59 < b.retry_after() <= 60  # doubled
+
+    clock.now += 60
+    assert b.allow() and b.allow()
+    b.record(failed=False, elapsed_s=0.1)
+    b.record(failed=False, elapsed_s=0.1)
+    assert b.state == CLOSED
+    assert b.allow() is True
+
+
+def test_state_is_exported_on_metrics():
+    b = _breaker(_Clock(), min_calls=1)
+    b.record(failed=True, elapsed_s=0.1)
+    assert 'payout_circuit_state{provider="PYTEST"} 2' in render_prometheus()
+
+
+class _Recorder:
+    def __init__(self):
+        self.updates = []
+
+    def update(self, p, **fields):
+        self.updates.append(fields)
+
+    def lease_held(self, p):
+        return True
+
+
+class _DownProvider:
+    def __init__(self):
+        self.calls = 0
+
+    def send_cashout(self, payout):
+        self.calls += 1
+        return ProviderResult(status="FAILED", error="Gateway timeout", response={"http_status": 504}, retryable=True)
+
+
+def test_open_breaker_reschedules_without_calling_provider(monkeypatch):
+    monkeypatch.setattr(settings, "CIRCUIT_MIN_CALLS", 3)
+    monkeypatch.setattr(settings, "CIRCUIT_WINDOW_SIZE", 3)
+    circuit_breaker.reset_breakers()
+    down = _DownProvider()
+    monkeypatch.setattr(payout_worker, "get_provider", lambda name: down)
+
+    out = _Recorder()
+    for i in range(5):
+        payout_worker._handle_pending(
+            out,
+            {"id": i, "status": "PENDING", "provider": "FLOOZ", "phone_e164": "+22890000000", "attempt_count": 1},
+        )
+
+    assert down.calls == 3
+    submitted, skipped = out.updates[:3], out.updates[3:]
+    assert all(u["attempt_count"] == 2 for u in submitted)
+    for u in skipped:
+        assert u["new_status"] == "PENDING"
+        assert u["attempt_count"] == 1
+        assert u["last_error"].startswith(payout_worker.CIRCUIT_OPEN_ERROR)
+        assert u["touch_last_attempt_at"] is False
+        assert u["next_retry_at"] > datetime.now(timezone.utc)
+    circuit_breaker.reset_breakers()
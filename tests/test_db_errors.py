@@ -21,16 +21,16 @@ def test_unknown_db_error_returns_500(client, user2, wallet2_xof, monkeypatch):
         raise HTTPException(status_code=500, detail="Internal server error")
 
     monkeypatch.setattr(db_exec, "raise_http_from_db_error", fake_raise_for_db_error, raising=True)
-    # Now patch the route module's get_conn to raise an unknown exception
+    # Now patch the route module's get_async_conn to raise an unknown exception
     class DummyConn:
-        def __enter__(self):  # pragma: no cover
+        async def __aenter__(self):  # pragma: no cover
             raise Exception("SOME_RANDOM_DB_BLOWUP_123")
-        def __exit__(self, exc_type, exc, tb):  # pragma: no cover
+        async def __aexit__(self, exc_type, exc, tb):  # pragma: no cover
             return False
 
-    monkeypatch.setattr(wallet_routes, "get_conn", lambda: DummyConn(), raising=True)
+    monkeypatch.setattr(wallet_routes, "get_async_conn", lambda readonly=False: DummyConn(), raising=True)
 
-    # Call an endpoint that uses get_conn + raise_for_db_error (balance is perfect)
+    # Call an endpoint that uses get_async_conn + raise_for_db_error (balance is perfect)
     r = client.get(
         f"/v1/wallets/{wallet2_xof}/balance",
         headers={"Authorization": f"Bearer {user2.token}"},
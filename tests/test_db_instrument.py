@@ -0,0 +1,121 @@
+import logging
+import re
+import time
+
+import psycopg2
+import pytest
+
+from db import get_conn
+from db_instrument import _TimedCursorMixin, fingerprint, normalize_sql, redact_params
+from services.metrics import observe_db_statement, render_prometheus
+from settings import settings
+
+# one exposition-format sample: name{label="escaped value",...} value
+_SAMPLE_RE = re.compile(
+    r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-zA-Z_]\w*="(?:[^"\\\n]|\\.)*"(?:,[a-zA-Z_]\w*="(?:[^"\\\n]|\\.)*")*\})? \S+$'
+)
+
+
+def _assert_parses(body: str) -> None:
+    for line in body.splitlines():
+        assert line.startswith("# ") or _SAMPLE_RE.match(line), line
+
+
+def test_fingerprint_ignores_literals_placeholders_and_whitespace():
+    a = "SELECT id FROM payouts WHERE status = %s AND attempt_count < 3 -- worker\n  LIMIT 10"
+    b = "select id  from payouts\nwhere status = 'PENDING' and attempt_count < 5 limit 50"
+    assert normalize_sql(a) == "select id from payouts where status = ? and attempt_count < ? limit ?"
+    assert fingerprint(a)[0] == fingerprint(b)[0]
+    assert fingerprint("SELECT 1 FROM t WHERE id IN (%s, %s)")[0] == fingerprint("SELECT 1 FROM t WHERE id IN (1,2,3)")[0]
+    assert fingerprint("SELECT 1 FROM a")[0] != fingerprint("SELECT 1 FROM b")[0]
+
+
+def test_params_are_redacted():
+    out = redact_params(("+22890123456", "user@example.com", {"access_token": "abc"}, 42))
+    assert out == ["+22890****56", "u***@example.com", {"access_token": "[REDACTED]"}, 42]
+
+
+def test_slow_statement_is_logged_with_redacted_params(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_MS", 1)
+    caplog.set_level(logging.WARNING, logger="nexapay.db")
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_sleep(0.01), %s::text", ("+22890123456",))
+
+    lines = [r.getMessage() for r in caplog.records if r.getMessage().startswith("slow_query ")]
+    assert lines
+    assert "select pg_sleep(?), ?::text" in lines[-1]
+    assert "+22890****56" in lines[-1]
+    assert "+22890123456" not in lines[-1]
+
+
+def test_failed_statement_is_timed(monkeypatch, caplog):
+    class Failing:
+        def execute(self, query, vars=None):
+            time.sleep(0.01)
+            raise RuntimeError("canceling statement due to statement timeout")
+
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_MS", 1)
+    caplog.set_level(logging.WARNING, logger="nexapay.db")
+    cur = type("TimedFailing", (_TimedCursorMixin, Failing), {})()
+
+    with pytest.raises(RuntimeError):
+        cur.execute("SELECT pytest_failed_statement(%s)", (1,))
+
+    assert any("select pytest_failed_statement(?)" in r.getMessage() for r in caplog.records)
+    assert 'statement="select pytest_failed_statement(?)"' in render_prometheus()
+
+
+def test_statement_timeout_is_slow_logged(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_MS", 1)
+    caplog.set_level(logging.WARNING, logger="nexapay.db")
+
+    with pytest.raises(psycopg2.errors.QueryCanceled):
+        with get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SET LOCAL statement_timeout = '20ms'")
+                cur.execute("SELECT pg_sleep(1)")
+
+    lines = [r.getMessage() for r in caplog.records if r.getMessage().startswith("slow_query ")]
+    assert any("select pg_sleep(?)" in line for line in lines)
+
+
+def test_failed_explain_leaves_the_transaction_usable(monkeypatch):
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_MS", 1)
+    monkeypatch.setattr(settings, "DB_EXPLAIN_SLOW_QUERIES", True)
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            # its EXPLAIN runs the CREATE a second time, which fails
+            cur.execute("SELECT pg_sleep(0.01); CREATE TEMP TABLE pytest_explain_twice (x int) ON COMMIT DROP")
+            cur.execute("SELECT 1")
+            assert cur.fetchone() == (1,)
+
+
+def test_statement_histogram_is_exported(client):
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+
+    body = client.get("/metrics").text
+    assert "db_statement_duration_seconds_bucket{" in body
+    assert 'route="background"' in body
+
+
+def test_label_values_are_escaped():
+    observe_db_statement("pytest", "fp-escape", 'select * from "ledger"."ledger_entries" -- a\\b\nc', 0.001)
+
+    body = render_prometheus()
+    _assert_parses(body)
+    assert 'statement="select * from \\"ledger\\".\\"ledger_entries\\" -- a\\\\b\\nc"' in body
+
+
+def test_metrics_parse_after_quoted_identifier_query(client):
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute('SELECT count(*) FROM "ledger"."ledger_entries" WHERE false')
+
+    body = client.get("/metrics").text
+    assert '\\"ledger\\".\\"ledger_entries\\"' in body
+    _assert_parses(body)
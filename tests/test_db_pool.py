@@ -0,0 +1,88 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import db_async
+from db import get_conn
+from db_pool import InstrumentedPool, PoolTimeout, session_connect_kwargs
+from main import app
+from settings import settings
+
+
+def _pool(**overrides) -> InstrumentedPool:
+    kwargs = dict(
+        name="test",
+        min_size=0,
+        max_size=1,
+        checkout_timeout_s=0.05,
+        connect_kwargs=session_connect_kwargs(),
+    )
+    kwargs.update(overrides)
+    return InstrumentedPool(settings.DATABASE_URL, **kwargs)
+
+
+def test_session_settings_applied_at_connect():
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SHOW statement_timeout;")
+            assert cur.fetchone()[0] == "5s"
+            cur.execute("SHOW application_name;")
+            assert cur.fetchone()[0] == settings.DB_APPLICATION_NAME
+
+
+def test_checkout_times_out_when_exhausted_and_reports_metrics(client):
+    pool = _pool()
+    try:
+        held = pool.getconn()
+        with pytest.raises(PoolTimeout):
+            pool.getconn()
+
+        pool.putconn(held)
+        again = pool.getconn()
+        assert again is held
+        pool.putconn(again)
+    finally:
+        pool.closeall()
+
+    body = client.get("/metrics").text
+    assert 'db_pool_checkout_timeouts_total{pool="test"}' in body
+    assert 'db_pool_wait_seconds_count{pool="test"}' in body
+    assert 'db_pool_connections_idle{pool="test"}' in body
+
+
+def test_expired_connections_are_recycled():
+    pool = _pool(max_lifetime_s=0.001)
+    try:
+        first = pool.getconn()
+        time.sleep(0.01)
+        pool.putconn(first)
+        assert first.closed
+
+        second = pool.getconn()
+        assert second is not first
+        pool.putconn(second)
+    finally:
+        pool.closeall()
+
+
+def test_async_routes_use_the_lifespan_pool(user2, wallet2_xof, monkeypatch):
+    # The session client runs without lifespan, so its async routes take the
+    # short-lived-connection fallback; entering the lifespan opens the pool.
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URL", "")
+    with TestClient(app) as lifespan_client:
+        pool = db_async._pool
+        assert pool is not None
+        before = pool.get_stats().get("requests_num", 0)
+
+        r = lifespan_client.get(
+            f"/v1/wallets/{wallet2_xof}/balance",
+            headers={"Authorization": f"Bearer {user2.token}"},
+        )
+        assert r.status_code == 200, r.text
+        assert pool.get_stats()["requests_num"] > before
+
+        body = lifespan_client.get("/metrics").text
+        assert 'db_pool_wait_seconds_count{pool="async"}' in body
+
+    assert db_async._pool is None
@@ -0,0 +1,49 @@
+import pytest
+
+import db
+from services.metrics import render_prometheus
+from settings import settings
+
+
+@pytest.fixture
+def replica_is_primary(monkeypatch):
+    """
+    Point the replica DSN at the primary: pg_is_in_recovery() is false,
+    so the lag guard reports 0 and routing can be checked without a standby.
+    """
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URL", settings.DATABASE_URL)
+    monkeypatch.setattr(settings, "DB_REPLICA_LAG_CHECK_INTERVAL_S", 0.0)
+    db._replica_guard.reset()
+    yield
+    if db._replica_pool is not None:
+        db._replica_pool.closeall()
+        db._replica_pool = None
+    db._replica_guard.reset()
+
+
+def _owned_by(pool, conn) -> bool:
+    return pool is not None and id(conn) in pool._created_at
+
+
+def test_readonly_conn_routes_to_replica(replica_is_primary):
+    with db.get_conn(readonly=True) as conn:
+        assert _owned_by(db._replica_pool, conn)
+
+    with db.get_conn() as conn:
+        assert _owned_by(db._pool, conn)
+
+
+def test_lagging_replica_falls_back_to_primary(replica_is_primary, monkeypatch):
+    monkeypatch.setattr(settings, "DB_REPLICA_MAX_LAG_S", -1.0)
+
+    with db.get_conn(readonly=True) as conn:
+        assert _owned_by(db._pool, conn)
+
+    assert 'db_replica_fallbacks_total{engine="sync",reason="lag"}' in render_prometheus()
+
+
+def test_readonly_without_replica_uses_primary(monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URL", "")
+
+    with db.get_conn(readonly=True) as conn:
+        assert _owned_by(db._pool, conn)
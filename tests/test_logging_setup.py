@@ -0,0 +1,60 @@
+import json
+import logging
+import queue
+from logging.handlers import QueueListener
+
+from logging_setup import JsonFormatter, SamplingFilter, _QueueHandler, _parse_rates
+
+
+def _record(msg: str, *args, level: int = logging.INFO, name: str = "nexapay.http") -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_json_formatter_extracts_event_and_fields():
+    line = JsonFormatter().format(_record("http_request request_id=%s status=%s", "abc", 200))
+    out = json.loads(line)
+    assert out["event"] == "http_request"
+    assert out["request_id"] == "abc"
+    assert out["status"] == "200"
+    assert out["logger"] == "nexapay.http"
+    assert out["level"] == "INFO"
+
+
+def test_sampling_drops_info_but_keeps_warnings():
+    f = SamplingFilter(_parse_rates("http_request=0,nexapay.webhooks=1"))
+    assert not f.filter(_record("http_request request_id=%s", "x"))
+    assert f.filter(_record("http_request error request_id=%s", "x", level=logging.ERROR))
+    assert f.filter(_record("webhook_received provider=%s", "TMONEY", name="nexapay.webhooks"))
+    assert f.filter(_record("other_event"))
+
+
+def test_queue_handler_hands_records_to_writer_thread():
+    q = queue.SimpleQueue()
+    seen = []
+
+    class _Collect(logging.Handler):
+        def emit(self, record):
+            seen.append(self.format(record))
+
+    collector = _Collect()
+    collector.setFormatter(JsonFormatter())
+    listener = QueueListener(q, collector)
+    listener.start()
+
+    logger = logging.getLogger("pytest.logging_setup")
+    logger.propagate = False
+    handler = _QueueHandler(q)
+    logger.addHandler(handler)
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("worker_poll found_pending=%s", 3)
+    finally:
+        logger.removeHandler(handler)
+        listener.stop()
+
+    out = json.loads(seen[0])
+    assert out["event"] == "worker_poll"
+    assert out["found_pending"] == "3"
+    assert "ValueError: boom" in out["exc"]
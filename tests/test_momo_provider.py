@@ -26,13 +26,13 @@ def _set_env(monkeypatch):
 def test_momo_token_success(monkeypatch):
     _set_env(monkeypatch)
 
-    def fake_post(url, headers=None, auth=None, json=None):
+    async def fake_post(url, headers=None, auth=None, json=None):
         assert url.endswith("/disbursement/token/")
         assert headers["Ocp-Apim-Subscription-Key"] == "sub-123"
         assert auth == ("user-123", "key-123")
         return _FakeResponse(200, {"access_token": "token-123", "expires_in": 3600})
 
-    monkeypatch.setattr("app.providers.mobile_money.momo.requests.post", fake_post)
+    monkeypatch.setattr("app.providers.mobile_money.momo.transport.post", fake_post)
 
     provider = MomoProvider()
     token = provider.get_token()
@@ -44,7 +44,7 @@ def test_momo_transfer_created(monkeypatch):
     calls = {"token": 0, "transfer": 0}
     monkeypatch.setenv("MOMO_SANDBOX_CURRENCY", "EUR")
 
-    def fake_post(url, headers=None, auth=None, json=None):
+    async def fake_post(url, headers=None, auth=None, json=None):
         if url.endswith("/disbursement/token/"):
             calls["token"] += 1
             return _FakeResponse(200, {"access_token": "token-123", "expires_in": 3600})
@@ -57,7 +57,7 @@ def test_momo_transfer_created(monkeypatch):
             return _FakeResponse(202, {"status": "PENDING", "referenceId": "momo-ref-123"})
         raise AssertionError("unexpected url")
 
-    monkeypatch.setattr("app.providers.mobile_money.momo.requests.post", fake_post)
+    monkeypatch.setattr("app.providers.mobile_money.momo.transport.post", fake_post)
 
     provider = MomoProvider()
     payout = {
@@ -81,14 +81,14 @@ def test_momo_transfer_created(monkeypatch):
 def test_momo_create_invalid_currency_non_retryable(monkeypatch):
     _set_env(monkeypatch)
 
-    def fake_post(url, headers=None, auth=None, json=None):
+    async def fake_post(url, headers=None, auth=None, json=None):
         if url.endswith("/disbursement/token/"):
             return _FakeResponse(200, {"access_token": "token-123", "expires_in": 3600})
         if url.endswith("/disbursement/v1_0/transfer"):
             return _FakeResponse(400, {"code": "INVALID_CURRENCY"})
         raise AssertionError("unexpected url")
 
-    monkeypatch.setattr("app.providers.mobile_money.momo.requests.post", fake_post)
+    monkeypatch.setattr("app.providers.mobile_money.momo.transport.post", fake_post)
 
     provider = MomoProvider()
     result = provider.create_transfer(
@@ -108,7 +108,7 @@ def test_momo_sandbox_currency_override(monkeypatch):
     _set_env(monkeypatch)
     monkeypatch.setenv("MOMO_SANDBOX_CURRENCY", "EUR")
 
-    def fake_post(url, headers=None, auth=None, json=None):
+    async def fake_post(url, headers=None, auth=None, json=None):
         if url.endswith("/disbursement/token/"):
             return _FakeResponse(200, {"access_token": "token-123", "expires_in": 3600})
         if url.endswith("/disbursement/v1_0/transfer"):
@@ -116,7 +116,7 @@ def test_momo_sandbox_currency_override(monkeypatch):
             return _FakeResponse(202, {"status": "PENDING", "referenceId": "momo-ref-123"})
         raise AssertionError("unexpected url")
 
-    monkeypatch.setattr("app.providers.mobile_money.momo.requests.post", fake_post)
+    monkeypatch.setattr("app.providers.mobile_money.momo.transport.post", fake_post)
 
     provider = MomoProvider()
     payout = {
@@ -136,7 +136,7 @@ def test_momo_real_uses_payout_currency(monkeypatch):
     monkeypatch.setenv("MOMO_ENV", "real")
     monkeypatch.setenv("MOMO_SANDBOX_CURRENCY", "EUR")
 
-    def fake_post(url, headers=None, auth=None, json=None):
+    async def fake_post(url, headers=None, auth=None, json=None):
         if url.endswith("/disbursement/token/"):
             return _FakeResponse(200, {"access_token": "token-123", "expires_in": 3600})
         if url.endswith("/disbursement/v1_0/transfer"):
@@ -144,7 +144,7 @@ def test_momo_real_uses_payout_currency(monkeypatch):
             return _FakeResponse(202, {"status": "PENDING", "referenceId": "momo-ref-123"})
         raise AssertionError("unexpected url")
 
-    monkeypatch.setattr("app.providers.mobile_money.momo.requests.post", fake_post)
+    monkeypatch.setattr("app.providers.mobile_money.momo.transport.post", fake_post)
 
     provider = MomoProvider()
     payout = {
@@ -162,15 +162,15 @@ def test_momo_real_uses_payout_currency(monkeypatch):
 def test_momo_status_successful_updates_payout(monkeypatch):
     _set_env(monkeypatch)
 
-    def fake_post(url, headers=None, auth=None, json=None):
+    async def fake_post(url, headers=None, auth=None, json=None):
         return _FakeResponse(200, {"access_token": "token-123", "expires_in": 3600})
 
-    def fake_get(url, headers=None):
+    async def fake_get(url, headers=None):
         assert url.endswith("/disbursement/v1_0/transfer/ref-123")
         return _FakeResponse(200, {"status": "SUCCESSFUL"})
 
-    monkeypatch.setattr("app.providers.mobile_money.momo.requests.post", fake_post)
-    monkeypatch.setattr("app.providers.mobile_money.momo.requests.get", fake_get)
+    monkeypatch.setattr("app.providers.mobile_money.momo.transport.post", fake_post)
+    monkeypatch.setattr("app.providers.mobile_money.momo.transport.get", fake_get)
 
     provider = MomoProvider()
     result = provider.get_status({"provider_ref": "ref-123"})
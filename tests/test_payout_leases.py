@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import uuid
+
+import pytest
+
+from app.payouts.repository import claim_pending_payouts, renew_leases, update_status
+from app.workers import payout_worker
+from db import get_conn
+from settings import settings
+
+
+@pytest.fixture(autouse=True)
+def _cleanup_pytest_payouts():
+    with get_conn() as conn:
+        conn.cursor().execute("DELETE FROM app.mobile_money_payouts WHERE provider_ref LIKE 'pytest-lease-%'")
+    yield
+    with get_conn() as conn:
+        conn.cursor().execute("DELETE FROM app.mobile_money_payouts WHERE provider_ref LIKE 'pytest-lease-%'")
+
+
+def _insert_pending() -> uuid.UUID:
+    payout_id = uuid.uuid4()
+    with get_conn() as conn:
+        conn.cursor().execute(
+            """
+            INSERT INTO app.mobile_money_payouts (
+              id, transaction_id, provider, phone_e164, provider_ref,
+              status, amount_cents, currency, attempt_count, retryable,
+              created_at, updated_at
+            )
+            VALUES (%s, %s, 'TMONEY', '+22890000000', %s, 'PENDING', 1000, 'XOF', 0, TRUE, now() - interval '1 day', now())
+            """,
+            (payout_id, uuid.uuid4(), f"pytest-lease-{payout_id}"),
+        )
+    return payout_id
+
+
+def _lease(payout_id: uuid.UUID):
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT status, lease_owner, leased_until FROM app.mobile_money_payouts WHERE id = %s",
+            (payout_id,),
+        )
+        return cur.fetchone()
+
+
+def _claim(owner: str, lease_seconds: float = 300) -> set:
+    with get_conn() as conn:
+        rows = claim_pending_payouts(conn, batch_size=500, lease_owner=owner, lease_seconds=lease_seconds)
+    return {r["id"] for r in rows}
+
+
+def test_claim_commits_lease_and_skips_leased_rows():
+    payout_id = _insert_pending()
+
+    assert payout_id in _claim("pytest-owner-a")
+    status, owner, leased_until = _lease(payout_id)
+    assert (status, owner) == ("PENDING", "pytest-owner-a")
+    assert leased_until is not None
+
+    # visible to (and skipped by) other claimers without holding any row lock
+    assert payout_id not in _claim("pytest-owner-b")
+
+
+def test_expired_lease_is_reclaimed():
+    payout_id = _insert_pending()
+    assert payout_id in _claim("pytest-owner-a")
+    with get_conn() as conn:
+        conn.cursor().execute(
+            "UPDATE app.mobile_money_payouts SET leased_until = now() - interval '1 second' WHERE id = %s",
+            (payout_id,),
+        )
+
+    assert payout_id in _claim("pytest-owner-b")
+    assert _lease(payout_id)[1] == "pytest-owner-b"
+
+
+def test_outcome_requires_lease_and_releases_it():
+    payout_id = _insert_pending()
+    assert payout_id in _claim("pytest-owner-a")
+
+    with get_conn() as conn:
+        stale = update_status(
+            conn,
+            payout_id=payout_id,
+            from_status="PENDING",
+            new_status="FAILED",
+            lease_owner="pytest-owner-b",
+        )
+        assert stale is False
+        ok = update_status(
+            conn,
+            payout_id=payout_id,
+            from_status="PENDING",
+            new_status="CONFIRMED",
+            attempt_count=1,
+            lease_owner="pytest-owner-a",
+        )
+        assert ok is True
+
+    assert _lease(payout_id) == ("CONFIRMED", None, None)
+
+
+def test_process_once_commits_each_outcome_and_releases_lease(monkeypatch):
+    monkeypatch.setattr(payout_worker, "get_provider", lambda name: payout_worker.MockProvider(succeed=True))
+    payout_id = _insert_pending()
+
+    for _ in range(3):
+        payout_worker.process_once(batch_size=500)
+        if _lease(payout_id)[0] == "CONFIRMED":
+            break
+
+    assert _lease(payout_id) == ("CONFIRMED", None, None)
+
+
+def test_lease_covers_the_worst_case_batch(monkeypatch):
+    monkeypatch.setattr(settings, "WORKER_LEASE_SECONDS", 60)
+    monkeypatch.setattr(settings, "MM_HTTP_TIMEOUT_S", 20.0)
+    monkeypatch.setattr(settings, "WORKER_MAX_IN_FLIGHT_THUNES", 4)
+    # 50 payouts on 4 lanes at 20 s each: 13 rounds, 260 s, leased for twice that
+    assert payout_worker._lease_seconds(50) == 520.0
+    assert payout_worker._lease_seconds(1) == 60.0
+
+
+def test_renewal_extends_only_leases_still_held():
+    kept, lost = _insert_pending(), _insert_pending()
+    assert {kept, lost} <= _claim("pytest-owner-a", lease_seconds=1)
+    with get_conn() as conn:
+        conn.cursor().execute(
+            "UPDATE app.mobile_money_payouts SET leased_until = now() - interval '1 second' WHERE id = %s",
+            (lost,),
+        )
+    assert lost in _claim("pytest-owner-b")
+
+    with get_conn() as conn:
+        renewed = renew_leases(conn, [kept, lost], lease_owner="pytest-owner-a", lease_seconds=300)
+    assert renewed == {str(kept)}
+    _, owner, leased_until = _lease(kept)
+    assert owner == "pytest-owner-a"
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT %s > now() + interval '200 seconds'", (leased_until,))
+        assert cur.fetchone()[0] is True
+
+
+def test_lost_lease_is_not_sent(monkeypatch):
+    sent = []
+
+    class Recording(payout_worker.MockProvider):
+        def send_cashout(self, payout):
+            sent.append(payout["id"])
+            return super().send_cashout(payout)
+
+    monkeypatch.setattr(payout_worker, "get_provider", lambda name: Recording(succeed=True))
+    payout_id = _insert_pending()
+    with get_conn() as conn:
+        rows = claim_pending_payouts(conn, batch_size=500, lease_owner="pytest-owner-a", lease_seconds=300)
+    (p,) = [r for r in rows if r["id"] == payout_id]
+    with get_conn() as conn:
+        conn.cursor().execute(
+            "UPDATE app.mobile_money_payouts SET leased_until = now() - interval '1 second' WHERE id = %s",
+            (payout_id,),
+        )
+    assert payout_id in _claim("pytest-owner-b")
+
+    with payout_worker.LeaseKeeper([payout_id], owner="pytest-owner-a", lease_seconds=300) as leases:
+        leases.renew()
+        out = payout_worker.OutcomeBatch(max_size=10, max_wait_s=60, leases=leases)
+        payout_worker._handle_pending(out, p)
+        out.flush()
+
+    assert sent == []
+    assert _lease(payout_id)[:2] == ("PENDING", "pytest-owner-b")
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import time
+import uuid
+
+import pytest
+
+from app.workers import payout_worker
+from db import get_conn
+
+
+@pytest.fixture(autouse=True)
+def _cleanup_pytest_payouts():
+    yield
+    with get_conn() as conn:
+        conn.cursor().execute("DELETE FROM app.mobile_money_payouts WHERE provider_ref LIKE 'pytest-notify-%'")
+
+
+@pytest.fixture()
+def wakeup():
+    w = payout_worker.PayoutWakeup(stale_seconds=3600, poll_seconds=1)
+    w.drain()
+    yield w
+    w.close()
+
+
+def _insert(status: str) -> uuid.UUID:
+    payout_id = uuid.uuid4()
+    with get_conn() as conn:
+        conn.cursor().execute(
+            """
+            INSERT INTO app.mobile_money_payouts (
+              id, transaction_id, provider, phone_e164, provider_ref,
+              status, amount_cents, currency, attempt_count, retryable, created_at, updated_at
+            )
+            VALUES (%s, %s, 'TMONEY', '+22890000000', %s, %s, 1000, 'XOF', 0, TRUE, now(), now())
+            """,
+            (payout_id, uuid.uuid4(), f"pytest-notify-{payout_id}", status),
+        )
+    return payout_id
+
+
+def test_pending_insert_wakes_listener(wakeup):
+    _insert("PENDING")
+
+    started = time.monotonic()
+    assert wakeup.wait(10) is True
+    assert time.monotonic() - started < 2
+
+
+def test_retry_to_pending_wakes_listener(wakeup):
+    payout_id = _insert("FAILED")
+    assert wakeup.wait(0.5) is False  # FAILED insert does not notify
+
+    with get_conn() as conn:
+        conn.cursor().execute(
+            "UPDATE app.mobile_money_payouts SET status = 'PENDING', next_retry_at = now() WHERE id = %s",
+            (payout_id,),
+        )
+
+    assert wakeup.wait(10) is True
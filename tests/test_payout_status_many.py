@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import uuid
+
+import pytest
+
+from app.payouts.model import StatusUpdate
+from app.payouts.repository import update_status_many
+from db import get_conn
+
+
+@pytest.fixture(autouse=True)
+def _cleanup_pytest_payouts():
+    yield
+    with get_conn() as conn:
+        conn.cursor().execute("DELETE FROM app.mobile_money_payouts WHERE provider_ref LIKE 'pytest-many-%'")
+
+
+def _insert(status: str, lease_owner: str | None = None) -> uuid.UUID:
+    payout_id = uuid.uuid4()
+    with get_conn() as conn:
+        conn.cursor().execute(
+            """
+            INSERT INTO app.mobile_money_payouts (
+              id, transaction_id, provider, phone_e164, provider_ref, status, amount_cents, currency,
+              lease_owner, leased_until
+            )
+            VALUES (%s, %s, 'TMONEY', '+22890000000', %s, %s, 1000, 'XOF',
+                    %s, CASE WHEN %s::text IS NULL THEN NULL ELSE now() + interval '5 minutes' END)
+            """,
+            (payout_id, uuid.uuid4(), f"pytest-many-{payout_id}", status, lease_owner, lease_owner),
+        )
+    return payout_id
+
+
+def _row(payout_id: uuid.UUID):
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT status, attempt_count, last_error, provider_response, next_retry_at IS NOT NULL, lease_owner
+            FROM app.mobile_money_payouts WHERE id = %s
+            """,
+            (payout_id,),
+        )
+        return cur.fetchone()
+
+
+def test_update_status_many_reports_per_row_guard():
+    confirmed = _insert("SENT")
+    moved_on = _insert("FAILED")
+    retry = _insert("SENT")
+
+    with get_conn() as conn:
+        applied = update_status_many(
+            conn,
+            [
+                StatusUpdate(payout_id=confirmed, from_status="SENT", new_status="CONFIRMED", attempt_count=2,
+                             provider_response={"http_status": 200}, retryable=False),
+                StatusUpdate(payout_id=moved_on, from_status="SENT", new_status="CONFIRMED"),
+                StatusUpdate(payout_id=retry, from_status="SENT", new_status="SENT", retryable=True,
+                             last_error="timeout"),
+            ],
+        )
+
+    assert applied == [True, False, True]
+    assert _row(confirmed)[:4] == ("CONFIRMED", 2, None, {"http_status": 200})
+    assert _row(moved_on)[0] == "FAILED"
+    # same default backoff as update_status for retryable SENT without next_retry_at
+    assert _row(retry)[:3] == ("SENT", 0, "timeout")
+    assert _row(retry)[4] is True
+
+
+def test_update_status_many_honours_and_releases_leases():
+    mine = _insert("PENDING", lease_owner="pytest-owner-a")
+    theirs = _insert("PENDING", lease_owner="pytest-owner-b")
+
+    with get_conn() as conn:
+        applied = update_status_many(
+            conn,
+            [
+                StatusUpdate(payout_id=mine, from_status="PENDING", new_status="SENT", lease_owner="pytest-owner-a"),
+                StatusUpdate(payout_id=theirs, from_status="PENDING", new_status="SENT", lease_owner="pytest-owner-a"),
+            ],
+        )
+
+    assert applied == [True, False]
+    assert _row(mine)[0] == "SENT" and _row(mine)[5] is None
+    assert _row(theirs)[0] == "PENDING" and _row(theirs)[5] == "pytest-owner-b"
+
+
+def test_update_status_many_empty_batch_is_a_no_op():
+    with get_conn() as conn:
+        assert update_status_many(conn, []) == []
@@ -254,16 +254,16 @@ def test_worker_momo_status_successful_transitions(monkeypatch):
     from app.providers.mobile_money import factory
     factory._PROVIDER_CACHE.clear()
 
-    def fake_post(url, headers=None, auth=None, json=None):
+    async def fake_post(url, headers=None, auth=None, json=None):
         assert url.endswith("/disbursement/token/")
         return SimpleNamespace(status_code=200, json=lambda: {"access_token": "token-123", "expires_in": 3600})
 
-    def fake_get(url, headers=None):
+    async def fake_get(url, headers=None):
         assert url.endswith("/disbursement/v1_0/transfer/pytest-momo-ref")
         return SimpleNamespace(status_code=200, json=lambda: {"status": "SUCCESSFUL"})
 
-    monkeypatch.setattr("app.providers.mobile_money.momo.requests.post", fake_post)
-    monkeypatch.setattr("app.providers.mobile_money.momo.requests.get", fake_get)
+    monkeypatch.setattr("app.providers.mobile_money.momo.transport.post", fake_post)
+    monkeypatch.setattr("app.providers.mobile_money.momo.transport.get", fake_get)
 
     payout_id = _insert_payout(
         provider="MOMO",
@@ -290,7 +290,7 @@ def test_worker_momo_transfer_creates_sent_and_saves_response(monkeypatch):
     from app.providers.mobile_money import factory
     factory._PROVIDER_CACHE.clear()
 
-    def fake_post(url, headers=None, auth=None, json=None):
+    async def fake_post(url, headers=None, auth=None, json=None):
         if url.endswith("/disbursement/token/"):
             return SimpleNamespace(status_code=200, json=lambda: {"access_token": "token-123", "expires_in": 3600})
         if url.endswith("/disbursement/v1_0/transfer"):
@@ -302,7 +302,7 @@ def test_worker_momo_transfer_creates_sent_and_saves_response(monkeypatch):
             )
         raise AssertionError("unexpected url")
 
-    monkeypatch.setattr("app.providers.mobile_money.momo.requests.post", fake_post)
+    monkeypatch.setattr("app.providers.mobile_money.momo.transport.post", fake_post)
 
     payout_id = uuid.uuid4()
     tx_id = uuid.uuid4()
@@ -368,14 +368,14 @@ def test_worker_momo_status_failed_marks_failed(monkeypatch):
     from app.providers.mobile_money import factory
     factory._PROVIDER_CACHE.clear()
 
-    def fake_post(url, headers=None, auth=None, json=None):
+    async def fake_post(url, headers=None, auth=None, json=None):
         return SimpleNamespace(status_code=200, json=lambda: {"access_token": "token-123", "expires_in": 3600})
 
-    def fake_get(url, headers=None):
+    async def fake_get(url, headers=None):
         return SimpleNamespace(status_code=200, json=lambda: {"status": "FAILED"})
 
-    monkeypatch.setattr("app.providers.mobile_money.momo.requests.post", fake_post)
-    monkeypatch.setattr("app.providers.mobile_money.momo.requests.get", fake_get)
+    monkeypatch.setattr("app.providers.mobile_money.momo.transport.post", fake_post)
+    monkeypatch.setattr("app.providers.mobile_money.momo.transport.get", fake_get)
 
     payout_id = _insert_payout(
         provider="MOMO",
@@ -402,16 +402,16 @@ def test_worker_momo_sent_uses_status_only(monkeypatch):
     from app.providers.mobile_money import factory
     factory._PROVIDER_CACHE.clear()
 
-    def fake_post(url, headers=None, auth=None, json=None):
+    async def fake_post(url, headers=None, auth=None, json=None):
         if url.endswith("/disbursement/token/"):
             return SimpleNamespace(status_code=200, json=lambda: {"access_token": "token-123", "expires_in": 3600})
         raise AssertionError("transfer creation should not be called for SENT payouts")
 
-    def fake_get(url, headers=None):
+    async def fake_get(url, headers=None):
         return SimpleNamespace(status_code=200, json=lambda: {"status": "PENDING"})
 
-    monkeypatch.setattr("app.providers.mobile_money.momo.requests.post", fake_post)
-    monkeypatch.setattr("app.providers.mobile_money.momo.requests.get", fake_get)
+    monkeypatch.setattr("app.providers.mobile_money.momo.transport.post", fake_post)
+    monkeypatch.setattr("app.providers.mobile_money.momo.transport.get", fake_get)
 
     payout_id = _insert_payout(
         provider="MOMO",
@@ -437,7 +437,7 @@ def test_worker_momo_pending_with_ref_still_creates(monkeypatch):
     from app.providers.mobile_money import factory
     factory._PROVIDER_CACHE.clear()
 
-    def fake_post(url, headers=None, auth=None, json=None):
+    async def fake_post(url, headers=None, auth=None, json=None):
         if url.endswith("/disbursement/token/"):
             return SimpleNamespace(status_code=200, json=lambda: {"access_token": "token-123", "expires_in": 3600})
         if url.endswith("/disbursement/v1_0/transfer"):
@@ -448,7 +448,7 @@ def test_worker_momo_pending_with_ref_still_creates(monkeypatch):
             )
         raise AssertionError("unexpected url")
 
-    monkeypatch.setattr("app.providers.mobile_money.momo.requests.post", fake_post)
+    monkeypatch.setattr("app.providers.mobile_money.momo.transport.post", fake_post)
 
     payout_id = uuid.uuid4()
     tx_id = uuid.uuid4()
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict
+
+from app.workers import payout_worker
+from settings import settings
+
+
+class _InFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = defaultdict(int)
+        self.peak = defaultdict(int)
+        self.seen = []
+
+    def handler(self, out, p: dict) -> None:
+        group = payout_worker._cap_group(p)
+        with self.lock:
+            self.current[group] += 1
+            self.peak[group] = max(self.peak[group], self.current[group])
+        time.sleep(0.02)
+        with self.lock:
+            self.current[group] -= 1
+            self.seen.append(p["id"])
+
+
+def _caps(monkeypatch, overall: int, **per_provider: int) -> None:
+    monkeypatch.setattr(settings, "WORKER_MAX_IN_FLIGHT", overall)
+    for name, cap in per_provider.items():
+        monkeypatch.setattr(settings, f"WORKER_MAX_IN_FLIGHT_{name}", cap)
+
+
+def test_dispatch_respects_per_provider_caps(monkeypatch):
+    _caps(monkeypatch, 16, TMONEY=2, MOMO=3)
+    tracker = _InFlight()
+    jobs = [(tracker.handler, {"id": i, "provider": "TMONEY"}, "PENDING") for i in range(8)]
+    jobs += [(tracker.handler, {"id": 100 + i, "provider": p}, "PENDING") for i, p in enumerate(["MTN_MOMO", "MOMO", "MTN"] * 4)]
+
+    payout_worker._dispatch(None, jobs)
+
+    assert sorted(tracker.seen) == sorted(p["id"] for _, p, _ in jobs)
+    assert tracker.peak["TMONEY"] == 2
+    assert tracker.peak["MOMO"] == 3  # MTN / MTN_MOMO share the MOMO cap
+
+
+def test_dispatch_is_sequential_when_overall_cap_is_one(monkeypatch):
+    _caps(monkeypatch, 1)
+    tracker = _InFlight()
+    jobs = [(tracker.handler, {"id": i, "provider": "FLOOZ"}, "PENDING") for i in range(5)]
+
+    payout_worker._dispatch(None, jobs)
+
+    assert tracker.seen == list(range(5))
+    assert tracker.peak["FLOOZ"] == 1
+
+
+def test_dispatch_marks_internal_error_per_payout(monkeypatch):
+    _caps(monkeypatch, 8, TMONEY=4)
+    marked = []
+    monkeypatch.setattr(
+        payout_worker,
+        "_mark_internal_error",
+        lambda out, p, e, *, from_status: marked.append((p["id"], from_status, str(e))),
+    )
+
+    def handler(out, p):
+        if p["id"] % 2:
+            raise RuntimeError("boom")
+
+    jobs = [(handler, {"id": i, "provider": "TMONEY"}, "SENT") for i in range(6)]
+    payout_worker._dispatch(None, jobs)
+
+    assert sorted(marked) == [(1, "SENT", "boom"), (3, "SENT", "boom"), (5, "SENT", "boom")]
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import urllib.request
+import uuid
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+
+from app.payouts.repository import payout_queue_stats
+from app.providers.base import ProviderResult
+from app.workers import payout_worker
+from db import get_conn
+from services.metrics import render_prometheus
+
+
+class _Provider:
+    def send_cashout(self, payout):
+        return ProviderResult(status="SENT", provider_ref="r1")
+
+
+def test_provider_calls_are_timed_and_missing_methods_stay_missing():
+    guarded = payout_worker._guard("PYTEST_METRICS", _Provider())
+
+    guarded.send_cashout({"id": "p1"})
+
+    assert 'payout_provider_call_duration_seconds_count{op="send",provider="PYTEST_METRICS"} 1' in render_prometheus()
+    # StatusPoller probes for the bulk endpoint with getattr(..., None)
+    assert getattr(guarded, "get_cashout_statuses", None) is None
+
+
+def test_time_to_confirm_is_observed_once_the_write_lands(monkeypatch):
+    monkeypatch.setattr(payout_worker, "get_conn", lambda: nullcontext(None))
+    monkeypatch.setattr(payout_worker, "update_status_many", lambda conn, batch: [True, False])
+
+    out = payout_worker.OutcomeBatch(max_size=10, max_wait_s=60)
+    created = datetime.now(timezone.utc) - timedelta(minutes=3)
+    out.update({"id": 1, "provider": "pytest_ttc", "created_at": created}, new_status="CONFIRMED")
+    out.update({"id": 2, "provider": "pytest_ttc", "created_at": created}, new_status="CONFIRMED")
+    out.flush()
+
+    text = render_prometheus()
+    assert 'payout_time_to_confirm_seconds_count{provider="PYTEST_TTC",source="worker"} 1' in text
+    assert 'payout_time_to_confirm_seconds_bucket{provider="PYTEST_TTC",source="worker",le="300"} 1' in text
+
+
+def test_worker_serves_metrics():
+    server = payout_worker._serve_metrics(0)
+    try:
+        assert server.server_address[0] == "127.0.0.1"  # loopback unless configured
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            assert resp.status == 200
+            assert resp.headers["Content-Type"].startswith("text/plain")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_queue_stats_count_due_payouts_per_provider():
+    ref = f"pytest-queue-{uuid.uuid4()}"
+    with get_conn() as conn:
+        cur = conn.cursor()
+        for status, next_retry in (("PENDING", "now() - interval '2 minutes'"), ("PENDING", "now() + interval '1 hour'"), ("SENT", "NULL")):
+            cur.execute(
+                f"""
+                INSERT INTO app.mobile_money_payouts (
+                  transaction_id, provider, phone_e164, provider_ref, status, amount_cents, currency,
+                  next_retry_at, last_attempt_at
+                )
+                VALUES (%s, 'PYTEST_Q', '+22890000000', %s, %s, 1000, 'XOF', {next_retry}, now() - interval '10 minutes')
+                """,
+                (uuid.uuid4(), f"{ref}-{status}-{uuid.uuid4()}", status),
+            )
+    try:
+        with get_conn() as conn:
+            pending, sent_due, oldest_age_s = payout_queue_stats(conn, stale_after_seconds=60)["PYTEST_Q"]
+        assert (pending, sent_due) == (2, 1)
+        assert 500 <= oldest_age_s < 600  # the SENT row became due 9 minutes ago
+    finally:
+        with get_conn() as conn:
+            conn.cursor().execute("DELETE FROM app.mobile_money_payouts WHERE provider_ref LIKE %s", (f"{ref}%",))
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import time
+import uuid
+
+import pytest
+
+from app.payouts.repository import claim_pending_payouts
+from app.workers import payout_worker
+from app.workers.worker_registry import WorkerRegistry, balance_shards
+from db import get_conn
+from tests.conftest import _auth_headers
+
+
+def _counts(assigned: dict) -> dict:
+    out: dict = {}
+    for w in assigned.values():
+        out[w] = out.get(w, 0) + 1
+    return out
+
+
+def test_balance_spreads_shards_evenly():
+    assigned = balance_shards({}, ["a", "b", "c"], 16)
+    assert sorted(assigned) == list(range(16))
+    assert _counts(assigned) == {"a": 6, "b": 5, "c": 5}
+
+
+def test_balance_only_moves_what_it_has_to():
+    two = balance_shards({}, ["a", "b"], 16)
+
+    three = balance_shards(two, ["a", "b", "c"], 16)
+    moved = [s for s in range(16) if two[s] != three[s]]
+    assert len(moved) == 5 and all(three[s] == "c" for s in moved)
+
+    # "a" leaves: only its shards change hands
+    two_again = balance_shards(three, ["b", "c"], 16)
+    assert all(two_again[s] == three[s] for s in range(16) if three[s] != "a")
+    assert _counts(two_again) == {"b": 8, "c": 8}
+
+
+def test_balance_more_workers_than_shards_and_none_live():
+    assigned = balance_shards({}, ["a", "b", "c"], 2)
+    assert _counts(assigned) == {"a": 1, "b": 1}
+    assert balance_shards({0: "gone"}, [], 2) == {0: None, 1: None}
+
+
+@pytest.fixture
+def _clean_registry():
+    def clean():
+        with get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM app.payout_worker_shards")
+            cur.execute("DELETE FROM app.payout_workers")
+            cur.execute("DELETE FROM app.mobile_money_payouts WHERE provider_ref LIKE 'pytest-shard-%'")
+
+    clean()
+    yield
+    clean()
+
+
+def _insert_pending(n: int) -> set:
+    ids = set()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        for _ in range(n):
+            payout_id = uuid.uuid4()
+            cur.execute(
+                """
+                INSERT INTO app.mobile_money_payouts (
+                  id, transaction_id, provider, phone_e164, provider_ref,
+                  status, amount_cents, currency, attempt_count, retryable
+                )
+                VALUES (%s, %s, 'TMONEY', '+22890000000', %s, 'PENDING', 1000, 'XOF', 0, TRUE)
+                """,
+                (payout_id, uuid.uuid4(), f"pytest-shard-{payout_id}"),
+            )
+            ids.add(payout_id)
+    return ids
+
+
+def test_each_shard_has_one_live_owner(_clean_registry):
+    a = WorkerRegistry(shard_count=8, ttl_s=60, worker_id="pytest-a")
+    b = WorkerRegistry(shard_count=8, ttl_s=60, worker_id="pytest-b")
+
+    assert a.heartbeat() == list(range(8))
+    b.heartbeat()
+    a.heartbeat()
+    assert len(a.shards) == len(b.shards) == 4
+    assert sorted(a.shards + b.shards) == list(range(8))
+
+    b.deregister()
+    assert a.heartbeat() == list(range(8))
+
+
+def test_expired_worker_loses_its_shards(_clean_registry):
+    a = WorkerRegistry(shard_count=8, ttl_s=60, worker_id="pytest-a")
+    b = WorkerRegistry(shard_count=8, ttl_s=0.2, worker_id="pytest-b")
+    a.heartbeat()
+    b.heartbeat()
+    time.sleep(0.3)
+
+    assert b.heartbeat() == list(range(8))
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT worker_id FROM app.payout_workers")
+        assert [r[0] for r in cur.fetchall()] == ["pytest-b"]
+
+
+def test_heartbeat_keeps_worker_live_through_a_long_batch(_clean_registry, monkeypatch):
+    class Slow(payout_worker.MockProvider):
+        def send_cashout(self, payout):
+            if (payout.get("provider_ref") or "").startswith("pytest-shard-"):
+                time.sleep(1.5)
+            return super().send_cashout(payout)
+
+    monkeypatch.setattr(payout_worker, "get_provider", lambda name: Slow())
+    _insert_pending(1)
+    busy = WorkerRegistry(shard_count=8, ttl_s=60, worker_id="pytest-busy")
+    # the peer drops anyone silent for 0.5 s
+    peer = WorkerRegistry(shard_count=8, ttl_s=0.5, worker_id="pytest-peer")
+
+    heartbeat = payout_worker.Heartbeat(busy, interval_s=0.1)
+    heartbeat.start()
+    try:
+        peer.heartbeat()
+        started = time.monotonic()
+        assert payout_worker.process_once(batch_size=500) >= 1
+        assert time.monotonic() - started > 3 * peer.ttl_s
+        peer.heartbeat()
+    finally:
+        heartbeat.stop()
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT worker_id FROM app.payout_workers")
+        assert {r[0] for r in cur.fetchall()} == {"pytest-busy", "pytest-peer"}
+    assert len(busy.shards) == len(peer.shards) == 4
+    assert sorted(busy.shards + peer.shards) == list(range(8))
+
+
+def test_claims_are_partitioned_by_shard(_clean_registry):
+    ids = _insert_pending(40)
+
+    claimed = []
+    with get_conn() as conn:
+        for shards in ([0, 1], [2, 3]):
+            rows = claim_pending_payouts(
+                conn,
+                batch_size=500,
+                lease_owner=f"pytest-shards-{shards[0]}",
+                lease_seconds=300,
+                shard_count=4,
+                shards=shards,
+            )
+            claimed.append({r["id"] for r in rows} & ids)
+
+    assert claimed[0] and claimed[1]
+    assert not claimed[0] & claimed[1]
+    assert claimed[0] | claimed[1] == ids
+
+
+def test_admin_lists_payout_workers(client, admin_user, _clean_registry):
+    WorkerRegistry(shard_count=4, ttl_s=60, worker_id="pytest-a").heartbeat()
+
+    r = client.get("/v1/admin/mobile-money/payout-workers", headers=_auth_headers(admin_user.token))
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["unassigned_shards"] == 0
+    assert [(w["worker_id"], w["shards"]) for w in body["workers"]] == [("pytest-a", [0, 1, 2, 3])]
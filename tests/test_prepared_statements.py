@@ -0,0 +1,43 @@
+import uuid
+
+from db import get_conn
+from db_prepared import PreparedStatement, _to_positional
+from services.idempotency import get_idempotency
+from settings import settings
+
+
+def test_placeholders_are_rewritten_positionally():
+    body, count = _to_positional("SELECT %s, %s::uuid WHERE x LIKE 'a%%'")
+    assert body == "SELECT $1, $2::uuid WHERE x LIKE 'a%'"
+    assert count == 2
+
+
+def _server_prepared(conn) -> set[str]:
+    with conn.cursor() as cur:
+        cur.execute("SELECT name FROM pg_prepared_statements;")
+        return {r[0] for r in cur.fetchall()}
+
+
+def test_hot_lookup_is_prepared_once_per_connection(monkeypatch):
+    monkeypatch.setattr(settings, "DB_PREPARED_STATEMENTS", True)
+    user_id = str(uuid.uuid4())
+
+    with get_conn() as conn:
+        for _ in range(3):
+            assert get_idempotency(conn, user_id=user_id, idempotency_key="k", route_key="r") is None
+
+        assert "idempotency_get" in conn.prepared_statements
+        assert "idempotency_get" in _server_prepared(conn)
+
+
+def test_toggle_off_runs_plain_sql(monkeypatch):
+    monkeypatch.setattr(settings, "DB_PREPARED_STATEMENTS", False)
+    stmt = PreparedStatement("test_toggle_off_stmt", "SELECT %s::int + 1")
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            stmt.execute(cur, (41,))
+            assert cur.fetchone()[0] == 42
+
+        assert "test_toggle_off_stmt" not in conn.prepared_statements
+        assert "test_toggle_off_stmt" not in _server_prepared(conn)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.providers.mobile_money import http
+from services.metrics import render_prometheus
+from settings import settings
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.dumps({"echo": json.loads(self.rfile.read(length) or b"null")}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    http.close_transport()
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_connections_are_reused_across_calls(server):
+    transport = http.ProviderTransport("pytest_keepalive")
+
+    for i in range(3):
+        resp = http.run_sync(transport.post(f"{server}/cashout", json={"n": i}))
+        assert resp.json() == {"echo": {"n": i}}
+
+    text = render_prometheus()
+    assert 'provider_http_requests_total{connection="new",http_version="HTTP/1.1",provider="PYTEST_KEEPALIVE"} 1' in text
+    assert 'provider_http_requests_total{connection="reused",http_version="HTTP/1.1",provider="PYTEST_KEEPALIVE"} 2' in text
+    assert 'provider_http_handshakes_total{kind="tcp",provider="PYTEST_KEEPALIVE"} 1' in text
+    assert 'provider_http_connect_seconds_count{provider="PYTEST_KEEPALIVE"} 1' in text
+
+
+def test_one_pool_per_host_and_loop(server):
+    async def clients():
+        return http._client_for(f"{server}/a"), http._client_for(f"{server}/b?x=1"), http._client_for("http://127.0.0.1:1/a")
+
+    a, b, other_host = http.run_sync(clients())
+    assert a is b
+    assert other_host is not a
+    # pools belong to the loop that opened them
+    on_another_loop = asyncio.run(clients())[0]
+    assert on_another_loop is not a
+
+
+def test_provider_timeouts(monkeypatch):
+    monkeypatch.setattr(settings, "MM_HTTP_CONNECT_TIMEOUT_S", 4.0)
+    monkeypatch.setattr(settings, "MM_HTTP_TIMEOUT_S", 20.0)
+    monkeypatch.setattr(settings, "MOMO_HTTP_TIMEOUT_S", 12.0)
+    monkeypatch.setattr(settings, "MM_HTTP_PROVIDER_TIMEOUTS", " thunes=2:45, FLOOZ=bad, TMONEY=0:5")
+
+    thunes = http.provider_timeout("THUNES")
+    assert (thunes.connect, thunes.read) == (2.0, 45.0)
+    momo = http.provider_timeout("MOMO")
+    assert (momo.connect, momo.read) == (4.0, 12.0)
+    tmoney = http.provider_timeout("TMONEY")
+    assert (tmoney.connect, tmoney.read) == (4.0, 20.0)
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+import uvicorn
+
+from app.providers.mobile_money.momo import MomoProvider
+from app.providers.mobile_money.thunes import ThunesProvider
+from app.providers.mobile_money.tmoney import TMoneyProvider
+from app.simulator.config import SimulatorSettings, parse_latencies
+from app.simulator.main import create_app
+from settings import settings
+
+
+@pytest.fixture
+def start_simulator():
+    servers = []
+
+    def start(**overrides) -> str:
+        cfg = SimulatorSettings(
+            **{
+                "SIM_LATENCY_MEDIAN_MS": 0,
+                "SIM_SETTLE_MEDIAN_MS": 0,
+                "SIM_FAILURE_RATE": 0,
+                "SIM_SEED": 7,
+                **overrides,
+            }
+        )
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        server = uvicorn.Server(uvicorn.Config(create_app(cfg), log_level="warning", lifespan="on"))
+        threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+        deadline = time.monotonic() + 10
+        while not server.started and time.monotonic() < deadline:
+            time.sleep(0.02)
+        servers.append((server, sock))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+    yield start
+    for server, _ in servers:
+        server.should_exit = True
+    time.sleep(0.2)
+    for _, sock in servers:
+        sock.close()
+
+
+def _payout(**extra) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "transaction_id": str(uuid.uuid4()),
+        "external_ref": f"ext-{uuid.uuid4()}",
+        "amount_cents": 50000,
+        "currency": "XOF",
+        "country": "TG",
+        "phone_e164": "+22890009911",
+        **extra,
+    }
+
+
+def test_tmoney_cashout_settles(start_simulator, monkeypatch):
+    base = start_simulator()
+    monkeypatch.setattr(settings, "MM_MODE", "sandbox")
+    monkeypatch.setattr(settings, "TMONEY_SANDBOX_API_KEY", "key")
+    monkeypatch.setattr(settings, "TMONEY_SANDBOX_CASHOUT_URL", f"{base}/tmoney/cashout")
+    monkeypatch.setattr(settings, "TMONEY_SANDBOX_STATUS_URL_TEMPLATE", f"{base}/tmoney/status/{{provider_ref}}")
+    provider = TMoneyProvider()
+
+    sent = provider.send_cashout(_payout())
+    assert sent.status == "SENT"
+    polled = provider.get_cashout_status({"provider_ref": sent.provider_ref})
+    assert polled.status == "CONFIRMED"
+
+
+def test_thunes_quotation_transaction_confirm(start_simulator, monkeypatch):
+    base = start_simulator()
+    monkeypatch.setattr(settings, "MM_MODE", "sandbox")
+    monkeypatch.setattr(settings, "THUNES_SANDBOX_API_ENDPOINT", f"{base}/thunes")
+    monkeypatch.setattr(settings, "THUNES_SANDBOX_API_KEY", "key")
+    monkeypatch.setattr(settings, "THUNES_SANDBOX_API_SECRET", "secret")
+    monkeypatch.setattr(settings, "THUNES_PAYER_ID_TG", "1234")
+    monkeypatch.setattr(settings, "THUNES_QUOTE_CACHE_TTL_S", 60.0)
+    provider = ThunesProvider()
+
+    first = provider.send_cashout(_payout())
+    second = provider.send_cashout(_payout())
+    assert (first.status, second.status) == ("SENT", "SENT")
+    assert provider.get_cashout_status({"provider_ref": second.provider_ref}).status == "CONFIRMED"
+
+    stats = httpx.get(f"{base}/sim/stats").json()["THUNES"]
+    assert stats["quotations"] == 1  # the second payout reused the quotation
+    assert stats["state_success"] == 2
+
+
+def test_momo_token_transfer_status(start_simulator, monkeypatch):
+    base = start_simulator()
+    monkeypatch.setenv("MOMO_BASE_URL", f"{base}/momo")
+    monkeypatch.setenv("MOMO_API_USER_ID", "user")
+    monkeypatch.setenv("MOMO_API_KEY", "key")
+    monkeypatch.setenv("MOMO_DISBURSE_SUB_KEY", "sub")
+    monkeypatch.setattr(settings, "PROVIDER_TOKEN_SHARED", False)
+    provider = MomoProvider()
+
+    sent = provider.send_cashout(_payout(country="GH", currency="GHS"))
+    assert sent.status == "SENT"
+    assert provider.get_cashout_status({"provider_ref": sent.provider_ref}).status == "CONFIRMED"
+    assert httpx.get(f"{base}/sim/stats").json()["MOMO"]["tokens"] == 1
+
+
+def test_errors_and_bursts(start_simulator):
+    base = start_simulator(SIM_ERROR_RATE_BY_PROVIDER="FLOOZ=1")
+    body = {"external_id": "r1", "amount_cents": 100, "currency": "XOF", "msisdn": "+22890009911"}
+
+    assert httpx.post(f"{base}/flooz/cashout", json=body).status_code == 500
+    assert httpx.post(f"{base}/tmoney/cashout", json=body).status_code == 202
+
+    httpx.post(f"{base}/sim/burst/tmoney", params={"seconds": 30, "status": 429})
+    throttled = httpx.post(f"{base}/tmoney/cashout", json=body)
+    assert throttled.status_code == 429
+    assert throttled.headers["Retry-After"] == "1"
+
+    stats = httpx.get(f"{base}/sim/stats").json()
+    assert stats["FLOOZ"]["http_500"] == 1
+    assert stats["TMONEY"]["http_429"] == 1
+
+
+class _Capture(BaseHTTPRequestHandler):
+    received: list[tuple[str, dict, bytes]] = []
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        _Capture.received.append((self.path, dict(self.headers), raw))
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_settled_cashouts_call_back_signed(start_simulator):
+    _Capture.received = []
+    api = ThreadingHTTPServer(("127.0.0.1", 0), _Capture)
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    try:
+        base = start_simulator(
+            SIM_WEBHOOK_BASE_URL=f"http://127.0.0.1:{api.server_address[1]}",
+            SIM_SETTLE_MEDIAN_MS=50,
+            SIM_SETTLE_P99_MS=50,
+            TMONEY_WEBHOOK_SECRET="sim_secret",
+        )
+        body = {"external_id": "r-hook", "amount_cents": 100, "currency": "XOF", "msisdn": "+22890009911"}
+        assert httpx.post(f"{base}/tmoney/cashout", json=body).status_code == 202
+
+        deadline = time.monotonic() + 5
+        while not _Capture.received and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        api.shutdown()
+        api.server_close()
+
+    path, headers, raw = _Capture.received[0]
+    assert path == "/v1/webhooks/tmoney"
+    expected = hmac.new(b"sim_secret", raw, hashlib.sha256).hexdigest()
+    assert headers["X-Signature"] == f"sha256={expected}"
+    assert json.loads(raw) == {
+        "event_type": "cashout.status",
+        "provider_ref": "r-hook",
+        "status": "SUCCESS",
+        "amount_cents": 100,
+        "currency": "XOF",
+    }
+
+
+def test_parse_latencies():
+    parsed = parse_latencies(" thunes=250:2000, MOMO=120, bad, FLOOZ=x:1")
+    assert sorted(parsed) == ["MOMO", "THUNES"]
+    assert (parsed["THUNES"].median_s, parsed["THUNES"].p99_s) == (0.25, 2.0)
+    assert parsed["MOMO"].p99_s == 0.12
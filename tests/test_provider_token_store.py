@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.providers.mobile_money.token_store import TokenKey, TokenStore
+from db import get_conn
+
+KEY = TokenKey("PYTEST_TOKENS", "sandbox", "GH")
+
+
+@pytest.fixture
+def shared_tokens():
+    # stores with shared=True read app.provider_tokens: start each test without a stored token
+    with get_conn() as conn:
+        conn.cursor().execute("TRUNCATE app.provider_tokens")
+    yield
+    with get_conn() as conn:
+        conn.cursor().execute("TRUNCATE app.provider_tokens")
+
+
+class _Endpoint:
+    def __init__(self, expires_in: float = 3600, delay: float = 0.0):
+        self.expires_in = expires_in
+        self.delay = delay
+        self.calls = 0
+
+    async def fetch(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return f"token-{self.calls}", self.expires_in
+
+
+def test_concurrent_callers_share_one_fetch():
+    endpoint = _Endpoint(delay=0.05)
+    store = TokenStore(refresh_ahead_s=0, shared=False)
+
+    async def burst():
+        return await asyncio.gather(*(store.get(KEY, endpoint.fetch, safety_buffer_s=60) for _ in range(50)))
+
+    assert asyncio.run(burst()) == ["token-1"] * 50
+    assert endpoint.calls == 1
+
+
+def test_refresh_ahead_happens_in_the_background():
+    # 3600s token, dropped 60s before expiry, refreshed 3600s before that: always due
+    endpoint = _Endpoint(delay=0.05)
+    store = TokenStore(refresh_ahead_s=3600, shared=False)
+
+    async def scenario():
+        first = await store.get(KEY, endpoint.fetch, safety_buffer_s=60)
+        second = await store.get(KEY, endpoint.fetch, safety_buffer_s=60)  # served at once, refresh started
+        await asyncio.sleep(0.2)
+        third = await store.get(KEY, endpoint.fetch, safety_buffer_s=60)
+        return first, second, third
+
+    assert asyncio.run(scenario()) == ("token-1", "token-1", "token-2")
+
+
+def test_tokens_inside_the_safety_buffer_are_not_used():
+    endpoint = _Endpoint(expires_in=30)
+    store = TokenStore(refresh_ahead_s=0, shared=False)
+
+    async def twice():
+        return [await store.get(KEY, endpoint.fetch, safety_buffer_s=60) for _ in range(2)]
+
+    assert asyncio.run(twice()) == ["token-1", "token-2"]
+
+
+def test_processes_share_the_stored_token(shared_tokens):
+    endpoint = _Endpoint()
+    api, worker = TokenStore(refresh_ahead_s=0), TokenStore(refresh_ahead_s=0)
+    worker.owner = "pytest-other-process"
+
+    async def both():
+        return (
+            await api.get(KEY, endpoint.fetch, safety_buffer_s=60),
+            await worker.get(KEY, endpoint.fetch, safety_buffer_s=60),
+        )
+
+    assert asyncio.run(both()) == ("token-1", "token-1")
+    assert endpoint.calls == 1
@@ -0,0 +1,53 @@
+import threading
+import uuid
+
+from rate_limit import MemoryRateLimiter, PostgresRateLimiter
+
+
+def test_memory_bucket_denies_with_retry_after():
+    limiter = MemoryRateLimiter()
+    key = f"t:{uuid.uuid4()}"
+
+    assert limiter.take_sync(key, capacity=2, refill_per_sec=0.5).allowed
+    assert limiter.take_sync(key, capacity=2, refill_per_sec=0.5).allowed
+
+    denied = limiter.take_sync(key, capacity=2, refill_per_sec=0.5)
+    assert not denied.allowed
+    assert 0.0 < denied.retry_after_s <= 2.0
+
+
+def test_memory_backend_is_bounded():
+    limiter = MemoryRateLimiter(max_keys=100)
+    for i in range(1000):
+        limiter.take_sync(f"ip:{i}", capacity=5, refill_per_sec=0.1)
+        limiter.allow_window(f"ip:{i}", limit=5, window_seconds=60)
+    assert len(limiter._buckets) == 100
+    assert len(limiter._hits) == 100
+
+
+def test_memory_backend_drops_refilled_buckets():
+    limiter = MemoryRateLimiter()
+    for i in range(50):
+        # refills in microseconds, so every bucket is already full again
+        limiter.take_sync(f"ip:{i}", capacity=1, refill_per_sec=1e9)
+    assert len(limiter._buckets) <= 1
+
+
+def test_postgres_backend_is_atomic_across_threads():
+    limiter = PostgresRateLimiter()
+    key = f"pytest:{uuid.uuid4()}"
+    results = []
+
+    def worker():
+        results.append(limiter.take_sync(key, capacity=5, refill_per_sec=0.001).allowed)
+
+    threads = [threading.Thread(target=worker) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results.count(True) == 5
+    assert results.count(False) == 15
+    assert limiter._calls == 20
+    limiter.close()
@@ -0,0 +1,55 @@
+import uuid
+
+from settings import settings
+from tests.conftest import _auth_headers
+
+
+def _cash_out(client, token: str, wallet_id: str):
+    payload = {
+        "wallet_id": wallet_id,
+        "amount_cents": 100,
+        "country": "BJ",
+        "provider_ref": f"rl-ref-{uuid.uuid4()}",
+        "provider": "TMONEY",
+        "phone_e164": "+22890000000",
+    }
+    return client.post(
+        "/v1/cash-out/mobile-money",
+        json=payload,
+        headers=_auth_headers(token, idem=f"pytest-rl-{uuid.uuid4()}"),
+    )
+
+
+def test_cash_out_limited_per_user_with_retry_after(client, user2, funded_wallet2_xof, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_CASHOUT_PER_MIN", 2)
+
+    assert _cash_out(client, user2.token, funded_wallet2_xof).status_code == 200
+    assert _cash_out(client, user2.token, funded_wallet2_xof).status_code == 200
+
+    r = _cash_out(client, user2.token, funded_wallet2_xof)
+    assert r.status_code == 429, r.text
+    assert r.json()["detail"] == "RATE_LIMITED"
+    assert int(r.headers["retry-after"]) >= 1
+
+
+def test_limit_is_per_user(client, user1, user2, wallet1_xof, funded_wallet2_xof, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_CASHOUT_PER_MIN", 1)
+
+    assert _cash_out(client, user2.token, funded_wallet2_xof).status_code == 200
+    assert _cash_out(client, user2.token, funded_wallet2_xof).status_code == 429
+
+    # another user still has their own bucket (may fail later for funds, but not 429)
+    assert _cash_out(client, user1.token, wallet1_xof).status_code != 429
+
+
+def test_unauthenticated_requests_are_not_user_limited(client, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_CASHOUT_PER_MIN", 1)
+    for _ in range(3):
+        r = client.post("/v1/cash-out/mobile-money", json={}, headers={"Idempotency-Key": str(uuid.uuid4())})
+        assert r.status_code == 401, r.text
+
+
+def test_cash_out_and_p2p_are_limited_by_default():
+    fields = type(settings).model_fields
+    assert fields["RATE_LIMIT_CASHOUT_PER_MIN"].default > 0
+    assert fields["RATE_LIMIT_P2P_TRANSFER_PER_MIN"].default > 0
@@ -0,0 +1,21 @@
+def test_request_id_is_echoed(client):
+    r = client.get("/healthz", headers={"X-Request-Id": "pytest-req-1"})
+    assert r.status_code == 200, r.text
+    assert r.headers.get("x-request-id") == "pytest-req-1"
+
+
+def test_request_id_generated_when_missing(client):
+    r = client.get("/healthz")
+    assert r.status_code == 200, r.text
+    assert r.headers.get("x-request-id")
+
+
+def test_rejections_carry_request_id_and_security_headers(client, monkeypatch):
+    monkeypatch.setenv("ENVIRONMENT", "staging")
+    monkeypatch.setenv("ENV", "staging")
+    monkeypatch.setenv("STAGING_GATE_KEY", "secret-key")
+
+    r = client.get("/v1/wallets", headers={"X-Request-Id": "pytest-req-2"})
+    assert r.status_code == 403, r.text
+    assert r.headers.get("x-request-id") == "pytest-req-2"
+    assert r.headers.get("x-content-type-options") == "nosniff"
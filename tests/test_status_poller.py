@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from app.payouts.status_poller import StatusPoller
+from app.providers.base import ProviderResult
+from db import get_conn
+
+
+class _CountingProvider:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls: list[str] = []
+        self._lock = threading.Lock()
+
+    def get_cashout_status(self, payout: dict):
+        time.sleep(self.delay)
+        with self._lock:
+            self.calls.append(payout["provider_ref"])
+        return ProviderResult(status="SENT", provider_ref=payout["provider_ref"], retryable=True)
+
+
+class _BulkProvider(_CountingProvider):
+    def __init__(self):
+        super().__init__()
+        self.bulk_calls: list[list[str]] = []
+
+    def get_cashout_statuses(self, payouts: list[dict]):
+        refs = [p["provider_ref"] for p in payouts]
+        self.bulk_calls.append(refs)
+        # the listing may miss some: those are fetched one by one
+        return {ref: ProviderResult(status="CONFIRMED", provider_ref=ref) for ref in refs if ref != "r-missing"}
+
+
+def _req(provider, ref: str | None, name: str = "TMONEY"):
+    return (name, provider, {"provider_ref": ref})
+
+
+def test_each_payout_is_fetched_once_per_window():
+    provider = _CountingProvider()
+    poller = StatusPoller(ttl_s=60)
+
+    first = poller.get_many([_req(provider, "r1"), _req(provider, "r2"), _req(provider, "r1")])
+    again = poller.get("TMONEY", provider, {"provider_ref": "r1"})
+
+    assert sorted(provider.calls) == ["r1", "r2"]
+    assert first[0] is first[2] is again
+
+
+def test_results_expire_after_ttl():
+    provider = _CountingProvider()
+    poller = StatusPoller(ttl_s=0.05)
+
+    poller.get("TMONEY", provider, {"provider_ref": "r1"})
+    time.sleep(0.1)
+    poller.get("TMONEY", provider, {"provider_ref": "r1"})
+
+    assert provider.calls == ["r1", "r1"]
+
+
+def test_payouts_without_ref_and_ttl_zero_are_not_cached():
+    provider = _CountingProvider()
+    StatusPoller(ttl_s=60).get_many([_req(provider, None), _req(provider, None)])
+    poller = StatusPoller(ttl_s=0)
+    poller.get("TMONEY", provider, {"provider_ref": "r1"})
+    poller.get("TMONEY", provider, {"provider_ref": "r1"})
+
+    assert provider.calls == [None, None, "r1", "r1"]
+
+
+def test_concurrent_lookups_share_one_fetch():
+    provider = _CountingProvider(delay=0.1)
+    poller = StatusPoller(ttl_s=60)
+    results = []
+
+    threads = [
+        threading.Thread(target=lambda: results.append(poller.get("TMONEY", provider, {"provider_ref": "r1"})))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert provider.calls == ["r1"]
+    assert len(results) == 5 and all(r is results[0] for r in results)
+
+
+def test_fan_out_is_bounded():
+    provider = _CountingProvider(delay=0.05)
+    poller = StatusPoller(ttl_s=60, max_in_flight=4)
+
+    started = time.monotonic()
+    poller.get_many([_req(provider, f"r{i}") for i in range(8)])
+    elapsed = time.monotonic() - started
+
+    assert len(provider.calls) == 8
+    assert 0.09 <= elapsed < 0.35  # two waves of four, not eight sequential calls
+
+
+def test_bulk_endpoint_is_used_per_provider_group():
+    provider = _BulkProvider()
+    poller = StatusPoller(ttl_s=60)
+
+    results = poller.get_many([_req(provider, "r1"), _req(provider, "r2"), _req(provider, "r-missing")])
+
+    assert provider.bulk_calls == [["r1", "r2", "r-missing"]]
+    assert provider.calls == ["r-missing"]
+    assert [r.status for r in results] == ["CONFIRMED", "CONFIRMED", "SENT"]
+
+
+def test_failures_are_raised_and_not_cached():
+    class Flaky:
+        calls = 0
+
+        def get_cashout_status(self, payout):
+            Flaky.calls += 1
+            if Flaky.calls == 1:
+                raise TimeoutError("provider timeout")
+            return ProviderResult(status="CONFIRMED", provider_ref=payout["provider_ref"])
+
+    poller = StatusPoller(ttl_s=60)
+    with pytest.raises(TimeoutError):
+        poller.get("FLOOZ", Flaky(), {"provider_ref": "r1"})
+    assert poller.get("FLOOZ", Flaky(), {"provider_ref": "r1"}).status == "CONFIRMED"
+    assert Flaky.calls == 2
+
+
+@pytest.fixture
+def shared_cache():
+    # pollers with shared=True read app.provider_status_cache: start each test without cached results
+    with get_conn() as conn:
+        conn.cursor().execute("TRUNCATE app.provider_status_cache")
+    yield
+    with get_conn() as conn:
+        conn.cursor().execute("TRUNCATE app.provider_status_cache")
+
+
+def test_shared_cache_answers_for_other_processes(shared_cache):
+    provider = _CountingProvider()
+    worker, api = StatusPoller(ttl_s=60, shared=True), StatusPoller(ttl_s=60, shared=True)
+
+    first = worker.get("TMONEY", provider, {"provider_ref": "r-shared"})
+    second = api.get("TMONEY", provider, {"provider_ref": "r-shared"})
+
+    assert provider.calls == ["r-shared"]
+    assert (first.status, second.status) == ("SENT", "SENT")
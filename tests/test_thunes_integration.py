@@ -230,7 +230,7 @@ def test_thunes_send_cashout_uses_external_ref(monkeypatch):
         def json(self):
             return self._data
 
-    def fake_post(url, json=None, headers=None, auth=None, timeout=None):
+    async def fake_post(url, json=None, headers=None, auth=None, timeout=None):
         if url.endswith("/quotations"):
             captured["quote"] = json
             return FakeResp(201, {"id": "quote-1"})
@@ -240,7 +240,7 @@ def test_thunes_send_cashout_uses_external_ref(monkeypatch):
             return FakeResp(202, {"status": "PENDING"})
         return FakeResp(500, {"error": "unexpected"})
 
-    monkeypatch.setattr("app.providers.mobile_money.thunes.requests.post", fake_post)
+    monkeypatch.setattr("app.providers.mobile_money.thunes.transport.post", fake_post)
 
     provider = ThunesProvider()
     payout = {
@@ -275,28 +275,28 @@ def test_thunes_get_cashout_status_mapping(monkeypatch):
         def json(self):
             return self._data
 
-    def fake_get_completed(url, headers=None, auth=None, timeout=None):
+    async def fake_get_completed(url, headers=None, auth=None, timeout=None):
         return FakeResp(200, {"status": "COMPLETED"})
 
-    def fake_get_failed(url, headers=None, auth=None, timeout=None):
+    async def fake_get_failed(url, headers=None, auth=None, timeout=None):
         return FakeResp(200, {"status": "FAILED"})
 
-    def fake_get_pending(url, headers=None, auth=None, timeout=None):
+    async def fake_get_pending(url, headers=None, auth=None, timeout=None):
         return FakeResp(200, {"status": "PENDING"})
 
     payout = {"provider_ref": "thunes-ref-1"}
     provider = ThunesProvider()
 
-    monkeypatch.setattr("app.providers.mobile_money.thunes.requests.get", fake_get_completed)
+    monkeypatch.setattr("app.providers.mobile_money.thunes.transport.get", fake_get_completed)
     res = provider.get_cashout_status(payout)
     assert res.status == "CONFIRMED"
     assert res.provider_ref == "thunes-ref-1"
 
-    monkeypatch.setattr("app.providers.mobile_money.thunes.requests.get", fake_get_failed)
+    monkeypatch.setattr("app.providers.mobile_money.thunes.transport.get", fake_get_failed)
     res = provider.get_cashout_status(payout)
     assert res.status == "FAILED"
     assert res.error == "FAILED"
 
-    monkeypatch.setattr("app.providers.mobile_money.thunes.requests.get", fake_get_pending)
+    monkeypatch.setattr("app.providers.mobile_money.thunes.transport.get", fake_get_pending)
     res = provider.get_cashout_status(payout)
     assert res.status == "SENT"
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.providers.base import ProviderResult
+from app.providers.mobile_money.http import run_sync
+from app.providers.mobile_money.shim import SyncProvider
+from app.providers.mobile_money.thunes import AsyncThunesProvider, QuoteCache, ThunesProvider
+from app.workers import payout_worker
+from services.metrics import render_prometheus
+from settings import settings
+
+
+class FakeResp:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self._data = data
+        self.text = json.dumps(data)
+
+    def json(self):
+        return self._data
+
+
+class FakeThunes:
+    """Quotations q-1, q-2, ...; transactions t-1, t-2, ...; refused quotation ids answer 400."""
+
+    def __init__(self, *, delay: float = 0.0, expires_in_s: float | None = None):
+        self.delay = delay
+        self.expires_in_s = expires_in_s
+        self.quotes: list[dict] = []
+        self.transactions: list[tuple[str, dict]] = []
+        self.refused: set[str] = set()
+
+    async def post(self, url, json=None, headers=None, auth=None, timeout=None):
+        await asyncio.sleep(self.delay)
+        if url.endswith("/quotations"):
+            self.quotes.append(json)
+            data = {"id": f"q-{len(self.quotes)}"}
+            if self.expires_in_s is not None:
+                expires = datetime.now(timezone.utc) + timedelta(seconds=self.expires_in_s)
+                data["expiration_date"] = expires.isoformat().replace("+00:00", "Z")
+            return FakeResp(201, data)
+        if url.endswith("/transactions"):
+            quotation_id = url.split("/quotations/")[1].split("/")[0]
+            if quotation_id in self.refused:
+                return FakeResp(400, {"errors": [{"code": "1006001", "message": "Quotation expired"}]})
+            self.transactions.append((quotation_id, json))
+            return FakeResp(201, {"id": f"t-{len(self.transactions)}"})
+        if url.endswith("/confirm"):
+            return FakeResp(202, {"status": "20000"})
+        return FakeResp(500, {"error": "unexpected"})
+
+
+@pytest.fixture
+def thunes(monkeypatch):
+    monkeypatch.setattr(settings, "MM_MODE", "sandbox")
+    monkeypatch.setattr(settings, "THUNES_SANDBOX_API_ENDPOINT", "https://example.test")
+    monkeypatch.setattr(settings, "THUNES_SANDBOX_API_KEY", "key")
+    monkeypatch.setattr(settings, "THUNES_SANDBOX_API_SECRET", "secret")
+    monkeypatch.setattr(settings, "THUNES_PAYER_ID_TG", "1234")
+    monkeypatch.setattr(settings, "THUNES_QUOTE_CACHE_TTL_S", 60.0)
+    monkeypatch.setattr(settings, "THUNES_QUOTE_EXPIRY_MARGIN_S", 15.0)
+    fake = FakeThunes()
+    monkeypatch.setattr("app.providers.mobile_money.thunes.transport.post", fake.post)
+    return fake
+
+
+def _payout(n: int, amount_cents: int = 50000) -> dict:
+    return {
+        "id": f"pytest-quote-{n}",
+        "transaction_id": f"tx-{n}",
+        "external_ref": f"ext-{n}",
+        "amount_cents": amount_cents,
+        "currency": "XOF",
+        "country": "TG",
+        "phone_e164": "+22890009911",
+        "status": "PENDING",
+        "provider": "THUNES",
+        "attempt_count": 0,
+    }
+
+
+def test_identical_payouts_reuse_the_quotation(thunes):
+    provider = ThunesProvider()
+
+    first = provider.send_cashout(_payout(1))
+    second = provider.send_cashout(_payout(2))
+    other_amount = provider.send_cashout(_payout(3, amount_cents=70000))
+
+    assert [r.status for r in (first, second, other_amount)] == ["SENT", "SENT", "SENT"]
+    assert len(thunes.quotes) == 2
+    assert [q for q, _ in thunes.transactions] == ["q-1", "q-1", "q-2"]
+    # each transaction carries its own payout's external_id
+    assert [t["external_id"] for _, t in thunes.transactions] == ["ext-1", "ext-2", "ext-3"]
+    assert 'provider_quotes_total{provider="THUNES",result="hit"}' in render_prometheus()
+
+
+def test_concurrent_identical_payouts_share_one_quotation_request(thunes):
+    thunes.delay = 0.05
+    provider = AsyncThunesProvider()
+
+    async def burst():
+        return await asyncio.gather(*(provider.send_cashout(_payout(i)) for i in range(10)))
+
+    results = run_sync(burst())
+
+    assert all(r.status == "SENT" for r in results)
+    assert len(thunes.quotes) == 1
+    assert len(thunes.transactions) == 10
+
+
+def test_refused_quotation_is_replaced(thunes):
+    provider = ThunesProvider()
+    provider.send_cashout(_payout(1))
+    thunes.refused.add("q-1")
+
+    res = provider.send_cashout(_payout(2))
+
+    assert res.status == "SENT"
+    assert [q for q, _ in thunes.transactions] == ["q-1", "q-2"]
+    # the replacement is cached for the next identical payout
+    provider.send_cashout(_payout(3))
+    assert len(thunes.quotes) == 2
+    assert 'provider_quotes_total{provider="THUNES",result="refused"}' in render_prometheus()
+
+
+def test_quotations_are_not_reused_near_expiry(thunes, monkeypatch):
+    provider = ThunesProvider()
+
+    thunes.expires_in_s = 10  # inside THUNES_QUOTE_EXPIRY_MARGIN_S
+    provider.send_cashout(_payout(1))
+    provider.send_cashout(_payout(2))
+    assert len(thunes.quotes) == 2
+
+    monkeypatch.setattr(settings, "THUNES_QUOTE_CACHE_TTL_S", 0.0)
+    thunes.expires_in_s = None
+    provider.send_cashout(_payout(3))
+    provider.send_cashout(_payout(4))
+    assert len(thunes.quotes) == 4
+
+
+def test_reuse_is_off_by_default():
+    assert type(settings).model_fields["THUNES_QUOTE_CACHE_TTL_S"].default == 0
+
+
+def test_put_sweeps_expired_quotations():
+    cache = QuoteCache()
+    old = (1234, "DESTINATION_AMOUNT", "C2C", "USD", "USA", "XOF", 100)
+    new = (1234, "DESTINATION_AMOUNT", "C2C", "USD", "USA", "XOF", 200)
+    cache.put(old, "q-1", time.time() + 0.05)
+    time.sleep(0.1)
+    cache.put(new, "q-2", time.time() + 60)
+
+    # the first key is never read again, yet its expired entry is gone
+    assert list(cache._quotes) == [new]
+
+
+class _SlowSender:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+
+    async def send_cashout(self, payout: dict) -> ProviderResult:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return ProviderResult(status="SENT", provider_ref=f"ref-{payout['id']}", retryable=True)
+
+    async def get_cashout_status(self, payout: dict) -> ProviderResult:
+        return ProviderResult(status="SENT", provider_ref=payout.get("provider_ref"), retryable=True)
+
+
+def test_pipelined_batch_submits_concurrently(monkeypatch):
+    aio = _SlowSender(delay=0.2)
+    monkeypatch.setattr(payout_worker, "get_provider", lambda name: SyncProvider(aio) if name == "THUNES" else object())
+    monkeypatch.setattr(settings, "WORKER_PIPELINE_PROVIDERS", "THUNES")
+    monkeypatch.setattr(settings, "WORKER_PIPELINE_MAX_IN_FLIGHT", 32)
+
+    payouts = [_payout(i) for i in range(20)]
+    assert payout_worker._pipelined(payouts[0])
+    assert not payout_worker._pipelined({**payouts[0], "provider": "TMONEY"})  # no .aio
+
+    out = payout_worker.OutcomeBatch(max_size=1000, max_wait_s=3600)
+    started = time.perf_counter()
+    payout_worker._submit_pipelined(out, payouts)
+
+    assert time.perf_counter() - started < 0.8  # 20 x 0.2s over 4 thread lanes takes 1s, one at a time 4s
+    assert aio.peak == 20
+    queued = {u.payout_id: u for u in out._queued}
+    assert len(queued) == 20
+    assert all(u.new_status == "SENT" and u.attempt_count == 1 for u in queued.values())
+    assert queued["pytest-quote-3"].provider_ref == "ref-pytest-quote-3"